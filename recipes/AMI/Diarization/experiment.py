@@ -289,6 +289,7 @@ def diarize_dataset(full_meta, split_type, n_lambdas, pval, n_neighbors=10):
                 pval,
                 params["affinity"],
                 n_neighbors,
+                params["max_neighbors"],
             )
 
         # Can used for AHC later. Likewise one can add different backends here.
@@ -574,7 +575,7 @@ if __name__ == "__main__":  # noqa: C901
     n_lambdas = None
     best_pval = None
 
-    if params["affinity"] == "cos" and (
+    if params["affinity"] in ["cos", "cos_sparse"] and (
         params["backend"] == "SC" or params["backend"] == "kmeans"
     ):
         # oracle num_spkrs or not, doesn't matter for kmeans and SC backends
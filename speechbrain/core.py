@@ -36,10 +36,14 @@ from torch.utils.data import DistributedSampler
 from torch.nn.parallel import DistributedDataParallel as DDP
 from hyperpyyaml import resolve_references
 from speechbrain.utils.optimizers import rm_vector_weight_decay
+from speechbrain.utils.phase_timer import PhaseTimer
+from speechbrain.dataio.batch import BatchsizeGuesser, PaddedBatch
 from speechbrain.dataio.dataloader import LoopedLoader
+from speechbrain.dataio.dataloader import DevicePrefetcher
 from speechbrain.dataio.dataloader import SaveableDataLoader
 from speechbrain.dataio.sampler import DistributedSamplerWrapper
 from speechbrain.dataio.sampler import ReproducibleRandomSampler
+from speechbrain.dataio.shards import ShardedDynamicItemDataset
 
 logger = logging.getLogger(__name__)
 DEFAULT_LOG_CONFIG = os.path.dirname(os.path.abspath(__file__))
@@ -326,6 +330,26 @@ def parse_arguments(arg_list=None):
         type=int,
         help="Number of batches to accumulate gradients before optimizer step",
     )
+    parser.add_argument(
+        "--prefetch_batches",
+        type=int,
+        help="Number of batches loaded ahead, and copied to the device, in a "
+        "background thread.",
+    )
+    parser.add_argument(
+        "--host_sync_interval",
+        type=int,
+        help="Number of training steps between reads of the loss on the host. "
+        "Above 1, the loss is accumulated on the device and non-finite losses "
+        "are checked only then, which avoids a device to host sync each step.",
+    )
+    parser.add_argument(
+        "--log_timing",
+        default=None,
+        action="store_true",
+        help="This flag logs the timing statistics of each stage through the "
+        "train_logger of the hparams.",
+    )
     parser.add_argument(
         "--optimizer_step_limit",
         type=int,
@@ -484,6 +508,28 @@ class Brain:
         ckpt_interval_steps (int)
             Number of steps between saving intra-epoch checkpoints.
             If non-positive, these are not saved. Default: ``0``.
+        host_sync_interval (int)
+            Number of training steps between reads of the loss on the host.
+            Default: ``1``. Above 1, training is sync-free: the loss stays on
+            the device (``fit_batch()`` does not copy it to the CPU), it is
+            accumulated there and read every ``host_sync_interval`` steps, at
+            intra-epoch checkpoints, and at the end of the stage (the
+            progress bar is updated then). The non-finite loss checks are
+            deferred to these reads too: an optimizer step whose gradients
+            come from a non-finite loss is undone on the device (see
+            ``_gated_optimizer_step()``, which keeps a copy of the parameters
+            and optimizer state for this), and the count of non-finite losses
+            is checked against ``nonfinite_patience`` when read. The number
+            of host syncs of the last training stage is in ``host_syncs``.
+        prefetch_batches (int)
+            If positive, the DataLoaders made by ``make_dataloader()`` load
+            this many batches ahead in a background thread, and copy them to
+            ``device`` there (on a side CUDA stream, with pinned memory), see
+            ``speechbrain.dataio.dataloader.DevicePrefetcher``. Default: ``0``.
+        log_timing (bool)
+            Whether to log the timing statistics of each stage (see
+            ``on_stage_end()``) with ``hparams["train_logger"]``, as the
+            stats of the stage with a "timing" meta. Default: ``False``.
 
 
         Typically in a script this comes from ``speechbrain.parse_args``, which
@@ -549,6 +595,9 @@ class Brain:
             "ckpt_interval_minutes": 0,
             "ckpt_interval_steps": 0,
             "grad_accumulation_factor": 1,
+            "host_sync_interval": 1,
+            "prefetch_batches": 0,
+            "log_timing": False,
             "optimizer_step_limit": None,
             "tqdm_colored_bar": False,
             "tqdm_barcolor": {
@@ -700,6 +749,13 @@ class Brain:
         self.step = 0
         self.valid_step = 0
         self.optimizer_step = 0
+        self.host_syncs = 0
+        self.phase_timer = PhaseTimer()
+        self._batchsize_guesser = BatchsizeGuesser()
+        self.stage_timing = {}
+        self._pending_train_losses = None
+        self._pending_train_steps = 0
+        self._window_finite = None
 
         # Add this class to the checkpointer for intra-epoch checkpoints
         if self.checkpointer is not None:
@@ -766,6 +822,15 @@ class Brain:
 
         Useful for computing stage statistics, saving checkpoints, etc.
 
+        The timing statistics of the stage (percentiles of the time waiting
+        for data, computing and stepping, samples and seconds of audio per
+        second, see ``speechbrain.utils.phase_timer``) are in
+        ``self.stage_timing``, e.g. to add to the stats of a train logger
+        (the ``log_timing`` option logs them with the train_logger of the
+        hparams). In training, the "compute" phase includes the
+        "optimizer" phase (gradient clipping, optimizer step and zeroing
+        of the gradients) of the default ``fit_batch()``.
+
         Arguments
         ---------
         stage : Stage
@@ -831,6 +896,9 @@ class Brain:
         #     loader_kwargs = sb.dataio.dataloader.distributed_loader_specifics(
         #         self.distributed_launch, self.rank, dataset, loader_kwargs
         #     )
+        if self.prefetch_batches > 0:
+            loader_kwargs.setdefault("prefetch_batches", self.prefetch_batches)
+            loader_kwargs.setdefault("prefetch_device", self.device)
         dataloader = sb.dataio.dataloader.make_dataloader(
             dataset, **loader_kwargs
         )
@@ -841,6 +909,10 @@ class Brain:
             and (
                 isinstance(dataloader, SaveableDataLoader)
                 or isinstance(dataloader, LoopedLoader)
+                or (
+                    isinstance(dataloader, DevicePrefetcher)
+                    and isinstance(dataloader.loader, SaveableDataLoader)
+                )
             )
         ):
             ckpt_key = ckpt_prefix + stage.name
@@ -848,6 +920,11 @@ class Brain:
         return dataloader
 
     def _train_loader_specifics(self, dataset, loader_kwargs):
+        if isinstance(dataset, ShardedDynamicItemDataset):
+            # Shuffles and splits the shards between processes by itself,
+            # only needs set_epoch to be called, like a sampler.
+            self.train_sampler = dataset
+            return loader_kwargs
         sampler = loader_kwargs.get("sampler", None)
         # Shuffling should really only matter for the train stage. Shuffling
         # will also lead to more padding in batches if the order was otherwise
@@ -1017,8 +1094,12 @@ class Brain:
         Returns
         -------
         detached loss
+            On the CPU, unless training is sync-free (see
+            ``host_sync_interval``).
         """
         valid_loss = False
+        # Non-finite losses are then checked when the loss is read
+        sync_free = self.host_sync_interval > 1
 
         # Managing automatic mixed precision
         if self.auto_mix_prec:
@@ -1028,7 +1109,7 @@ class Brain:
             # Losses are excluded from mixed precision to avoid instabilities
             loss = self.compute_objectives(outputs, batch, Stage.TRAIN)
 
-            if self.check_gradients(loss):
+            if sync_free or self._check_loss_finite(loss):
                 valid_loss = True
                 self.valid_step += 1
 
@@ -1039,10 +1120,15 @@ class Brain:
                         loss / self.grad_accumulation_factor
                     ).backward()
                 if should_step:
-                    self.scaler.unscale_(self.optimizer)
-                    self.scaler.step(self.optimizer)
-                    self.scaler.update()
-                    self.zero_grad()
+                    with self.phase_timer.time("optimizer"):
+                        self.scaler.unscale_(self.optimizer)
+                        # The scaler skips the steps with non-finite gradients
+                        self._clip_gradients()
+                        # Checking the gradients syncs with the host
+                        self.host_syncs += 1
+                        self.scaler.step(self.optimizer)
+                        self.scaler.update()
+                        self.zero_grad()
                     self.optimizer_step += 1
         else:
             if self.bfloat16_mix_prec:
@@ -1056,7 +1142,7 @@ class Brain:
                 outputs = self.compute_forward(batch, Stage.TRAIN)
                 loss = self.compute_objectives(outputs, batch, Stage.TRAIN)
 
-            if self.check_gradients(loss):
+            if sync_free or self._check_loss_finite(loss):
                 valid_loss = True
                 self.valid_step += 1
 
@@ -1064,12 +1150,23 @@ class Brain:
             if valid_loss:
                 with self.no_sync(not should_step):
                     (loss / self.grad_accumulation_factor).backward()
+                if sync_free:
+                    self._track_window_finite(loss)
                 if should_step:
-                    self.optimizer.step()
-                    self.zero_grad()
+                    with self.phase_timer.time("optimizer"):
+                        self._clip_gradients()
+                        if sync_free:
+                            self._gated_optimizer_step(self._window_finite)
+                            self._window_finite = None
+                        else:
+                            self.optimizer.step()
+                        self.zero_grad()
                     self.optimizer_step += 1
 
         self.on_fit_batch_end(batch, outputs, loss, should_step)
+        if sync_free:
+            return loss.detach()
+        self.host_syncs += 1
         return loss.detach().cpu()
 
     def on_fit_batch_end(self, batch, outputs, loss, should_step):
@@ -1104,6 +1201,18 @@ class Brain:
         bool
             Whether or not the optimizer step should be carried out.
         """
+        if not self._check_loss_finite(loss):
+            return False
+
+        self._clip_gradients()
+        return True
+
+    def _check_loss_finite(self, loss):
+        """Checks that the loss is finite, counting the non-finite losses
+        against ``nonfinite_patience``. Does not touch the gradients, so
+        that ``fit_batch()`` can check the loss before ``backward()`` and
+        clip the gradients after."""
+        self.host_syncs += 1
         if not torch.isfinite(loss):
             self.nonfinite_count += 1
 
@@ -1113,26 +1222,130 @@ class Brain:
                 if not torch.isfinite(p).all():
                     logger.warning("Parameter is not finite: " + str(p))
 
-            # Check if patience is exhausted
-            if self.nonfinite_count > self.nonfinite_patience:
-                raise ValueError(
-                    "Loss is not finite and patience is exhausted. "
-                    "To debug, wrap `fit()` with "
-                    "autograd's `detect_anomaly()`, e.g.\n\nwith "
-                    "torch.autograd.detect_anomaly():\n\tbrain.fit(...)"
-                )
-            else:
-                logger.warning(
-                    "Patience not yet exhausted, ignoring this batch."
-                )
-                return False
+            self._check_nonfinite_patience()
+            logger.warning("Patience not yet exhausted, ignoring this batch.")
+            return False
+        return True
 
+    def _check_nonfinite_patience(self):
+        if self.nonfinite_count > self.nonfinite_patience:
+            raise ValueError(
+                "Loss is not finite and patience is exhausted. "
+                "To debug, wrap `fit()` with "
+                "autograd's `detect_anomaly()`, e.g.\n\nwith "
+                "torch.autograd.detect_anomaly():\n\tbrain.fit(...)"
+            )
+
+    def _clip_gradients(self):
         if self.max_grad_norm > 0.0:
             torch.nn.utils.clip_grad_norm_(
                 (p for p in self.modules.parameters()), self.max_grad_norm
             )
 
-        return True
+    def _track_window_finite(self, loss):
+        """Keeps, on the device, whether all the losses since the last
+        optimizer step are finite."""
+        finite = torch.isfinite(loss.detach())
+        if self._window_finite is None:
+            self._window_finite = finite
+        else:
+            self._window_finite = self._window_finite & finite
+
+    def _gated_optimizer_step(self, finite):
+        """Steps the optimizer, then undoes the step on the device if
+        ``finite`` is False, without syncing with the host.
+
+        Used by sync-free training instead of skipping the step (deciding to
+        skip would need the loss on the host). The parameters and the
+        optimizer state are copied before the step, and put back where
+        ``finite`` is False, so the step of a non-finite loss moves neither
+        the parameters nor the momentum buffers, and applies no weight decay.
+        With gradient accumulation, the batches accumulated with it are
+        skipped too. State created by the step (on the first one) is reset
+        to zeros. State kept on another device than the loss cannot be
+        restored without a sync, and is left as is: the step counts that
+        most PyTorch optimizers keep on the CPU then count skipped steps.
+
+        Arguments
+        ---------
+        finite : torch.Tensor
+            Boolean scalar on the device, whether the step is kept.
+        """
+        params = [
+            p for group in self.optimizer.param_groups for p in group["params"]
+        ]
+        saved_params = [p.detach().clone() for p in params]
+        saved_state = {
+            (i, key): value.clone()
+            for i, p in enumerate(params)
+            for key, value in self.optimizer.state.get(p, {}).items()
+            if torch.is_tensor(value) and value.device == finite.device
+        }
+        self.optimizer.step()
+        with torch.no_grad():
+            for p, saved in zip(params, saved_params):
+                p.copy_(torch.where(finite, p, saved))
+            for i, p in enumerate(params):
+                state = self.optimizer.state.get(p, {})
+                for key, value in state.items():
+                    if not torch.is_tensor(value):
+                        continue
+                    if value.device != finite.device:
+                        continue
+                    saved = saved_state.get((i, key))
+                    if saved is None:
+                        saved = torch.zeros_like(value)
+                    value.copy_(torch.where(finite, value, saved))
+
+    def _accumulate_train_loss(self, loss):
+        """Updates, on the device of the loss, the average train loss (as
+        ``update_average()`` does) and the count of non-finite losses, which
+        are read by ``_sync_train_loss()``.
+
+        The average after the pending steps is ``a * avg + b``, where ``avg``
+        is the average at the last read, so only ``a`` and ``b`` are kept.
+        """
+        loss = loss.detach().float()
+        if self._pending_train_losses is None:
+            self._pending_train_losses = torch.stack(
+                [
+                    torch.ones_like(loss),
+                    torch.zeros_like(loss),
+                    torch.zeros_like(loss),
+                ]
+            )
+        a, b, nonfinite = self._pending_train_losses
+        # Non-finite losses leave the average unchanged, as with
+        # update_average()
+        scale = 1 - 1 / self.step
+        updated = torch.stack(
+            [a * scale, b * scale + loss / self.step, nonfinite]
+        )
+        skipped = torch.stack([a, b, nonfinite + 1])
+        self._pending_train_losses = torch.where(
+            torch.isfinite(loss), updated, skipped
+        )
+        self._pending_train_steps += 1
+
+    def _sync_train_loss(self):
+        """Reads the losses accumulated on the device, updates the average
+        train loss and checks the non-finite losses."""
+        if self._pending_train_steps == 0:
+            return
+        a, b, nonfinite = self._pending_train_losses.tolist()
+        self.host_syncs += 1
+        steps = self._pending_train_steps
+        self._pending_train_losses = None
+        self._pending_train_steps = 0
+
+        self.avg_train_loss = a * self.avg_train_loss + b
+        if nonfinite > 0:
+            self.nonfinite_count += int(nonfinite)
+            logger.warning(
+                f"{int(nonfinite)} non-finite losses in the last {steps} "
+                "steps, their optimizer steps were undone."
+            )
+            self._check_nonfinite_patience()
 
     def evaluate_batch(self, batch, stage):
         """Evaluate one batch, override for different procedure than train.
@@ -1168,6 +1381,8 @@ class Brain:
 
         # Reset nonfinite count to 0 each epoch
         self.nonfinite_count = 0
+        self.host_syncs = 0
+        self._window_finite = None
 
         if self.train_sampler is not None and hasattr(
             self.train_sampler, "set_epoch"
@@ -1177,6 +1392,7 @@ class Brain:
         # Time since last intra-epoch checkpoint
         last_ckpt_time = time.time()
         steps_since_ckpt = 0
+        self.phase_timer.reset()
         with tqdm(
             train_set,
             initial=self.step,
@@ -1184,17 +1400,25 @@ class Brain:
             disable=not enable,
             colour=self.tqdm_barcolor["train"],
         ) as t:
-            for batch in t:
+            for batch in self.phase_timer.timed(t):
                 if self._optimizer_step_limit_exceeded:
                     logger.info("Train iteration limit exceeded")
                     break
                 self.step += 1
                 steps_since_ckpt += 1
-                loss = self.fit_batch(batch)
-                self.avg_train_loss = self.update_average(
-                    loss, self.avg_train_loss
-                )
-                t.set_postfix(train_loss=self.avg_train_loss)
+                self._count_batch(batch)
+                with self.phase_timer.time("compute"):
+                    loss = self.fit_batch(batch)
+                if self.host_sync_interval > 1:
+                    self._accumulate_train_loss(loss)
+                    if self.step % self.host_sync_interval == 0:
+                        self._sync_train_loss()
+                        t.set_postfix(train_loss=self.avg_train_loss)
+                else:
+                    self.avg_train_loss = self.update_average(
+                        loss, self.avg_train_loss
+                    )
+                    t.set_postfix(train_loss=self.avg_train_loss)
 
                 # Profile only if desired (steps allow the profiler to know when all is warmed up)
                 if self.profiler is not None:
@@ -1209,10 +1433,16 @@ class Brain:
                     last_ckpt_time, steps_since_ckpt
                 ):
                     # Checkpointer class will handle running this on main only
-                    self._save_intra_epoch_ckpt()
+                    self._sync_train_loss()
+                    with self.phase_timer.time("checkpoint"):
+                        self._save_intra_epoch_ckpt()
                     last_ckpt_time = time.time()
                     steps_since_ckpt = 0
 
+        self._sync_train_loss()
+        logger.debug(f"{self.host_syncs} host syncs in the training stage")
+        self._summarize_timing(Stage.TRAIN)
+
         # Run train "on_stage_end" on all processes
         self.zero_grad(set_to_none=True)  # flush gradients
         self.on_stage_end(Stage.TRAIN, self.avg_train_loss, epoch)
@@ -1220,6 +1450,43 @@ class Brain:
         self.step = 0
         self.valid_step = 0
 
+    def _count_batch(self, batch):
+        """Counts the examples and the audio of a batch in the throughput.
+
+        The audio is found in the "sig" key of a PaddedBatch, and its
+        duration needs a ``sample_rate`` hyperparameter. The duration is
+        summed on the device of the lengths, without syncing.
+        """
+        if not isinstance(batch, PaddedBatch):
+            self.phase_timer.add_batch(self._batchsize_guesser(batch))
+            return
+        audio_seconds = None
+        sample_rate = getattr(getattr(self, "hparams", None), "sample_rate", 0)
+        if sample_rate and hasattr(batch, "sig"):
+            wavs, wav_lens = batch.sig
+            audio_seconds = wav_lens.sum() * wavs.shape[1] / sample_rate
+        self.phase_timer.add_batch(len(batch), audio_seconds)
+
+    def _summarize_timing(self, stage):
+        """Stores the timing statistics of the stage in ``stage_timing``,
+        where ``on_stage_end()`` can find them, and logs them with the train
+        logger of the hparams if ``log_timing``."""
+        self.stage_timing = self.phase_timer.summary()
+        logger.debug(f"Timing of the {stage.name} stage: {self.stage_timing}")
+        train_logger = getattr(
+            getattr(self, "hparams", None), "train_logger", None
+        )
+        if self.log_timing and train_logger is not None:
+            stats = {
+                Stage.TRAIN: "train_stats",
+                Stage.VALID: "valid_stats",
+                Stage.TEST: "test_stats",
+            }[stage]
+            train_logger.log_stats(
+                stats_meta={"timing": stage.name.lower()},
+                **{stats: self.stage_timing},
+            )
+
     def _should_save_intra_epoch_ckpt(self, last_ckpt_time, steps_since_ckpt):
         """Determines if an intra-epoch checkpoint should be saved.
 
@@ -1248,6 +1515,7 @@ class Brain:
         # timing result than the other processes.
         else:
             broadcast_list = [decision]
+            self.host_syncs += 1
             torch.distributed.broadcast_object_list(broadcast_list, src=0)
             return broadcast_list[0]
 
@@ -1257,15 +1525,20 @@ class Brain:
             self.on_stage_start(Stage.VALID, epoch)
             self.modules.eval()
             avg_valid_loss = 0.0
+            self.phase_timer.reset()
             with torch.no_grad():
-                for batch in tqdm(
-                    valid_set,
-                    dynamic_ncols=True,
-                    disable=not enable,
-                    colour=self.tqdm_barcolor["valid"],
+                for batch in self.phase_timer.timed(
+                    tqdm(
+                        valid_set,
+                        dynamic_ncols=True,
+                        disable=not enable,
+                        colour=self.tqdm_barcolor["valid"],
+                    )
                 ):
                     self.step += 1
-                    loss = self.evaluate_batch(batch, stage=Stage.VALID)
+                    self._count_batch(batch)
+                    with self.phase_timer.time("compute"):
+                        loss = self.evaluate_batch(batch, stage=Stage.VALID)
                     avg_valid_loss = self.update_average(loss, avg_valid_loss)
 
                     # Profile only if desired (steps allow the profiler to know when all is warmed up)
@@ -1278,6 +1551,7 @@ class Brain:
                         break
 
                 self.step = 0
+                self._summarize_timing(Stage.VALID)
                 self.on_stage_end(Stage.VALID, avg_valid_loss, epoch)
 
     def fit(
@@ -1338,6 +1612,7 @@ class Brain:
         if not (
             isinstance(train_set, DataLoader)
             or isinstance(train_set, LoopedLoader)
+            or isinstance(train_set, DevicePrefetcher)
         ):
             train_set = self.make_dataloader(
                 train_set, stage=sb.Stage.TRAIN, **train_loader_kwargs
@@ -1345,6 +1620,7 @@ class Brain:
         if valid_set is not None and not (
             isinstance(valid_set, DataLoader)
             or isinstance(valid_set, LoopedLoader)
+            or isinstance(valid_set, DevicePrefetcher)
         ):
             valid_set = self.make_dataloader(
                 valid_set,
@@ -1374,6 +1650,10 @@ class Brain:
             ):
                 break
 
+        # Asynchronous checkpoints are complete when fit returns
+        if self.checkpointer is not None:
+            self.checkpointer.wait_for_saves()
+
     @property
     def _optimizer_step_limit_exceeded(self):
         return (
@@ -1523,6 +1803,7 @@ class Brain:
         if not (
             isinstance(test_set, DataLoader)
             or isinstance(test_set, LoopedLoader)
+            or isinstance(test_set, DevicePrefetcher)
         ):
             test_loader_kwargs["ckpt_prefix"] = None
             test_set = self.make_dataloader(
@@ -1532,15 +1813,20 @@ class Brain:
         self.on_stage_start(Stage.TEST, epoch=None)
         self.modules.eval()
         avg_test_loss = 0.0
+        self.phase_timer.reset()
         with torch.no_grad():
-            for batch in tqdm(
-                test_set,
-                dynamic_ncols=True,
-                disable=not progressbar,
-                colour=self.tqdm_barcolor["test"],
+            for batch in self.phase_timer.timed(
+                tqdm(
+                    test_set,
+                    dynamic_ncols=True,
+                    disable=not progressbar,
+                    colour=self.tqdm_barcolor["test"],
+                )
             ):
                 self.step += 1
-                loss = self.evaluate_batch(batch, stage=Stage.TEST)
+                self._count_batch(batch)
+                with self.phase_timer.time("compute"):
+                    loss = self.evaluate_batch(batch, stage=Stage.TEST)
                 avg_test_loss = self.update_average(loss, avg_test_loss)
 
                 # Profile only if desired (steps allow the profiler to know when all is warmed up)
@@ -1552,8 +1838,11 @@ class Brain:
                 if self.debug and self.step == self.debug_batches:
                     break
 
+            self._summarize_timing(Stage.TEST)
             self.on_stage_end(Stage.TEST, avg_test_loss, None)
         self.step = 0
+        if self.checkpointer is not None:
+            self.checkpointer.wait_for_saves()
         return avg_test_loss
 
     def update_average(self, loss, avg_loss):
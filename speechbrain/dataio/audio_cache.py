@@ -0,0 +1,373 @@
+"""Cache of audio headers and decoded audio for segment reads.
+
+Datasets such as AMI, Switchboard or LibriParty describe many segments
+(``{"file": ..., "start": ..., "stop": ...}``) of the same long recordings.
+``read_audio`` opens, parses and seeks the file again for each of them, and
+``read_audio_info`` parses the header again for durations. ``AudioCache``
+reads each file once per process instead:
+
+- The headers (sample rate, number of frames and channels, and for PCM WAV
+  the offset and type of the samples) are kept in an index, which can be
+  built beforehand and persisted to disk.
+- PCM WAV files are memory-mapped, so that a segment read is a slice of the
+  mapped samples, converted to float.
+- Other (compressed) files are decoded whole, and kept in a least recently
+  used cache bounded by its size in bytes.
+
+Each DataLoader worker has its own copy of the cache (the memory maps and
+decoded files are not sent to the workers), so it plugs into a
+``DynamicItemDataset`` as a dynamic item, in place of ``read_audio``.
+
+Example
+-------
+>>> import torch
+>>> from speechbrain.dataio.dataio import read_audio, write_audio
+>>> from speechbrain.dataio.dataset import DynamicItemDataset
+>>> tmpdir = getfixture("tmpdir")
+>>> path = str(tmpdir / "meeting.wav")
+>>> write_audio(path, torch.rand(48000) - 0.5, 16000)
+>>> data = {
+...     f"seg{i}": {"wav": {"file": path, "start": 8000 * i, "stop": 8000 * (i + 1)}}
+...     for i in range(6)
+... }
+>>> cache = AudioCache(str(tmpdir / "audio_index.json"))
+>>> cache.build([path], num_workers=0)
+1
+>>> cache.info(path).num_frames
+48000
+>>> dataset = DynamicItemDataset(data)
+>>> dataset.add_dynamic_item(cache, takes="wav", provides="sig")
+>>> dataset.set_output_keys(["id", "sig"])
+>>> torch.equal(dataset[1]["sig"], read_audio(data["seg1"]["wav"]))
+True
+"""
+
+import collections
+import json
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+import torch
+
+from speechbrain.dataio.dataio import read_audio, read_audio_info
+from speechbrain.utils.parallel import parallel_map
+
+logger = logging.getLogger(__name__)
+
+AudioHeader = collections.namedtuple(
+    "AudioHeader",
+    ["sample_rate", "num_frames", "num_channels", "data_offset", "dtype"],
+)
+AudioHeader.__doc__ = """Header of an audio file. data_offset (in bytes) and
+dtype (numpy type of the samples) are None unless the file is a PCM WAV file
+that can be memory-mapped."""
+
+# Format tags of the WAV fmt chunk
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Memory-mappable sample types, by format and bits per sample
+WAV_DTYPES = {
+    (WAVE_FORMAT_PCM, 8): "u1",
+    (WAVE_FORMAT_PCM, 16): "<i2",
+    (WAVE_FORMAT_PCM, 32): "<i4",
+    (WAVE_FORMAT_IEEE_FLOAT, 32): "<f4",
+    (WAVE_FORMAT_IEEE_FLOAT, 64): "<f8",
+}
+
+
+class AudioCache:
+    """Reads audio (files or segments of files) with cached headers, memory
+    maps and decoded files.
+
+    Calling the cache on an audio in the notation of ``read_audio`` (a path,
+    or a dict with file, start and stop) returns the same tensor as
+    ``read_audio``. ``info`` replaces ``read_audio_info``.
+
+    Arguments
+    ---------
+    index_path : str, None
+        JSON file where the index of the headers is persisted (see ``build``
+        and ``save``). None keeps the index in memory only.
+    max_decoded_bytes : int
+        Maximum size of the decoded (non memory-mappable) files kept in
+        memory, in each process.
+    max_open_files : int
+        Maximum number of memory-mapped files, in each process.
+    """
+
+    def __init__(
+        self,
+        index_path=None,
+        max_decoded_bytes=512 * 2 ** 20,
+        max_open_files=128,
+    ):
+        self.index_path = index_path
+        self.max_decoded_bytes = max_decoded_bytes
+        self.max_open_files = max_open_files
+        self.reload()
+
+    def reload(self):
+        """Reads the index again, e.g. after another process has built it."""
+        self._index = {}
+        if self.index_path is not None and os.path.isfile(self.index_path):
+            with open(self.index_path) as fi:
+                self._index = json.load(fi)
+        # Files whose index entry was checked against the file in this process
+        self._checked = set()
+        self._maps = collections.OrderedDict()
+        self._decoded = collections.OrderedDict()
+        self._decoded_bytes = 0
+
+    def build(self, paths, num_workers=None, chunk_size=64):
+        """Reads the headers of the files missing from the index, or which
+        have changed, and saves the index.
+
+        Arguments
+        ---------
+        paths : list
+            Paths of the audio files.
+        num_workers : int, None
+            Number of processes reading the headers. 0 reads them in this
+            process. None uses as many processes as CPUs.
+        chunk_size : int
+            Number of files given at once to a worker process.
+
+        Returns
+        -------
+        int
+            The number of headers read.
+        """
+        to_read = [
+            path
+            for path in dict.fromkeys(paths)
+            if self._index.get(path, {}).get("stat") != _file_stat(path)
+        ]
+        if not to_read:
+            return 0
+        if num_workers == 0:
+            entries = map(_index_entry, to_read)
+        else:
+            kwargs = (
+                {} if num_workers is None else {"process_count": num_workers}
+            )
+            entries = parallel_map(
+                _index_entry, to_read, chunk_size=chunk_size, **kwargs
+            )
+        for path, entry in zip(to_read, entries):
+            self._index[path] = entry
+            self._checked.add(path)
+        self.save()
+        return len(to_read)
+
+    def save(self):
+        """Writes the index (with the headers read so far) to index_path."""
+        if self.index_path is None:
+            return
+        with open(self.index_path + ".tmp", "w") as fo:
+            json.dump(self._index, fo)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def info(self, path):
+        """Returns the header of an audio file.
+
+        Arguments
+        ---------
+        path : str
+            Path of the audio file.
+
+        Returns
+        -------
+        AudioHeader
+            With the same sample_rate, num_frames and num_channels as
+            ``read_audio_info``.
+        """
+        if path not in self._checked:
+            entry = self._index.get(path)
+            if entry is None or entry["stat"] != _file_stat(path):
+                self._index[path] = _index_entry(path)
+                self._maps.pop(path, None)
+                self._uncache_decoded(path)
+            self._checked.add(path)
+        return AudioHeader(*self._index[path]["header"])
+
+    def __call__(self, waveforms_obj):
+        """Reads an audio, see ``read_audio``.
+
+        Arguments
+        ---------
+        waveforms_obj : str, dict
+            Path to audio or dict with the file, start and stop.
+
+        Returns
+        -------
+        torch.Tensor
+            1-channel: audio tensor with shape: `(samples, )`.
+            >=2-channels: audio tensor with shape: `(samples, channels)`.
+        """
+        if isinstance(waveforms_obj, str):
+            path, start, stop = waveforms_obj, 0, None
+        elif isinstance(waveforms_obj, dict):
+            path = waveforms_obj["file"]
+            start = waveforms_obj.get("start", 0)
+            stop = waveforms_obj.get("stop", start)
+            if start < 0 or stop < start:
+                # read_audio raises the appropriate error
+                return read_audio(waveforms_obj)
+            # As read_audio, start == stop reads to the end
+            stop = None if stop == start else stop
+        else:
+            return read_audio(waveforms_obj)
+
+        header = self.info(path)
+        if header.data_offset is not None:
+            samples = self._mapped(path, header)[start:stop]
+            audio = torch.from_numpy(_to_float(samples))
+        else:
+            audio = self._decoded_audio(path)[start:stop]
+        return audio.squeeze(1)
+
+    def __getstate__(self):
+        # Memory maps and decoded files are not sent to the DataLoader workers
+        state = self.__dict__.copy()
+        state["_maps"] = collections.OrderedDict()
+        state["_decoded"] = collections.OrderedDict()
+        state["_decoded_bytes"] = 0
+        return state
+
+    def _mapped(self, path, header):
+        """The samples of a PCM WAV file, [frames, channels], memory-mapped."""
+        samples = self._maps.get(path)
+        if samples is None:
+            with open(path, "rb") as fi:
+                buffer = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+            samples = np.frombuffer(
+                buffer,
+                dtype=header.dtype,
+                count=header.num_frames * header.num_channels,
+                offset=header.data_offset,
+            ).reshape(header.num_frames, header.num_channels)
+            if len(self._maps) >= self.max_open_files:
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(path)
+        self._maps[path] = samples
+        return samples
+
+    def _decoded_audio(self, path):
+        """The decoded audio of a file, [frames, channels]."""
+        audio = self._decoded.get(path)
+        if audio is not None:
+            self._decoded.move_to_end(path)
+            return audio
+        audio = read_audio(path)
+        if audio.dim() == 1:
+            audio = audio.unsqueeze(1)
+        size = audio.numel() * audio.element_size()
+        if size <= self.max_decoded_bytes:
+            while self._decoded_bytes + size > self.max_decoded_bytes:
+                _, evicted = self._decoded.popitem(last=False)
+                self._decoded_bytes -= evicted.numel() * evicted.element_size()
+            self._decoded[path] = audio
+            self._decoded_bytes += size
+        return audio
+
+    def _uncache_decoded(self, path):
+        audio = self._decoded.pop(path, None)
+        if audio is not None:
+            self._decoded_bytes -= audio.numel() * audio.element_size()
+
+
+def wav_header(path):
+    """Parses the header of a WAV file, if its samples can be memory-mapped.
+
+    Arguments
+    ---------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    AudioHeader, None
+        The header, or None if the file is not a WAV file with 8, 16 or 32
+        bits integer or 32 or 64 bits float samples.
+
+    Example
+    -------
+    >>> import torch
+    >>> from speechbrain.dataio.dataio import write_audio
+    >>> path = str(getfixture("tmpdir") / "stereo.wav")
+    >>> write_audio(path, torch.rand(1600, 2) - 0.5, 16000)
+    >>> header = wav_header(path)
+    >>> header.sample_rate, header.num_frames, header.num_channels
+    (16000, 1600, 2)
+    """
+    with open(path, "rb") as fi:
+        riff = fi.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            chunk_header = fi.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                fmt = fi.read(chunk_size)
+            elif chunk_id == b"data":
+                data_offset = fi.tell()
+                break
+            else:
+                fi.seek(chunk_size, os.SEEK_CUR)
+            # Chunks are aligned on two bytes
+            if chunk_size % 2:
+                fi.seek(1, os.SEEK_CUR)
+        file_size = os.fstat(fi.fileno()).st_size
+
+    if fmt is None or len(fmt) < 16:
+        return None
+    format_tag, num_channels, sample_rate, _, block_align, bits = struct.unpack(
+        "<HHIIHH", fmt[:16]
+    )
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # The format is at the start of the subformat GUID
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    dtype = WAV_DTYPES.get((format_tag, bits))
+    if dtype is None or block_align != num_channels * bits // 8:
+        return None
+    # The data size may be wrong, e.g. in files written as streams
+    data_size = min(chunk_size, file_size - data_offset)
+    return AudioHeader(
+        sample_rate, data_size // block_align, num_channels, data_offset, dtype
+    )
+
+
+def _to_float(samples):
+    """Converts samples to float32, normalized as by torchaudio.load."""
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if samples.dtype.kind == "i":
+        scale = np.float32(2.0 ** (1 - 8 * samples.dtype.itemsize))
+        # One pass, and a power of two scale: same values as a division
+        return np.multiply(samples, scale, dtype=np.float32)
+    return samples.astype(np.float32)
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _index_entry(path):
+    """The index entry of a file: its header and stat."""
+    header = wav_header(path)
+    if header is None:
+        info = read_audio_info(path)
+        header = AudioHeader(
+            info.sample_rate, info.num_frames, info.num_channels, None, None
+        )
+    return {"header": list(header), "stat": _file_stat(path)}
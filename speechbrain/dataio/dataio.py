@@ -240,10 +240,15 @@ def read_audio(waveforms_obj):
     Which codecs are supported depends on your torchaudio backend.
     Refer to `torchaudio.load` documentation for further details.
 
+    To read many segments of the same files, see
+    `speechbrain.dataio.audio_cache.AudioCache`.
+
     Arguments
     ----------
-    waveforms_obj : str, dict
-        Path to audio or dict with the desired configuration.
+    waveforms_obj : str, dict, file-like
+        Path to audio or dict with the desired configuration. An open
+        (binary) file-like object, e.g. an audio file read from a shard into
+        an io.BytesIO, is loaded whole.
 
         Keys for the dict variant:
         - `"file"` (str): Path to the audio file.
@@ -271,7 +276,7 @@ def read_audio(waveforms_obj):
     >>> loaded.allclose(dummywav.squeeze(0),atol=1e-4) # replace with eq with sox_io backend
     True
     """
-    if isinstance(waveforms_obj, str):
+    if isinstance(waveforms_obj, str) or hasattr(waveforms_obj, "read"):
         audio, _ = torchaudio.load(waveforms_obj)
     else:
         path = waveforms_obj["file"]
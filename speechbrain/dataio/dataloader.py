@@ -40,9 +40,15 @@ from torch.utils.data.dataloader import _BaseDataLoaderIter
 import logging
 import warnings
 import functools
+import queue
+import threading
+import torch
 from torch.utils.data import DistributedSampler
+from torch.utils.data._utils.pin_memory import pin_memory as recursive_pin
 from speechbrain.dataio.batch import PaddedBatch, BatchsizeGuesser
+from speechbrain.utils.data_utils import recursive_to
 from speechbrain.dataio.dataset import DynamicItemDataset
+from speechbrain.dataio.shards import ShardedDynamicItemDataset
 from speechbrain.dataio.sampler import (
     ReproducibleRandomSampler,
     DistributedSamplerWrapper,
@@ -123,6 +129,9 @@ def distributed_loader_specifics(
                 loader_kwargs.get("batch_sampler", None), rank=rank,
             )
             loader_kwargs["batch_sampler"] = sampler
+    elif distributed_launch and isinstance(dataset, ShardedDynamicItemDataset):
+        # Shards are split between the processes by the dataset itself
+        pass
     elif distributed_launch and isinstance(dataset, IterableDataset):
         logger.warning(
             "Cannot automatically solve distributed sampling "
@@ -131,11 +140,17 @@ def distributed_loader_specifics(
     return loader_kwargs
 
 
-def make_dataloader(dataset, looped_nominal_epoch=None, **loader_kwargs):
+def make_dataloader(
+    dataset,
+    looped_nominal_epoch=None,
+    prefetch_batches=0,
+    prefetch_device=None,
+    **loader_kwargs,
+):
     """Makes a basic DataLoader with SpeechBrain defaults.
 
-    For DynamicItemDatasets (which return dicts), use
-    PaddedBatch as the default collate_fn.
+    For DynamicItemDatasets and ShardedDynamicItemDatasets (which return
+    dicts), use PaddedBatch as the default collate_fn.
 
     Shuffling gets implemented by ReproducibleRandomSampler.
 
@@ -156,6 +171,13 @@ def make_dataloader(dataset, looped_nominal_epoch=None, **loader_kwargs):
         If an integer is given, loop the underlying DataLoader infinitely and
         set a nominal epoch length in batches (or whatever the DataLoader
         yields).
+    prefetch_batches : int
+        If positive, wrap the DataLoader in a DevicePrefetcher, which loads
+        this many batches ahead in a background thread, and moves them to
+        prefetch_device.
+    prefetch_device : str, torch.device, None
+        Device where the DevicePrefetcher moves the batches. If None, they
+        are only loaded ahead.
     **loader_kwargs : dict
         Keyword args to DataLoader, see PyTorch DataLoader for
         options.
@@ -164,16 +186,23 @@ def make_dataloader(dataset, looped_nominal_epoch=None, **loader_kwargs):
     -------
     DataLoader
         If looped_nominal_epoch is None
+    DevicePrefetcher
+        If prefetch_batches is positive (and looped_nominal_epoch is None)
     LoopedLoader
         If looped_nominal_epoch is not None
     """
     # PaddedBatch as default collation for DynamicItemDataset
     if "collate_fn" not in loader_kwargs and isinstance(
-        dataset, DynamicItemDataset
+        dataset, (DynamicItemDataset, ShardedDynamicItemDataset)
     ):
         loader_kwargs["collate_fn"] = PaddedBatch
     # Reproducible random sampling
     if loader_kwargs.get("shuffle", False):
+        if isinstance(dataset, ShardedDynamicItemDataset):
+            raise ValueError(
+                "ShardedDynamicItemDataset shuffles by itself, set "
+                "shuffle=True on the dataset instead of the loader"
+            )
         if loader_kwargs.get("sampler") is not None:
             raise ValueError(
                 "Cannot specify both shuffle=True and a "
@@ -200,6 +229,10 @@ def make_dataloader(dataset, looped_nominal_epoch=None, **loader_kwargs):
         dataloader = DataLoader(dataset, **loader_kwargs)
     else:
         dataloader = SaveableDataLoader(dataset, **loader_kwargs)
+    if prefetch_batches > 0:
+        dataloader = DevicePrefetcher(
+            dataloader, prefetch_device, prefetch_batches
+        )
     if looped_nominal_epoch is not None:
         dataloader = LoopedLoader(dataloader, looped_nominal_epoch)
     return dataloader
@@ -409,3 +442,175 @@ class LoopedLoader:
                 # loop has already finished but there is a checkpoint in the
                 # middle of validation.
                 self.step = self.epoch_length
+
+
+# Put in the queue of a DevicePrefetcher when the loader is exhausted
+_END_OF_LOADER = object()
+
+
+class _LoaderError:
+    """Carries an exception from the thread of a DevicePrefetcher."""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+@register_checkpoint_hooks
+class DevicePrefetcher:
+    """Loads batches ahead in a background thread, and moves them to a device.
+
+    Copying a batch to the GPU in ``compute_forward`` (``batch.to(device)``)
+    is synchronous and on the critical path. This loads the next batches in
+    a thread, while the current one is processed, pins their memory, and
+    copies them to the device with non-blocking copies on a side CUDA
+    stream, so that the copies overlap with compute. On the CPU (or with
+    device None), the batches are only loaded ahead, which overlaps e.g.
+    collation with compute when the DataLoader has no workers.
+
+    The prefetched batches already are on the device: moving them there
+    again (``batch.to(device)``) does nothing.
+
+    When it wraps a SaveableDataLoader, save the DevicePrefetcher in
+    checkpoints rather than the DataLoader: it saves the position of the
+    batches actually used, rather than of the batches loaded ahead.
+
+    Arguments
+    ---------
+    loader : iterable
+        The DataLoader (or other iterable of batches).
+    device : str, torch.device, None
+        Where to move the batches. If None, the batches are not moved.
+    num_batches : int
+        Number of batches loaded ahead.
+
+    Example
+    -------
+    >>> from speechbrain.dataio.dataset import DynamicItemDataset
+    >>> dataset = DynamicItemDataset(
+    ...     {"a": {"x": 1.0}, "b": {"x": 2.0}, "c": {"x": 3.0}},
+    ...     output_keys=["x"],
+    ... )
+    >>> loader = make_dataloader(dataset, batch_size=2)
+    >>> prefetcher = DevicePrefetcher(loader, "cpu", num_batches=2)
+    >>> [batch.x for batch in prefetcher]
+    [tensor([1., 2.], dtype=torch.float64), tensor([3.], dtype=torch.float64)]
+    """
+
+    def __init__(self, loader, device=None, num_batches=2):
+        self.loader = loader
+        self.device = None if device is None else torch.device(device)
+        self.num_batches = num_batches
+        self._num_used = None
+        self._start_position = 0
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        # The position the SaveableDataLoader recovered to, if any
+        self._start_position = (
+            getattr(self.loader, "_speechbrain_recovery_skip_to", None) or 0
+        )
+        self._num_used = 0
+        use_cuda = self.device is not None and self.device.type == "cuda"
+        batches = queue.Queue(maxsize=self.num_batches)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._load,
+            args=(iter(self.loader), batches, stop, use_cuda),
+            daemon=True,
+        )
+        thread.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _END_OF_LOADER:
+                    return
+                if isinstance(item, _LoaderError):
+                    raise item.exception
+                batch, copied = item
+                if copied is not None:
+                    stream = torch.cuda.current_stream(self.device)
+                    stream.wait_event(copied)
+                    # The memory was allocated on the side stream
+                    _record_stream(batch, stream)
+                self._num_used += 1
+                yield batch
+        finally:
+            stop.set()
+
+    def _load(self, iterator, batches, stop, use_cuda):
+        # Runs in the background thread
+        stream = None
+        if use_cuda:
+            torch.cuda.set_device(self.device)
+            stream = torch.cuda.Stream(self.device)
+        try:
+            for batch in iterator:
+                copied = None
+                if stream is not None:
+                    batch = _pin(batch)
+                    with torch.cuda.stream(stream):
+                        batch = _move(batch, self.device, non_blocking=True)
+                        copied = torch.cuda.Event()
+                        copied.record(stream)
+                elif self.device is not None:
+                    batch = _move(batch, self.device)
+                if not _put_until_stopped(batches, (batch, copied), stop):
+                    return
+            _put_until_stopped(batches, _END_OF_LOADER, stop)
+        except BaseException as e:
+            _put_until_stopped(batches, _LoaderError(e), stop)
+
+    @mark_as_saver
+    def _speechbrain_save(self, path):
+        # Same format as SaveableDataLoader: the position in the epoch
+        if self._num_used is None:
+            to_save = None
+        else:
+            to_save = self._start_position + self._num_used
+        with open(path, "w") as fo:
+            fo.write(str(to_save))
+
+    @mark_as_loader
+    def _speechbrain_load(self, path, end_of_epoch, device=None):
+        if isinstance(self.loader, SaveableDataLoader):
+            self.loader._speechbrain_load(path, end_of_epoch, device)
+
+
+def _put_until_stopped(batches, item, stop):
+    """Puts item in the queue, unless the iteration has stopped first."""
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _pin(batch):
+    """Pins the memory of a batch, unless already pinned."""
+    if isinstance(batch, PaddedBatch):
+        return batch.pin_memory()
+    return recursive_pin(batch)
+
+
+def _move(batch, device, non_blocking=False):
+    if isinstance(batch, PaddedBatch):
+        return batch.to(device, non_blocking=non_blocking)
+    return recursive_to(batch, device, non_blocking=non_blocking)
+
+
+def _record_stream(data, stream):
+    """Marks the tensors of a batch as used on stream, so that the caching
+    allocator does not reuse their memory while the stream needs it."""
+    if isinstance(data, torch.Tensor):
+        if data.is_cuda:
+            data.record_stream(stream)
+    elif isinstance(data, dict):
+        for value in data.values():
+            _record_stream(value, stream)
+    elif isinstance(data, (list, tuple, PaddedBatch)):
+        for value in data:
+            _record_stream(value, stream)
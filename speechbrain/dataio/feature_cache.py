@@ -0,0 +1,280 @@
+"""On-disk cache of precomputed features.
+
+Without augmentation on the waveforms, features such as ``Fbank`` or
+``MFCC`` are the same at every epoch, yet they are recomputed for every
+batch. ``FeatureCache`` computes them once (in parallel) and stores them in
+a single memory-mapped file, so that loading the features of an example is
+a cheap read. It plugs into a ``DynamicItemDataset`` as a dynamic item.
+
+The store lives in a directory named after a hash of the feature
+extractor's configuration (its hyperparameters and buffers), so that
+changing e.g. ``n_mels`` uses a fresh store instead of stale features.
+Each entry also records the modification time and size of its audio file,
+and is recomputed by ``build`` when these change.
+
+Example
+-------
+>>> import torch
+>>> from speechbrain.dataio.dataio import write_audio
+>>> from speechbrain.dataio.dataset import DynamicItemDataset
+>>> from speechbrain.lobes.features import Fbank
+>>> tmpdir = getfixture("tmpdir")
+>>> data = {}
+>>> for i in range(3):
+...     path = str(tmpdir / f"utt{i}.wav")
+...     write_audio(path, torch.rand(16000), 16000)
+...     data[f"utt{i}"] = {"wav": path}
+>>> cache = FeatureCache(Fbank(n_mels=40), str(tmpdir / "fbank_cache"))
+>>> cache.build([example["wav"] for example in data.values()], num_workers=0)
+3
+>>> dataset = DynamicItemDataset(data)
+>>> dataset.add_dynamic_item(cache, takes="wav", provides="feats")
+>>> dataset.set_output_keys(["id", "feats"])
+>>> dataset[0]["feats"].shape
+torch.Size([101, 40])
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import torch
+
+from speechbrain.dataio.dataio import read_audio
+from speechbrain.utils.parallel import parallel_map
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+DATA_FILE = "features.bin"
+
+
+class FeatureCache:
+    """Persistent store of the features of audio files.
+
+    Calling the cache on an audio (in the notation of ``read_audio``: a path
+    or a dict with file, start and stop) returns its features, read from the
+    store. Audio which is not in the store is computed on the fly (and not
+    stored), so call ``build`` first on all the data.
+
+    The store is built on one process only. With DDP, use e.g.
+    ``run_on_main(cache.build, args=[audio_list], post_func=cache.reload)``.
+
+    Arguments
+    ---------
+    feature_extractor : torch.nn.Module
+        Computes the features of a batch of waveforms [batch, time],
+        e.g. ``speechbrain.lobes.features.Fbank``. It should be
+        deterministic (no augmentation, no random filter perturbation).
+    cache_dir : str
+        Directory of the cache. The store is in a subdirectory named after
+        the hash of the feature configuration.
+    config : dict, None
+        Extra configuration that affects the features but is not visible
+        on the feature extractor (e.g. a resampling applied beforehand).
+        It becomes part of the hash.
+    dtype : str
+        Type of the stored features, "float32" or "float16" (which halves
+        the size of the store).
+    """
+
+    def __init__(
+        self, feature_extractor, cache_dir, config=None, dtype="float32"
+    ):
+        self.feature_extractor = feature_extractor
+        self.dtype = np.dtype(dtype)
+        self.config_hash = feature_config_hash(
+            feature_extractor, dict(config or {}, dtype=dtype)
+        )
+        self.cache_dir = os.path.join(cache_dir, self.config_hash)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._warned_miss = False
+        self.reload()
+
+    def reload(self):
+        """Reads the index of the store again, e.g. after another process
+        has built it."""
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        if os.path.isfile(index_path):
+            with open(index_path) as fi:
+                self._index = json.load(fi)
+        else:
+            self._index = {}
+        self._data = None
+
+    def build(self, audio_list, num_workers=None, chunk_size=8):
+        """Computes and stores the features of the audio missing from the
+        store, or whose file has changed.
+
+        Arguments
+        ---------
+        audio_list : list
+            The audio to cache, in the notation of ``read_audio``.
+        num_workers : int, None
+            Number of processes computing the features. 0 computes them in
+            this process. None uses as many processes as CPUs.
+        chunk_size : int
+            Number of audio given at once to a worker process.
+
+        Returns
+        -------
+        int
+            The number of audio whose features were computed.
+        """
+        to_compute = []
+        for audio in audio_list:
+            key = _audio_key(audio)
+            entry = self._index.get(key)
+            if entry is None or entry["stat"] != _file_stat(audio):
+                to_compute.append(audio)
+        # Same audio given twice: only compute it once
+        to_compute = list({_audio_key(a): a for a in to_compute}.values())
+        if not to_compute:
+            return 0
+
+        compute = functools.partial(
+            _compute_features, self.feature_extractor, self.dtype
+        )
+        if num_workers == 0:
+            results = map(compute, to_compute)
+        else:
+            kwargs = (
+                {} if num_workers is None else {"process_count": num_workers}
+            )
+            results = parallel_map(
+                compute, to_compute, chunk_size=chunk_size, **kwargs
+            )
+
+        # Entries which are recomputed are appended; the old data is only
+        # reclaimed by clearing the cache.
+        data_path = os.path.join(self.cache_dir, DATA_FILE)
+        # Offsets are in numbers of values, as for indexing the memory map
+        offset = 0
+        if os.path.isfile(data_path):
+            offset = os.path.getsize(data_path) // self.dtype.itemsize
+        with open(data_path, "ab") as fo:
+            for audio, features in zip(to_compute, results):
+                fo.write(features.tobytes())
+                self._index[_audio_key(audio)] = {
+                    "offset": offset,
+                    "shape": list(features.shape),
+                    "stat": _file_stat(audio),
+                }
+                offset += features.size
+        self._write_index()
+        self._data = None
+        return len(to_compute)
+
+    def __call__(self, audio):
+        """Returns the features of one audio, as a torch.Tensor."""
+        entry = self._index.get(_audio_key(audio))
+        if entry is None:
+            if not self._warned_miss:
+                logger.warning(
+                    "FeatureCache miss: features computed on the fly. "
+                    "Build the cache on all the data first."
+                )
+                self._warned_miss = True
+            features = _compute_features(
+                self.feature_extractor, self.dtype, audio
+            )
+            return torch.from_numpy(features.astype(np.float32))
+        if self._data is None:
+            # Opened lazily, so that every DataLoader worker maps the file
+            self._data = np.memmap(
+                os.path.join(self.cache_dir, DATA_FILE),
+                dtype=self.dtype,
+                mode="r",
+            )
+        size = int(np.prod(entry["shape"]))
+        features = self._data[entry["offset"] : entry["offset"] + size]
+        features = features.astype(np.float32).reshape(entry["shape"])
+        return torch.from_numpy(features)
+
+    def __contains__(self, audio):
+        return _audio_key(audio) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getstate__(self):
+        # Memory maps are not sent to the DataLoader workers
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def _write_index(self):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        with open(index_path + ".tmp", "w") as fo:
+            json.dump(self._index, fo)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def feature_config_hash(module, config=None):
+    """Hashes the configuration of a feature extractor.
+
+    The hash covers the classes of the module and its submodules, their
+    plain (scalar or string) attributes, e.g. hop_length or n_mels, and their
+    parameters and buffers, e.g. the filterbank or window.
+
+    Arguments
+    ---------
+    module : torch.nn.Module
+        The feature extractor.
+    config : dict, None
+        Extra configuration to include in the hash.
+
+    Returns
+    -------
+    str
+        Hexadecimal hash (shortened SHA-256).
+
+    Example
+    -------
+    >>> from speechbrain.lobes.features import Fbank
+    >>> feature_config_hash(Fbank(n_mels=40)) == feature_config_hash(Fbank())
+    True
+    >>> feature_config_hash(Fbank(n_mels=80)) == feature_config_hash(Fbank())
+    False
+    >>> feature_config_hash(Fbank(hop_length=20)) == feature_config_hash(Fbank())
+    False
+    """
+    hasher = hashlib.sha256()
+    for name, submodule in module.named_modules():
+        hasher.update(f"{name}:{type(submodule).__qualname__};".encode())
+        for key, value in sorted(vars(submodule).items()):
+            if key != "training" and isinstance(
+                value, (bool, int, float, str, type(None))
+            ):
+                hasher.update(f"{key}={value!r};".encode())
+        tensors = list(submodule.named_parameters(recurse=False))
+        tensors += list(submodule.named_buffers(recurse=False))
+        for key, tensor in tensors:
+            hasher.update(key.encode())
+            hasher.update(tensor.detach().cpu().numpy().tobytes())
+    if config:
+        hasher.update(json.dumps(config, sort_keys=True).encode())
+    return hasher.hexdigest()[:16]
+
+
+def _audio_key(audio):
+    if isinstance(audio, dict):
+        return json.dumps(audio, sort_keys=True)
+    return audio
+
+
+def _file_stat(audio):
+    path = audio["file"] if isinstance(audio, dict) else audio
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _compute_features(feature_extractor, dtype, audio):
+    """Computes the features of one audio, as a numpy array."""
+    signal = read_audio(audio)
+    with torch.no_grad():
+        features = feature_extractor(signal.unsqueeze(0)).squeeze(0)
+    return features.numpy().astype(dtype)
@@ -407,6 +407,19 @@ class DynamicBatchSampler(Sampler):
          have not been grouped.
     verbose: bool
         If ``True``, log also the stats for each batch at the first epoch.
+    packing : bool
+        If ``True``, ignore the buckets and pack the examples, sorted by
+        length, greedily into batches whose padded length (longest example
+        times number of examples) fits in max_batch_length. This gives
+        the least padding, at the cost of batches which always group the
+        same examples (up to ties in length, which are broken at random
+        when shuffling). Then num_buckets is not needed.
+
+    Attributes
+    ----------
+    padding_ratio : float
+        The fraction of the padded batches of this epoch which is padding,
+        i.e. compute spent on nothing.
     """
 
     def __init__(
@@ -424,13 +437,13 @@ class DynamicBatchSampler(Sampler):
         epoch: int = 0,
         drop_last: bool = False,
         verbose: bool = False,
+        packing: bool = False,
     ):
         self._dataset = dataset
-        self._ex_lengths = {}
         self.verbose = verbose
 
         # We do not put a default on num_buckets to encourage users to play with this parameter
-        if num_buckets is None and len(bucket_boundaries) == 0:
+        if num_buckets is None and len(bucket_boundaries) == 0 and not packing:
             raise RuntimeError(
                 "Please specify either num_buckets or bucket boundaries."
                 "Check the docs, and/or the tutorial !"
@@ -438,20 +451,24 @@ class DynamicBatchSampler(Sampler):
 
         if lengths_list is not None:
             # take length of examples from this argument and bypass length_key
-            for indx in range(len(lengths_list)):
-                self._ex_lengths[str(indx)] = lengths_list[indx]
+            self._ex_lengths = np.asarray(lengths_list)
         else:
             # use length func
             if not isinstance(dataset, DynamicItemDataset):
                 raise NotImplementedError(
                     "Dataset should be a Speechbrain DynamicItemDataset when using length function"
                 )
-            for indx in range(len(self._dataset)):
-                self._ex_lengths[str(indx)] = length_func(
-                    self._dataset.data[self._dataset.data_ids[indx]]
-                )
+            self._ex_lengths = np.array(
+                [
+                    length_func(self._dataset.data[data_id])
+                    for data_id in self._dataset.data_ids
+                ]
+            )
 
-        if len(bucket_boundaries) > 0:
+        if packing:
+            # Buckets are not used to form the batches
+            self._bucket_boundaries = np.array(sorted(bucket_boundaries))
+        elif len(bucket_boundaries) > 0:
             if not all([x >= 0 for x in bucket_boundaries]):
                 raise ValueError(
                     "All elements in bucket boundaries should be non-negative (>= 0)."
@@ -483,6 +500,8 @@ class DynamicBatchSampler(Sampler):
         if max_batch_ex is None:
             max_batch_ex = np.inf
         self._max_batch_ex = max_batch_ex
+        self._packing = packing
+        self.padding_ratio = 0.0
         # Calculate bucket lengths - how often does one bucket boundary fit into max_batch_length?
         self._bucket_lens = [
             max(1, int(max_batch_length / self._bucket_boundaries[i]))
@@ -493,7 +512,7 @@ class DynamicBatchSampler(Sampler):
 
     def get_durations(self, batch):
         """Gets durations of the elements in the batch."""
-        return [self._ex_lengths[str(idx)] for idx in batch]
+        return self._ex_lengths[batch].tolist()
 
     def _get_boundaries_through_warping(
         self, max_batch_length: int, num_quantiles: int,
@@ -532,27 +551,18 @@ class DynamicBatchSampler(Sampler):
             # deterministically shuffle based on epoch and seed
             g = torch.Generator()
             g.manual_seed(self._seed + self._epoch)
-            sampler = torch.randperm(
-                len(self._batches), generator=g
-            ).tolist()  # type: ignore
-            tmp = []
-            for idx in sampler:
-                tmp.append(self._batches[idx])
-            self._batches = tmp
-
+            order = torch.randperm(
+                len(self._batch_sizes), generator=g
+            ).numpy()  # type: ignore
         elif self._batch_ordering == "ascending":
-            self._batches = sorted(
-                self._batches,
-                key=lambda x: max([self._ex_lengths[str(idx)] for idx in x]),
-            )
+            order = np.argsort(self._batch_max_lengths, kind="stable")
         elif self._batch_ordering == "descending":
-            self._batches = sorted(
-                self._batches,
-                key=lambda x: max([self._ex_lengths[str(idx)] for idx in x]),
-                reverse=True,
-            )
+            order = np.argsort(-self._batch_max_lengths, kind="stable")
         else:
             raise NotImplementedError
+        self._batch_starts = self._batch_starts[order]
+        self._batch_sizes = self._batch_sizes[order]
+        self._batch_max_lengths = self._batch_max_lengths[order]
 
     def _generate_batches(self):
         logger.info("DynamicBatchSampler: Generating dynamic batches")
@@ -560,127 +570,176 @@ class DynamicBatchSampler(Sampler):
             # deterministically shuffle based on epoch and seed
             g = torch.Generator()
             g.manual_seed(self._seed + self._epoch)
-            sampler = torch.randperm(len(self._dataset), generator=g).tolist()  # type: ignore
+            sampler = torch.randperm(len(self._dataset), generator=g).numpy()  # type: ignore
         else:
             # take examples as they are: e.g. they have been sorted
-            sampler = range(len(self._dataset))  # type: ignore
-
-        self._batches = []
-        bucket_batches = [[] for i in self._bucket_lens]
-
-        stats_tracker = [
-            {"min": np.inf, "max": -np.inf, "tot": 0, "n_ex": 0}
-            for i in self._bucket_lens
-        ]
-
-        for idx in sampler:
-            # length of pre-sampled audio
-            item_len = self._ex_lengths[str(idx)]
-            # bucket to fill up most padding
-            bucket_id = np.searchsorted(self._bucket_boundaries, item_len)
-            # fill audio's duration into that bucket
-            bucket_batches[bucket_id].append(idx)
+            sampler = np.arange(len(self._dataset))  # type: ignore
 
-            stats_tracker[bucket_id]["min"] = min(
-                stats_tracker[bucket_id]["min"], item_len
-            )
-            stats_tracker[bucket_id]["max"] = max(
-                stats_tracker[bucket_id]["max"], item_len
+        # The batches are stored as slices of the examples array, so that
+        # they are made without a Python loop over the examples
+        if self._packing:
+            examples, self._batch_sizes = self._pack_batches(sampler)
+        else:
+            examples, self._batch_sizes = self._bucket_batches(sampler)
+        self._batch_starts = np.cumsum(self._batch_sizes) - self._batch_sizes
+        lengths = self._ex_lengths[examples]
+        if len(examples) > 0:
+            self._batch_max_lengths = np.maximum.reduceat(
+                lengths, self._batch_starts
             )
-            stats_tracker[bucket_id]["tot"] += item_len
-            stats_tracker[bucket_id]["n_ex"] += 1
-            # track #samples - why not duration/#frames; rounded up?
-            # keep track of durations, if necessary
-
-            if (
-                len(bucket_batches[bucket_id]) >= self._bucket_lens[bucket_id]
-                or len(bucket_batches[bucket_id]) >= self._max_batch_ex
-            ):
-                self._batches.append(bucket_batches[bucket_id])
-                bucket_batches[bucket_id] = []
-                # keep track of durations
-
-        # Dump remaining batches
-        if not self._drop_last:
-            for batch in bucket_batches:
-                if batch:
-                    self._batches.append(batch)
+        else:
+            self._batch_max_lengths = lengths
+        padded_length = (self._batch_max_lengths * self._batch_sizes).sum()
+        if padded_length > 0:
+            self.padding_ratio = float(1 - lengths.sum() / padded_length)
+        else:
+            self.padding_ratio = 0.0
+        self._examples = examples.tolist()
 
         self._permute_batches()  # possibly reorder batches
 
         if self._epoch == 0:  # only log at first epoch
-            # frames per batch & their padding remaining
-            boundaries = [0] + self._bucket_boundaries.tolist()
+            logger.info(
+                "DynamicBatchSampler: {} batches, {:.2f} (%) padding.".format(
+                    len(self), self.padding_ratio * 100
+                )
+            )
+            if not self._packing:
+                self._log_bucket_stats()
+            if self.verbose:
+                self._log_batch_stats()
+
+    def _bucket_batches(self, sampler):
+        """Fills the buckets in sampler order, and emits each batch as soon as
+        it is full.
+
+        Returns the examples in batch order and the batch sizes."""
+        lengths = self._ex_lengths[sampler]
+        # bucket to fill up most padding
+        bucket_ids = np.searchsorted(self._bucket_boundaries, lengths)
+        max_sizes = np.minimum(self._bucket_lens, self._max_batch_ex)
+        max_sizes = max_sizes.astype(np.int64)
+
+        # Group the examples by bucket, keeping the sampler order in buckets
+        by_bucket = np.argsort(bucket_ids, kind="stable")
+        bucket_ids = bucket_ids[by_bucket]
+        counts = np.bincount(bucket_ids, minlength=len(max_sizes))
+        bucket_starts = np.cumsum(counts) - counts
+        ranks = np.arange(len(by_bucket)) - bucket_starts[bucket_ids]
+        batch_ids = ranks // max_sizes[bucket_ids]
+
+        # A batch starts at each change of bucket or of batch in the bucket
+        is_start = np.ones(len(by_bucket), dtype=bool)
+        is_start[1:] = (np.diff(bucket_ids) != 0) | (np.diff(batch_ids) != 0)
+        starts = np.flatnonzero(is_start)
+        sizes = np.diff(np.append(starts, len(by_bucket)))
+        is_full = sizes == max_sizes[bucket_ids[starts]]
+
+        # A full batch is emitted when its last example is drawn, then the
+        # remaining (partial) batches are dumped in bucket order
+        emit_times = np.where(
+            is_full, by_bucket[starts + sizes - 1], len(by_bucket)
+        )
+        order = np.argsort(emit_times, kind="stable")
+        if self._drop_last:
+            order = order[is_full[order]]
+        # Gather the examples of the batches, in the batch order
+        sizes = sizes[order]
+        new_starts = np.cumsum(sizes) - sizes
+        positions = np.repeat(starts[order] - new_starts, sizes)
+        positions += np.arange(len(positions))
+        return sampler[by_bucket[positions]], sizes
+
+    def _pack_batches(self, sampler):
+        """Packs the examples, longest first, into batches whose padded
+        length fits in max_batch_length (sorted greedy packing).
+
+        Returns the examples in batch order and the batch sizes."""
+        # Stable sort: ties in length stay in the (shuffled) sampler order
+        order = sampler[np.argsort(-self._ex_lengths[sampler], kind="stable")]
+        lengths = self._ex_lengths[order]
+        # Number of examples which fit with each example as the longest one
+        with np.errstate(divide="ignore"):
+            fits = np.floor(self._max_batch_length / lengths)
+        fits = np.clip(np.minimum(fits, self._max_batch_ex), 1, len(order))
+        fits = fits.astype(np.int64).tolist()
+        sizes = []
+        start = 0
+        while start < len(order):
+            # The first example is the longest one in the batch
+            size = fits[start]
+            if self._drop_last and start + size > len(order):
+                break
+            sizes.append(min(size, len(order) - start))
+            start += size
+        sizes = np.array(sizes, dtype=np.int64)
+        return order[: sizes.sum()], sizes
+
+    def _log_bucket_stats(self):
+        # frames per batch & their padding remaining
+        boundaries = [0] + self._bucket_boundaries.tolist()
+        num_buckets = len(self._bucket_lens)
+        bucket_ids = np.searchsorted(self._bucket_boundaries, self._ex_lengths)
+        n_ex = np.bincount(bucket_ids, minlength=num_buckets)
+        tot = np.bincount(
+            bucket_ids, weights=self._ex_lengths, minlength=num_buckets
+        )
+        mins = np.full(num_buckets, np.inf)
+        np.minimum.at(mins, bucket_ids, self._ex_lengths)
+        maxs = np.full(num_buckets, -np.inf)
+        np.maximum.at(maxs, bucket_ids, self._ex_lengths)
+
+        for bucket_indx in range(len(self._bucket_boundaries)):
+            if n_ex[bucket_indx] > 0:
+                num_batches = tot[bucket_indx] // self._max_batch_length
+                pad_factor = (maxs[bucket_indx] - mins[bucket_indx]) / (
+                    tot[bucket_indx] / n_ex[bucket_indx]
+                )
+            else:
+                num_batches = 0
+                pad_factor = 0
+
+            logger.debug(
+                (
+                    "DynamicBatchSampler: Bucket {} with boundary {:.1f}-{:.1f} and "
+                    + "batch_size {}: Num Examples {:.1f}, Num Full Batches {:.3f}, Pad Factor {:.3f}."
+                ).format(
+                    bucket_indx,
+                    boundaries[bucket_indx],
+                    boundaries[bucket_indx + 1],
+                    self._bucket_lens[bucket_indx],
+                    n_ex[bucket_indx],
+                    num_batches,
+                    pad_factor * 100,
+                )
+            )
 
-            for bucket_indx in range(len(self._bucket_boundaries)):
-                try:
-                    num_batches = stats_tracker[bucket_indx]["tot"] // (
-                        self._max_batch_length
-                    )
-                    pad_factor = (
-                        stats_tracker[bucket_indx]["max"]
-                        - stats_tracker[bucket_indx]["min"]
-                    ) / (
-                        stats_tracker[bucket_indx]["tot"]
-                        / stats_tracker[bucket_indx]["n_ex"]
-                    )
-                except ZeroDivisionError:
-                    num_batches = 0
-                    pad_factor = 0
-
-                logger.debug(
-                    (
-                        "DynamicBatchSampler: Bucket {} with boundary {:.1f}-{:.1f} and "
-                        + "batch_size {}: Num Examples {:.1f}, Num Full Batches {:.3f}, Pad Factor {:.3f}."
-                    ).format(
-                        bucket_indx,
-                        boundaries[bucket_indx],
-                        boundaries[bucket_indx + 1],
-                        self._bucket_lens[bucket_indx],
-                        stats_tracker[bucket_indx]["n_ex"],
-                        num_batches,
-                        pad_factor * 100,
-                    )
+    def _log_batch_stats(self):
+        padding_details = "Batch {} with {:.1f} frames with {} files - {:.1f} padding, {:.2f} (%) of total."
+        padding_details = "DynamicBatchSampler: " + padding_details
+        for i, batch in enumerate(self._iter_batches()):
+            lengths = self._ex_lengths[batch]
+            tot_frames = lengths.sum()
+            tot_pad = (lengths.max() - lengths).sum()
+            logger.debug(
+                padding_details.format(
+                    i,
+                    tot_frames,
+                    len(batch),
+                    tot_pad,
+                    tot_pad / tot_frames * 100,
                 )
+            )
 
-            if self.verbose:
-                batch_stats = {
-                    "tot_frames": [],
-                    "tot_pad_frames": [],
-                    "pad_%": [],
-                }
-                for batch in self._batches:
-                    tot_frames = sum(
-                        [self._ex_lengths[str(idx)] for idx in batch]
-                    )
-                    batch_stats["tot_frames"].append(tot_frames)
-                    max_frames = max(
-                        [self._ex_lengths[str(idx)] for idx in batch]
-                    )
-                    tot_pad = sum(
-                        [
-                            max_frames - self._ex_lengths[str(idx)]
-                            for idx in batch
-                        ]
-                    )
-                    batch_stats["tot_pad_frames"].append(tot_pad)
-                    batch_stats["pad_%"].append(tot_pad / tot_frames * 100)
-
-                padding_details = "Batch {} with {:.1f} frames with {} files - {:.1f} padding, {:.2f} (%) of total."
-                padding_details = "DynamicBatchSampler: " + padding_details
-                for i in range(len(self._batches)):
-                    logger.debug(
-                        padding_details.format(
-                            i,
-                            batch_stats["tot_frames"][i],
-                            len(self._batches[i]),
-                            batch_stats["tot_pad_frames"][i],
-                            batch_stats["pad_%"][i],
-                        )
-                    )
+    def _iter_batches(self):
+        examples = self._examples
+        for start, size in zip(
+            self._batch_starts.tolist(), self._batch_sizes.tolist()
+        ):
+            yield examples[start : start + size]
 
     def __iter__(self):
-        for batch in self._batches:
+        for batch in self._iter_batches():
             yield batch
         if self._shuffle_ex:  # re-generate examples if ex_ordering == "random"
             self._generate_batches()
@@ -697,7 +756,7 @@ class DynamicBatchSampler(Sampler):
         self._generate_batches()
 
     def __len__(self):
-        return len(self._batches)
+        return len(self._batch_sizes)
 
 
 # Heavily inspired by Catalyst, which is under Apache 2.0 licence.
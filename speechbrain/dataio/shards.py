@@ -0,0 +1,378 @@
+"""Sharded sequential storage for large datasets.
+
+Reading one audio file per example is bound by the number of file opens
+that the (network) filesystem can serve. Here, the examples are instead
+packed into large tar shards, which are then read sequentially, in bulk.
+
+Each example is stored as consecutive tar members:
+
+* ``<id>.json``: the metadata (all the non-audio fields of the example);
+* ``<id>.<field>.<ext>``: the encoded audio file of each audio field,
+  stored as-is (e.g. ``utt1.wav.flac``).
+
+``ShardedDynamicItemDataset`` streams the examples of the shards, and runs
+the same dynamic items as ``DynamicItemDataset``. The audio fields are
+given to the pipeline as file-like objects, which ``read_audio`` accepts,
+so the usual audio pipelines work unchanged.
+
+Example
+-------
+>>> import torch
+>>> from speechbrain.dataio.dataio import read_audio, write_audio
+>>> tmpdir = getfixture("tmpdir")
+>>> data = {}
+>>> for i in range(10):
+...     path = str(tmpdir / f"utt{i}.wav")
+...     write_audio(path, torch.rand(1600 * (i + 1)), 16000)
+...     data[f"utt{i}"] = {"wav": path, "words": f"word {i}"}
+>>> shards = write_shards(data, str(tmpdir / "shard-%06d.tar"), max_count=4)
+>>> len(shards)
+3
+>>> dataset = ShardedDynamicItemDataset(shards, shuffle=True)
+>>> dataset.add_dynamic_item(read_audio, takes="wav", provides="sig")
+>>> dataset.set_output_keys(["id", "sig", "words"])
+>>> examples = list(dataset)
+>>> sorted(example["id"] for example in examples)[:3]
+['utt0', 'utt1', 'utt2']
+>>> examples[0]["sig"].shape[0] == 1600 * (int(examples[0]["id"][3:]) + 1)
+True
+"""
+
+import io
+import json
+import logging
+import os
+import random
+import tarfile
+
+import torch
+from torch.utils.data import IterableDataset
+
+from speechbrain.dataio.dataio import read_audio
+from speechbrain.utils.data_pipeline import DataPipeline
+
+logger = logging.getLogger(__name__)
+
+
+class ShardWriter:
+    """Packs examples into tar shards of bounded size.
+
+    Arguments
+    ---------
+    pattern : str
+        Shard path pattern, with a %-format for the shard index,
+        e.g. ``"shards/train-%06d.tar"``.
+    max_count : int
+        Maximum number of examples in a shard.
+    max_size : int
+        Maximum size of a shard, in bytes (a shard is closed once it
+        exceeds this).
+
+    Example
+    -------
+    >>> tmpdir = getfixture("tmpdir")
+    >>> with ShardWriter(str(tmpdir / "shard-%03d.tar"), max_count=2) as sink:
+    ...     for i in range(3):
+    ...         sink.write(f"utt{i}", {"words": "hello"})
+    >>> [os.path.basename(shard) for shard in sink.shards]
+    ['shard-000.tar', 'shard-001.tar']
+    """
+
+    def __init__(self, pattern, max_count=1000, max_size=2 ** 30):
+        self.pattern = pattern
+        self.max_count = max_count
+        self.max_size = max_size
+        self.shards = []
+        self._tar = None
+        self._count = 0
+        self._size = 0
+
+    def write(self, data_id, metadata, audio_files={}):
+        """Adds an example to the current shard.
+
+        Arguments
+        ---------
+        data_id : str
+            The example id.
+        metadata : dict
+            JSON-serializable fields of the example.
+        audio_files : dict
+            Maps audio field names to the encoded audio, either the path of
+            an audio file, or a tuple (bytes, extension).
+        """
+        if self._tar is None or (
+            self._count >= self.max_count or self._size >= self.max_size
+        ):
+            self._next_shard()
+        self._add_member(
+            f"{data_id}.json", json.dumps(metadata).encode("utf-8")
+        )
+        for field, audio in audio_files.items():
+            if isinstance(audio, tuple):
+                content, ext = audio
+            else:
+                with open(audio, "rb") as fi:
+                    content = fi.read()
+                ext = os.path.splitext(audio)[1].lstrip(".")
+            self._add_member(f"{data_id}.{field}.{ext}", content)
+        self._count += 1
+
+    def close(self):
+        """Closes the current shard."""
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _next_shard(self):
+        self.close()
+        path = self.pattern % len(self.shards)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._tar = tarfile.open(path, "w")
+        self.shards.append(path)
+        self._count = 0
+        self._size = 0
+
+    def _add_member(self, name, content):
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        self._tar.addfile(info, io.BytesIO(content))
+        self._size += info.size
+
+
+def write_shards(
+    data, pattern, audio_keys=["wav"], max_count=1000, max_size=2 ** 30
+):
+    """Packs a dataset (e.g. from a data prep JSON or CSV) into shards.
+
+    Arguments
+    ---------
+    data : dict
+        Maps example ids to dicts of fields, as given by
+        ``speechbrain.dataio.dataio.load_data_json``.
+    pattern : str
+        Shard path pattern, see ``ShardWriter``.
+    audio_keys : list
+        The fields which point to audio, in the notation of ``read_audio``.
+        Whole files are stored as-is; segments (dicts with start and stop)
+        are cut and stored as FLAC.
+    max_count : int
+        Maximum number of examples in a shard.
+    max_size : int
+        Maximum size of a shard, in bytes.
+
+    Returns
+    -------
+    list
+        The paths of the written shards.
+    """
+    with ShardWriter(pattern, max_count, max_size) as sink:
+        for data_id, fields in data.items():
+            metadata = {
+                key: value
+                for key, value in fields.items()
+                if key not in audio_keys
+            }
+            audio_files = {}
+            for key in audio_keys:
+                audio = fields[key]
+                if isinstance(audio, dict):
+                    audio = _encode_segment(audio)
+                audio_files[key] = audio
+            sink.write(data_id, metadata, audio_files)
+    return sink.shards
+
+
+def _encode_segment(audio):
+    """Cuts a segment (read_audio dict notation) and encodes it as FLAC."""
+    import torchaudio
+
+    sample_rate = torchaudio.info(audio["file"]).sample_rate
+    signal = read_audio(audio)
+    if signal.dim() == 1:
+        signal = signal.unsqueeze(1)
+    buffer = io.BytesIO()
+    torchaudio.save(buffer, signal.transpose(0, 1), sample_rate, format="flac")
+    return buffer.getvalue(), "flac"
+
+
+class ShardedDynamicItemDataset(IterableDataset):
+    """Streams the examples of tar shards through a DataPipeline.
+
+    The counterpart of ``DynamicItemDataset`` for data stored with
+    ``write_shards``: each shard is read sequentially, in one pass.
+    Randomness comes from shuffling the shard order (every epoch) and from
+    a buffer of examples which are drawn at random.
+
+    Shards are assigned to the processes (DDP) and then to the DataLoader
+    workers, so that every example is seen once per epoch. For an even
+    load, use a number of shards divisible by the number of processes times
+    the number of workers.
+
+    Arguments
+    ---------
+    shards : list
+        Paths of the tar shards.
+    dynamic_items : list
+        Configuration for the dynamic items produced when fetching an
+        example, see ``DynamicItemDataset``.
+    output_keys : dict, list
+        Keys to include in the output dicts, see ``DynamicItemDataset``.
+    shuffle : bool
+        Whether to shuffle the shards and the examples.
+    shuffle_buffer : int
+        Number of examples in the shuffle buffer. Larger buffers give more
+        randomness at the cost of memory.
+    seed : int
+        Base seed of the shuffling, combined with the epoch.
+    split_by_node : bool
+        Whether to assign disjoint shards to each DDP process.
+    split_by_worker : bool
+        Whether to assign disjoint shards to each DataLoader worker.
+    """
+
+    def __init__(
+        self,
+        shards,
+        dynamic_items=[],
+        output_keys=[],
+        shuffle=False,
+        shuffle_buffer=1000,
+        seed=563375142,
+        split_by_node=True,
+        split_by_worker=True,
+    ):
+        self.shards = list(shards)
+        if not self.shards:
+            raise ValueError("No shards given")
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.split_by_node = split_by_node
+        self.split_by_worker = split_by_worker
+        self.epoch = 0
+        # The static keys are those of the first example
+        reader = _read_shard(self.shards[0])
+        _, first_example = next(reader)
+        reader.close()
+        static_keys = list(first_example.keys())
+        if "id" in static_keys:
+            raise ValueError("The key 'id' is reserved for the data point id.")
+        static_keys.append("id")
+        self.pipeline = DataPipeline(static_keys, dynamic_items)
+        self.set_output_keys(output_keys)
+
+    def add_dynamic_item(self, func, takes=None, provides=None):
+        """Makes a new dynamic item available on the dataset.
+
+        See ``DynamicItemDataset.add_dynamic_item``.
+        """
+        self.pipeline.add_dynamic_item(func, takes, provides)
+
+    def set_output_keys(self, keys):
+        """Use this to change the output keys.
+
+        See ``DynamicItemDataset.set_output_keys``.
+        """
+        self.pipeline.set_output_keys(keys)
+
+    def set_epoch(self, epoch):
+        """Sets the epoch, which seeds the shuffling.
+
+        Called by ``Brain`` before every epoch, as for the samplers.
+        """
+        self.epoch = epoch
+
+    def __iter__(self):
+        examples = self._examples()
+        if self.shuffle:
+            examples = _shuffled(
+                examples, self.shuffle_buffer, self._rng(offset=1)
+            )
+        for data_id, example in examples:
+            yield self.pipeline.compute_outputs({"id": data_id, **example})
+
+    def _examples(self):
+        for shard in self._assigned_shards():
+            yield from _read_shard(shard)
+
+    def _assigned_shards(self):
+        """The shards of this process and worker, in this epoch's order."""
+        shards = list(self.shards)
+        if self.shuffle:
+            # Same order in every process, so the splits are disjoint
+            random.Random(self.seed + self.epoch).shuffle(shards)
+        if self.split_by_node and torch.distributed.is_initialized():
+            rank = torch.distributed.get_rank()
+            world_size = torch.distributed.get_world_size()
+            shards = shards[rank::world_size]
+        worker_info = torch.utils.data.get_worker_info()
+        if self.split_by_worker and worker_info is not None:
+            shards = shards[worker_info.id :: worker_info.num_workers]
+        if not shards:
+            logger.warning(
+                "A data loading process got no shards, use more shards "
+                "than processes times workers."
+            )
+        return shards
+
+    def _rng(self, offset=0):
+        worker_info = torch.utils.data.get_worker_info()
+        worker = worker_info.id if worker_info is not None else 0
+        rank = 0
+        if torch.distributed.is_initialized():
+            rank = torch.distributed.get_rank()
+        return random.Random(
+            hash((self.seed, self.epoch, rank, worker, offset))
+        )
+
+    @classmethod
+    def from_pattern(cls, pattern, dynamic_items=[], output_keys=[], **kwargs):
+        """Creates the dataset from a glob pattern of shard paths."""
+        import glob
+
+        shards = sorted(glob.glob(pattern))
+        return cls(shards, dynamic_items, output_keys, **kwargs)
+
+
+def _read_shard(path):
+    """Yields (id, fields) for each example of a shard, in order."""
+    with tarfile.open(path, "r|") as tar:
+        data_id, example = None, None
+        for member in tar:
+            if not member.isfile():
+                continue
+            content = tar.extractfile(member).read()
+            if member.name.endswith(".json"):
+                if data_id is not None:
+                    yield data_id, example
+                data_id = member.name[: -len(".json")]
+                example = json.loads(content.decode("utf-8"))
+            else:
+                member_id, field, _ext = member.name.rsplit(".", 2)
+                if member_id != data_id:
+                    raise ValueError(
+                        f"Unexpected member {member.name} in shard {path}"
+                    )
+                example[field] = io.BytesIO(content)
+        if data_id is not None:
+            yield data_id, example
+
+
+def _shuffled(examples, buffer_size, rng):
+    """Shuffles a stream with a buffer of examples drawn at random."""
+    buffer = []
+    for example in examples:
+        if len(buffer) < buffer_size:
+            buffer.append(example)
+            continue
+        index = rng.randrange(buffer_size)
+        yield buffer[index]
+        buffer[index] = example
+    rng.shuffle(buffer)
+    yield from buffer
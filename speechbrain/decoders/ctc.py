@@ -5,9 +5,13 @@ Authors
  * Aku Rouhe 2020
  * Sung-Lin Yeh 2020
 """
+import math
+import numpy as np
 import torch
 from itertools import groupby
 from speechbrain.dataio.dataio import length_to_mask
+from speechbrain.lm.arpa import read_arpa
+from speechbrain.lm.ngram import BackoffNgramLM, CompiledNgramLM
 
 
 class CTCPrefixScorer:
@@ -374,3 +378,570 @@ def ctc_greedy_decode(probabilities, seq_lens, blank_id=-1):
         out = filter_ctc_output(predictions.tolist(), blank_id=blank_id)
         batch_outputs.append(out)
     return batch_outputs
+
+
+class CTCPrefixBeamSearcher:
+    """CTC prefix beam search with optional word-level N-gram LM shallow
+    fusion and hotword boosting.
+
+    Unlike CTCPrefixScorer, which scores the hypotheses of an attentional
+    decoder, this is a standalone decoder for CTC-only models, meant as a
+    drop-in replacement of ctc_greedy_decode (e.g., as the
+    decoding_function of EncoderASR).
+
+    The LM is applied at word level: each time a word is completed, its
+    log-probability given the previous words is added to the hypothesis.
+    The LM queries of the words completed at a frame are made together,
+    and cached, so each (context, word) pair is only looked up once per
+    call (the cache is cleared at each call, to bound its size). With a
+    CompiledNgramLM, the contexts are its integer states and the queries
+    of a frame are one call of score_batch. Words are built from the token
+    strings of vocab_list: for character vocabularies, space_token
+    separates words, and for SentencePiece vocabularies a token starting
+    with "▁" begins a new word.
+
+    Reference: https://arxiv.org/abs/1408.2873 (See Sec. 3.1, Algorithm 1)
+
+    Arguments
+    ---------
+    blank_index : int
+        The index of the blank token.
+    vocab_list : list
+        The string of each token (index -> token). Only needed with an LM or
+        hotwords. EncoderASR fills it from its tokenizer if not given.
+    beam_size : int
+        Maximum number of hypotheses kept at each frame.
+    beam_prune_logp : float
+        Hypotheses scoring worse than the best one by more than this
+        (in log space) are pruned.
+    token_prune_min_logp : float
+        Tokens with a lower log-probability at a frame are not expanded
+        (the most likely token is always kept).
+    blank_skip_threshold : float
+        Frames where the blank probability is above this value only extend
+        the hypotheses with blank, skipping the token expansion.
+    lm : BackoffNgramLM, CompiledNgramLM or str
+        The N-gram LM used for shallow fusion, or the path of an ARPA file
+        or of a binary model saved by CompiledNgramLM to load.
+    lm_weight : float
+        The weight of the LM score (alpha).
+    word_insertion_bonus : float
+        Bonus added for each word (beta).
+    lm_log_base : float
+        The base of the LM log-probabilities (10 for ARPA files), used to
+        convert them to natural logarithms.
+    unk_score_offset : float
+        Log-probability given to words unknown to the LM (if the LM has no
+        unk_token).
+    unk_token : str
+        The unknown word of the LM.
+    space_token : str
+        The token separating words (character vocabularies).
+    hotwords : list
+        Words whose score is boosted.
+    hotword_weight : float
+        Bonus added for each occurrence of a hotword. Partial words are
+        boosted proportionally to how much of a hotword they match, which
+        keeps them in the beam.
+
+    Example
+    -------
+    >>> vocab = ["<blank>", " ", "a", "b"]
+    >>> probs = torch.tensor([[
+    ...     [0.1, 0.1, 0.7, 0.1],
+    ...     [0.7, 0.1, 0.1, 0.1],
+    ...     [0.1, 0.7, 0.1, 0.1],
+    ...     [0.1, 0.1, 0.1, 0.7],
+    ... ]])
+    >>> searcher = CTCPrefixBeamSearcher(blank_index=0, vocab_list=vocab)
+    >>> searcher(probs.log(), torch.tensor([1.0]))
+    [[2, 1, 3]]
+    >>> ngrams = {1: {tuple(): {"a": -2.0, "b": -0.1, "</s>": -0.1}}}
+    >>> searcher = CTCPrefixBeamSearcher(
+    ...     blank_index=0,
+    ...     vocab_list=vocab,
+    ...     lm=BackoffNgramLM(ngrams, {}),
+    ...     lm_weight=1.0,
+    ...     word_insertion_bonus=1.0,
+    ... )
+    >>> searcher(probs.log(), torch.tensor([1.0]))
+    [[3, 1, 3]]
+    >>> searcher = CTCPrefixBeamSearcher(
+    ...     blank_index=0, vocab_list=vocab, hotwords=["b"], hotword_weight=3.0
+    ... )
+    >>> searcher(probs.log(), torch.tensor([1.0]))
+    [[3, 1, 3]]
+    """
+
+    def __init__(
+        self,
+        blank_index,
+        vocab_list=None,
+        beam_size=10,
+        beam_prune_logp=-10.0,
+        token_prune_min_logp=-5.0,
+        blank_skip_threshold=0.999,
+        lm=None,
+        lm_weight=0.5,
+        word_insertion_bonus=0.0,
+        lm_log_base=10.0,
+        unk_score_offset=-10.0,
+        unk_token="<unk>",
+        space_token=" ",
+        hotwords=None,
+        hotword_weight=10.0,
+    ):
+        self.blank_index = blank_index
+        self.beam_size = beam_size
+        self.beam_prune_logp = beam_prune_logp
+        self.token_prune_min_logp = token_prune_min_logp
+        self.blank_skip_logp = math.log(blank_skip_threshold)
+
+        if isinstance(lm, str):
+            if CompiledNgramLM.is_compiled_lm(lm):
+                lm = CompiledNgramLM.load(lm)
+            else:
+                with open(lm) as fin:
+                    _, ngrams, backoffs = read_arpa(fin)
+                lm = BackoffNgramLM(ngrams, backoffs)
+        self.lm = lm
+        self.lm_weight = lm_weight
+        self.word_insertion_bonus = word_insertion_bonus
+        self.lm_scale = math.log(lm_log_base)
+        self.unk_score_offset = unk_score_offset
+        self.unk_token = unk_token
+        self.space_token = space_token
+        self.hotwords = set(hotwords) if hotwords is not None else set()
+        self.hotword_weight = hotword_weight
+        self._lm_cache = {}
+
+        self.vocab_list = None
+        if vocab_list is not None:
+            self.set_vocab_list(vocab_list)
+
+    def set_vocab_list(self, vocab_list):
+        """Sets the string of each token, used to build the words.
+
+        Arguments
+        ---------
+        vocab_list : list
+            The string of each token (index -> token).
+        """
+        self.vocab_list = list(vocab_list)
+        self.is_sentencepiece = any(
+            token.startswith("\u2581") for token in self.vocab_list
+        )
+
+    def __call__(self, log_probs, wav_lens):
+        """Decodes a batch of CTC log-probabilities.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            Log-probabilities from the network with shape [batch, time, vocab].
+        wav_lens : torch.Tensor
+            Relative true sequence lengths (to deal with padded inputs).
+
+        Returns
+        -------
+        list
+            The best token sequence of each utterance, as Python list of lists.
+        """
+        return [hyps[0][0] for hyps in self.decode_beams(log_probs, wav_lens)]
+
+    def decode_beams(self, log_probs, wav_lens):
+        """Decodes a batch of CTC log-probabilities and returns the final
+        beams.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            Log-probabilities from the network with shape [batch, time, vocab].
+        wav_lens : torch.Tensor
+            Relative true sequence lengths (to deal with padded inputs).
+
+        Returns
+        -------
+        list
+            For each utterance, the list of (tokens, score) pairs of the
+            hypotheses in the final beam, sorted by decreasing score.
+        """
+        self._start_call()
+        batch_max_len = log_probs.shape[1]
+        lengths = torch.round(wav_lens * batch_max_len).int().tolist()
+        batch_frames = self._candidate_frames(log_probs, lengths)
+        return [
+            self.finalize_beams(self._search(self._initial_beams(), frames))
+            for frames in batch_frames
+        ]
+
+    def decode_chunk(self, log_probs, beams=None):
+        """Continues the search of one utterance on its next chunk of
+        frames, for streaming.
+
+        The beams carry the whole state of the search (CTC, LM and hotword
+        scores), so decoding the frames of an utterance chunk by chunk gives
+        the same beams as decoding them at once.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            Log-probabilities of the frames of the chunk, [time, vocab].
+        beams : dict, None
+            The beams returned for the previous chunk (which are updated in
+            place), or None for the first chunk of the utterance.
+
+        Returns
+        -------
+        dict
+            The beams after the chunk, to pass to the next call, and to
+            finalize_beams after the last chunk.
+
+        Example
+        -------
+        >>> vocab = ["<blank>", " ", "a", "b"]
+        >>> log_probs = torch.tensor([
+        ...     [0.1, 0.1, 0.7, 0.1],
+        ...     [0.7, 0.1, 0.1, 0.1],
+        ...     [0.1, 0.7, 0.1, 0.1],
+        ...     [0.1, 0.1, 0.1, 0.7],
+        ... ]).log()
+        >>> searcher = CTCPrefixBeamSearcher(
+        ...     blank_index=0, vocab_list=vocab, beam_prune_logp=-1.0
+        ... )
+        >>> beams = searcher.decode_chunk(log_probs[:2])
+        >>> searcher.stable_prefix(beams)
+        [2]
+        >>> beams = searcher.decode_chunk(log_probs[2:], beams)
+        >>> searcher.finalize_beams(beams)[0][0]
+        [2, 1, 3]
+        """
+        self._start_call()
+        if beams is None:
+            beams = self._initial_beams()
+        frames = self._candidate_frames(
+            log_probs.unsqueeze(0), [len(log_probs)]
+        )
+        return self._search(beams, frames[0])
+
+    @staticmethod
+    def stable_prefix(beams):
+        """Returns the tokens shared by all the beams.
+
+        Every later hypothesis extends one of the beams, so these tokens
+        will not change anymore, and can be output while streaming.
+
+        Arguments
+        ---------
+        beams : dict
+            The beams returned by decode_chunk.
+
+        Returns
+        -------
+        list
+            The longest common prefix of the beams.
+        """
+        prefixes = list(beams)
+        shortest = min(prefixes, key=len)
+        for i, token in enumerate(shortest):
+            if any(prefix[i] != token for prefix in prefixes):
+                return list(shortest[:i])
+        return list(shortest)
+
+    def _start_call(self):
+        """Checks the settings, and clears the LM cache, which is kept for
+        one call only to bound its size."""
+        if self.vocab_list is None and (self.lm is not None or self.hotwords):
+            raise ValueError("vocab_list is needed to use an LM or hotwords.")
+        self._lm_cache.clear()
+
+    def _candidate_frames(self, log_probs, lengths):
+        """Returns, for each utterance and frame, the blank log-probability
+        and the list of (token, log-probability) of the candidate non-blank
+        tokens."""
+        # The candidate tokens of every frame are selected for the whole batch
+        # in one go, so the Python loop only sees the few surviving tokens.
+        num_candidates = min(self.beam_size, log_probs.shape[-1])
+        cand_logp, cand_tokens = log_probs.detach().topk(num_candidates, dim=-1)
+        keep = cand_logp >= self.token_prune_min_logp
+        keep[:, :, 0] = True
+        blank_logp = log_probs[:, :, self.blank_index].detach()
+
+        cand_logp = cand_logp.cpu().tolist()
+        cand_tokens = cand_tokens.cpu().tolist()
+        keep = keep.cpu().tolist()
+        blank_logp = blank_logp.cpu().tolist()
+
+        return [
+            [
+                (
+                    blank_logp[i][t],
+                    [
+                        (tok, lp)
+                        for tok, lp, k in zip(
+                            cand_tokens[i][t], cand_logp[i][t], keep[i][t]
+                        )
+                        if k and tok != self.blank_index
+                    ],
+                )
+                for t in range(length)
+            ]
+            for i, length in enumerate(lengths)
+        ]
+
+    def _initial_beams(self):
+        """Returns the beams before the first frame: the empty hypothesis.
+
+        A beam is:
+        [logp_blank, logp_nonblank, ext_score, lm_context, partial, query]
+        where ext_score gathers the LM, word bonus and hotword scores, and
+        query is the (lm_context, word) LM query of a word just completed,
+        pending until the end of the frame.
+        """
+        context = self._initial_lm_context()
+        return {tuple(): [0.0, -math.inf, 0.0, context, "", None]}
+
+    def _search(self, beams, frames):
+        """Runs the prefix beam search on frames of one utterance.
+
+        Arguments
+        ---------
+        beams : dict
+            The beams before the frames, by prefix.
+        frames : list
+            For each frame, the blank log-probability and the list of
+            (token, log-probability) of the candidate non-blank tokens.
+
+        Returns
+        -------
+        dict
+            The beams after the frames.
+        """
+        for blank_lp, candidates in frames:
+            if blank_lp >= self.blank_skip_logp:
+                for beam in beams.values():
+                    beam[0] = _logaddexp(beam[0], beam[1]) + blank_lp
+                    beam[1] = -math.inf
+                continue
+
+            next_beams = {}
+            for prefix, beam in beams.items():
+                p_b, p_nb = beam[0], beam[1]
+                p_total = _logaddexp(p_b, p_nb)
+
+                # extend with blank
+                same = self._get_beam(next_beams, prefix, beams)
+                same[0] = _logaddexp(same[0], p_total + blank_lp)
+
+                last = prefix[-1] if prefix else None
+                for token, lp in candidates:
+                    new = self._get_beam(next_beams, prefix + (token,), beams)
+                    if token == last:
+                        # repeated token: collapses unless separated by blank
+                        same[1] = _logaddexp(same[1], p_nb + lp)
+                        new[1] = _logaddexp(new[1], p_b + lp)
+                    else:
+                        new[1] = _logaddexp(new[1], p_total + lp)
+            self._apply_lm_queries(next_beams.values())
+            beams = self._prune(next_beams)
+        return beams
+
+    def finalize_beams(self, beams):
+        """Adds the scores of the last words and of the end of sentence to
+        the beams after the last frame.
+
+        Arguments
+        ---------
+        beams : dict
+            The beams returned by decode_chunk after the last chunk.
+
+        Returns
+        -------
+        list
+            (tokens, score) pairs of the final beam sorted by decreasing score.
+        """
+        # Score of the pending words and end of sentence
+        prefixes = list(beams)
+        scores = [
+            _logaddexp(beams[prefix][0], beams[prefix][1]) + beams[prefix][2]
+            for prefix in prefixes
+        ]
+        contexts = [beams[prefix][3] for prefix in prefixes]
+        pending = [i for i, prefix in enumerate(prefixes) if beams[prefix][4]]
+        for i in pending:
+            partial = beams[prefixes[i]][4]
+            scores[i] += self._word_score(partial)
+            scores[i] -= self._partial_hotword_bonus(partial)
+        if self.lm is not None:
+            queries = [(contexts[i], beams[prefixes[i]][4]) for i in pending]
+            for i, (logprob, context) in zip(pending, self._lm_scores(queries)):
+                scores[i] += self.lm_weight * logprob
+                contexts[i] = context
+            queries = [(context, "</s>") for context in contexts]
+            for i, (logprob, _) in enumerate(self._lm_scores(queries)):
+                scores[i] += self.lm_weight * logprob
+
+        final = [
+            (list(prefix), score) for prefix, score in zip(prefixes, scores)
+        ]
+        final.sort(key=lambda x: x[1], reverse=True)
+        return final
+
+    def _get_beam(self, next_beams, prefix, beams):
+        """Returns the beam of prefix in next_beams, creating it if needed.
+        The word-level fields only depend on the prefix, so they are
+        computed once from the parent beam."""
+        if prefix in next_beams:
+            return next_beams[prefix]
+        if prefix in beams:
+            beam = beams[prefix]
+            new = [-math.inf, -math.inf, beam[2], beam[3], beam[4], None]
+        else:
+            parent = beams[prefix[:-1]]
+            new = [-math.inf, -math.inf] + self._extend_words(
+                parent, prefix[-1]
+            )
+        next_beams[prefix] = new
+        return new
+
+    def _extend_words(self, parent, token):
+        """Computes ext_score (LM excepted), lm_context, partial word and LM
+        query after adding token."""
+        ext_score, context, partial = parent[2], parent[3], parent[4]
+        query = None
+        if self.vocab_list is None:
+            return [ext_score, context, partial, query]
+
+        token_str = self.vocab_list[token]
+        if self.is_sentencepiece:
+            starts_word = token_str.startswith("\u2581")
+            token_str = token_str.lstrip("\u2581")
+        else:
+            starts_word = token_str == self.space_token
+            if starts_word:
+                token_str = ""
+
+        if starts_word and partial:
+            ext_score -= self._partial_hotword_bonus(partial)
+            ext_score += self._word_score(partial)
+            if self.lm is not None:
+                query = (context, partial)
+            partial = ""
+        if token_str:
+            ext_score -= self._partial_hotword_bonus(partial)
+            partial = partial + token_str
+            ext_score += self._partial_hotword_bonus(partial)
+        return [ext_score, context, partial, query]
+
+    def _word_score(self, word):
+        """Returns the score (LM excepted) added when word is completed."""
+        score = self.word_insertion_bonus
+        if word in self.hotwords:
+            score += self.hotword_weight
+        return score
+
+    def _apply_lm_queries(self, beams):
+        """Adds the LM scores of the words completed by the beams, and moves
+        them to the contexts extended by these words."""
+        pending = [beam for beam in beams if beam[5] is not None]
+        results = self._lm_scores([beam[5] for beam in pending])
+        for beam, (logprob, context) in zip(pending, results):
+            beam[2] += self.lm_weight * logprob
+            beam[3] = context
+            beam[5] = None
+
+    def _partial_hotword_bonus(self, partial):
+        """Boosts partial words that are the beginning of a hotword."""
+        if not self.hotwords or not partial:
+            return 0.0
+        best = 0.0
+        for hotword in self.hotwords:
+            if hotword.startswith(partial):
+                best = max(best, len(partial) / len(hotword))
+        return best * self.hotword_weight
+
+    def _initial_lm_context(self):
+        """The LM context of the empty hypothesis: the state of <s> for a
+        CompiledNgramLM, the words of the context otherwise."""
+        if isinstance(self.lm, CompiledNgramLM):
+            return self.lm.context_state(("<s>",))
+        return self._truncate_context(("<s>",))
+
+    def _truncate_context(self, words):
+        """Keeps the words used as context by the LM."""
+        if self.lm is None or self.lm.top_order <= 1:
+            return ()
+        return words[-(self.lm.top_order - 1) :]
+
+    def _lm_scores(self, queries):
+        """Cached LM queries.
+
+        Arguments
+        ---------
+        queries : list
+            (context, word) pairs.
+
+        Returns
+        -------
+        list
+            For each query, the natural log-probability of the word (with
+            unknown words scored as unk_token or unk_score_offset), and the
+            context extended by the word.
+        """
+        missing = list(
+            dict.fromkeys(q for q in queries if q not in self._lm_cache)
+        )
+        if missing and isinstance(self.lm, CompiledNgramLM):
+            word_ids = self.lm.words_to_ids([word for _, word in missing])
+            unk_id = self.lm.word2id.get(self.unk_token, -1)
+            logprobs, states = self.lm.score_batch(
+                [context for context, _ in missing],
+                np.where(word_ids >= 0, word_ids, unk_id),
+            )
+            # Unknown words are not used as context
+            states[word_ids < 0] = 0
+            for query, logprob, state in zip(missing, logprobs, states):
+                self._lm_cache[query] = (self._scale_lm(logprob), int(state))
+        else:
+            for context, word in missing:
+                logprob = self.lm.logprob(word, context)
+                if logprob == -math.inf:
+                    logprob = self.lm.logprob(self.unk_token, context)
+                self._lm_cache[(context, word)] = (
+                    self._scale_lm(logprob),
+                    self._truncate_context(context + (word,)),
+                )
+        return [self._lm_cache[query] for query in queries]
+
+    def _scale_lm(self, logprob):
+        """Converts an LM log-probability to a natural logarithm."""
+        if logprob == -math.inf:
+            return self.unk_score_offset
+        return float(logprob) * self.lm_scale
+
+    def _prune(self, beams):
+        """Keeps the beam_size best hyps within beam_prune_logp of the best."""
+        scored = sorted(
+            (
+                (_logaddexp(beam[0], beam[1]) + beam[2], prefix)
+                for prefix, beam in beams.items()
+            ),
+            reverse=True,
+        )
+        threshold = scored[0][0] + self.beam_prune_logp
+        return {
+            prefix: beams[prefix]
+            for score, prefix in scored[: self.beam_size]
+            if score >= threshold
+        }
+
+
+def _logaddexp(a, b):
+    """Numerically stable log(exp(a) + exp(b)) on Python floats."""
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    if a > b:
+        return a + math.log1p(math.exp(b - a))
+    return b + math.log1p(math.exp(a - b))
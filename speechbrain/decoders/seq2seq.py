@@ -1306,6 +1306,12 @@ class S2STransformerBeamSearch(S2SBeamSearcher):
         The model to use for decoding.
     linear : torch.nn.Module
         A linear output layer.
+    use_kv_cache : bool
+        If True, the decoder runs incrementally (see TransformerASR.decode_step):
+        the self-attention keys/values of the previous tokens and the
+        projected encoder states are cached, so each step only processes
+        the newly predicted token. In this mode the attention returned at
+        each step is the one of the current token (batch, src_len).
     **kwargs
         Arguments to pass to S2SBeamSearcher
 
@@ -1315,7 +1321,12 @@ class S2STransformerBeamSearch(S2SBeamSearcher):
     """
 
     def __init__(
-        self, modules, temperature=1.0, temperature_lm=1.0, **kwargs,
+        self,
+        modules,
+        temperature=1.0,
+        temperature_lm=1.0,
+        use_kv_cache=False,
+        **kwargs,
     ):
         super(S2STransformerBeamSearch, self).__init__(**kwargs)
 
@@ -1327,6 +1338,10 @@ class S2STransformerBeamSearch(S2SBeamSearcher):
         self.temperature = temperature
         self.temperature_lm = temperature_lm
 
+        if use_kv_cache and not hasattr(self.model, "decode_step"):
+            raise ValueError("use_kv_cache requires a model with decode_step")
+        self.use_kv_cache = use_kv_cache
+
     def reset_mem(self, batch_size, device):
         """Needed to reset the memory during beamsearch."""
         return None
@@ -1337,6 +1352,8 @@ class S2STransformerBeamSearch(S2SBeamSearcher):
 
     def permute_mem(self, memory, index):
         """Permutes the memory."""
+        if self.use_kv_cache:
+            return _permute_kv_cache(memory, index)
         memory = torch.index_select(memory, dim=0, index=index)
         return memory
 
@@ -1347,6 +1364,10 @@ class S2STransformerBeamSearch(S2SBeamSearcher):
 
     def forward_step(self, inp_tokens, memory, enc_states, enc_lens):
         """Performs a step in the implemented beamsearcher."""
+        if self.use_kv_cache:
+            return _transformer_cached_step(
+                self, inp_tokens, memory, enc_states, enc_lens
+            )
         memory = _update_mem(inp_tokens, memory)
         pred, attn = self.model.decode(memory, enc_states, enc_lens)
         prob_dist = self.softmax(self.fc(pred) / self.temperature)
@@ -1375,12 +1396,15 @@ class S2STransformerGreedySearch(S2SGreedySearcher):
             A linear output layer for the seq2seq model.
     temperature : float
         Temperature to use during decoding.
+    use_kv_cache : bool
+        If True, the decoder runs incrementally, reusing the attention
+        keys/values of the previous steps (see S2STransformerBeamSearch).
     **kwargs
         Arguments to pass to S2SGreedySearcher
     """
 
     def __init__(
-        self, modules, temperature=1.0, **kwargs,
+        self, modules, temperature=1.0, use_kv_cache=False, **kwargs,
     ):
         super(S2SGreedySearcher, self).__init__(**kwargs)
 
@@ -1390,12 +1414,20 @@ class S2STransformerGreedySearch(S2SGreedySearcher):
 
         self.temperature = temperature
 
+        if use_kv_cache and not hasattr(self.model, "decode_step"):
+            raise ValueError("use_kv_cache requires a model with decode_step")
+        self.use_kv_cache = use_kv_cache
+
     def reset_mem(self, batch_size, device):
         """Needed to reset the memory during greedy search."""
         return None
 
     def forward_step(self, inp_tokens, memory, enc_states, enc_lens):
         """Performs a step in the implemented greedy searcher."""
+        if self.use_kv_cache:
+            return _transformer_cached_step(
+                self, inp_tokens, memory, enc_states, enc_lens
+            )
         memory = _update_mem(inp_tokens, memory)
         pred, attn = self.model.decode(memory, enc_states, enc_lens)
         prob_dist = self.softmax(self.fc(pred) / self.temperature)
@@ -1681,3 +1713,50 @@ def _update_mem(inp_tokens, memory):
     if memory is None:
         return inp_tokens.unsqueeze(1)
     return torch.cat([memory, inp_tokens.unsqueeze(1)], dim=-1)
+
+
+def _transformer_cached_step(searcher, inp_tokens, cache, enc_states, enc_lens):
+    """Performs an incremental decoding step for the transformer searchers.
+    Only the token predicted at the previous step is fed to the model, the
+    attention keys/values of the previous ones are stored in the cache.
+
+    Arguments:
+    -----------
+    searcher : S2SBaseSearcher
+        The searcher, providing the model, the output layer and temperature.
+    inp_tokens : tensor
+        Predicted token of the previous decoding step.
+    cache : list
+        The decoder cache (None at the first step).
+    enc_states : tensor
+        The encoder states to be attended.
+    enc_lens : tensor
+        The actual length of each enc_states sequence.
+    """
+    pred, attn, cache = searcher.model.decode_step(
+        inp_tokens.unsqueeze(1), enc_states, enc_lens, cache=cache
+    )
+    logits = searcher.fc(pred[:, -1]) / searcher.temperature
+    return searcher.softmax(logits), cache, attn[:, -1]
+
+
+def _permute_kv_cache(cache, index):
+    """Reorders the decoder cache of the transformer searchers according
+    to the selected beams. The encoder-decoder attention cache is left
+    untouched: predecessors always belong to the same utterance, whose
+    beams share the same (inflated) encoder states.
+
+    Arguments:
+    -----------
+    cache : list
+        Per-layer ((self_k, self_v), cross_attn_cache) tuples.
+    index : tensor
+        The index of the previous path.
+    """
+    return [
+        (
+            tuple(torch.index_select(x, dim=0, index=index) for x in self_kv),
+            cross_kv,
+        )
+        for self_kv, cross_kv in cache
+    ]
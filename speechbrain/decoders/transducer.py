@@ -41,6 +41,11 @@ class TransducerBeamSearcher(torch.nn.Module):
         that are added in A (process_hyp).
         Reference: https://arxiv.org/pdf/1911.01629.pdf
         Reference: https://github.com/kaldi-asr/kaldi/blob/master/src/decoder/simple-decoder.cc (See PruneToks)
+    batched_beam_search : bool
+        If True (and beam > 1), uses a batch-parallel modified beam search
+        (at most one emission per frame) that keeps the hypotheses of all
+        the utterances in padded tensors and runs the PN/joint networks
+        on the whole batch x beam at once.
 
     Example
     -------
@@ -82,6 +87,19 @@ class TransducerBeamSearcher(torch.nn.Module):
     ... )
     >>> enc = torch.rand([1, 20, 10])
     >>> hyps, scores, _, _ = searcher(enc)
+    >>> searcher = TransducerBeamSearcher(
+    ...     decode_network_lst=[emb, dec],
+    ...     tjoint=tjoint,
+    ...     classifier_network=[lin],
+    ...     blank_id=0,
+    ...     beam_size=4,
+    ...     nbest=2,
+    ...     batched_beam_search=True,
+    ... )
+    >>> enc = torch.rand([3, 20, 10])
+    >>> hyps, scores, nbest_hyps, nbest_scores = searcher(enc)
+    >>> len(hyps), len(nbest_hyps[0])
+    (3, 2)
     """
 
     def __init__(
@@ -96,6 +114,7 @@ class TransducerBeamSearcher(torch.nn.Module):
         lm_weight=0.0,
         state_beam=2.3,
         expand_beam=2.3,
+        batched_beam_search=False,
     ):
         super(TransducerBeamSearcher, self).__init__()
         self.decode_network_lst = decode_network_lst
@@ -116,6 +135,8 @@ class TransducerBeamSearcher(torch.nn.Module):
 
         if self.beam_size <= 1:
             self.searcher = self.transducer_greedy_decode
+        elif batched_beam_search:
+            self.searcher = self.transducer_batched_beam_search_decode
         else:
             self.searcher = self.transducer_beam_search_decode
 
@@ -372,6 +393,207 @@ class TransducerBeamSearcher(torch.nn.Module):
             nbest_batch_score,
         )
 
+    def transducer_batched_beam_search_decode(self, tn_output):
+        """Batch-parallel modified beam search: each hypothesis can emit at
+        most one token per frame, which makes the search time-synchronous
+        and allows to process all the utterances and beams together:
+            1- for each time step in the Transcription Network (TN) output:
+                -> Do forward on the Joint network for all the B x beam hyps
+                -> Select the topK <= beam extensions of each utterance
+                -> Merge the hyps that end up with the same prefix
+                -> Do a forward on PN (and LM) for the hyps extended by a
+                   non-blank token only, the others reuse their PN output
+
+        Arguments
+        ----------
+        tn_output : torch.tensor
+            Output from transcription network with shape
+            [batch, time_len, hiddens].
+
+        Returns
+        -------
+        list
+            The best hypothesis (list of tokens) of each utterance.
+        torch.tensor
+            Mean over the batch of the probability (normalized by the
+            length) of the best hypotheses.
+        list
+            The nbest hypotheses of each utterance, best first.
+        list
+            The normalized log-scores of the nbest hypotheses.
+        """
+        batch_size, max_len = tn_output.shape[:2]
+        beam = self.beam_size
+        n_hyps = batch_size * beam
+        device = tn_output.device
+
+        # One row per (utterance, beam): emitted tokens, number of emitted
+        # tokens and a rolling hash of the prefix used to merge duplicates.
+        tokens = torch.full(
+            (n_hyps, max_len), self.blank_id, dtype=torch.long, device=device
+        )
+        lengths = torch.zeros(n_hyps, dtype=torch.long, device=device)
+        prefix_hash = torch.zeros(n_hyps, dtype=torch.long, device=device)
+
+        # Only the first beam is alive at the beginning
+        scores = torch.full((batch_size, beam), float("-inf"), device=device)
+        scores[:, 0] = 0.0
+        beam_offset = torch.arange(batch_size, device=device) * beam
+
+        # prepare BOS = Blank for the Prediction Network (PN)
+        input_PN = torch.full(
+            (n_hyps, 1), self.blank_id, dtype=torch.int32, device=device
+        )
+        out_PN, hidden = self._forward_PN(input_PN, self.decode_network_lst)
+        if self.lm_weight > 0:
+            log_probs_lm, hidden_lm = self._lm_forward_step(input_PN, None)
+            log_probs_lm = log_probs_lm.view(n_hyps, -1)
+
+        for t_step in range(max_len):
+            # do unsqueeze over since tjoint must be have a 4 dim [B,T,U,Hidden]
+            h_i = tn_output[:, t_step, :].repeat_interleave(beam, dim=0)
+            log_probs = self._joint_forward_step(
+                h_i.unsqueeze(1).unsqueeze(1), out_PN.unsqueeze(1),
+            ).view(n_hyps, -1)
+            vocab_size = log_probs.size(-1)
+
+            if self.lm_weight > 0:
+                # the LM only scores the non-blank extensions
+                lm_scores = self.lm_weight * log_probs_lm
+                lm_scores[:, self.blank_id] = 0.0
+                log_probs = log_probs + lm_scores
+
+            # Sort outputs at time (topk over beam x vocab of each utterance)
+            candidates = scores.view(n_hyps, 1) + log_probs
+            scores, positions = candidates.view(batch_size, -1).topk(
+                beam, dim=-1
+            )
+            predecessors = (
+                torch.div(positions, vocab_size, rounding_mode="floor")
+                + beam_offset.unsqueeze(1)
+            ).view(-1)
+            new_tokens = (positions % vocab_size).view(-1)
+
+            # Permute the hyps to synchronize with the selection
+            tokens = tokens[predecessors]
+            lengths = lengths[predecessors]
+            prefix_hash = prefix_hash[predecessors]
+            out_PN = out_PN[predecessors]
+            hidden = self._select_hiddens(hidden, predecessors)
+            if self.lm_weight > 0:
+                log_probs_lm = log_probs_lm[predecessors]
+                hidden_lm = self._select_hiddens(hidden_lm, predecessors)
+
+            # Extend the hyps with the non-blank tokens
+            emit = new_tokens != self.blank_id
+            tokens[emit, lengths[emit]] = new_tokens[emit]
+            lengths = lengths + emit.long()
+            prefix_hash = torch.where(
+                emit,
+                (prefix_hash * 1000003 + new_tokens + 1) % 2147483647,
+                prefix_hash,
+            )
+            scores = self._merge_duplicate_prefixes(
+                scores,
+                prefix_hash.view(batch_size, beam),
+                lengths.view(batch_size, beam),
+                tokens.view(batch_size, beam, -1),
+            )
+
+            # forward PN (and LM) on the extended, still alive, hyps only:
+            # after the merge, each prefix is forwarded once
+            emit = emit & torch.isfinite(scores.view(-1))
+            selected = emit.nonzero(as_tuple=True)[0]
+            if selected.numel() == 0:
+                continue
+            input_PN = new_tokens[selected].unsqueeze(1).int()
+            selected_out_PN, selected_hidden = self._forward_PN(
+                input_PN,
+                self.decode_network_lst,
+                self._select_hiddens(hidden, selected),
+            )
+            out_PN[selected] = selected_out_PN
+            if hidden is not None:
+                hidden = self._update_hiddens(selected, selected_hidden, hidden)
+            if self.lm_weight > 0:
+                (
+                    selected_log_probs_lm,
+                    selected_hidden_lm,
+                ) = self._lm_forward_step(
+                    input_PN, self._select_hiddens(hidden_lm, selected)
+                )
+                log_probs_lm[selected] = selected_log_probs_lm.view(
+                    selected.numel(), -1
+                )
+                hidden_lm = self._update_hiddens(
+                    selected, selected_hidden_lm, hidden_lm
+                )
+
+        # Add norm score (the initial blank is counted as in get_transducer_key)
+        norm_scores = scores / (lengths.view(batch_size, beam) + 1)
+        nbest = min(self.nbest, beam)
+        norm_scores, order = norm_scores.topk(nbest, dim=-1)
+        order = (order + beam_offset.unsqueeze(1)).view(-1)
+        tokens = tokens[order].view(batch_size, nbest, -1).tolist()
+        lengths = lengths[order].view(batch_size, nbest).tolist()
+
+        nbest_batch = [
+            [hyp[:length] for hyp, length in zip(utt_hyps, utt_lengths)]
+            for utt_hyps, utt_lengths in zip(tokens, lengths)
+        ]
+        nbest_batch_score = norm_scores.tolist()
+        return (
+            [nbest_utt[0] for nbest_utt in nbest_batch],
+            norm_scores[:, 0].exp().mean(),
+            nbest_batch,
+            nbest_batch_score,
+        )
+
+    def _merge_duplicate_prefixes(self, scores, prefix_hash, lengths, tokens):
+        """Merge the hyps of an utterance sharing the same prefix (reached
+        with different alignments) by summing their probabilities. The
+        merged score is kept in the first hyp of each group, the other ones
+        are disabled by setting their score to -inf. The hashes select the
+        candidate pairs, whose tokens are then compared, so that a hash
+        collision never merges different prefixes.
+
+        Arguments
+        ----------
+        scores : torch.tensor
+            Scores of the hyps [B, beam].
+        prefix_hash : torch.tensor
+            Hash of the prefix of each hyp [B, beam].
+        lengths : torch.tensor
+            Length of the prefix of each hyp [B, beam].
+        tokens : torch.tensor
+            Tokens of each hyp, padded with blanks [B, beam, max_len].
+
+        Returns
+        -------
+        torch.tensor
+            The merged scores [B, beam].
+        """
+        same = (prefix_hash.unsqueeze(2) == prefix_hash.unsqueeze(1)) & (
+            lengths.unsqueeze(2) == lengths.unsqueeze(1)
+        )
+        same.diagonal(dim1=1, dim2=2).fill_(False)
+        utts, hyps, others = same.nonzero(as_tuple=True)
+        if utts.numel() > 0:
+            collision = (tokens[utts, hyps] != tokens[utts, others]).any(dim=-1)
+            same[utts[collision], hyps[collision], others[collision]] = False
+        same.diagonal(dim1=1, dim2=2).fill_(True)
+        merged = torch.logsumexp(
+            scores.unsqueeze(1)
+            .expand_as(same)
+            .masked_fill(~same, float("-inf")),
+            dim=-1,
+        )
+        first = same.int().argmax(dim=-1)
+        is_first = first == torch.arange(scores.size(1), device=scores.device)
+        return torch.where(
+            is_first, merged, torch.full_like(merged, float("-inf"))
+        )
+
     def _joint_forward_step(self, h_i, out_PN):
         """Join predictions (TN & PN)."""
 
@@ -440,6 +662,27 @@ class TransducerBeamSearcher(torch.nn.Module):
             hidden_update_hyp = hidden[:, selected_sentences, :]
         return selected_output_PN, hidden_update_hyp
 
+    def _select_hiddens(self, hidden, index):
+        """Select the hiddens of a subset of the hyps (along the batch axis).
+
+        Arguments
+        ----------
+        hidden : torch.tensor
+            Hidden tensor (or tuple of tensors for LSTM), can be None.
+        index : torch.tensor
+            Index of the hyps to select.
+
+        Returns
+        -------
+        torch.tensor
+            Selected hiddens tensor.
+        """
+        if hidden is None:
+            return None
+        if isinstance(hidden, tuple):
+            return tuple(h[:, index, :] for h in hidden)
+        return hidden[:, index, :]
+
     def _update_hiddens(self, selected_sentences, updated_hidden, hidden):
         """Update hidden tensor by a subset of hidden tensor (updated ones).
 
@@ -61,6 +61,7 @@ Authors
 """
 import collections
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -185,6 +186,128 @@ def read_arpa(fstream):
     return num_ngrams, ngrams_by_order, backoffs_by_order
 
 
+def read_arpa_arrays(fstream):
+    r"""
+    Reads an ARPA format N-gram language model from a stream into flat
+    arrays, without building the nested dicts of `read_arpa`.
+
+    Each word is mapped to an integer ID, given by the order of the
+    unigram section. This is the input format of
+    `speechbrain.lm.ngram.CompiledNgramLM`, and is suited to large models
+    (the memory used is a few bytes per N-gram).
+
+    Arguments
+    ---------
+    fstream : TextIO
+        Text file stream (as commonly returned by open()) to read the model
+        from.
+
+    Returns
+    -------
+    list
+        The vocabulary: the words, indexed by their ID.
+    dict
+        Maps N-gram orders to a tuple of arrays (words, logprobs, backoffs):
+        words is an int32 array of shape [num_ngrams, order] with the word
+        IDs of each N-gram, logprobs and backoffs are float32 arrays of
+        shape [num_ngrams] (missing backoffs are 0.0).
+
+    Raises
+    ------
+    ValueError
+        If no LM is found or the file is badly formatted.
+
+    Example
+    -------
+    >>> import io
+    >>> arpa = "\\data\\\nngram 1=2\nngram 2=1\n\n\\1-grams:\n"
+    >>> arpa += "-0.5 a -0.1\n-0.3 b\n\n\\2-grams:\n-0.2 a b\n\n\\end\\\n"
+    >>> vocab, arrays = read_arpa_arrays(io.StringIO(arpa))
+    >>> vocab
+    ['a', 'b']
+    >>> words, logprobs, backoffs = arrays[2]
+    >>> words.tolist(), logprobs.tolist(), arrays[1][2].tolist()
+    ([[0, 1]], [-0.20000000298023224], [-0.10000000149011612, 0.0])
+    """
+    _find_data_section(fstream)
+    num_ngrams = {}
+    order = None
+    for line in fstream:
+        line = line.strip()
+        if line[:5] == "ngram":
+            lhs, rhs = line.split("=")
+            num_ngrams[int(lhs.split()[1])] = int(rhs)
+        elif _starts_ngrams_section(line):
+            order = _parse_order(line)
+            break
+        elif line:
+            raise ValueError("Not a properly formatted line")
+    if order is None:
+        raise ValueError("Not a properly formatted ARPA file")
+
+    vocab = []
+    word2id = {}
+    arrays = {}
+    while order is not None:
+        if order not in num_ngrams:
+            raise ValueError("Not a properly formatted ARPA file")
+        arrays[order], next_order = _read_ngrams_section_arrays(
+            fstream, order, num_ngrams[order], vocab, word2id
+        )
+        order = next_order
+    if not num_ngrams.keys() == arrays.keys():
+        raise ValueError("Not a properly formatted ARPA file")
+    return vocab, arrays
+
+
+def _read_ngrams_section_arrays(fstream, order, count, vocab, word2id):
+    """
+    Reads the N-grams of one order into arrays (see `read_arpa_arrays`).
+    The unigrams section fills vocab and word2id.
+
+    Returns
+    -------
+    tuple
+        The (words, logprobs, backoffs) arrays.
+    int
+        The order of the section that starts next, None at the end.
+    """
+    words = np.zeros((count, order), dtype=np.int32)
+    logprobs = np.zeros(count, dtype=np.float32)
+    backoffs = np.zeros(count, dtype=np.float32)
+    i = 0
+    next_order = None
+    for line in fstream:
+        line = line.strip()
+        if not line:
+            continue
+        if _starts_ngrams_section(line):
+            next_order = _parse_order(line)
+            break
+        if _ends_arpa(line):
+            break
+        parts = line.split()
+        if i >= count:
+            raise ValueError("More N-grams than declared in \\data\\")
+        logprobs[i] = float(parts[0])
+        if len(parts) == order + 2:
+            backoffs[i] = float(parts[-1])
+        tokens = parts[1 : order + 1]
+        if order == 1:
+            word2id[tokens[0]] = len(vocab)
+            vocab.append(tokens[0])
+            words[i, 0] = i
+        else:
+            try:
+                words[i] = [word2id[token] for token in tokens]
+            except KeyError:
+                raise ValueError("N-gram with a word not in the unigrams")
+        i += 1
+    if i != count:
+        raise ValueError("Fewer N-grams than declared in \\data\\")
+    return (words, logprobs, backoffs), next_order
+
+
 def _find_data_section(fstream):
     r"""
     Reads (lines) from the stream until the \data\ header is found.
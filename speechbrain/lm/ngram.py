@@ -5,6 +5,10 @@ Authors
  * Aku Rouhe 2020
 """
 import collections
+import json
+import struct
+import numpy as np
+from speechbrain.lm.arpa import read_arpa_arrays
 
 NEGINFINITY = float("-inf")
 
@@ -106,6 +110,388 @@ class BackoffNgramLM:
         return lp + backoff_log_weight
 
 
+class CompiledNgramLM:
+    r"""
+    Compact, array-backed query interface for backoff N-gram language models
+
+    The model is stored as a trie in flat numpy arrays: words are integer
+    IDs, and the N-grams of each order are sorted by (context index, word ID)
+    so that they are found by binary search. Each N-gram also keeps a link to
+    its longest listed suffix, used when backing off. Log-probabilities and
+    backoff weights can be quantized to 8 or 16 bits with a per-order
+    codebook.
+
+    LM states are integers: state 0 is the empty context, and the other
+    states identify the listed N-gram which is the longest usable context.
+    `score_batch` advances arrays of states in a vectorized way, which is
+    what decoders should use. `logprob` offers the same interface as
+    `BackoffNgramLM` (and returns the same values).
+
+    The model can be saved to a binary file which is loaded with memory
+    mapping, so loading is instant and the arrays are shared between
+    processes.
+
+    Arguments
+    ---------
+    vocab : list
+        The words, indexed by their ID.
+    tables : dict
+        The arrays of the model, as built by `from_arrays`.
+    top_order : int
+        The order of the model.
+
+    Example
+    -------
+    >>> import io
+    >>> arpa = "\\data\\\nngram 1=3\nngram 2=2\n\n\\1-grams:\n"
+    >>> arpa += "-1.0 <s> -0.3\n-0.5 a -0.2\n-0.7 b\n\n\\2-grams:\n"
+    >>> arpa += "-0.1 <s> a\n-0.4 a b\n\n\\end\\\n"
+    >>> lm = CompiledNgramLM.from_arpa(io.StringIO(arpa))
+    >>> lm.logprob("b", ("a",))
+    -0.4000000059604645
+    >>> round(lm.logprob("b", ("<s>",)), 4)  # backoff(<s>) + P(b)
+    -1.0
+    >>> state = lm.context_state(("<s>",))
+    >>> logprobs, states = lm.score_batch([state, state], lm.words_to_ids(["a", "b"]))
+    >>> logprobs.round(4).tolist()
+    [-0.1, -1.0]
+    >>> logprobs, states = lm.score_batch(states, lm.words_to_ids(["b", "b"]))
+    >>> logprobs.round(4).tolist()
+    [-0.4, -0.7]
+    >>> path = str(getfixture("tmpdir") / "lm.bin")
+    >>> lm.save(path)
+    >>> lm = CompiledNgramLM.load(path)
+    >>> lm.logprob("b", ("a",))
+    -0.4000000059604645
+    """
+
+    MAGIC = b"SBNGRAM1"
+    ALIGNMENT = 64
+
+    def __init__(self, vocab, tables, top_order):
+        self.vocab = list(vocab)
+        self.word2id = {word: i for i, word in enumerate(self.vocab)}
+        self.tables = tables
+        self.top_order = top_order
+
+        # State IDs: 0 is the empty context, then the N-grams of each order
+        # up to top_order - 1 (the ones that can be used as context).
+        counts = [len(tables["probs_%d" % n]) for n in range(1, top_order)]
+        self._offsets = np.cumsum([0, 1] + counts)[:top_order]
+
+    @classmethod
+    def from_arpa(cls, arpa, quantize_bits=None):
+        """Builds the model from an ARPA file.
+
+        Arguments
+        ---------
+        arpa : str or TextIO
+            The path of the ARPA file, or a text stream to read it from.
+        quantize_bits : int
+            If given (8 or 16), the log-probabilities and backoffs are
+            quantized to this number of bits.
+
+        Returns
+        -------
+        CompiledNgramLM
+            The compiled model.
+        """
+        if isinstance(arpa, str):
+            with open(arpa) as fin:
+                vocab, arrays = read_arpa_arrays(fin)
+        else:
+            vocab, arrays = read_arpa_arrays(arpa)
+        return cls.from_arrays(vocab, arrays, quantize_bits)
+
+    @classmethod
+    def from_arrays(cls, vocab, arrays, quantize_bits=None):
+        """Builds the model from the output of
+        `speechbrain.lm.arpa.read_arpa_arrays`.
+
+        Arguments
+        ---------
+        vocab : list
+            The words, indexed by their ID.
+        arrays : dict
+            Maps N-gram orders to (words, logprobs, backoffs) arrays.
+        quantize_bits : int
+            If given (8 or 16), the log-probabilities and backoffs are
+            quantized to this number of bits.
+
+        Returns
+        -------
+        CompiledNgramLM
+            The compiled model.
+        """
+        if quantize_bits not in [None, 8, 16]:
+            raise ValueError("quantize_bits must be None, 8 or 16")
+        top_order = max(arrays)
+        vocab_size = len(vocab)
+        num_states = 1 + sum(len(arrays[n][0]) for n in range(1, top_order))
+        state_dtype = np.int32 if num_states < 2 ** 31 else np.int64
+        offsets = np.cumsum(
+            [0, 1] + [len(arrays[n][0]) for n in range(1, top_order)]
+        )
+
+        tables = {}
+        for n in range(1, top_order + 1):
+            words, logprobs, backoffs = arrays[n]
+            if n > 1:
+                parents = _lookup_ngrams(tables, words[:, :-1], vocab_size)
+                if (parents < 0).any():
+                    raise ValueError("N-gram whose context is not listed")
+                keys = parents * vocab_size + words[:, -1]
+                order = np.argsort(keys, kind="stable")
+                tables["keys_%d" % n] = keys[order]
+                words = words[order]
+                logprobs = logprobs[order]
+                backoffs = backoffs[order]
+
+                # Link to the longest listed suffix (as a state ID)
+                suffix = np.zeros(len(words), dtype=state_dtype)
+                missing = np.ones(len(words), dtype=bool)
+                for start in range(1, n):
+                    if not missing.any():
+                        break
+                    found = _lookup_ngrams(
+                        tables, words[missing, start:], vocab_size
+                    )
+                    idx = np.flatnonzero(missing)[found >= 0]
+                    suffix[idx] = offsets[n - start] + found[found >= 0]
+                    missing[idx] = False
+                tables["suffix_%d" % n] = suffix
+            _store_values(tables, "probs_%d" % n, logprobs, quantize_bits)
+            if n < top_order:
+                _store_values(
+                    tables, "backoffs_%d" % n, backoffs, quantize_bits
+                )
+        return cls(vocab, tables, top_order)
+
+    def save(self, path):
+        """Saves the model to a binary file that `load` memory-maps.
+
+        The file is made of a magic string, the length of a JSON header
+        (vocab, order, and dtype / shape / offset of each array) as uint64,
+        the header itself, and the raw arrays aligned on 64 bytes.
+
+        Arguments
+        ---------
+        path : str
+            Where to save the model.
+        """
+        arrays = {}
+        offset = 0
+        for name in sorted(self.tables):
+            array = np.ascontiguousarray(self.tables[name])
+            arrays[name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset += _align(array.nbytes, self.ALIGNMENT)
+        header = json.dumps(
+            {"top_order": self.top_order, "vocab": self.vocab, "arrays": arrays}
+        ).encode("utf-8")
+        data_start = _align(len(self.MAGIC) + 8 + len(header), self.ALIGNMENT)
+
+        with open(path, "wb") as fout:
+            fout.write(self.MAGIC)
+            fout.write(struct.pack("<Q", len(header)))
+            fout.write(header)
+            for name in sorted(self.tables):
+                fout.write(
+                    b"\0" * (data_start + arrays[name]["offset"] - fout.tell())
+                )
+                np.ascontiguousarray(self.tables[name]).tofile(fout)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a model saved with `save`, memory-mapping its arrays.
+
+        Arguments
+        ---------
+        path : str
+            The path of the binary model.
+
+        Returns
+        -------
+        CompiledNgramLM
+            The loaded model.
+        """
+        with open(path, "rb") as fin:
+            if fin.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError("%s is not a compiled N-gram LM" % path)
+            (header_len,) = struct.unpack("<Q", fin.read(8))
+            header = json.loads(fin.read(header_len).decode("utf-8"))
+        data_start = _align(len(cls.MAGIC) + 8 + header_len, cls.ALIGNMENT)
+
+        tables = {}
+        for name, info in header["arrays"].items():
+            shape = tuple(info["shape"])
+            if np.prod(shape) == 0:
+                tables[name] = np.zeros(shape, dtype=info["dtype"])
+            else:
+                tables[name] = np.memmap(
+                    path,
+                    dtype=info["dtype"],
+                    mode="r",
+                    offset=data_start + info["offset"],
+                    shape=shape,
+                )
+        return cls(header["vocab"], tables, header["top_order"])
+
+    @classmethod
+    def is_compiled_lm(cls, path):
+        """Returns True if path is a binary model saved with `save`."""
+        with open(path, "rb") as fin:
+            return fin.read(len(cls.MAGIC)) == cls.MAGIC
+
+    def words_to_ids(self, words):
+        """Maps words to their IDs (-1 for words out of the vocabulary)."""
+        return np.array([self.word2id.get(word, -1) for word in words])
+
+    def context_state(self, context=tuple()):
+        """Returns the state of a context (tuple of words)."""
+        if self.top_order == 1:
+            return 0
+        ids = self.words_to_ids(context[-(self.top_order - 1) :])
+        for start in range(len(ids)):
+            if (ids[start:] < 0).any():
+                continue
+            idx = _lookup_ngrams(
+                self.tables, ids[start:].reshape(1, -1), len(self.vocab)
+            )[0]
+            if idx >= 0:
+                return int(self._offsets[len(ids) - start] + idx)
+        return 0
+
+    def score_batch(self, states, word_ids):
+        """Scores a batch of words given the states of their contexts.
+
+        Arguments
+        ---------
+        states : array_like
+            The LM states (integers) of the contexts.
+        word_ids : array_like
+            The IDs of the words to score (-1 for out of vocabulary).
+
+        Returns
+        -------
+        numpy.ndarray
+            The log-probability of each word (-inf if out of vocabulary).
+        numpy.ndarray
+            The LM state of each context extended by its word.
+        """
+        states = np.array(states, dtype=np.int64)
+        word_ids = np.asarray(word_ids, dtype=np.int64)
+        logprobs = np.zeros(states.shape, dtype=np.float64)
+        next_states = np.zeros(states.shape, dtype=np.int64)
+        vocab_size = len(self.vocab)
+
+        pending = word_ids >= 0
+        logprobs[~pending] = NEGINFINITY
+        while pending.any():
+            orders = np.searchsorted(self._offsets, states, side="right") - 1
+            for order in np.unique(orders[pending]):
+                sel = np.flatnonzero(pending & (orders == order))
+                words = word_ids[sel]
+                if order == 0:
+                    logprobs[sel] += self._values("probs", 1, words)
+                    next_states[sel] = self._next_states(1, words)
+                    pending[sel] = False
+                    continue
+
+                # Look for the (context, word) N-gram
+                context = states[sel] - self._offsets[order]
+                keys = self.tables["keys_%d" % (order + 1)]
+                query = context * vocab_size + words
+                if len(keys) > 0:
+                    pos = np.minimum(
+                        np.searchsorted(keys, query), len(keys) - 1
+                    )
+                    found = keys[pos] == query
+                else:
+                    pos = np.zeros(len(sel), dtype=np.int64)
+                    found = np.zeros(len(sel), dtype=bool)
+                hit = sel[found]
+                logprobs[hit] += self._values("probs", order + 1, pos[found])
+                next_states[hit] = self._next_states(order + 1, pos[found])
+                pending[hit] = False
+
+                # Otherwise, back off to the suffix of the context
+                miss = sel[~found]
+                context = context[~found]
+                logprobs[miss] += self._values("backoffs", order, context)
+                if order == 1:
+                    states[miss] = 0
+                else:
+                    states[miss] = self.tables["suffix_%d" % order][context]
+        return logprobs, next_states
+
+    def logprob(self, token, context=tuple()):
+        """Computes the backoff log weights and applies them."""
+        state = self.context_state(context)
+        logprobs, _ = self.score_batch([state], [self.word2id.get(token, -1)])
+        return float(logprobs[0])
+
+    def _values(self, name, order, idx):
+        """Reads (and dequantizes) log-probabilities or backoffs."""
+        values = self.tables["%s_%d" % (name, order)][idx]
+        codebook = self.tables.get("%s_%d_codebook" % (name, order))
+        if codebook is not None:
+            values = codebook[values]
+        return values.astype(np.float64)
+
+    def _next_states(self, order, idx):
+        """Returns the state reached after the N-grams idx of an order."""
+        if order < self.top_order:
+            return self._offsets[order] + idx
+        if order == 1:
+            return np.zeros(len(idx), dtype=np.int64)
+        return self.tables["suffix_%d" % order][idx]
+
+
+def _lookup_ngrams(tables, words, vocab_size):
+    """Finds the index of N-grams (rows of word IDs) within their order,
+    -1 for the ones that are not listed."""
+    idx = words[:, 0].astype(np.int64)
+    for n in range(2, words.shape[1] + 1):
+        keys = tables["keys_%d" % n]
+        if len(keys) == 0:
+            return np.full(len(words), -1, dtype=np.int64)
+        query = idx * vocab_size + words[:, n - 1]
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        idx = np.where((idx >= 0) & (keys[pos] == query), pos, -1)
+    return idx
+
+
+def _store_values(tables, name, values, quantize_bits):
+    """Stores float values, quantized with a codebook if requested."""
+    if quantize_bits is None:
+        tables[name] = values.astype(np.float32)
+        return
+    num_bins = 2 ** quantize_bits
+    dtype = np.uint8 if quantize_bits == 8 else np.uint16
+    uniques = np.unique(values)
+    if len(uniques) <= num_bins:
+        codebook = uniques
+        codes = np.searchsorted(uniques, values)
+    else:
+        # Bins with (about) the same number of values, centered on their mean
+        bounds = np.quantile(values, np.linspace(0, 1, num_bins + 1)[1:-1])
+        codes = np.searchsorted(bounds, values)
+        sums = np.bincount(codes, weights=values, minlength=num_bins)
+        counts = np.bincount(codes, minlength=num_bins)
+        codebook = sums / np.maximum(counts, 1)
+    tables[name] = codes.astype(dtype)
+    tables[name + "_codebook"] = codebook.astype(np.float32)
+
+
+def _align(size, alignment):
+    """Rounds size up to a multiple of alignment."""
+    return (size + alignment - 1) // alignment * alignment
+
+
 def ngram_evaluation_details(data, LM):
     """
     Evaluates the N-gram LM on each sentence in data
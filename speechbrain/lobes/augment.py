@@ -23,6 +23,7 @@ from speechbrain.processing.speech_augmentation import (
     AddBabble,
     AddNoise,
     AddReverb,
+    AudioBank,
 )
 from speechbrain.utils.torch_audio_backend import check_torchaudio_backend
 
@@ -354,6 +355,16 @@ class EnvCorrupt(torch.nn.Module):
         Sample rate of input audio signals used for adding noise.
     clean_sample_rate: int
         Sample rate of original (clean) audio signals.
+    preload : bool
+        If True, the noises and impulse responses are decoded once into an
+        ``AudioBank``, and drawn per signal from memory, instead of being
+        read from their files at every batch. The bank stays on the CPU when
+        the module is moved to a GPU, only the drawn signals are copied.
+    preload_dtype : str
+        "float32" or "float16", the type of the preloaded signals.
+    preload_folder : str, None
+        If given, the preloaded signals are stored in this folder and
+        memory-mapped, rather than kept in memory.
 
     Example
     -------
@@ -381,6 +392,9 @@ class EnvCorrupt(torch.nn.Module):
         reverb_sample_rate=16000,
         noise_sample_rate=16000,
         clean_sample_rate=16000,
+        preload=False,
+        preload_dtype="float32",
+        preload_folder=None,
     ):
         super().__init__()
 
@@ -405,8 +419,24 @@ class EnvCorrupt(torch.nn.Module):
                 noise_csv = open_noise_csv
                 noise_sample_rate = 16000
 
+        def make_bank(csv_file, orig_sample_rate, name):
+            if not preload:
+                return None
+            cache_dir = None
+            if preload_folder is not None:
+                cache_dir = os.path.join(preload_folder, name)
+            return AudioBank(
+                csv_file,
+                replacements={"rir_root": openrir_folder},
+                orig_sample_rate=orig_sample_rate,
+                sample_rate=clean_sample_rate,
+                dtype=preload_dtype,
+                cache_dir=cache_dir,
+            )
+
         # Initialize corrupters
         if reverb_csv is not None and reverb_prob > 0.0:
+            rir_bank = make_bank(reverb_csv, reverb_sample_rate, "reverb")
             self.add_reverb = AddReverb(
                 reverb_prob=reverb_prob,
                 csv_file=reverb_csv,
@@ -414,6 +444,7 @@ class EnvCorrupt(torch.nn.Module):
                 rir_scale_factor=rir_scale_factor,
                 reverb_sample_rate=reverb_sample_rate,
                 clean_sample_rate=clean_sample_rate,
+                rir_bank=rir_bank,
             )
 
         if babble_speaker_count > 0 and babble_prob > 0.0:
@@ -425,6 +456,7 @@ class EnvCorrupt(torch.nn.Module):
             )
 
         if noise_csv is not None and noise_prob > 0.0:
+            noise_bank = make_bank(noise_csv, noise_sample_rate, "noise")
             self.add_noise = AddNoise(
                 mix_prob=noise_prob,
                 csv_file=noise_csv,
@@ -434,6 +466,7 @@ class EnvCorrupt(torch.nn.Module):
                 snr_high=noise_snr_high,
                 noise_sample_rate=noise_sample_rate,
                 clean_sample_rate=clean_sample_rate,
+                noise_bank=noise_bank,
             )
 
     def forward(self, waveforms, lengths):
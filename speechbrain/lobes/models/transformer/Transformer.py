@@ -726,6 +726,82 @@ class TransformerDecoderLayer(nn.Module):
 
         return tgt, self_attn, multihead_attention
 
+    def forward_step(
+        self, tgt, memory, cache=None, memory_key_padding_mask=None,
+    ):
+        """Incremental decoding step. Only the new target positions are
+        processed, the keys/values of the previous ones are taken from cache.
+        The new positions attend to each other causally.
+
+        Arguments
+        ----------
+        tgt: tensor
+            The new positions of the target sequence (B, L, E).
+        memory: tensor
+            The sequence from the last layer of the encoder (required).
+        cache: tuple
+            (self_attn_cache, cross_attn_cache) as returned by the previous
+            step, or None at the first step.
+        memory_key_padding_mask: tensor
+            The mask for the memory keys per batch (optional).
+        """
+        if not isinstance(self.self_attn, sb.nnet.attention.MultiheadAttention):
+            raise ValueError(
+                "Incremental decoding is only supported with regularMHA"
+            )
+        self_cache, cross_cache = cache if cache is not None else (None, None)
+
+        if self.normalize_before:
+            tgt1 = self.norm1(tgt)
+        else:
+            tgt1 = tgt
+
+        tgt2, self_attn, self_cache = self.self_attn.forward_step(
+            tgt1, tgt1, tgt1, cache=self_cache, causal=True
+        )
+
+        # add & norm
+        tgt = tgt + self.dropout1(tgt2)
+        if not self.normalize_before:
+            tgt = self.norm1(tgt)
+
+        if self.normalize_before:
+            tgt1 = self.norm2(tgt)
+        else:
+            tgt1 = tgt
+
+        (
+            tgt2,
+            multihead_attention,
+            cross_cache,
+        ) = self.mutihead_attn.forward_step(
+            tgt1,
+            memory,
+            memory,
+            cache=cross_cache,
+            static_kv=True,
+            key_padding_mask=memory_key_padding_mask,
+        )
+
+        # add & norm
+        tgt = tgt + self.dropout2(tgt2)
+        if not self.normalize_before:
+            tgt = self.norm2(tgt)
+
+        if self.normalize_before:
+            tgt1 = self.norm3(tgt)
+        else:
+            tgt1 = tgt
+
+        tgt2 = self.pos_ffn(tgt1)
+
+        # add & norm
+        tgt = tgt + self.dropout3(tgt2)
+        if not self.normalize_before:
+            tgt = self.norm3(tgt)
+
+        return tgt, self_attn, multihead_attention, (self_cache, cross_cache)
+
 
 class TransformerDecoder(nn.Module):
     """This class implements the Transformer decoder.
@@ -833,6 +909,62 @@ class TransformerDecoder(nn.Module):
 
         return output, self_attns, multihead_attns
 
+    def forward_step(
+        self, tgt, memory, cache=None, memory_key_padding_mask=None,
+    ):
+        """Runs the decoder on the new target positions only, reusing the
+        self-attention keys/values of the previous steps and the projected
+        encoder states stored in cache. This makes each autoregressive
+        step linear in the length of the output. Several new positions
+        (e.g. a prefix at the first step) can be given at once, they are
+        masked causally.
+
+        Arguments
+        ----------
+        tgt : tensor
+            The new positions of the target sequence (B, L, E).
+        memory : tensor
+            The sequence from the last layer of the encoder (required).
+        cache : list
+            Per-layer caches returned by the previous step, or None at the
+            first step.
+        memory_key_padding_mask : tensor
+            The mask for the memory keys per batch (optional).
+
+        Example
+        -------
+        >>> src = torch.rand((8, 60, 512))
+        >>> tgt = torch.rand((8, 1, 512))
+        >>> net = TransformerDecoder(1, 8, 1024, d_model=512)
+        >>> output, _, _, cache = net.forward_step(tgt, src)
+        >>> output, _, _, cache = net.forward_step(tgt, src, cache)
+        >>> output.shape
+        torch.Size([8, 1, 512])
+        """
+        if cache is None:
+            cache = [None] * len(self.layers)
+
+        output = tgt
+        self_attns, multihead_attns, new_cache = [], [], []
+        for dec_layer, layer_cache in zip(self.layers, cache):
+            (
+                output,
+                self_attn,
+                multihead_attn,
+                layer_cache,
+            ) = dec_layer.forward_step(
+                output,
+                memory,
+                cache=layer_cache,
+                memory_key_padding_mask=memory_key_padding_mask,
+            )
+            self_attns.append(self_attn)
+            multihead_attns.append(multihead_attn)
+            new_cache.append(layer_cache)
+        output = self.norm(output)
+
+        return output, self_attns, multihead_attns, new_cache
+
 
 class NormalizedEmbedding(nn.Module):
     """This class implements the normalized embedding layer for the transformer.
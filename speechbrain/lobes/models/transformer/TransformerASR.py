@@ -302,6 +302,69 @@ class TransformerASR(TransformerInterface):
         )
         return prediction, multihead_attns[-1]
 
+    def decode_step(self, tgt, encoder_out, enc_len=None, cache=None):
+        """Incremental counterpart of decode(). Only the newly predicted
+        tokens are fed to the decoder, the attention keys/values of the
+        previous steps are kept in cache.
+
+        Arguments
+        ---------
+        tgt : torch.Tensor
+            The new tokens (batch, 1).
+        encoder_out : torch.Tensor
+            Hidden output of the encoder.
+        enc_len : torch.LongTensor
+            The actual length of encoder states.
+        cache : list
+            The decoder cache returned by the previous step (None at the
+            first step).
+
+        Returns
+        -------
+        prediction : torch.Tensor
+            Decoder output for the new tokens (batch, 1, d_model).
+        attn : torch.Tensor
+            Encoder-decoder attention of the last layer (batch, 1, src_len).
+        cache : list
+            The updated decoder cache.
+
+        Example
+        -------
+        >>> src = torch.rand([2, 40, 64])
+        >>> net = TransformerASR(10, 64, 64, 4, 1, 1, 128)
+        >>> enc_out = net.encode(src).detach()
+        >>> bos = torch.zeros([2, 1], dtype=torch.long)
+        >>> pred, attn, cache = net.decode_step(bos, enc_out)
+        >>> pred, attn, cache = net.decode_step(bos, enc_out, cache=cache)
+        >>> pred.shape
+        torch.Size([2, 1, 64])
+        """
+        if self.attention_type != "regularMHA":
+            raise ValueError(
+                "decode_step is only supported with attention_type=regularMHA"
+            )
+        src_key_padding_mask = None
+        if enc_len is not None:
+            src_key_padding_mask = (
+                1 - length_to_mask(enc_len, max_len=encoder_out.shape[1])
+            ).bool()
+
+        # position of the new tokens = number of cached ones
+        start = 0 if cache is None else cache[0][0][0].shape[2]
+
+        tgt = self.custom_tgt_module(tgt)
+        if self.positional_encoding_type == "fixed_abs_sine":
+            pe = self.positional_encoding.pe
+            tgt = tgt + pe[:, start : start + tgt.shape[1]]
+
+        prediction, _, multihead_attns, cache = self.decoder.forward_step(
+            tgt,
+            encoder_out,
+            cache=cache,
+            memory_key_padding_mask=src_key_padding_mask,
+        )
+        return prediction, multihead_attns[-1], cache
+
     def encode(self, src, wav_len=None, pad_idx=0):
         """
         Encoder forward pass
@@ -779,6 +779,123 @@ class MultiheadAttention(nn.Module):
 
         return output
 
+    def forward_step(
+        self,
+        query,
+        key,
+        value,
+        cache: Optional[tuple] = None,
+        static_kv: bool = False,
+        key_padding_mask: Optional[torch.Tensor] = None,
+        causal: bool = False,
+    ):
+        """Incremental version of forward() used for autoregressive decoding.
+
+        The projected keys and values are returned so that they can be
+        passed back at the next step. For self-attention, the keys and values
+        of the new positions are appended to the cached ones. For
+        cross-attention (static_kv=True), the projection of the (fixed)
+        key/value sequence is computed only once and then reused.
+
+        Arguments
+        ----------
+        query : torch.Tensor
+            (B, L, E) where L is the number of new target positions.
+        key : torch.Tensor
+            (B, S, E) keys for the new positions (self-attention) or the full
+            source sequence (cross-attention).
+        value : torch.Tensor
+            (B, S, E) values, same convention as key.
+        cache : tuple, optional
+            (key, value) tensors of shape (B, nhead, S', E // nhead) returned
+            by the previous call, or None at the first step.
+        static_kv : bool
+            If True, key and value are assumed constant across steps and the
+            cached projections are reused as they are.
+        key_padding_mask : torch.Tensor, optional
+            (B, S) BoolTensor, True at positions to be ignored.
+        causal : bool
+            If True (self-attention), each new position only attends to the
+            cached positions and to the new positions up to itself, which
+            allows to process several new positions at once.
+
+        Returns
+        -------
+        attn_output : torch.Tensor
+            (B, L, E) attention output.
+        attn_output_weights : torch.Tensor
+            (B, L, S) attention weights averaged over heads.
+        cache : tuple
+            Updated (key, value) projections to pass at the next step.
+
+        Example
+        -------
+        >>> inputs = torch.rand([8, 1, 512])
+        >>> net = MultiheadAttention(nhead=8, d_model=inputs.shape[-1])
+        >>> outputs, attn, cache = net.forward_step(inputs, inputs, inputs)
+        >>> outputs, attn, cache = net.forward_step(
+        ...     inputs, inputs, inputs, cache=cache
+        ... )
+        >>> cache[0].shape
+        torch.Size([8, 8, 2, 64])
+        """
+        att = self.att
+        if att.bias_k is not None or att.add_zero_attn:
+            raise NotImplementedError(
+                "forward_step does not support add_bias_kv or add_zero_attn"
+            )
+
+        batch_size, tgt_len, embed_dim = query.shape
+        head_dim = embed_dim // att.num_heads
+
+        if att._qkv_same_embed_dim:
+            w_q, w_k, w_v = att.in_proj_weight.chunk(3)
+        else:
+            w_q, w_k, w_v = (
+                att.q_proj_weight,
+                att.k_proj_weight,
+                att.v_proj_weight,
+            )
+        b_q = b_k = b_v = None
+        if att.in_proj_bias is not None:
+            b_q, b_k, b_v = att.in_proj_bias.chunk(3)
+
+        def _split_heads(x):
+            return x.view(batch_size, -1, att.num_heads, head_dim).transpose(
+                1, 2
+            )
+
+        q = _split_heads(F.linear(query, w_q, b_q)) * head_dim ** -0.5
+
+        if static_kv and cache is not None:
+            k, v = cache
+        else:
+            k = _split_heads(F.linear(key, w_k, b_k))
+            v = _split_heads(F.linear(value, w_v, b_v))
+            if cache is not None:
+                k = torch.cat([cache[0], k], dim=2)
+                v = torch.cat([cache[1], v], dim=2)
+
+        # (B, nhead, L, S)
+        scores = torch.matmul(q, k.transpose(-2, -1))
+        if key_padding_mask is not None:
+            scores = scores.masked_fill(
+                key_padding_mask[:, None, None, :], float("-inf")
+            )
+        if causal and tgt_len > 1:
+            # New position i sits at k.shape[2] - tgt_len + i
+            future = torch.ones(
+                tgt_len, k.shape[2], dtype=torch.bool, device=scores.device
+            ).triu(k.shape[2] - tgt_len + 1)
+            scores = scores.masked_fill(future, float("-inf"))
+        weights = F.softmax(scores, dim=-1)
+        weights = F.dropout(weights, p=att.dropout, training=self.training)
+
+        output = torch.matmul(weights, v).transpose(1, 2)
+        output = att.out_proj(output.reshape(batch_size, tgt_len, embed_dim))
+
+        return output, weights.mean(dim=1), (k, v)
+
 
 class PositionalwiseFeedForward(nn.Module):
     """The class implements the positional-wise feed forward module in
@@ -10,7 +10,7 @@ from torch.autograd import Function
 from torch.nn import Module
 
 try:
-    from numba import cuda
+    from numba import cuda, njit
 except ImportError:
     err_msg = "The optional dependency Numba is needed to use this module\n"
     err_msg += "Cannot import numba. To use Transducer loss\n"
@@ -28,9 +28,7 @@ except ImportError:
 import math
 
 
-@cuda.jit(
-    "(float32[:,:,:,:], int32[:,:], float32[:,:,:], float32[:], int32[:], int32[:], int32, int32[:,:])"
-)
+@cuda.jit
 def cu_kernel_forward(log_probs, labels, alpha, log_p, T, U, blank, lock):
     """
     Compute forward pass for the forward-backward algorithm using Numba cuda kernel.
@@ -106,9 +104,7 @@ def cu_kernel_forward(log_probs, labels, alpha, log_p, T, U, blank, lock):
             ) / T[b]
 
 
-@cuda.jit(
-    "(float32[:,:,:,:], int32[:,:], float32[:,:,:], float32[:], int32[:], int32[:], int32, int32[:,:])"
-)
+@cuda.jit
 def cu_kernel_backward(log_probs, labels, beta, log_p, T, U, blank, lock):
     """
     Compute backward pass for the forward-backward algorithm using Numba cuda kernel.
@@ -180,9 +176,7 @@ def cu_kernel_backward(log_probs, labels, beta, log_p, T, U, blank, lock):
         log_p[b] = beta[b, 0, 0] / T[b]
 
 
-@cuda.jit(
-    "(float32[:,:,:,:], int32[:,:],float32[:,:,:], float32[:,:,:], float32[:,:,:,:], int32[:], int32[:], int32)"
-)
+@cuda.jit
 def cu_kernel_compute_grad(log_probs, labels, alpha, beta, grads, T, U, blank):
     """
     Compute gradient for the forward-backward algorithm using Numba cuda kernel.
@@ -236,34 +230,203 @@ def cu_kernel_compute_grad(log_probs, labels, alpha, beta, grads, T, U, blank):
                 )
 
 
-class Transducer(Function):
+@njit
+def cpu_kernel_forward(log_probs, labels, alpha, log_p, T, U, blank):
     """
-    This class implements the Transducer loss computation with forward-backward algorithm
-    Sequence Transduction with naive implementation : https://arxiv.org/pdf/1211.3711.pdf
+    Compute forward pass for the forward-backward algorithm using Numba on CPU.
+    Same computation as cu_kernel_forward, one utterance after the other.
 
-    This class use torch.autograd.Function. In fact of using the forward-backward algorithm,
-    we need to compute the gradient manually.
+    Arguments
+    ---------
+    log_probs : array
+        4D array of (batch x TimeLength x LabelLength x outputDim) from the Transducer network.
+    labels : array
+        2D array of (batch x MaxSeqLabelLength) containing targets of the batch with zero padding.
+    alpha : array
+        3D array of (batch x TimeLength x LabelLength) for forward computation.
+    log_p : array
+        1D array of (batch) for forward cost computation.
+    T : array
+        1D array of (batch) containing TimeLength of each target.
+    U : array
+        1D array of (batch) containing LabelLength of each target.
+    blank : int
+        Blank indice.
+    """
+    for b in range(log_probs.shape[0]):
+        # alpha[b, t, u] only depends on alpha[b, t - 1, u] and
+        # alpha[b, t, u - 1]: compute it row by row
+        for t in range(T[b]):
+            for u in range(U[b] + 1):
+                if t == 0 and u == 0:
+                    alpha[b, 0, 0] = 0
+                elif t == 0:
+                    alpha[b, 0, u] = (
+                        alpha[b, 0, u - 1]
+                        + log_probs[b, 0, u - 1, labels[b, u - 1]]
+                    )
+                elif u == 0:
+                    alpha[b, t, 0] = (
+                        alpha[b, t - 1, 0] + log_probs[b, t - 1, 0, blank]
+                    )
+                else:
+                    # compute emission prob
+                    emit = (
+                        alpha[b, t, u - 1]
+                        + log_probs[b, t, u - 1, labels[b, u - 1]]
+                    )
+                    # compute no_emission prob
+                    no_emit = alpha[b, t - 1, u] + log_probs[b, t - 1, u, blank]
+                    # do logsumexp between log_emit and log_no_emit
+                    alpha[b, t, u] = max(no_emit, emit) + math.log1p(
+                        math.exp(-abs(no_emit - emit))
+                    )
+        # normalize the loss over time
+        log_p[b] = (
+            alpha[b, T[b] - 1, U[b]] + log_probs[b, T[b] - 1, U[b], blank]
+        ) / T[b]
 
-    This class can't be instantiated, please refer to TransducerLoss class
 
-    It is also possible to use this class directly by using Transducer.apply
+@njit
+def cpu_kernel_backward(log_probs, labels, beta, log_p, T, U, blank):
     """
+    Compute backward pass for the forward-backward algorithm using Numba on CPU.
+    Same computation as cu_kernel_backward, one utterance after the other.
 
-    @staticmethod
-    def forward(ctx, log_probs, labels, T, U, blank, reduction):
-        """Computes the transducer loss."""
-        log_probs = log_probs.detach()
-        B, maxT, maxU, A = log_probs.shape
-        grads = torch.zeros(
-            (B, maxT, maxU, A), dtype=torch.float32, device=log_probs.device
-        )
-        alpha = torch.zeros((B, maxT, maxU), device=log_probs.device)
-        beta = torch.zeros((B, maxT, maxU), device=log_probs.device)
+    Arguments
+    ---------
+    log_probs : array
+        4D array of (batch x TimeLength x LabelLength x outputDim) from the Transducer network.
+    labels : array
+        2D array of (batch x MaxSeqLabelLength) containing targets of the batch with zero padding.
+    beta : array
+        3D array of (batch x TimeLength x LabelLength) for backward computation.
+    log_p : array
+        1D array of (batch) for backward cost computation.
+    T : array
+        1D array of (batch) containing TimeLength of each target.
+    U : array
+        1D array of (batch) containing LabelLength of each target.
+    blank : int
+        Blank indice.
+    """
+    for b in range(log_probs.shape[0]):
+        for t in range(T[b] - 1, -1, -1):
+            for u in range(U[b], -1, -1):
+                if t == T[b] - 1 and u == U[b]:
+                    beta[b, t, u] = log_probs[b, t, u, blank]
+                elif t == T[b] - 1:
+                    beta[b, t, u] = (
+                        beta[b, t, u + 1] + log_probs[b, t, u, labels[b, u]]
+                    )
+                elif u == U[b]:
+                    beta[b, t, u] = (
+                        beta[b, t + 1, u] + log_probs[b, t, u, blank]
+                    )
+                else:
+                    # compute emission prob
+                    emit = beta[b, t, u + 1] + log_probs[b, t, u, labels[b, u]]
+                    # compute no_emission prob
+                    no_emit = beta[b, t + 1, u] + log_probs[b, t, u, blank]
+                    # do logsumexp between log_emit and log_no_emit
+                    beta[b, t, u] = max(no_emit, emit) + math.log1p(
+                        math.exp(-abs(no_emit - emit))
+                    )
+        # normalize the loss over time
+        log_p[b] = beta[b, 0, 0] / T[b]
+
+
+@njit
+def cpu_kernel_compute_grad(log_probs, labels, alpha, beta, grads, T, U, blank):
+    """
+    Compute gradient for the forward-backward algorithm using Numba on CPU.
+    Same computation as cu_kernel_compute_grad, one utterance after the other.
+
+    Arguments
+    ---------
+    log_probs : array
+        4D array of (batch x TimeLength x LabelLength x outputDim) from the Transducer network.
+    labels : array
+        2D array of (batch x MaxSeqLabelLength) containing targets of the batch with zero padding.
+    alpha : array
+        3D array of (batch x TimeLength x LabelLength) from the forward computation.
+    beta : array
+        3D array of (batch x TimeLength x LabelLength) from the backward computation.
+    grads : array
+        4D array of (batch x TimeLength x LabelLength x outputDim), zero initialized.
+    T : array
+        1D array of (batch) containing TimeLength of each target.
+    U : array
+        1D array of (batch) containing LabelLength of each target.
+    blank : int
+        Blank indice.
+    """
+    for b in range(log_probs.shape[0]):
+        log_p = beta[b, 0, 0]
+        for t in range(T[b]):
+            for u in range(U[b] + 1):
+                # compute the gradient for no_emit prob
+                if t < T[b] - 1:
+                    grads[b, t, u, blank] = -math.exp(
+                        alpha[b, t, u]
+                        + beta[b, t + 1, u]
+                        + log_probs[b, t, u, blank]
+                        - log_p
+                    )
+                elif u == U[b]:
+                    grads[b, t, u, blank] = -math.exp(
+                        alpha[b, t, u] + log_probs[b, t, u, blank] - log_p
+                    )
+                # compute the gradient for emit prob
+                if u < U[b]:
+                    label = labels[b, u]
+                    grads[b, t, u, label] = -math.exp(
+                        alpha[b, t, u]
+                        + beta[b, t, u + 1]
+                        + log_probs[b, t, u, label]
+                        - log_p
+                    )
+
+
+def transducer_forward_backward(log_probs, labels, T, U, blank):
+    """Runs the forward-backward algorithm with the kernels of the device of
+    log_probs (Numba CUDA kernels on GPU, compiled Numba CPU kernels
+    otherwise).
+
+    Arguments
+    ---------
+    log_probs : torch.Tensor
+        4D Tensor of (batch x TimeLength x LabelLength x outputDim).
+    labels : torch.Tensor
+        2D Tensor of (batch x MaxSeqLabelLength) containing the targets.
+    T : torch.Tensor
+        1D Tensor of (batch) containing TimeLength of each target.
+    U : torch.Tensor
+        1D Tensor of (batch) containing LabelLength of each target.
+    blank : int
+        Blank indice.
+
+    Returns
+    -------
+    log_p : torch.Tensor
+        1D Tensor of (batch), log-likelihood of each target divided by its
+        TimeLength.
+    grads : torch.Tensor
+        Gradient of -log-likelihood w.r.t. log_probs.
+    """
+    log_probs = log_probs.detach()
+    B, maxT, maxU, A = log_probs.shape
+    grads = torch.zeros(
+        (B, maxT, maxU, A), dtype=torch.float32, device=log_probs.device
+    )
+    alpha = torch.zeros((B, maxT, maxU), device=log_probs.device)
+    beta = torch.zeros((B, maxT, maxU), device=log_probs.device)
+    log_p_alpha = torch.zeros((B,), device=log_probs.device)
+    log_p_beta = torch.zeros((B,), device=log_probs.device)
+    if log_probs.is_cuda:
         lock = torch.zeros(
             (B, maxU), dtype=torch.int32, device=log_probs.device
         )
-        log_p_alpha = torch.zeros((B,), device=log_probs.device)
-        log_p_beta = torch.zeros((B,), device=log_probs.device)
         cu_kernel_forward[B, maxU](
             log_probs, labels, alpha, log_p_alpha, T, U, blank, lock,
         )
@@ -274,17 +437,132 @@ class Transducer(Function):
         cu_kernel_compute_grad[maxT, B](
             log_probs, labels, alpha, beta, grads, T, U, blank
         )
+        del lock
+    else:
+        log_probs_np = log_probs.float().numpy()
+        labels_np = labels.numpy()
+        T_np, U_np = T.numpy(), U.numpy()
+        cpu_kernel_forward(
+            log_probs_np,
+            labels_np,
+            alpha.numpy(),
+            log_p_alpha.numpy(),
+            T_np,
+            U_np,
+            blank,
+        )
+        cpu_kernel_backward(
+            log_probs_np,
+            labels_np,
+            beta.numpy(),
+            log_p_beta.numpy(),
+            T_np,
+            U_np,
+            blank,
+        )
+        cpu_kernel_compute_grad(
+            log_probs_np,
+            labels_np,
+            alpha.numpy(),
+            beta.numpy(),
+            grads.numpy(),
+            T_np,
+            U_np,
+            blank,
+        )
+    return log_p_alpha, grads
+
+
+def _reduce(log_p, reduction):
+    if reduction == "mean":
+        return -log_p.mean()
+    elif reduction == "sum":
+        return sum(-log_p)
+    elif reduction == "none":
+        return -log_p
+    else:
+        raise Exception("Unexpected reduction {}".format(reduction))
+
+
+class Transducer(Function):
+    """
+    This class implements the Transducer loss computation with forward-backward algorithm
+    Sequence Transduction with naive implementation : https://arxiv.org/pdf/1211.3711.pdf
+
+    This class use torch.autograd.Function. In fact of using the forward-backward algorithm,
+    we need to compute the gradient manually.
+
+    This class can't be instantiated, please refer to TransducerLoss class
+
+    It is also possible to use this class directly by using Transducer.apply
+    """
+
+    @staticmethod
+    def forward(ctx, log_probs, labels, T, U, blank, reduction):
+        """Computes the transducer loss."""
+        log_p_alpha, grads = transducer_forward_backward(
+            log_probs, labels, T, U, blank
+        )
         ctx.grads = grads
-        del alpha, beta, lock, log_p_beta, T, U, log_probs, labels
-        torch.cuda.empty_cache()
-        if reduction == "mean":
-            return -log_p_alpha.mean()
-        elif reduction == "sum":
-            return sum(-log_p_alpha)
-        elif reduction == "none":
-            return -log_p_alpha
-        else:
-            raise Exception("Unexpected reduction {}".format(reduction))
+        if log_probs.is_cuda:
+            torch.cuda.empty_cache()
+        return _reduce(log_p_alpha, reduction)
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        """Backward computations for the transducer loss."""
+        grad_output = grad_output.view(-1, 1, 1, 1).to(ctx.grads)
+        return ctx.grads.mul_(grad_output), None, None, None, None, None, None
+
+
+class FusedTransducer(Function):
+    """
+    Transducer loss computed from the logits, with the log-softmax fused in
+    the loss (same loss and gradients as Transducer.apply on
+    logits.log_softmax(-1)).
+
+    Only the log-probabilities of the blank and of the next label are
+    needed by the forward-backward algorithm, so the log-probabilities of
+    all the outputs are never stored: the only tensor of the size of the
+    logits is the gradient, which is computed in one buffer from the
+    softmax. This saves two tensors of (batch x TimeLength x LabelLength x
+    outputDim) compared to Transducer.apply.
+
+    It is used with FusedTransducer.apply(logits, labels, T, U, blank,
+    reduction).
+    """
+
+    @staticmethod
+    def forward(ctx, logits, labels, T, U, blank, reduction):
+        """Computes the transducer loss."""
+        logits = logits.detach()
+        B, maxT, maxU, A = logits.shape
+        log_norm = torch.logsumexp(logits, dim=-1, keepdim=True)
+        # The label emitted at each u (the blank after the last label)
+        next_labels = torch.full(
+            (B, maxU), blank, dtype=torch.long, device=logits.device
+        )
+        next_labels[:, : labels.shape[1]] = labels
+        next_labels = next_labels.view(B, 1, maxU, 1).expand(B, maxT, maxU, 1)
+        # Two outputs: 0 is the blank, 1 the next label
+        log_probs = torch.cat(
+            [logits[..., blank : blank + 1], logits.gather(-1, next_labels)],
+            dim=-1,
+        ).sub_(log_norm)
+        log_p_alpha, label_grads = transducer_forward_backward(
+            log_probs,
+            torch.ones((B, maxU), dtype=labels.dtype, device=labels.device),
+            T,
+            U,
+            0,
+        )
+        # d(-log_p)/d(logits) = softmax * occupancy - (blank and label terms)
+        occupancy = label_grads.sum(dim=-1, keepdim=True).neg_()
+        grads = logits.sub(log_norm).exp_().mul_(occupancy)
+        grads[..., blank] += label_grads[..., 0]
+        grads.scatter_add_(-1, next_labels, label_grads[..., 1:])
+        ctx.grads = grads
+        return _reduce(log_p_alpha, reduction)
 
     @staticmethod
     def backward(ctx, grad_output):
@@ -301,25 +579,37 @@ class TransducerLoss(Module):
     The TranducerLoss(nn.Module) use Transducer(autograd.Function)
     to compute the forward-backward loss and gradients.
 
-    Input tensors must be on a cuda device.
+    Input tensors can be on a cuda device (Numba CUDA kernels) or on the
+    CPU (compiled Numba CPU kernels).
+
+    Arguments
+    ---------
+    blank : int
+        Blank indice.
+    reduction : str
+        'mean' | 'sum' | 'none'.
+    fused_log_softmax : bool
+        If True, the log-softmax is fused in the loss (see FusedTransducer),
+        which saves memory. The results are the same.
 
     Example
     -------
     >>> import torch
     >>> loss = TransducerLoss(blank=0)
-    >>> logits = torch.randn((1,2,3,5)).cuda().requires_grad_()
-    >>> labels = torch.Tensor([[1,2]]).cuda().int()
-    >>> act_length = torch.Tensor([2]).cuda().int()
+    >>> logits = torch.randn((1,2,3,5)).requires_grad_()
+    >>> labels = torch.Tensor([[1,2]]).int()
+    >>> act_length = torch.Tensor([2]).int()
     >>> # U = label_length+1
-    >>> label_length = torch.Tensor([2]).cuda().int()
+    >>> label_length = torch.Tensor([2]).int()
     >>> l = loss(logits, labels, act_length, label_length)
     >>> l.backward()
     """
 
-    def __init__(self, blank=0, reduction="mean"):
+    def __init__(self, blank=0, reduction="mean", fused_log_softmax=False):
         super(TransducerLoss, self).__init__()
         self.blank = blank
         self.reduction = reduction
+        self.fused_log_softmax = fused_log_softmax
         self.loss = Transducer.apply
         try:
             cuda.cuda_paths
@@ -339,13 +629,15 @@ class TransducerLoss(Module):
 
     def forward(self, logits, labels, T, U):
         """Computes the transducer loss."""
-        # Transducer.apply function take log_probs tensor.
-        if all(t.is_cuda for t in (logits, labels, T, U)):
-            log_probs = logits.log_softmax(-1)
-            return self.loss(
-                log_probs, labels, T, U, self.blank, self.reduction
-            )
-        else:
+        devices = {t.device for t in (logits, labels, T, U)}
+        if len(devices) > 1:
             raise ValueError(
-                f"Found inputs tensors to be on {[logits.device, labels.device, T.device, U.device]} while needed to be on a 'cuda' device to use the transducer loss."
+                f"Found inputs tensors to be on {[logits.device, labels.device, T.device, U.device]} while needed to be on the same device to use the transducer loss."
+            )
+        if self.fused_log_softmax:
+            return FusedTransducer.apply(
+                logits, labels, T, U, self.blank, self.reduction
             )
+        # Transducer.apply function take log_probs tensor.
+        log_probs = logits.log_softmax(-1)
+        return self.loss(log_probs, labels, T, U, self.blank, self.reduction)
@@ -34,6 +34,7 @@ def transducer_loss(
     blank_index,
     reduction="mean",
     use_torchaudio=True,
+    fused_log_softmax=False,
 ):
     """Transducer loss, see `speechbrain/nnet/loss/transducer_loss.py`.
 
@@ -53,7 +54,11 @@ def transducer_loss(
         Specifies the reduction to apply to the output: 'mean' | 'batchmean' | 'sum'.
     use_torchaudio: bool
         If True, use Transducer loss implementation from torchaudio, otherwise,
-        use Speechbrain Numba implementation.
+        use Speechbrain Numba implementation (on GPU or CPU).
+    fused_log_softmax: bool
+        With the Speechbrain Numba implementation, if True, the log-softmax
+        is fused in the loss, which saves memory (see
+        `speechbrain.nnet.loss.transducer_loss.FusedTransducer`).
     """
     input_lens = (input_lens * logits.shape[1]).round().int()
     target_lens = (target_lens * targets.shape[1]).round().int()
@@ -78,8 +83,20 @@ def transducer_loss(
             reduction=reduction,
         )
     else:
-        from speechbrain.nnet.loss.transducer_loss import Transducer
+        from speechbrain.nnet.loss.transducer_loss import (
+            FusedTransducer,
+            Transducer,
+        )
 
+        if fused_log_softmax:
+            return FusedTransducer.apply(
+                logits,
+                targets,
+                input_lens,
+                target_lens,
+                blank_index,
+                reduction,
+            )
         # Transducer.apply function take log_probs tensor.
         log_probs = logits.log_softmax(-1)
         return Transducer.apply(
@@ -0,0 +1,649 @@
+"""Index of embeddings for large-scale identification.
+
+``SpeakerRecognition.verify_batch`` scores pairs of signals. To identify a
+speaker among many enrolled ones, the embeddings of the enrolled speakers
+are kept in an ``EmbeddingIndex``: one contiguous matrix of L2-normalized
+embeddings (float32 or float16), so that the cosine similarities of a batch
+of queries with all of them are matrix products, computed by chunks of rows
+with a running top-k. The matrix can be backed by a file, which is
+memory-mapped: opening an index does not read it, and it can be larger than
+the memory.
+
+For registries where even the brute force search is too slow, an
+approximate inverted file with product quantization (IVF-PQ) can be trained
+on the index: the embeddings are partitioned in ``num_lists`` clusters, and
+stored as ``num_subvectors`` bytes. A search then only scores the
+embeddings of the ``nprobe`` clusters closest to each query, from their
+codes, and rescores the best candidates exactly.
+
+Example
+-------
+>>> index = EmbeddingIndex(dim=4)
+>>> index.add(["spk1", "spk2"], torch.tensor([[1.0, 0, 0, 0], [0, 1.0, 0, 0]]))
+>>> scores, keys = index.search(torch.tensor([[0.9, 0.1, 0, 0]]), k=2)
+>>> keys
+[['spk1', 'spk2']]
+>>> index.remove(["spk1"])
+>>> len(index)
+1
+"""
+
+import json
+import logging
+import math
+import os
+import pathlib
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+KEYS_FILE = "keys.json"
+IVFPQ_FILE = "ivfpq.npz"
+INITIAL_CAPACITY = 1024
+
+
+class EmbeddingIndex:
+    """A store of normalized embeddings, searched by cosine similarity.
+
+    Each embedding is identified by a unique key (e.g. a speaker id).
+    Removing an embedding moves the last one in its place, so the matrix
+    stays contiguous, and adding embeddings grows it geometrically.
+
+    Arguments
+    ---------
+    dim : int
+        Dimension of the embeddings.
+    path : str, pathlib.Path, optional
+        Directory where the index is stored. The embeddings are then in a
+        memory-mapped file, see ``save`` and ``open``. By default, the index
+        is in memory. It should not hold an index already: use ``open``.
+    dtype : str
+        "float32" or "float16", the type of the stored embeddings.
+    chunk_size : int
+        Number of embeddings scored at once in the brute force search.
+    device : str
+        Device where the similarities are computed. On a GPU, the chunks of
+        the matrix are copied there for every search.
+
+    Example
+    -------
+    >>> tmpdir = getfixture("tmpdir")
+    >>> index = EmbeddingIndex(dim=3, path=tmpdir / "index", dtype="float16")
+    >>> index.add(["a", "b"], torch.tensor([[1.0, 0, 0], [0, 0, 1.0]]))
+    >>> index.save()
+    >>> index = EmbeddingIndex.open(tmpdir / "index")
+    >>> index.keys
+    ['a', 'b']
+    """
+
+    def __init__(
+        self, dim, path=None, dtype="float32", chunk_size=65536, device="cpu"
+    ):
+        if dtype not in ["float32", "float16"]:
+            raise ValueError(f"Unsupported dtype {dtype}")
+        self.dim = dim
+        self.path = None if path is None else pathlib.Path(path)
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.device = device
+        self.keys = []
+        self.rows = {}
+        self.ivfpq = None
+        if self.path is not None and (self.path / EMBEDDINGS_FILE).exists():
+            raise FileExistsError(
+                f"{self.path} already holds an index, "
+                "use EmbeddingIndex.open() to open it"
+            )
+        self._matrix = self._allocate(INITIAL_CAPACITY)
+
+    @classmethod
+    def open(cls, path, chunk_size=65536, device="cpu"):
+        """Opens an index saved with ``save``.
+
+        Arguments
+        ---------
+        path : str, pathlib.Path
+            Directory of the index.
+        chunk_size : int
+            As for the constructor.
+        device : str
+            As for the constructor.
+
+        Returns
+        -------
+        EmbeddingIndex
+        """
+        path = pathlib.Path(path)
+        matrix = np.load(path / EMBEDDINGS_FILE, mmap_mode="r+")
+        with open(path / KEYS_FILE) as fi:
+            keys = json.load(fi)
+        index = cls.__new__(cls)
+        index.dim = matrix.shape[1]
+        index.path = path
+        index.dtype = str(matrix.dtype)
+        index.chunk_size = chunk_size
+        index.device = device
+        index.keys = keys
+        index.rows = {key: row for row, key in enumerate(keys)}
+        index.ivfpq = None
+        index._matrix = matrix
+        if (path / IVFPQ_FILE).exists():
+            index.ivfpq = IVFPQ.load(path / IVFPQ_FILE, len(keys))
+        return index
+
+    def save(self):
+        """Writes the index to its directory.
+
+        The embeddings are already in their memory-mapped file, they are
+        flushed, and the keys (and the IVF-PQ index) are written.
+        """
+        if self.path is None:
+            raise ValueError("The index was created without a path")
+        self._matrix.flush()
+        tmp_path = self.path / (KEYS_FILE + ".tmp")
+        with open(tmp_path, "w") as fo:
+            json.dump(self.keys, fo)
+        os.replace(tmp_path, self.path / KEYS_FILE)
+        if self.ivfpq is not None:
+            self.ivfpq.save(self.path / IVFPQ_FILE, len(self))
+        elif (self.path / IVFPQ_FILE).exists():
+            os.remove(self.path / IVFPQ_FILE)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    @property
+    def embeddings(self):
+        """The stored (normalized) embeddings, [len(self), dim], a view on
+        the matrix."""
+        return self._matrix[: len(self)]
+
+    def add(self, keys, embeddings):
+        """Adds embeddings to the index.
+
+        Arguments
+        ---------
+        keys : list
+            The (unique, hashable and JSON serializable) keys of the
+            embeddings.
+        embeddings : torch.Tensor
+            The embeddings, [len(keys), dim] (or [len(keys), 1, dim] as
+            given by ``EncoderClassifier.encode_batch``). They are normalized
+            before they are stored.
+        """
+        embeddings = self._normalize(embeddings)
+        if embeddings.shape[0] != len(keys):
+            raise ValueError("There should be one key per embedding")
+        for key in keys:
+            if key in self.rows:
+                raise ValueError(f"Key {key} is already in the index")
+        if len(set(keys)) != len(keys):
+            raise ValueError("Duplicate keys")
+
+        begin = len(self)
+        end = begin + len(keys)
+        if end > self._matrix.shape[0]:
+            self._grow(max(end, 2 * self._matrix.shape[0]))
+        self._matrix[begin:end] = embeddings.cpu().numpy()
+        for row, key in enumerate(keys, start=begin):
+            self.rows[key] = row
+        self.keys.extend(keys)
+        if self.ivfpq is not None:
+            self.ivfpq.add(begin, embeddings)
+
+    def add_batch(self, encoder, keys, wavs, wav_lens=None):
+        """Enrolls a batch of signals, with ``encoder.encode_batch``.
+
+        Arguments
+        ---------
+        encoder : EncoderClassifier
+            The pre-trained encoder, e.g. ``SpeakerRecognition``.
+        keys : list
+            The keys of the signals.
+        wavs : torch.Tensor
+            Batch of waveforms, as for ``encode_batch``.
+        wav_lens : torch.Tensor
+            Relative lengths of the waveforms.
+        """
+        with torch.no_grad():
+            embeddings = encoder.encode_batch(wavs, wav_lens)
+        self.add(keys, embeddings)
+
+    def remove(self, keys):
+        """Removes embeddings from the index.
+
+        Arguments
+        ---------
+        keys : list
+            The keys of the embeddings to remove.
+        """
+        for key in keys:
+            row = self.rows.pop(key)
+            last = len(self) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self.keys[row] = self.keys[last]
+                self.rows[self.keys[row]] = row
+            self.keys.pop()
+            if self.ivfpq is not None:
+                self.ivfpq.move(last, row)
+
+    def search(self, queries, k=10, nprobe=None, refine=4):
+        """Finds the embeddings most similar to each query.
+
+        Arguments
+        ---------
+        queries : torch.Tensor
+            The query embeddings, [batch, dim] (or [batch, 1, dim]).
+        k : int
+            Number of results per query.
+        nprobe : int, optional
+            If given (and an IVF-PQ index was trained), the search is
+            approximate, in the ``nprobe`` clusters closest to each query.
+            Otherwise, all the embeddings are scored.
+        refine : int
+            For approximate searches, the ``refine * k`` best candidates
+            according to their codes are rescored with the embeddings.
+
+        Returns
+        -------
+        scores : torch.Tensor
+            The cosine similarities of the results, [batch, k], in
+            decreasing order.
+        keys : list
+            The keys of the results, a list of k keys per query. When the
+            index holds less than k embeddings (or the clusters probed do),
+            there are fewer results.
+        """
+        queries = self._normalize(queries).to(self.device)
+        if nprobe is not None and self.ivfpq is not None:
+            scores, rows = self._search_ivfpq(queries, k, nprobe, refine)
+        else:
+            scores, rows = self._search_all(queries, k)
+        keys = [
+            [self.keys[row] for row in query_rows if row >= 0]
+            for query_rows in rows.tolist()
+        ]
+        num_results = max([len(query_keys) for query_keys in keys], default=0)
+        return scores[:, :num_results], keys
+
+    def train_ivfpq(
+        self,
+        num_lists=1024,
+        num_subvectors=16,
+        num_iters=20,
+        max_train_size=None,
+        seed=0,
+    ):
+        """Trains an IVF-PQ index on the embeddings, for approximate
+        searches (see ``search``). It is updated when embeddings are added
+        or removed, but not retrained.
+
+        Arguments
+        ---------
+        num_lists : int
+            Number of clusters (inverted lists). About the square root of the
+            number of embeddings is a common choice.
+        num_subvectors : int
+            Number of bytes of the code of each embedding. Must divide dim.
+        num_iters : int
+            Number of iterations of k-means.
+        max_train_size : int, optional
+            Number of embeddings k-means is trained on, by default 64 per
+            centroid.
+        seed : int
+            Seed of the random initialization of k-means.
+        """
+        ivfpq = IVFPQ(self.dim, num_lists, num_subvectors)
+        if max_train_size is None:
+            max_train_size = 64 * max(num_lists, IVFPQ.NUM_CODES)
+        rng = np.random.default_rng(seed)
+        sample = np.arange(len(self))
+        if len(sample) > max_train_size:
+            sample = np.sort(rng.choice(sample, max_train_size, replace=False))
+        ivfpq.train(self._rows_to_cpu(sample), num_iters, seed)
+        for begin in range(0, len(self), self.chunk_size):
+            end = min(begin + self.chunk_size, len(self))
+            ivfpq.add(begin, self._rows_to_cpu(slice(begin, end)))
+        self.ivfpq = ivfpq
+
+    def _normalize(self, embeddings):
+        embeddings = torch.as_tensor(embeddings).detach().float()
+        embeddings = embeddings.reshape(-1, self.dim)
+        return torch.nn.functional.normalize(embeddings, dim=-1)
+
+    def _allocate(self, capacity):
+        if self.path is None:
+            return np.zeros((capacity, self.dim), dtype=self.dtype)
+        self.path.mkdir(parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(
+            self.path / EMBEDDINGS_FILE,
+            mode="w+",
+            dtype=self.dtype,
+            shape=(capacity, self.dim),
+        )
+
+    def _grow(self, capacity):
+        if self.path is None:
+            matrix = self._allocate(capacity)
+            matrix[: len(self)] = self.embeddings
+        else:
+            # The new file replaces the old one once complete
+            tmp_path = self.path / (EMBEDDINGS_FILE + ".tmp")
+            matrix = np.lib.format.open_memmap(
+                tmp_path,
+                mode="w+",
+                dtype=self.dtype,
+                shape=(capacity, self.dim),
+            )
+            matrix[: len(self)] = self.embeddings
+            matrix.flush()
+            os.replace(tmp_path, self.path / EMBEDDINGS_FILE)
+        self._matrix = matrix
+
+    def _rows_to_cpu(self, rows):
+        return torch.from_numpy(np.asarray(self._matrix[rows])).float()
+
+    def _rows_to_device(self, begin, end):
+        chunk = torch.from_numpy(np.asarray(self._matrix[begin:end]))
+        if torch.device(self.device).type == "cpu":
+            return chunk.float()
+        return chunk.to(self.device, non_blocking=True).to(torch.float32)
+
+    def _search_all(self, queries, k):
+        """Brute force search, by chunks of rows with a running top-k."""
+        best_scores = torch.full((len(queries), 0), -2.0, device=self.device)
+        best_rows = torch.full(
+            (len(queries), 0), -1, dtype=torch.long, device=self.device
+        )
+        for begin in range(0, len(self), self.chunk_size):
+            end = min(begin + self.chunk_size, len(self))
+            scores = queries @ self._rows_to_device(begin, end).T
+            rows = torch.arange(begin, end, device=self.device)
+            scores = torch.cat([best_scores, scores], dim=1)
+            rows = torch.cat([best_rows, rows.expand(len(queries), -1)], dim=1)
+            best_scores, top = scores.topk(min(k, scores.shape[1]), dim=1)
+            best_rows = rows.gather(1, top)
+        return best_scores.cpu(), best_rows.cpu()
+
+    def _search_ivfpq(self, queries, k, nprobe, refine):
+        queries = queries.cpu()
+        candidates = self.ivfpq.search(queries, refine * k, nprobe)
+
+        # Exact scores of the candidates, read in the order of the rows
+        found = candidates >= 0
+        unique, inverse = torch.unique(candidates[found], return_inverse=True)
+        exact = torch.full(candidates.shape, -2.0)
+        if len(unique) > 0:
+            embeddings = self._rows_to_cpu(unique.numpy())[inverse]
+            query_ids = found.nonzero()[:, 0]
+            exact[found] = (embeddings * queries[query_ids]).sum(dim=1)
+        scores, top = exact.topk(min(k, exact.shape[1]), dim=1)
+        rows = candidates.gather(1, top)
+        return scores, rows.masked_fill(scores < -1.5, -1)
+
+
+class IVFPQ:
+    """An inverted file with product quantization, on the rows of an
+    ``EmbeddingIndex`` (use ``EmbeddingIndex.train_ivfpq``).
+
+    Each row is assigned to its closest centroid (its list), and the
+    residual (embedding minus centroid) is quantized by splitting it in
+    ``num_subvectors`` parts, each replaced by the index of the closest of
+    256 codewords. The inner product of a query with a row is then
+    approximated with the one with the centroid plus a lookup in a table of
+    the inner products of the parts of the query with the codewords.
+
+    Arguments
+    ---------
+    dim : int
+        Dimension of the embeddings.
+    num_lists : int
+        Number of centroids.
+    num_subvectors : int
+        Number of parts of the residuals. Must divide dim.
+    """
+
+    NUM_CODES = 256
+    ENCODE_CHUNK_SIZE = 4096
+    SEARCH_CHUNK_SIZE = 16
+
+    def __init__(self, dim, num_lists, num_subvectors):
+        if dim % num_subvectors != 0:
+            raise ValueError("num_subvectors must divide the dimension")
+        self.dim = dim
+        self.num_lists = num_lists
+        self.num_subvectors = num_subvectors
+        self.centroids = None
+        self.codebooks = None
+        self.list_ids = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, num_subvectors), dtype=np.uint8)
+        self._num_rows = 0
+        self._lists = None
+
+    def train(self, embeddings, num_iters=20, seed=0):
+        """Trains the centroids and the codewords.
+
+        Arguments
+        ---------
+        embeddings : torch.Tensor
+            The normalized embeddings trained on, [N, dim].
+        num_iters : int
+            Number of iterations of k-means.
+        seed : int
+            Seed of the random initialization.
+        """
+        generator = torch.Generator().manual_seed(seed)
+        num_lists = min(self.num_lists, len(embeddings))
+        self.centroids = kmeans(embeddings, num_lists, num_iters, generator)
+        self.num_lists = num_lists
+
+        residuals = embeddings - self.centroids[self._assign(embeddings)]
+        parts = residuals.reshape(len(residuals), self.num_subvectors, -1)
+        num_codes = min(self.NUM_CODES, len(embeddings))
+        self.codebooks = torch.stack(
+            [
+                kmeans(parts[:, j], num_codes, num_iters, generator)
+                for j in range(self.num_subvectors)
+            ]
+        )
+
+    def add(self, begin, embeddings):
+        """Encodes the embeddings of the rows from begin on."""
+        end = begin + len(embeddings)
+        if end > len(self.list_ids):
+            capacity = max(end, 2 * len(self.list_ids))
+            self.list_ids = np.resize(self.list_ids, capacity)
+            self.codes = np.resize(self.codes, (capacity, self.num_subvectors))
+        for i in range(0, len(embeddings), self.ENCODE_CHUNK_SIZE):
+            chunk = embeddings[i : i + self.ENCODE_CHUNK_SIZE]
+            list_ids = self._assign(chunk)
+            residuals = chunk - self.centroids[list_ids]
+            parts = residuals.reshape(len(chunk), self.num_subvectors, -1)
+            # Closest codeword of each part: [chunk, num_subvectors]
+            distances = torch.cdist(parts.transpose(0, 1), self.codebooks)
+            codes = distances.argmin(dim=-1).T
+            self.list_ids[begin + i : begin + i + len(chunk)] = list_ids
+            self.codes[begin + i : begin + i + len(chunk)] = codes
+        self._num_rows = end
+        self._lists = None
+
+    def move(self, source, destination):
+        """Moves the code of a row (following ``EmbeddingIndex.remove``)."""
+        self.list_ids[destination] = self.list_ids[source]
+        self.codes[destination] = self.codes[source]
+        self._num_rows = source
+        self._lists = None
+
+    def search(self, queries, num_candidates, nprobe):
+        """Returns the best candidates of each query according to the codes.
+
+        The lists probed by a chunk of queries are concatenated, and the
+        approximate scores of all their rows are computed at once, with one
+        lookup in the tables of the queries per subvector.
+
+        Arguments
+        ---------
+        queries : torch.Tensor
+            The normalized queries, [batch, dim].
+        num_candidates : int
+            Number of candidates per query.
+        nprobe : int
+            Number of lists searched.
+
+        Returns
+        -------
+        torch.Tensor
+            The rows of the candidates of each query, best first,
+            [batch, num_candidates], padded with -1.
+        """
+        order, offsets, lookup_codes = self._inverted_lists()
+        coarse = queries @ self.centroids.T
+        probe_scores, probes = coarse.topk(min(nprobe, self.num_lists), dim=1)
+        parts = queries.reshape(len(queries), self.num_subvectors, -1)
+        # Inner products of the parts of the queries with the codewords,
+        # flattened to [batch, num_subvectors * num_codes]
+        tables = torch.einsum("bmd,mcd->bmc", parts, self.codebooks)
+        tables = tables.reshape(len(queries), -1)
+
+        candidates = torch.full((len(queries), num_candidates), -1)
+        for begin in range(0, len(queries), self.SEARCH_CHUNK_SIZE):
+            end = min(begin + self.SEARCH_CHUNK_SIZE, len(queries))
+            chunk_probes = probes[begin:end]
+
+            # Positions (in the rows sorted by list) of the rows of the
+            # probed lists, and the (query, probe) pair of each
+            starts = offsets[chunk_probes].flatten()
+            sizes = offsets[chunk_probes + 1].flatten() - starts
+            total = int(sizes.sum())
+            if total == 0:
+                continue
+            pairs = torch.repeat_interleave(torch.arange(len(sizes)), sizes)
+            pair_begins = torch.cumsum(sizes, 0) - sizes
+            positions = torch.arange(total) + (starts - pair_begins)[pairs]
+            query_ids = pairs // chunk_probes.shape[1]
+
+            # Score of the list plus the table lookups of the codes
+            scores = probe_scores[begin:end].flatten()[pairs]
+            lookup = lookup_codes[positions]
+            lookup += (query_ids * tables.shape[1]).int().unsqueeze(1)
+            scores += torch.nn.functional.embedding_bag(
+                lookup, tables[begin:end].reshape(-1, 1), mode="sum"
+            ).squeeze(1)
+
+            # Best candidates of each query, from its scores padded to
+            # the largest number of rows probed
+            counts = sizes.reshape(chunk_probes.shape).sum(dim=1)
+            columns = (
+                torch.arange(total)
+                - (torch.cumsum(counts, 0) - counts)[query_ids]
+            )
+            padded = torch.full((end - begin, int(counts.max())), -math.inf)
+            padded[query_ids, columns] = scores
+            top_scores, top = padded.topk(
+                min(num_candidates, padded.shape[1]), dim=1
+            )
+            padded_rows = torch.full(padded.shape, -1)
+            padded_rows[query_ids, columns] = order[positions]
+            rows = padded_rows.gather(1, top)
+            rows[top_scores == -math.inf] = -1
+            candidates[begin:end, : rows.shape[1]] = rows
+        return candidates
+
+    def save(self, path, num_rows):
+        """Saves the index, for num_rows rows."""
+        np.savez(
+            path,
+            centroids=self.centroids.numpy(),
+            codebooks=self.codebooks.numpy(),
+            list_ids=self.list_ids[:num_rows],
+            codes=self.codes[:num_rows],
+        )
+
+    @classmethod
+    def load(cls, path, num_rows):
+        """Loads an index saved with ``save``."""
+        data = np.load(path)
+        centroids = torch.from_numpy(data["centroids"])
+        codebooks = torch.from_numpy(data["codebooks"])
+        ivfpq = cls(centroids.shape[1], len(centroids), len(codebooks))
+        ivfpq.centroids = centroids
+        ivfpq.codebooks = codebooks
+        ivfpq.list_ids = data["list_ids"][:num_rows].copy()
+        ivfpq.codes = data["codes"][:num_rows].copy()
+        ivfpq._num_rows = num_rows
+        return ivfpq
+
+    def _assign(self, embeddings):
+        return (embeddings @ self.centroids.T).argmax(dim=1)
+
+    def _inverted_lists(self):
+        """The rows sorted by list, the offset of each list, and the codes
+        in the same order as positions in a flattened table (code plus
+        subvector * num_codes, in int32 for embedding_bag), computed again
+        after changes."""
+        if self._lists is None:
+            list_ids = self.list_ids[: self._num_rows]
+            order = np.argsort(list_ids, kind="stable")
+            counts = np.bincount(list_ids, minlength=self.num_lists)
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            num_codes = self.codebooks.shape[1]
+            code_offsets = np.arange(self.num_subvectors) * num_codes
+            lookup_codes = self.codes[order].astype(np.int32) + code_offsets
+            self._lists = (
+                torch.from_numpy(order),
+                torch.from_numpy(offsets),
+                torch.from_numpy(lookup_codes.astype(np.int32)),
+            )
+        return self._lists
+
+
+def kmeans(points, num_clusters, num_iters, generator=None, chunk_size=16384):
+    """Plain k-means (Lloyd) with a random initialization.
+
+    Arguments
+    ---------
+    points : torch.Tensor
+        The points, [N, dim].
+    num_clusters : int
+        Number of clusters, at most N.
+    num_iters : int
+        Number of iterations.
+    generator : torch.Generator, optional
+        For the random initialization.
+    chunk_size : int
+        Number of points assigned at once.
+
+    Returns
+    -------
+    torch.Tensor
+        The centroids, [num_clusters, dim].
+
+    Example
+    -------
+    >>> points = torch.cat([torch.zeros(10, 2), torch.ones(10, 2)])
+    >>> centroids = kmeans(points, 2, 5, torch.Generator().manual_seed(0))
+    >>> sorted(centroids.sum(dim=1).tolist())
+    [0.0, 2.0]
+    """
+    init = torch.randperm(len(points), generator=generator)[:num_clusters]
+    centroids = points[init].clone()
+    for _ in range(num_iters):
+        assignments = torch.cat(
+            [
+                torch.cdist(points[i : i + chunk_size], centroids).argmin(1)
+                for i in range(0, len(points), chunk_size)
+            ]
+        )
+        sums = torch.zeros_like(centroids).index_add_(0, assignments, points)
+        counts = torch.bincount(assignments, minlength=num_clusters)
+        # Empty clusters keep their centroid
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centroids
@@ -29,19 +29,21 @@ from torch.nn import DataParallel as DP
 from hyperpyyaml import load_hyperpyyaml
 from copy import copy
 from speechbrain.pretrained.fetching import fetch
+from speechbrain.pretrained.serving import BatchingServer
 from speechbrain.dataio.preprocess import AudioNormalizer
 import torch.nn.functional as F
 from torch.nn.parallel import DistributedDataParallel as DDP
 from speechbrain.utils.data_utils import split_path
 from speechbrain.utils.distributed import run_on_main
 from speechbrain.dataio.batch import PaddedBatch, PaddedData
+from speechbrain.decoders.ctc import CTCPrefixBeamSearcher, ctc_greedy_decode
 from speechbrain.utils.data_pipeline import DataPipeline
 from speechbrain.utils.callchains import lengths_arg_exists
 from speechbrain.utils.superpowers import import_from_path
 from speechbrain.dataio.dataio import length_to_mask
 from speechbrain.processing.NMF import spectral_phase
 from speechbrain.utils.text_to_sequence import text_to_sequence
-from itertools import chain
+from itertools import chain, permutations
 
 logger = logging.getLogger(__name__)
 
@@ -281,11 +283,129 @@ class Pretrained(torch.nn.Module):
         Similarly, it is simple to downmix a stereo file to mono.
         The path can be a local path, a web url, or a link to a huggingface repo.
         """
-        source, fl = split_path(path)
-        kwargs = copy(kwargs)  # shallow copy of references only
+        path, kwargs = self._fetch_audio(path, savedir, kwargs)
         channels_first = kwargs.pop(
             "channels_first", False
         )  # False as default value: SB consistent tensor format
+        signal, sr = torchaudio.load(
+            str(path), channels_first=channels_first, **kwargs
+        )
+        return self.audio_normalizer(signal, sr)
+
+    def load_audio_chunks(
+        self,
+        path,
+        chunk_size=10.0,
+        left_context=2.0,
+        right_context=0.5,
+        savedir="audio_cache",
+        audio_normalizer=None,
+        **kwargs,
+    ):
+        """Reads an audio file chunk by chunk, with this model's input spec.
+
+        Only one chunk (plus its context) is in memory at a time, so long
+        recordings can be processed with a constant memory footprint.
+        Each chunk is extended with some audio on its left and right, which
+        gives the models context at the chunk boundaries. The outputs that
+        belong to the context should be discarded (see ``trim_context``).
+
+        Arguments
+        ---------
+        path : str
+            Path to the audio file, see ``load_audio``.
+        chunk_size : float
+            Size of the chunks, in seconds.
+        left_context : float
+            Audio (in seconds) added before each chunk, when available.
+        right_context : float
+            Audio (in seconds) added after each chunk, when available.
+        savedir : str
+            Where to store the file if it has to be fetched.
+        audio_normalizer : AudioNormalizer, optional
+            Normalizer of the chunks, by default ``self.audio_normalizer``.
+        **kwargs : dict
+            Arguments forwarded to ``load_audio``.
+
+        Yields
+        ------
+        torch.Tensor
+            The normalized chunk with its context.
+        int
+            Number of samples of left context at the start of the chunk.
+        int
+            Number of samples of right context at the end of the chunk.
+        """
+        if audio_normalizer is None:
+            audio_normalizer = self.audio_normalizer
+        path, kwargs = self._fetch_audio(path, savedir, kwargs)
+        kwargs.pop("channels_first", None)
+        sample_rate = torchaudio.info(str(path)).sample_rate
+        chunk_len = int(chunk_size * sample_rate)
+        left_len = int(left_context * sample_rate)
+        right_len = int(right_context * sample_rate)
+        if chunk_len <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        start = 0
+        while True:
+            begin = max(0, start - left_len)
+            signal, sr = torchaudio.load(
+                str(path),
+                frame_offset=begin,
+                num_frames=start + chunk_len + right_len - begin,
+                channels_first=False,
+                **kwargs,
+            )
+            available = signal.shape[0] - (start - begin)
+            if available <= 0:
+                break
+            normalized = audio_normalizer(signal, sr)
+            # Context lengths at the (possibly resampled) model rate
+            ratio = normalized.shape[0] / signal.shape[0]
+            left = int(round((start - begin) * ratio))
+            right = int(round(max(0, available - chunk_len) * ratio))
+            yield normalized, left, right
+            if available < chunk_len + right_len:
+                break
+            start += chunk_len
+
+    @staticmethod
+    def trim_context(outputs, num_samples, left, right):
+        """Drops the frames computed for the context of an audio chunk.
+
+        Arguments
+        ---------
+        outputs : torch.Tensor
+            Frame-level outputs for a chunk, [batch, time, ...].
+        num_samples : int
+            Number of samples of the chunk, context included.
+        left : int
+            Number of samples of left context, see ``load_audio_chunks``.
+        right : int
+            Number of samples of right context.
+
+        Returns
+        -------
+        torch.Tensor
+            The outputs of the chunk without its context.
+
+        Example
+        -------
+        >>> outputs = torch.rand(1, 100, 10)
+        >>> Pretrained.trim_context(outputs, 16000, 3200, 1600).shape
+        torch.Size([1, 70, 10])
+        """
+        num_frames = outputs.shape[1]
+        start = int(round(num_frames * left / num_samples))
+        end = num_frames - int(round(num_frames * right / num_samples))
+        return outputs[:, start:end]
+
+    def _fetch_audio(self, path, savedir, kwargs):
+        """Fetches the audio file, returns its local path and the kwargs
+        left for torchaudio.load"""
+        source, fl = split_path(path)
+        kwargs = copy(kwargs)  # shallow copy of references only
         if kwargs:
             fetch_kwargs = dict()
             for key in [
@@ -301,10 +421,43 @@ class Pretrained(torch.nn.Module):
             path = fetch(fl, source=source, savedir=savedir, **fetch_kwargs)
         else:
             path = fetch(fl, source=source, savedir=savedir)
-        signal, sr = torchaudio.load(
-            str(path), channels_first=channels_first, **kwargs
-        )
-        return self.audio_normalizer(signal, sr)
+        return path, kwargs
+
+    def serve(self, batch_fn=None, **kwargs):
+        """Starts a server which batches concurrent requests to this model.
+
+        Arguments
+        ---------
+        batch_fn : callable
+            The batch method to serve, called with ``(wavs, wav_lens)``,
+            e.g. ``self.transcribe_batch``. Defaults to ``self.forward``.
+        **kwargs : dict
+            Batching options, see ``BatchingServer``.
+
+        Returns
+        -------
+        BatchingServer
+            The running server; ``await server.submit(wav)`` gives the
+            result for one input. Call ``server.close()`` when done.
+
+        Example
+        -------
+        >>> asr_model = EncoderDecoderASR.from_hparams(
+        ...     source="speechbrain/asr-crdnn-rnnlm-librispeech",
+        ...     savedir=getfixture("tmpdir"),
+        ... ) # doctest: +SKIP
+        >>> server = asr_model.serve(
+        ...     asr_model.transcribe_batch, max_batch_size=8, max_wait_ms=20
+        ... ) # doctest: +SKIP
+        >>> wav = asr_model.load_audio(
+        ...     "tests/samples/single-mic/example2.flac"
+        ... ) # doctest: +SKIP
+        >>> # In a coroutine:
+        >>> # words, tokens = await server.submit(wav)
+        """
+        if batch_fn is None:
+            batch_fn = self.forward
+        return BatchingServer(batch_fn, **kwargs).start()
 
     def _compile(self):
         """Compile requested modules with either JIT or TorchInductor."""
@@ -677,6 +830,77 @@ class EncoderDecoderASR(Pretrained):
         )
         return predicted_words[0]
 
+    def transcribe_file_chunked(
+        self,
+        path,
+        chunk_size=20.0,
+        left_context=2.0,
+        right_context=0.5,
+        **kwargs,
+    ):
+        """Transcribes a (long) audio file in independent chunks.
+
+        The file is read in chunks (see ``Pretrained.load_audio_chunks``),
+        and the encoder only sees each chunk with a bounded left and right
+        context, so memory does not grow with the file length. This is not
+        a streaming decoder: each chunk is searched from scratch, on the
+        encoder states of the chunk without its context. No hypothesis,
+        attention or language model state is carried from one chunk to the
+        next, so a word cut by a chunk boundary may be split in two or lost.
+        Attention-based decoders work best with chunks of a few seconds or
+        more. For streaming with the decoding state carried over the
+        chunks, see ``EncoderASR.transcribe_file_streaming`` (CTC models).
+
+        Arguments
+        ---------
+        path : str
+            Path to audio file which to transcribe.
+        chunk_size : float
+            Size of the chunks, in seconds.
+        left_context : float
+            Audio (in seconds) that the encoder sees before each chunk.
+        right_context : float
+            Audio (in seconds) that the encoder sees after each chunk.
+
+        Yields
+        ------
+        str
+            The transcription of each chunk, possibly empty. Joining all of
+            them gives the transcription of the file.
+
+        Example
+        -------
+        >>> asr_model = EncoderDecoderASR.from_hparams(
+        ...     source="speechbrain/asr-crdnn-rnnlm-librispeech",
+        ...     savedir=getfixture("tmpdir"),
+        ... ) # doctest: +SKIP
+        >>> "".join(asr_model.transcribe_file_chunked(
+        ...     "tests/samples/single-mic/example2.flac", chunk_size=2.0
+        ... )) # doctest: +SKIP
+        "MY FATHER HAS REVEALED THE CULPRIT'S NAME"
+        """
+        rel_length = torch.tensor([1.0])
+        first_text = True
+        for chunk, left, right in self.load_audio_chunks(
+            path, chunk_size, left_context, right_context, **kwargs
+        ):
+            with torch.no_grad():
+                encoder_out = self.encode_batch(chunk.unsqueeze(0), rel_length)
+                encoder_out = self.trim_context(
+                    encoder_out, chunk.shape[0], left, right
+                )
+                if encoder_out.shape[1] == 0:
+                    continue
+                predicted_tokens, scores = self.mods.decoder(
+                    encoder_out, rel_length.to(self.device)
+                )
+            text = self.tokenizer.decode_ids(predicted_tokens[0])
+            if text and not first_text:
+                text = " " + text
+            elif text:
+                first_text = False
+            yield text
+
     def encode_batch(self, wavs, wav_lens):
         """Encodes the input audio into a sequence of hidden states
 
@@ -841,6 +1065,18 @@ class EncoderASR(Pretrained):
     ...     savedir=tmpdir,
     ... ) # doctest: +SKIP
     >>> asr_model.transcribe_file("samples/audio_samples/example_fr.wav") # doctest: +SKIP
+
+    The decoding_function can be a CTCPrefixBeamSearcher, e.g., to decode
+    with an N-gram LM, in which case its vocabulary is taken from the
+    tokenizer:
+
+    >>> asr_model = EncoderASR.from_hparams(
+    ...     source="speechbrain/asr-wav2vec2-commonvoice-fr",
+    ...     savedir=tmpdir,
+    ...     overrides={"decoding_function": CTCPrefixBeamSearcher(
+    ...         blank_index=0, lm="lm.arpa", lm_weight=0.5
+    ...     )},
+    ... ) # doctest: +SKIP
     """
 
     HPARAMS_NEEDED = ["tokenizer", "decoding_function"]
@@ -851,6 +1087,28 @@ class EncoderASR(Pretrained):
 
         self.tokenizer = self.hparams.tokenizer
         self.decoding_function = self.hparams.decoding_function
+        if (
+            isinstance(self.decoding_function, CTCPrefixBeamSearcher)
+            and self.decoding_function.vocab_list is None
+        ):
+            self.decoding_function.set_vocab_list(self._get_vocab_list())
+
+    def _get_vocab_list(self):
+        """Returns the string of each token of the tokenizer."""
+        if isinstance(
+            self.tokenizer, speechbrain.dataio.encoder.CTCTextEncoder
+        ):
+            return [
+                self.tokenizer.ind2lab[i] for i in range(len(self.tokenizer))
+            ]
+        elif isinstance(self.tokenizer, sentencepiece.SentencePieceProcessor):
+            return [
+                self.tokenizer.id_to_piece(i)
+                for i in range(self.tokenizer.get_piece_size())
+            ]
+        raise ValueError(
+            "The tokenizer must be sentencepiece or CTCTextEncoder"
+        )
 
     def transcribe_file(self, path, **kwargs):
         """Transcribes the given audiofile into a sequence of words.
@@ -874,6 +1132,167 @@ class EncoderASR(Pretrained):
         )
         return str(predicted_words[0])
 
+    def transcribe_file_streaming(
+        self,
+        path,
+        chunk_size=10.0,
+        left_context=2.0,
+        right_context=0.5,
+        **kwargs,
+    ):
+        """Transcribes a (long) audio file chunk by chunk.
+
+        The file is read in chunks (see ``Pretrained.load_audio_chunks``),
+        and the encoder only sees each chunk with a bounded left and right
+        context, so memory and latency do not grow with the file length.
+        The decoding state is carried over the chunk boundaries:
+
+        * with ``ctc_greedy_decode`` (possibly a functools.partial of it),
+          the last frame of the previous chunk, so that a token spanning
+          two chunks is not emitted twice;
+        * with a ``CTCPrefixBeamSearcher``, its beams, with their LM and
+          hotword scores (see ``CTCPrefixBeamSearcher.decode_chunk``). The
+          tokens shared by all the beams are emitted after each chunk, and
+          the rest of the best hypothesis after the last one.
+
+        With a frame-local encoder, the joined texts are then the same as
+        ``transcribe_file``.
+
+        Arguments
+        ---------
+        path : str
+            Path to audio file which to transcribe.
+        chunk_size : float
+            Size of the chunks, in seconds.
+        left_context : float
+            Audio (in seconds) that the encoder sees before each chunk.
+        right_context : float
+            Audio (in seconds) that the encoder sees after each chunk.
+
+        Yields
+        ------
+        str
+            The new text after each chunk, possibly empty (and, with a
+            CTCPrefixBeamSearcher, the end of the text after the last chunk).
+            Joining all of them gives the transcription of the file.
+
+        Raises
+        ------
+        ValueError
+            If the decoding_function is neither greedy nor a
+            CTCPrefixBeamSearcher, whose state cannot be carried.
+
+        Example
+        -------
+        >>> asr_model = EncoderASR.from_hparams(
+        ...     source="speechbrain/asr-wav2vec2-commonvoice-fr",
+        ...     savedir=getfixture("tmpdir"),
+        ... ) # doctest: +SKIP
+        >>> for text in asr_model.transcribe_file_streaming(
+        ...     "samples/audio_samples/example_fr.wav", chunk_size=4.0
+        ... ):
+        ...     print(text, end="", flush=True) # doctest: +SKIP
+        """
+        if isinstance(self.decoding_function, CTCPrefixBeamSearcher):
+            stream_tokens = self._stream_prefix_beam_search
+        elif (
+            getattr(self.decoding_function, "func", self.decoding_function)
+            is ctc_greedy_decode
+        ):
+            stream_tokens = self._stream_greedy
+        else:
+            raise ValueError(
+                "transcribe_file_streaming carries the decoding state over "
+                "the chunks, it needs ctc_greedy_decode or a "
+                "CTCPrefixBeamSearcher as the decoding_function"
+            )
+        encoder_chunks = self._encode_chunks(
+            path, chunk_size, left_context, right_context, **kwargs
+        )
+        first_text = True
+        for tokens in stream_tokens(encoder_chunks):
+            text = self._tokens_to_text(tokens)
+            if first_text and text:
+                text = text.lstrip()
+                first_text = False
+            yield text
+
+    def _encode_chunks(
+        self, path, chunk_size, left_context, right_context, **kwargs
+    ):
+        """Yields the encoder outputs of the chunks of the file, without
+        their context."""
+        rel_length = torch.tensor([1.0])
+        for chunk, left, right in self.load_audio_chunks(
+            path, chunk_size, left_context, right_context, **kwargs
+        ):
+            with torch.no_grad():
+                encoder_out = self.encode_batch(chunk.unsqueeze(0), rel_length)
+            encoder_out = self.trim_context(
+                encoder_out, chunk.shape[0], left, right
+            )
+            if encoder_out.shape[1] > 0:
+                yield encoder_out
+
+    def _stream_greedy(self, encoder_chunks):
+        """Greedy decoding of the chunks, yields the new tokens of each."""
+        rel_length = torch.tensor([1.0], device=self.device)
+        carry_frame, carry_token = None, None
+        for encoder_out in encoder_chunks:
+            if carry_frame is not None:
+                encoder_out = torch.cat([carry_frame, encoder_out], dim=1)
+            tokens = list(self.decoding_function(encoder_out, rel_length)[0])
+            # The carried frame was already decoded with the previous chunk
+            if tokens and carry_token is not None and tokens[0] == carry_token:
+                tokens = tokens[1:]
+            carry_frame = encoder_out[:, -1:]
+            carry_token = carry_frame.argmax(dim=-1).item()
+            if carry_token == self._get_blank_index(encoder_out.shape[-1]):
+                carry_token = None
+            yield tokens
+
+    def _stream_prefix_beam_search(self, encoder_chunks):
+        """Prefix beam search over the chunks, yields the tokens which no
+        longer change after each chunk, then the rest of the best
+        hypothesis."""
+        beams, num_emitted = None, 0
+        for encoder_out in encoder_chunks:
+            beams = self.decoding_function.decode_chunk(encoder_out[0], beams)
+            stable = self.decoding_function.stable_prefix(beams)
+            yield stable[num_emitted:]
+            num_emitted = len(stable)
+        if beams is not None:
+            best = self.decoding_function.finalize_beams(beams)[0][0]
+            yield best[num_emitted:]
+
+    def _get_blank_index(self, num_classes):
+        """Returns the blank index used by the decoding function."""
+        blank_index = getattr(self.decoding_function, "blank_index", None)
+        if blank_index is None:
+            # e.g. functools.partial(ctc_greedy_decode, blank_id=...)
+            keywords = getattr(self.decoding_function, "keywords", {})
+            blank_index = keywords.get("blank_id", -1)
+        if blank_index < 0:
+            blank_index += num_classes
+        return blank_index
+
+    def _tokens_to_text(self, tokens):
+        """Converts the tokens of a chunk to text which can be concatenated
+        with the text of the other chunks."""
+        if isinstance(
+            self.tokenizer, speechbrain.dataio.encoder.CTCTextEncoder
+        ):
+            return "".join(self.tokenizer.decode_ndim(tokens))
+        elif isinstance(self.tokenizer, sentencepiece.SentencePieceProcessor):
+            # Keep the word boundary markers, which decode_ids strips at the
+            # start of a chunk
+            return "".join(
+                self.tokenizer.id_to_piece(token) for token in tokens
+            ).replace("▁", " ")
+        raise ValueError(
+            "The tokenizer must be sentencepiece or CTCTextEncoder"
+        )
+
     def encode_batch(self, wavs, wav_lens):
         """Encodes the input audio into a sequence of hidden states
 
@@ -1124,7 +1543,8 @@ class EncoderClassifier(Pretrained):
 
 class SpeakerRecognition(EncoderClassifier):
     """A ready-to-use model for speaker recognition. It can be used to
-    perform speaker verification with verify_batch().
+    perform speaker verification with verify_batch(), and identification
+    among enrolled speakers with identify_batch().
 
     ```
     Example
@@ -1220,6 +1640,36 @@ class SpeakerRecognition(EncoderClassifier):
         # Squeeze:
         return score[0], decision[0]
 
+    def identify_batch(self, wavs, index, wav_lens=None, k=1, nprobe=None):
+        """Identifies the speakers of the signals among the ones enrolled in
+        an index.
+
+        Arguments
+        ---------
+        wavs : torch.Tensor
+            Tensor containing the speech waveforms (batch, time).
+            Make sure the sample rate is fs=16000 Hz.
+        index : speechbrain.pretrained.embedding_index.EmbeddingIndex
+            The enrolled speakers, e.g. with ``index.add_batch(self, ...)``.
+        wav_lens : torch.Tensor
+            Tensor containing the relative length for each sentence
+            in the length (e.g., [0.8 0.6 1.0])
+        k : int
+            Number of speakers returned per signal.
+        nprobe : int, optional
+            If given, the (approximate) IVF-PQ index is searched, see
+            ``EmbeddingIndex.search``.
+
+        Returns
+        -------
+        scores
+            The cosine similarities of the k closest speakers (batch, k).
+        keys
+            The keys of the k closest speakers of each signal.
+        """
+        emb = self.encode_batch(wavs, wav_lens, normalize=False)
+        return index.search(emb, k=k, nprobe=nprobe)
+
 
 class VAD(Pretrained):
     """A ready-to-use class for Voice Activity Detection (VAD) using a
@@ -2162,10 +2612,260 @@ class VAD(Pretrained):
         return self.get_speech_prob_chunk(wavs, wav_lens)
 
 
+class StreamingVAD:
+    """Voice activity detection on live audio, with a pre-trained VAD.
+
+    Audio is given in frames of any size with ``process()``, which returns
+    the speech probabilities of the new complete frames of the model (one
+    per ``time_resolution``) and the speech segments finalized so far. The
+    post-processing of ``VAD.get_speech_segments`` (``apply_threshold``,
+    ``get_boundaries``, ``merge_close_segments``,
+    ``remove_short_segments``) is applied online.
+
+    The CRDNN of the pre-trained VAD is bidirectional and normalizes its
+    features over the whole input, so it cannot carry its state from one
+    call to the next exactly. As ``get_speech_prob_file`` does with its
+    chunks, the probabilities are instead computed on windows of
+    ``chunk_size`` seconds, together with ``context`` seconds of past audio
+    and ``lookahead`` seconds of future audio, which give the convolutions,
+    the recurrent layers and the normalization their context. Only that
+    much audio is kept, so the memory is constant.
+
+    The algorithmic latency of the probabilities is at most ``chunk_size +
+    lookahead`` seconds (``latency``): the probability of a frame is
+    known once the audio ``lookahead`` seconds after the end of its chunk
+    has been given. A segment is final ``close_th`` seconds after its end
+    (when no following segment can be merged with it anymore).
+
+    Arguments
+    ---------
+    vad : VAD
+        The pre-trained VAD.
+    chunk_size : float
+        Duration (in seconds) of the audio for which the probabilities are
+        computed together.
+    context : float
+        Duration (in seconds) of past audio given to the model with a chunk.
+    lookahead : float
+        Duration (in seconds) of future audio given to the model with a
+        chunk. At least half of the window of the features.
+    activation_th : float
+        Threshold of the posteriors above which a speech segment starts.
+    deactivation_th : float
+        Threshold of the posteriors below which a speech segment ends.
+    close_th : float
+        Segments closer than this (in seconds) are merged.
+    len_th : float
+        Segments shorter than this (in seconds) are removed.
+    speech_th : float, None
+        If given, segments where the mean posterior is lower are removed (as
+        the ``double_check`` of ``VAD.get_speech_segments``, but with the
+        posteriors already computed).
+
+    Example
+    -------
+    >>> import torchaudio
+    >>> from speechbrain.pretrained import VAD
+    >>> tmpdir = getfixture("tmpdir")
+    >>> vad = VAD.from_hparams(
+    ...     source="speechbrain/vad-crdnn-libriparty",
+    ...     savedir=tmpdir,
+    ... )
+    >>> stream = StreamingVAD(vad)
+    >>> audio, fs = torchaudio.load("tests/samples/single-mic/example1.wav")
+    >>> for frame in audio[0].split(1600):  # 100 ms frames
+    ...     probs, segments = stream.process(frame)
+    >>> probs, segments = stream.flush()
+    """
+
+    def __init__(
+        self,
+        vad,
+        chunk_size=0.5,
+        context=1.0,
+        lookahead=0.5,
+        activation_th=0.5,
+        deactivation_th=0.25,
+        close_th=0.250,
+        len_th=0.250,
+        speech_th=None,
+    ):
+        self.vad = vad
+        self.time_resolution = vad.time_resolution
+        self.hop = int(round(vad.time_resolution * vad.sample_rate))
+        self.chunk_frames = max(
+            1, int(round(chunk_size / self.time_resolution))
+        )
+        self.context_frames = int(round(context / self.time_resolution))
+        self.lookahead_frames = int(round(lookahead / self.time_resolution))
+        self.activation_th = activation_th
+        self.deactivation_th = deactivation_th
+        self.close_th = close_th
+        self.len_th = len_th
+        self.speech_th = speech_th
+        self.reset()
+
+    @property
+    def latency(self):
+        """The algorithmic latency of the probabilities, in seconds."""
+        return (
+            self.chunk_frames + self.lookahead_frames
+        ) * self.time_resolution
+
+    def reset(self):
+        """Starts a new stream."""
+        # Audio kept, starting at sample self._buffer_start of the stream
+        self._buffer = torch.zeros(0)
+        self._buffer_start = 0
+        self._num_samples = 0
+        # The first frame whose probability is not computed yet
+        self._next_frame = 0
+        # The segment being detected: [first frame, last frame, prob sum]
+        self._active = None
+        # The last segment, which may still be merged with the next one
+        self._pending = None
+
+    def process(self, samples):
+        """Processes the next frames of audio.
+
+        Arguments
+        ---------
+        samples : torch.Tensor, numpy.ndarray
+            The next samples of the (single channel) stream, at the sample
+            rate of the VAD. Integer PCM (int16) is scaled to [-1, 1].
+
+        Returns
+        -------
+        probs : torch.Tensor
+            The speech probabilities of the frames completed by these
+            samples (possibly none), following those already returned.
+        segments : torch.Tensor
+            The speech segments finalized by these samples, [n, 2] with the
+            begin and end of each segment in seconds.
+        """
+        samples = torch.as_tensor(samples)
+        if samples.dtype == torch.int16:
+            samples = samples / 32768.0
+        self._buffer = torch.cat([self._buffer, samples.float().flatten()])
+        self._num_samples += samples.numel()
+
+        probs = []
+        while (
+            self._next_frame + self.chunk_frames + self.lookahead_frames
+        ) * self.hop <= self._num_samples:
+            end_frame = self._next_frame + self.chunk_frames
+            end_sample = (end_frame + self.lookahead_frames) * self.hop
+            probs.append(self._compute_probs(end_frame, end_sample))
+        return self._finish(probs, final=False)
+
+    def flush(self):
+        """Processes the end of the stream, and starts a new one.
+
+        Returns
+        -------
+        probs : torch.Tensor
+            The speech probabilities of the remaining frames.
+        segments : torch.Tensor
+            The remaining speech segments.
+        """
+        # As get_speech_prob_file, the stream is padded with zeros
+        num_frames = self._num_samples // self.hop
+        padding = torch.zeros(self.lookahead_frames * self.hop)
+        self._buffer = torch.cat([self._buffer, padding])
+        end_sample = self._num_samples + padding.numel()
+        probs = []
+        while self._next_frame < num_frames:
+            end_frame = min(self._next_frame + self.chunk_frames, num_frames)
+            probs.append(self._compute_probs(end_frame, end_sample))
+        results = self._finish(probs, final=True)
+        self.reset()
+        return results
+
+    def _compute_probs(self, end_frame, end_sample):
+        """Computes the probabilities of the frames up to end_frame, with the
+        audio up to end_sample as lookahead, and forgets the audio not
+        needed anymore."""
+        begin_frame = self._next_frame
+        start_sample = max(0, (begin_frame - self.context_frames) * self.hop)
+        window = self._buffer[
+            start_sample - self._buffer_start : end_sample - self._buffer_start
+        ]
+        with torch.no_grad():
+            probs = self.vad.get_speech_prob_chunk(window.unsqueeze(0))
+        offset = (begin_frame * self.hop - start_sample) // self.hop
+        probs = probs[0, offset : offset + end_frame - begin_frame, 0].cpu()
+
+        # Only the context of the next chunk is needed
+        keep_from = max(0, (end_frame - self.context_frames) * self.hop)
+        self._buffer = self._buffer[keep_from - self._buffer_start :]
+        self._buffer_start = keep_from
+        self._next_frame = end_frame
+        return probs
+
+    def _finish(self, probs, final):
+        probs = torch.cat(probs) if probs else torch.zeros(0)
+        first_frame = self._next_frame - probs.numel()
+        segments = []
+        for i, prob in enumerate(probs.tolist()):
+            self._update_segments(first_frame + i, prob, segments)
+        if final:
+            if self._active is not None:
+                self._end_segment(segments)
+            if self._pending is not None:
+                self._finalize_pending(segments)
+        segments = torch.tensor(segments, dtype=torch.float).reshape(-1, 2)
+        return probs, segments
+
+    def _update_segments(self, frame, prob, segments):
+        # Online apply_threshold: a segment starts above activation_th and
+        # goes on while above deactivation_th
+        if self._active is not None:
+            if prob >= self.deactivation_th:
+                self._active[1] = frame
+                self._active[2] += prob
+                return
+            self._end_segment(segments)
+        if prob >= self.activation_th:
+            self._active = [frame, frame, prob]
+        elif self._pending is not None:
+            # No segment starting after this frame can be merged anymore
+            gap = (frame + 1 - self._pending[1]) * self.time_resolution
+            if gap > self.close_th:
+                self._finalize_pending(segments)
+
+    def _end_segment(self, segments):
+        # Online merge_close_segments
+        segment, self._active = self._active, None
+        if self._pending is not None:
+            gap = (segment[0] - self._pending[1]) * self.time_resolution
+            if gap <= self.close_th:
+                self._pending[1] = segment[1]
+                self._pending[2] += segment[2]
+                return
+            self._finalize_pending(segments)
+        self._pending = segment
+
+    def _finalize_pending(self, segments):
+        # Online remove_short_segments (and double check)
+        begin, end, prob_sum = self._pending
+        self._pending = None
+        if (end - begin) * self.time_resolution <= self.len_th:
+            return
+        if self.speech_th is not None:
+            # The probabilities of the frames between merged segments are not
+            # kept, they count as zero
+            if prob_sum / (end - begin + 1) < self.speech_th:
+                return
+        segments.append(
+            [begin * self.time_resolution, end * self.time_resolution]
+        )
+
+
 class SepformerSeparation(Pretrained):
     """A "ready-to-use" speech separation model.
 
-    Uses Sepformer architecture.
+    Uses Sepformer architecture. Long files can be separated chunk by chunk
+    with separate_file_streaming or separate_file_to_disk.
 
     Example
     -------
@@ -2261,6 +2961,154 @@ class SepformerSeparation(Pretrained):
         )
         return est_sources
 
+    def separate_file_streaming(
+        self, path, chunk_size=10.0, overlap=2.0, savedir="audio_cache"
+    ):
+        """Separates the sources of a (long) file chunk by chunk.
+
+        The mixture is read in windows of chunk_size seconds, each one
+        overlapping the previous one by overlap seconds (see
+        ``Pretrained.load_audio_chunks``), and the windows are separated
+        independently, so memory does not grow with the file length. The
+        sources of each window are put in the order that best matches the
+        previous window on their overlap (highest correlation), and the two
+        windows are cross-faded over the overlap.
+
+        Unlike ``separate_file``, the sources are not normalized by their
+        maximum, which is only known at the end.
+
+        Arguments
+        ---------
+        path : str
+            Path to file which has a mixture of sources. It can be a local
+            path, a web url, or a huggingface repo.
+        chunk_size : float
+            Size of the windows separated, in seconds.
+        overlap : float
+            Overlap of successive windows, in seconds.
+        savedir : path
+            Path where to store the wav signals (when downloaded from the web).
+
+        Yields
+        ------
+        torch.Tensor
+            The separated sources of the successive parts of the file,
+            [time, num_spks], on the CPU. Concatenated, they cover the file.
+        """
+        if not 0 < overlap < chunk_size:
+            raise ValueError("overlap must be positive and below chunk_size")
+        sample_rate = self.hparams.sample_rate
+        overlap_len = int(round(overlap * sample_rate))
+        tail = None
+        for chunk, left, _ in self.load_audio_chunks(
+            path,
+            chunk_size=chunk_size - overlap,
+            left_context=overlap,
+            right_context=0.0,
+            savedir=savedir,
+            audio_normalizer=AudioNormalizer(sample_rate=sample_rate),
+        ):
+            with torch.no_grad():
+                est_sources = self.separate_batch(chunk.unsqueeze(0))[0].cpu()
+
+            parts = []
+            if tail is not None:
+                # The left context of the chunk is the end of the previous one
+                left = min(left, tail.shape[0])
+                parts.append(tail[: tail.shape[0] - left])
+                tail = tail[tail.shape[0] - left :]
+                order = self._best_permutation(tail, est_sources[:left])
+                est_sources = est_sources[:, list(order)]
+                fade_in = torch.linspace(0, 1, left + 2)[1:-1].unsqueeze(1)
+                parts.append(
+                    tail * (1 - fade_in) + est_sources[:left] * fade_in
+                )
+                est_sources = est_sources[left:]
+
+            # The end overlaps with the next chunk, if any
+            end = max(est_sources.shape[0] - overlap_len, 0)
+            parts.append(est_sources[:end])
+            tail = est_sources[end:]
+            yield torch.cat(parts)
+
+        if tail is not None and tail.shape[0] > 0:
+            yield tail
+
+    def separate_file_to_disk(
+        self,
+        path,
+        save_paths,
+        chunk_size=10.0,
+        overlap=2.0,
+        savedir="audio_cache",
+    ):
+        """Separates the sources of a (long) file chunk by chunk, and writes
+        them to audio files as they are separated.
+
+        See ``separate_file_streaming``. Only one chunk is in memory at a
+        time. The files are written with soundfile, in 32-bit float, so
+        that the sources, which are not normalized, are not clipped.
+
+        Arguments
+        ---------
+        path : str
+            Path to file which has a mixture of sources. It can be a local
+            path, a web url, or a huggingface repo.
+        save_paths : list of str
+            Paths of the audio files written, one per source.
+        chunk_size : float
+            Size of the windows separated, in seconds.
+        overlap : float
+            Overlap of successive windows, in seconds.
+        savedir : path
+            Path where to store the wav signals (when downloaded from the web).
+        """
+        try:
+            import soundfile
+        except ImportError:
+            raise ImportError(
+                "separate_file_to_disk writes files with soundfile, "
+                "please install it with: pip install soundfile"
+            )
+
+        if len(save_paths) != self.hparams.num_spks:
+            raise ValueError("There should be one path per source")
+        files = [
+            soundfile.SoundFile(
+                save_path,
+                mode="w",
+                samplerate=self.hparams.sample_rate,
+                channels=1,
+                subtype="FLOAT",
+            )
+            for save_path in save_paths
+        ]
+        try:
+            for est_sources in self.separate_file_streaming(
+                path, chunk_size, overlap, savedir
+            ):
+                for i, fo in enumerate(files):
+                    fo.write(est_sources[:, i].numpy())
+        finally:
+            for fo in files:
+                fo.close()
+
+    @staticmethod
+    def _best_permutation(reference, est_sources):
+        """Returns the order of the sources which best correlates them with
+        the reference sources, [time, num_spks] both."""
+        reference = F.normalize(reference, dim=0)
+        est_sources = F.normalize(est_sources, dim=0)
+        # Correlation of each reference source with each estimated source
+        correlations = reference.T @ est_sources
+        num_spks = correlations.shape[0]
+        return max(
+            permutations(range(num_spks)),
+            key=lambda order: float(
+                correlations[range(num_spks), list(order)].sum()
+            ),
+        )
+
     def forward(self, mix):
         """Runs separation on the input mix"""
         return self.separate_batch(mix)
@@ -0,0 +1,260 @@
+"""Dynamic batching of inference requests for pretrained models.
+
+The ``*_batch`` methods of the ``Pretrained`` interfaces are much more
+efficient than one call per input, but a serving stack receives the inputs
+one at a time. ``BatchingServer`` collects the concurrent requests into
+batches: a worker thread, which owns the model, waits a little for requests
+to accumulate, groups them by length (to limit the padding), and runs the
+batch method. Requests are submitted from an asyncio event loop.
+
+Example
+-------
+>>> import asyncio
+>>> def batch_fn(wavs, wav_lens):
+...     return wavs.sum(dim=1), wav_lens
+>>> async def main(server):
+...     wavs = [torch.ones(100), torch.ones(50)]
+...     return await asyncio.gather(*[server.submit(w) for w in wavs])
+>>> with BatchingServer(batch_fn, max_batch_size=4) as server:
+...     results = asyncio.run(main(server))
+>>> [(total.item(), length.item()) for total, length in results]
+[(100.0, 1.0), (50.0, 0.5)]
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import torch
+
+from speechbrain.utils.data_utils import batch_pad_right
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put in the queue to stop the worker
+_STOP = object()
+
+
+class BatchingServer:
+    """Runs a batch inference function on dynamically formed batches.
+
+    Arguments
+    ---------
+    batch_fn : callable
+        Called as ``batch_fn(wavs, wav_lens)`` on the padded batch of inputs
+        with their relative lengths, e.g. ``asr.transcribe_batch``.
+        It is only ever called from the worker thread.
+    max_batch_size : int
+        Maximum number of requests in a batch.
+    max_wait_ms : float
+        How long (in milliseconds) the first request of a batch may wait for
+        more requests to arrive. Higher values give larger batches (more
+        throughput) at the cost of latency when the load is low.
+    num_buckets : int
+        When requests pile up, up to ``num_buckets * max_batch_size`` of them
+        are sorted by length and split into batches, so that inputs of
+        similar lengths are padded together.
+    max_length_ratio : float
+        A batch is split when its longest input would be more than this many
+        times longer than its shortest one, which bounds the compute wasted
+        on padding.
+    """
+
+    def __init__(
+        self,
+        batch_fn,
+        max_batch_size=16,
+        max_wait_ms=10.0,
+        num_buckets=4,
+        max_length_ratio=2.0,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.num_buckets = num_buckets
+        self.max_length_ratio = max_length_ratio
+        self._queue = queue.Queue()
+        self._worker = None
+        # Held to enqueue, so that nothing is queued after _STOP
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="BatchingServer", daemon=True
+            )
+            self._worker.start()
+        return self
+
+    def close(self):
+        """Stops the worker thread, once all submitted requests are done."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+            if worker is None:
+                return
+            self._queue.put(_STOP)
+        worker.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    async def submit(self, wav):
+        """Submits one input and waits for its result.
+
+        Arguments
+        ---------
+        wav : torch.Tensor
+            A single input, e.g. a waveform [time] or [time, channels].
+
+        Returns
+        -------
+        object
+            The part of the ``batch_fn`` output that corresponds to this
+            input: tensors and lists are indexed along the batch, tuples and
+            dicts are split element-wise.
+        """
+        if not isinstance(wav, torch.Tensor) or wav.dim() == 0:
+            raise ValueError(
+                "Expected a tensor with a time dimension, got "
+                f"{wav.shape if isinstance(wav, torch.Tensor) else type(wav)}"
+            )
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._worker is None:
+                raise RuntimeError(
+                    "The server is not running, call start() first"
+                )
+            self._queue.put((wav, loop, future))
+        return await future
+
+    def _run(self):
+        """Worker loop: gathers requests and runs them in batches."""
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            requests, stop = self._gather(first)
+            try:
+                batches = self._make_batches(requests)
+            except Exception as e:
+                logger.exception("Batching failed")
+                _fail(requests, e)
+                continue
+            for batch in batches:
+                self._run_batch(batch)
+
+        # close() queues nothing after _STOP, but fail anything left anyway,
+        # rather than leave it waiting forever
+        leftover = []
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _STOP:
+                leftover.append(request)
+        _fail(leftover, RuntimeError("The server was closed"))
+
+    def _gather(self, first):
+        """Collects the requests to run with the first one, returns them and
+        whether the server was stopped meanwhile."""
+        requests = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(requests) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return requests, True
+            requests.append(request)
+        # Also take the requests which are already waiting, so that they
+        # can be bucketed by length.
+        while len(requests) < self.num_buckets * self.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return requests, True
+            requests.append(request)
+        return requests, False
+
+    def _make_batches(self, requests):
+        """Splits the requests into batches of similar lengths."""
+        requests = sorted(requests, key=lambda request: request[0].shape[0])
+        batches = [[requests[0]]]
+        for request in requests[1:]:
+            batch = batches[-1]
+            shortest = max(batch[0][0].shape[0], 1)
+            too_long = request[0].shape[0] > self.max_length_ratio * shortest
+            if len(batch) == self.max_batch_size or too_long:
+                batches.append([request])
+            else:
+                batch.append(request)
+        return batches
+
+    def _run_batch(self, batch):
+        """Runs batch_fn and hands the results over to the event loops."""
+        try:
+            wavs, wav_lens = batch_pad_right([request[0] for request in batch])
+            with torch.no_grad():
+                output = self.batch_fn(wavs, wav_lens)
+            results = _unbatch(output, len(batch))
+        except Exception as e:
+            logger.exception("Batch inference failed")
+            _fail(batch, e)
+            return
+        for (_, loop, future), result in zip(batch, results):
+            _call_soon(loop, _set_result, future, result)
+
+
+def _unbatch(output, batch_size):
+    """Splits the output of a batch function into one output per input."""
+    if isinstance(output, torch.Tensor) and output.dim() > 0:
+        if output.shape[0] == batch_size:
+            return list(output)
+    elif isinstance(output, list) and len(output) == batch_size:
+        return output
+    elif isinstance(output, tuple):
+        return list(zip(*[_unbatch(element, batch_size) for element in output]))
+    elif isinstance(output, dict):
+        values = [_unbatch(value, batch_size) for value in output.values()]
+        return [dict(zip(output.keys(), item)) for item in zip(*values)]
+    # Not batched, e.g. None: every input gets the same value
+    return [output] * batch_size
+
+
+def _fail(requests, exception):
+    """Sets the exception on the futures of the requests."""
+    for _, loop, future in requests:
+        _call_soon(loop, _set_exception, future, exception)
+
+
+def _call_soon(loop, callback, *args):
+    """Schedules the callback on the loop, unless the loop is closed."""
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        logger.warning("Dropping a result: its event loop is closed")
+
+
+def _set_result(future, result):
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.cancelled():
+        future.set_exception(exception)
@@ -54,6 +54,14 @@ class Augmenter(torch.nn.Module):
     repeat_augment: int
         Applies the augmentation algorithm N times. This can be used to
         perform more data augmentation.
+    per_example_augment: bool
+        If True, the number of augmentations (between min_augmentations and
+        max_augmentations) and the augmentations themselves are sampled for
+        each example, rather than once for the batch. Each augmentation then
+        runs once, on the sub-batch of the examples that selected it, and
+        its outputs are written back into the batch. The selected
+        augmentations are applied in the order of the augmentations dict.
+        Not compatible with parallel_augment.
 
 
     Example
@@ -64,6 +72,10 @@ class Augmenter(torch.nn.Module):
     >>> augment = Augmenter(parallel_augment=False, concat_original=False, freq_dropper=freq_dropper,  chunk_dropper= chunk_dropper)
     >>> signal = torch.rand([4, 16000])
     >>> output_signal, lenghts = augment(signal, lengths=torch.tensor([0.2,0.5,0.7,1.0]))
+    >>> augment = Augmenter(per_example_augment=True, shuffle_augmentations=True, freq_dropper=freq_dropper,  chunk_dropper= chunk_dropper)
+    >>> output_signal, lenghts = augment(signal, lengths=torch.tensor([0.2,0.5,0.7,1.0]))
+    >>> output_signal.shape
+    torch.Size([4, 16000])
     """
 
     def __init__(
@@ -75,6 +87,7 @@ class Augmenter(torch.nn.Module):
         max_augmentations=None,
         shuffle_augmentations=False,
         repeat_augment=1,
+        per_example_augment=False,
         **augmentations,
     ):
         super().__init__()
@@ -86,6 +99,7 @@ class Augmenter(torch.nn.Module):
         self.max_augmentations = max_augmentations
         self.shuffle_augmentations = shuffle_augmentations
         self.repeat_augment = repeat_augment
+        self.per_example_augment = per_example_augment
         # Check min and max augmentations
         self.check_min_max_augmentations()
 
@@ -96,6 +110,11 @@ class Augmenter(torch.nn.Module):
         if self.repeat_augment < 0:
             raise ValueError("repeat_augment must be greater than 0.")
 
+        if self.per_example_augment and self.parallel_augment:
+            raise ValueError(
+                "per_example_augment cannot be used with parallel_augment."
+            )
+
         # Check if augmentation modules need the length argument
         self.require_lengths = {}
         for aug_key, aug_fun in self.augmentations.items():
@@ -167,6 +186,86 @@ class Augmenter(torch.nn.Module):
 
         return output, output_lengths
 
+    def sample_plan(self, batch_size):
+        """Samples the augmentations to apply to each example.
+
+        Arguments
+        ---------
+        batch_size : int
+            The number of examples.
+
+        Returns
+        -------
+        torch.Tensor (batch, augmentations)
+            True where the augmentation is applied to the example.
+        """
+        N_augment = torch.randint(
+            low=self.min_augmentations,
+            high=self.max_augmentations + 1,
+            size=(batch_size, 1),
+        )
+
+        # Rank of each augmentation, the first N_augment are selected
+        ranks = torch.arange(len(self.augmentations)).expand(batch_size, -1)
+        if self.shuffle_augmentations:
+            ranks = torch.rand(ranks.shape).argsort(dim=1).argsort(dim=1)
+        return ranks < N_augment
+
+    def augment_per_example(self, x, lengths, plan):
+        """Applies the augmentations of each example, each augmentation
+        running once on the sub-batch of the examples which selected it.
+
+        Arguments
+        ---------
+        x : torch.Tensor (batch, time, channel)
+            input to augment.
+        lengths : torch.Tensor
+            The length of each sequence in the batch.
+        plan : torch.Tensor (batch, augmentations)
+            True where the augmentation is applied to the example,
+            see ``sample_plan``.
+        """
+        output = x.clone()
+        output_lengths = lengths.clone()
+
+        for k, augment_name in enumerate(self.augmentations):
+            idx = plan[:, k].nonzero().squeeze(1).to(x.device)
+            if len(idx) == 0:
+                continue
+            augment_fun = self.augmentations[augment_name]
+
+            # Check input arguments
+            if self.require_lengths[augment_name]:
+                out = augment_fun(output[idx], lengths=output_lengths[idx])
+            else:
+                out = augment_fun(output[idx])
+
+            # Check output arguments
+            out_lengths = output_lengths[idx]
+            if isinstance(out, tuple):
+                if len(out) == 2:
+                    out, out_lengths = out
+                else:
+                    raise ValueError(
+                        "The function must return max two arguments (Tensor, Length[optional])"
+                    )
+
+            # Pad the batch or the outputs if the time dimension changed
+            # (e.g. speed perturbation), lengths are relative to it
+            time, out_time = output.shape[1], out.shape[1]
+            if out_time > time:
+                output = _pad_time(output, out_time)
+                output_lengths = output_lengths * time / out_time
+            elif out_time < time:
+                out = _pad_time(out, time)
+                out_lengths = out_lengths * out_time / time
+
+            # Write the outputs back into the batch
+            output[idx] = out
+            output_lengths[idx] = out_lengths
+
+        return output, output_lengths
+
     def forward(self, x, lengths):
         """Applies data augmentation.
 
@@ -190,7 +289,7 @@ class Augmenter(torch.nn.Module):
         # No augmentation
         if (
             self.repeat_augment == 0
-            or N_augment == 0
+            or (N_augment == 0 and not self.per_example_augment)
             or len(self.augmentations) == 0
         ):
             return x, lengths
@@ -219,9 +318,14 @@ class Augmenter(torch.nn.Module):
 
         # Perform augmentations
         for i in range(self.repeat_augment):
-            output, output_lengths = self.augment(
-                x, lengths, selected_augmentations
-            )
+            if self.per_example_augment:
+                output, output_lengths = self.augment_per_example(
+                    x, lengths, self.sample_plan(len(x))
+                )
+            else:
+                output, output_lengths = self.augment(
+                    x, lengths, selected_augmentations
+                )
             output_lst.append(output)
             output_len_lst.append(output_lengths)
 
@@ -251,3 +355,9 @@ class Augmenter(torch.nn.Module):
             raise ValueError("min_augmentations cannot be smaller than 0.")
         if self.max_augmentations < 0:
             raise ValueError("max_augmentations cannot be smaller than 0.")
+
+
+def _pad_time(x, time):
+    """Zero-pads the time dimension (the second) of x to time."""
+    padding = [0, 0] * (len(x.shape) - 2) + [0, time - x.shape[1]]
+    return torch.nn.functional.pad(x, padding)
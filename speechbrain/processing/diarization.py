@@ -26,7 +26,7 @@ import pytest
 import numpy as np
 
 from scipy import sparse
-from scipy.sparse.linalg import eigsh
+from scipy.sparse.linalg import eigsh, lobpcg
 from scipy.sparse.csgraph import connected_components
 from scipy.sparse.csgraph import laplacian as csgraph_laplacian
 
@@ -38,6 +38,7 @@ try:
     from sklearn.neighbors import kneighbors_graph
     from sklearn.cluster import SpectralClustering
     from sklearn.cluster._kmeans import k_means
+    from sklearn.preprocessing import normalize
 except ImportError:
     err_msg = "The optional dependency scikit-learn (sklearn) is used in this module\n"
     err_msg += "Cannot import scikit-learn. \n"
@@ -911,25 +912,42 @@ class Spec_Clust_unorm:
         if k_oracle is not None:
             num_of_spk = k_oracle
         else:
-            lambda_gap_list = self.getEigenGaps(lambdas[1 : self.max_num_spkrs])
-
-            num_of_spk = (
-                np.argmax(
-                    lambda_gap_list[
-                        : min(self.max_num_spkrs, len(lambda_gap_list))
-                    ]
-                )
-                if lambda_gap_list
-                else 0
-            ) + 2
-
-            if num_of_spk < self.min_num_spkrs:
-                num_of_spk = self.min_num_spkrs
+            num_of_spk = self.estimate_num_spkrs(lambdas)
 
         emb = eig_vecs[:, 0:num_of_spk]
 
         return emb, num_of_spk
 
+    def estimate_num_spkrs(self, lambdas):
+        """Estimates the number of speakers using maximum Eigen gap.
+
+        Arguments
+        ---------
+        lambdas : array
+            Eigen values of the Laplacian in ascending order (at least the
+            max_num_spkrs smallest ones).
+
+        Returns
+        -------
+        num_of_spk : int
+            Estimated number of speakers.
+        """
+
+        lambda_gap_list = self.getEigenGaps(lambdas[1 : self.max_num_spkrs])
+
+        num_of_spk = (
+            np.argmax(
+                lambda_gap_list[: min(self.max_num_spkrs, len(lambda_gap_list))]
+            )
+            if lambda_gap_list
+            else 0
+        ) + 2
+
+        if num_of_spk < self.min_num_spkrs:
+            num_of_spk = self.min_num_spkrs
+
+        return num_of_spk
+
     def cluster_embs(self, emb, k):
         """Clusters the embeddings using kmeans.
 
@@ -970,11 +988,325 @@ class Spec_Clust_unorm:
         return eig_vals_gap_list
 
 
+class Spec_Clust_sparse(Spec_Clust_unorm):
+    """
+    This class implements the spectral clustering of Spec_Clust_unorm with a
+    sparse affinity matrix, for long recordings with many embeddings.
+
+    The pruned cosine affinity matrix is computed by chunks of rows, keeping
+    only the most similar embeddings of each row, and stored as a sparse
+    matrix. Only the smallest Eigen pairs of the Laplacian needed (the
+    max_num_spkrs smallest ones, or k_oracle) are computed, with the Lanczos
+    (ARPACK) or LOBPCG iterative eigensolvers. The affinity matrix then
+    holds at most max_neighbors entries per row: its memory grows linearly
+    with the number of embeddings, while computing it still takes a time
+    quadratic in the number of embeddings (each row is compared with all
+    the embeddings, by chunks). With max_neighbors=None, p_val alone sets
+    the number of entries per row, and the memory is quadratic as well.
+
+    Optionally, the embeddings are first grouped into num_centroids clusters
+    with kmeans, the centroids are clustered, and each embedding takes the
+    label of its centroid. p_val then applies to the centroids.
+
+    Arguments
+    ---------
+    min_num_spkrs : int
+        Minimum number of speakers estimated.
+    max_num_spkrs : int
+        Maximum number of speakers estimated.
+    max_neighbors : int
+        Maximum number of neighbours kept in each row of the affinity matrix,
+        whatever p_val (None for no maximum, as many as p_val keeps).
+    chunk_size : int
+        Number of rows of the affinity matrix computed at once.
+    eigen_solver : str
+        Iterative eigensolver, "lanczos" or "lobpcg".
+    num_centroids : int
+        Number of kmeans centroids clustered instead of the embeddings
+        (None to cluster the embeddings).
+    random_state : int
+        Seed of the initializations of the eigensolvers and kmeans.
+
+    Example
+    -------
+    >>> from speechbrain.processing import diarization as diar
+    >>> clust = diar.Spec_Clust_sparse(min_num_spkrs=2, max_num_spkrs=5)
+    >>> rng = np.random.RandomState(0)
+    >>> centers = rng.randn(3, 16)
+    >>> emb = np.repeat(centers, 40, axis=0) + 0.1 * rng.randn(120, 16)
+    >>> sim_mat = clust.get_sim_mat(emb, 0.25)
+    >>> sim_mat.nnz
+    3600
+    >>> sym_sim_mat = 0.5 * (sim_mat + sim_mat.T)
+    >>> laplacian = clust.get_laplacian(sym_sim_mat)
+    >>> spec_emb, num_of_spk = clust.get_spec_embs(laplacian, None)
+    >>> print(num_of_spk)
+    3
+    >>> # Complete spectral clustering
+    >>> clust.do_spec_clust(emb, k_oracle=None, p_val=0.25)
+    >>> [len(set(clust.labels_[i : i + 40])) for i in range(0, 120, 40)]
+    [1, 1, 1]
+    >>> len(set(clust.labels_))
+    3
+    """
+
+    def __init__(
+        self,
+        min_num_spkrs=2,
+        max_num_spkrs=10,
+        max_neighbors=100,
+        chunk_size=1024,
+        eigen_solver="lanczos",
+        num_centroids=None,
+        random_state=1234,
+    ):
+        super().__init__(min_num_spkrs, max_num_spkrs)
+        if eigen_solver not in ["lanczos", "lobpcg"]:
+            raise ValueError("Unknown eigen_solver %s" % eigen_solver)
+        self.max_neighbors = max_neighbors
+        self.chunk_size = chunk_size
+        self.eigen_solver = eigen_solver
+        self.num_centroids = num_centroids
+        self.random_state = random_state
+
+    def do_spec_clust(self, X, k_oracle, p_val):
+        """Function for spectral clustering.
+
+        Arguments
+        ---------
+        X : array
+            (n_samples, n_features).
+            Embeddings extracted from the model.
+        k_oracle : int
+            Number of speakers (when oracle number of speakers).
+        p_val : float
+            p percent value to prune the affinity matrix.
+        """
+
+        X = normalize(np.asarray(X, dtype=np.float64))
+
+        if self.num_centroids is None or len(X) <= self.num_centroids:
+            self._spec_clust(X, k_oracle, p_val)
+            return
+
+        # Cluster the kmeans centroids, then label embeddings like them
+        centroids, assignments, _ = k_means(
+            X, self.num_centroids, n_init=1, random_state=self.random_state
+        )
+        self._spec_clust(normalize(centroids), k_oracle, p_val)
+        self.labels_ = self.labels_[assignments]
+
+    def _spec_clust(self, X, k_oracle, p_val):
+        """Spectral clustering of normalized embeddings."""
+
+        # Pruned similarity matrix
+        sim_mat = self.get_sim_mat(X, p_val)
+
+        # Symmetrization
+        sym_sim_mat = 0.5 * (sim_mat + sim_mat.T)
+
+        # Laplacian calculation
+        laplacian = self.get_laplacian(sym_sim_mat)
+
+        # Get Spectral Embeddings
+        emb, num_of_spk = self.get_spec_embs(laplacian, k_oracle)
+
+        # Perform clustering
+        self.cluster_embs(emb, num_of_spk)
+
+    def get_sim_mat(self, X, pval):
+        """Returns the sparse similarity matrix based on cosine similarities,
+        pruned as with p_pruning.
+
+        Arguments
+        ---------
+        X : array
+            (n_samples, n_features).
+            Embeddings extracted from the model.
+        pval : float
+            p-value to be retained in each row of the affinity matrix.
+
+        Returns
+        -------
+        M : scipy.sparse.csr_matrix
+            (n_samples, n_samples).
+            Similarity matrix with the cosine similarities of each embedding
+            with its most similar ones (itself included).
+        """
+
+        X = normalize(np.asarray(X, dtype=np.float64))
+        n_samples = X.shape[0]
+
+        # As many as p_pruning keeps
+        n_keep = n_samples - int((1 - pval) * n_samples)
+        if self.max_neighbors is not None:
+            n_keep = min(n_keep, self.max_neighbors)
+        n_keep = max(n_keep, 1)
+
+        rows, cols, vals = [], [], []
+        for begin in range(0, n_samples, self.chunk_size):
+            sims = X[begin : begin + self.chunk_size] @ X.T
+            if n_keep < n_samples:
+                top = np.argpartition(-sims, n_keep - 1, axis=1)[:, :n_keep]
+            else:
+                top = np.broadcast_to(np.arange(n_samples), sims.shape)
+            rows.append(np.repeat(np.arange(begin, begin + len(sims)), n_keep))
+            cols.append(top.ravel())
+            vals.append(np.take_along_axis(sims, top, axis=1).ravel())
+
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        M = sparse.csr_matrix(
+            (np.concatenate(vals), (rows, cols)), shape=(n_samples, n_samples)
+        )
+        return M
+
+    def get_laplacian(self, M):
+        """Returns the un-normalized laplacian for the given sparse affinity
+        matrix.
+
+        Arguments
+        ---------
+        M : scipy.sparse matrix
+            (n_samples, n_samples)
+            Affinity matrix.
+
+        Returns
+        -------
+        L : scipy.sparse.csr_matrix
+            (n_samples, n_samples)
+            Laplacian matrix.
+        """
+
+        M = sparse.csr_matrix(M - sparse.diags(M.diagonal()))
+        M.eliminate_zeros()
+        D = np.asarray(abs(M).sum(axis=1)).ravel()
+        L = sparse.csr_matrix(sparse.diags(D) - M)
+        return L
+
+    def get_spec_embs(self, L, k_oracle=4):
+        """Returns spectral embeddings and estimates the number of speakers
+        using maximum Eigen gap, from the smallest Eigen pairs only.
+
+        Arguments
+        ---------
+        L : scipy.sparse matrix (n_samples, n_samples)
+            Laplacian matrix.
+        k_oracle : int
+            Number of speakers when the condition is oracle number of speakers,
+            else None.
+
+        Returns
+        -------
+        emb : array (n_samples, n_components)
+            Spectral embedding for each sample with n Eigen components.
+        num_of_spk : int
+            Estimated number of speakers. If the condition is set to the oracle
+            number of speakers then returns k_oracle.
+        """
+
+        n_eigs = k_oracle if k_oracle is not None else self.max_num_spkrs
+        lambdas, eig_vecs = self.get_smallest_eigs(L, n_eigs)
+
+        if k_oracle is not None:
+            num_of_spk = k_oracle
+        else:
+            num_of_spk = self.estimate_num_spkrs(lambdas)
+
+        emb = eig_vecs[:, 0:num_of_spk]
+
+        return emb, num_of_spk
+
+    def get_smallest_eigs(self, L, n_eigs):
+        """Returns the smallest Eigen values of a Laplacian, and the
+        corresponding Eigen vectors.
+
+        The Laplacian of a graph with several connected components is block
+        diagonal, and its zero Eigen value is repeated, which the Lanczos
+        algorithm does not reliably find. So the Eigen pairs of each
+        component are computed separately, and the smallest ones kept.
+
+        Arguments
+        ---------
+        L : scipy.sparse matrix (n_samples, n_samples)
+            Laplacian matrix.
+        n_eigs : int
+            Number of Eigen pairs.
+
+        Returns
+        -------
+        lambdas : array (n_eigs,)
+            Eigen values in ascending order.
+        eig_vecs : array (n_samples, n_eigs)
+            The corresponding Eigen vectors.
+        """
+
+        n_samples = L.shape[0]
+        n_eigs = min(n_eigs, n_samples)
+        L = sparse.csr_matrix(L)
+        _, components = connected_components(L, directed=False)
+
+        lambdas, eig_vecs = [], []
+        for component in np.unique(components):
+            nodes = np.flatnonzero(components == component)
+            sub_lambdas, sub_eig_vecs = self._component_eigs(
+                L[nodes][:, nodes], min(n_eigs, len(nodes))
+            )
+            vecs = np.zeros((n_samples, len(sub_lambdas)))
+            vecs[nodes] = sub_eig_vecs
+            lambdas.append(sub_lambdas)
+            eig_vecs.append(vecs)
+
+        lambdas = np.concatenate(lambdas)
+        eig_vecs = np.concatenate(eig_vecs, axis=1)
+        order = np.argsort(lambdas, kind="stable")[:n_eigs]
+        return lambdas[order], eig_vecs[:, order]
+
+    def _component_eigs(self, L, n_eigs):
+        """Smallest Eigen pairs of the Laplacian of a connected graph.
+
+        Lanczos (ARPACK) converges to the largest Eigen values, so it is run
+        on s*I - L, where s bounds the Eigen values of L (Gershgorin): the
+        smallest Eigen values of L are the largest of s*I - L, with the same
+        gaps. LOBPCG directly computes the smallest ones, with a Jacobi
+        preconditioner. Small matrices are decomposed densely.
+        """
+
+        n_samples = L.shape[0]
+        if n_samples <= 5 * n_eigs:
+            lambdas, eig_vecs = scipy.linalg.eigh(L.toarray())
+            return lambdas[:n_eigs], eig_vecs[:, :n_eigs]
+
+        random_state = _check_random_state(self.random_state)
+        degrees = L.diagonal()
+        if self.eigen_solver == "lanczos":
+            shift = max(2 * np.max(np.abs(degrees)), 1.0)
+            shifted = sparse.identity(n_samples, format="csr") * shift - L
+            v0 = random_state.uniform(-1, 1, n_samples)
+            mus, eig_vecs = eigsh(shifted, k=n_eigs, which="LA", v0=v0)
+            lambdas = shift - mus
+        else:
+            X0 = random_state.uniform(-1, 1, (n_samples, n_eigs))
+            precond = sparse.diags(1.0 / np.maximum(degrees, 1e-8))
+            lambdas, eig_vecs = lobpcg(
+                L, X0, M=precond, largest=False, tol=1e-6, maxiter=1000
+            )
+
+        order = np.argsort(lambdas)
+        return lambdas[order], eig_vecs[:, order]
+
+
 #####################
 
 
 def do_spec_clustering(
-    diary_obj, out_rttm_file, rec_id, k, pval, affinity_type, n_neighbors
+    diary_obj,
+    out_rttm_file,
+    rec_id,
+    k,
+    pval,
+    affinity_type,
+    n_neighbors,
+    max_neighbors=100,
 ):
     """Performs spectral clustering on embeddings. This function calls specific
     clustering algorithms as per affinity.
@@ -992,11 +1324,23 @@ def do_spec_clustering(
     pval : float
         `pval` for prunning affinity matrix.
     affinity_type : str
-        Type of similarity to be used to get affinity matrix (cos or nn).
+        Type of similarity to be used to get affinity matrix (cos, cos_sparse
+        or nn). cos_sparse is cos with a sparse affinity matrix, for long
+        recordings.
+    n_neighbors : int
+        Number of neighbors for the nn affinity.
+    max_neighbors : int
+        Maximum number of neighbors kept in each row of the cos_sparse
+        affinity matrix (None for as many as pval keeps).
     """
 
-    if affinity_type == "cos":
-        clust_obj = Spec_Clust_unorm(min_num_spkrs=2, max_num_spkrs=10)
+    if affinity_type in ["cos", "cos_sparse"]:
+        if affinity_type == "cos":
+            clust_obj = Spec_Clust_unorm(min_num_spkrs=2, max_num_spkrs=10)
+        else:
+            clust_obj = Spec_Clust_sparse(
+                min_num_spkrs=2, max_num_spkrs=10, max_neighbors=max_neighbors
+            )
         k_oracle = k  # use it only when oracle num of speakers
         clust_obj.do_spec_clust(diary_obj.stat1, k_oracle, pval)
         labels = clust_obj.labels_
@@ -232,9 +232,11 @@ def convolve1d(
         Without padding, circular convolution occurs. This makes little
         difference in the case of reverberation, but may make more difference
         with different kernels.
-    rotation_index : int
+    rotation_index : int or tensor
         This option only applies if `use_fft` is true. If so, the kernel is
         rolled by this amount before convolution to shift the output location.
+        A tensor of shape `[batch]` gives one rotation per kernel of a batch
+        of kernels.
 
     Returns
     -------
@@ -247,6 +249,15 @@ def convolve1d(
     >>> signal = signal.unsqueeze(0).unsqueeze(2)
     >>> kernel = torch.rand(1, 10, 1)
     >>> signal = convolve1d(signal, kernel, padding=(9, 0))
+    >>> signals = torch.rand(4, 100, 1)
+    >>> kernels = torch.rand(4, 10, 1)
+    >>> rotations = torch.tensor([0, 1, 2, 3])
+    >>> batched = convolve1d(signals, kernels, use_fft=True,
+    ...                      rotation_index=rotations)
+    >>> single = convolve1d(signals[2:3], kernels[2:3], use_fft=True,
+    ...                     rotation_index=2)
+    >>> torch.allclose(batched[2:3], single, atol=1e-6)
+    True
     """
     if len(waveform.shape) != 3:
         raise ValueError("Convolve1D expects a 3-dimensional tensor")
@@ -273,12 +284,36 @@ def convolve1d(
             zero_length = 0
 
         # Perform rotation to ensure alignment
-        zeros = torch.zeros(
-            kernel.size(0), kernel.size(1), zero_length, device=kernel.device
-        )
-        after_index = kernel[..., rotation_index:]
-        before_index = kernel[..., :rotation_index]
-        kernel = torch.cat((after_index, zeros, before_index), dim=-1)
+        if isinstance(rotation_index, torch.Tensor):
+            if rotation_index.numel() == 1:
+                rotation_index = int(rotation_index)
+            else:
+                # One rotation per kernel: kernel[d:] goes to the start and
+                # kernel[:d] to the end, gathered from zero-padded copies
+                length = kernel.size(-1)
+                positions = torch.arange(length, device=kernel.device)
+                positions = positions + rotation_index.view(-1, 1)
+                positions = positions.unsqueeze(1).expand_as(kernel)
+                rotated = kernel.new_zeros(
+                    kernel.size(0), kernel.size(1), length + zero_length
+                )
+                rotated[..., :length] = torch.nn.functional.pad(
+                    kernel, (0, length)
+                ).gather(-1, positions)
+                rotated[..., zero_length:] += torch.nn.functional.pad(
+                    kernel, (length, 0)
+                ).gather(-1, positions)
+                kernel = rotated
+        if not isinstance(rotation_index, torch.Tensor):
+            zeros = torch.zeros(
+                kernel.size(0),
+                kernel.size(1),
+                zero_length,
+                device=kernel.device,
+            )
+            after_index = kernel[..., rotation_index:]
+            before_index = kernel[..., :rotation_index]
+            kernel = torch.cat((after_index, zeros, before_index), dim=-1)
 
         # Multiply in frequency domain to convolve in time domain
         if version.parse(torch.__version__) > version.parse("1.6.0"):
@@ -329,7 +364,8 @@ def reverberate(waveforms, rir_waveform, rescale_amp="avg"):
         The waveforms to normalize.
         Shape should be `[batch, time]` or `[batch, time, channels]`.
     rir_waveform : tensor
-        RIR tensor, shape should be [time, channels].
+        RIR tensor, shape should be [time, channels], or
+        [batch, time, channels] for one RIR per waveform.
     rescale_amp : str
         Whether reverberated signal is rescaled (None) and with respect either
         to original signal "peak" amplitude or "avg" average amplitude.
@@ -364,7 +400,10 @@ def reverberate(waveforms, rir_waveform, rescale_amp="avg"):
     )
 
     # Compute index of the direct signal, so we can preserve alignment
+    # (one per impulse response, for a batch of impulse responses)
     value_max, direct_index = rir_waveform.abs().max(axis=1, keepdim=True)
+    if rir_waveform.size(0) > 1:
+        direct_index = direct_index[:, 0, 0]
 
     # Making sure the max is always positive (if not, flip)
     # mask = torch.logical_and(rir_waveform == value_max,  rir_waveform < 0)
@@ -417,15 +456,20 @@ def notch_filter(notch_freq, filter_width=101, notch_width=0.05):
 
     Arguments
     ---------
-    notch_freq : float
+    notch_freq : float or tensor
         frequency to put notch as a fraction of the
         sampling rate / 2. The range of possible inputs is 0 to 1.
+        A tensor of shape `[batch]` returns one filter per frequency.
     filter_width : int
         Filter width in samples. Longer filters have
         smaller transition bands, but are more inefficient.
     notch_width : float
         Width of the notch, as a fraction of the sampling_rate / 2.
 
+    Returns
+    -------
+    The filter, shape `[1, filter_width, 1]`, or `[batch, filter_width, 1]`.
+
     Example
     -------
     >>> from speechbrain.dataio.dataio import read_audio
@@ -433,16 +477,22 @@ def notch_filter(notch_freq, filter_width=101, notch_width=0.05):
     >>> signal = signal.unsqueeze(0).unsqueeze(2)
     >>> kernel = notch_filter(0.25)
     >>> notched_signal = convolve1d(signal, kernel)
+    >>> kernels = notch_filter(torch.tensor([0.25, 0.5]))
+    >>> kernels.shape
+    torch.Size([2, 101, 1])
+    >>> torch.allclose(kernels[0:1], kernel, atol=1e-6)
+    True
     """
 
     # Check inputs
-    assert 0 < notch_freq <= 1
+    notch_freq = torch.as_tensor(notch_freq, dtype=torch.float32).view(-1, 1)
+    assert torch.all(notch_freq > 0) and torch.all(notch_freq <= 1)
     assert filter_width % 2 != 0
     pad = filter_width // 2
     inputs = torch.arange(filter_width) - pad
 
     # Avoid frequencies that are too low
-    notch_freq += notch_width
+    notch_freq = notch_freq + notch_width
 
     # Define sinc function, avoiding division by zero
     def sinc(x):
@@ -452,21 +502,22 @@ def notch_filter(notch_freq, filter_width=101, notch_width=0.05):
             return torch.sin(x) / x
 
         # The zero is at the middle index
-        return torch.cat([_sinc(x[:pad]), torch.ones(1), _sinc(x[pad + 1 :])])
+        ones = torch.ones(len(x), 1)
+        return torch.cat([_sinc(x[:, :pad]), ones, _sinc(x[:, pad + 1 :])], 1)
 
     # Compute a low-pass filter with cutoff frequency notch_freq.
     hlpf = sinc(3 * (notch_freq - notch_width) * inputs)
     hlpf *= torch.blackman_window(filter_width)
-    hlpf /= torch.sum(hlpf)
+    hlpf /= torch.sum(hlpf, dim=1, keepdim=True)
 
     # Compute a high-pass filter with cutoff frequency notch_freq.
     hhpf = sinc(3 * (notch_freq + notch_width) * inputs)
     hhpf *= torch.blackman_window(filter_width)
-    hhpf /= -torch.sum(hhpf)
-    hhpf[pad] += 1
+    hhpf /= -torch.sum(hhpf, dim=1, keepdim=True)
+    hhpf[:, pad] += 1
 
     # Adding filters creates notch filter
-    return (hlpf + hhpf).view(1, -1, 1)
+    return (hlpf + hhpf).unsqueeze(-1)
 
 
 def overlap_and_add(signal, frame_step):
@@ -13,7 +13,10 @@ Authors
 """
 
 # Importing libraries
+import json
 import math
+import os
+import numpy as np
 import torch
 import torch.nn.functional as F
 from speechbrain.dataio.legacy import ExtendedCSVDataset
@@ -76,6 +79,10 @@ class AddNoise(torch.nn.Module):
     clean_sample_rate : int
         The sample rate of the clean audio signals, so noise can be resampled
         to the clean sample rate if necessary.
+    noise_bank : AudioBank, None
+        If given, the noises are drawn from this bank (at the clean sample
+        rate), instead of the csv file: a different random noise and
+        start index for every signal of the batch, without file reads.
 
     Example
     -------
@@ -86,6 +93,10 @@ class AddNoise(torch.nn.Module):
     >>> noisifier = AddNoise('tests/samples/annotation/noise.csv',
     ...                     replacements={'noise_folder': 'tests/samples/noise'})
     >>> noisy = noisifier(clean, torch.ones(1))
+    >>> bank = AudioBank('tests/samples/annotation/noise.csv',
+    ...                  replacements={'noise_folder': 'tests/samples/noise'})
+    >>> noisifier = AddNoise(noise_bank=bank, pad_noise=True)
+    >>> noisy = noisifier(clean.repeat(4, 1), torch.ones(4))
     """
 
     def __init__(
@@ -104,6 +115,7 @@ class AddNoise(torch.nn.Module):
         replacements={},
         noise_sample_rate=16000,
         clean_sample_rate=16000,
+        noise_bank=None,
     ):
         super().__init__()
 
@@ -119,6 +131,7 @@ class AddNoise(torch.nn.Module):
         self.normalize = normalize
         self.replacements = replacements
         self.noise_funct = noise_funct
+        self.noise_bank = noise_bank
 
         if noise_sample_rate != clean_sample_rate:
             self.resampler = Resample(noise_sample_rate, clean_sample_rate)
@@ -162,7 +175,9 @@ class AddNoise(torch.nn.Module):
         noisy_waveform *= 1 - noise_amplitude_factor
 
         # Loop through clean samples and create mixture
-        if self.csv_file is None:
+        if self.noise_bank is not None:
+            noise_waveform, noise_length = self._sample_noise(waveforms)
+        elif self.csv_file is None:
             noise_waveform = self.noise_funct(waveforms)
             noise_length = lengths
         else:
@@ -187,6 +202,24 @@ class AddNoise(torch.nn.Module):
 
         return noisy_waveform
 
+    def _sample_noise(self, waveforms):
+        """Draw a batch of noises from the noise bank"""
+        noise_batch, noise_len = self.noise_bank.sample_crops(
+            len(waveforms),
+            waveforms.shape[1],
+            tile=self.pad_noise,
+            start_index=self.start_index,
+        )
+        noise_batch = noise_batch.to(waveforms.device, waveforms.dtype)
+        noise_len = noise_len.to(waveforms.device).unsqueeze(1)
+
+        # Same noise on all the channels
+        if len(waveforms.shape) == 3:
+            noise_batch = noise_batch.unsqueeze(-1).repeat(
+                1, 1, waveforms.shape[2]
+            )
+        return noise_batch, noise_len
+
     def _load_noise(self, lengths, max_length):
         """Load a batch of noises"""
         lengths = lengths.long().squeeze(1)
@@ -335,6 +368,11 @@ class AddReverb(torch.nn.Module):
     clean_sample_rate : int
         The sample rate of the clean signals, so that the corruption
         signals can be resampled to the clean sample rate before convolution.
+    rir_bank : AudioBank, None
+        If given, the impulse responses are drawn from this bank (at the
+        clean sample rate), instead of the csv file: a different random
+        impulse response for every signal of the batch, all convolved in
+        one FFT.
 
     Example
     -------
@@ -345,17 +383,22 @@ class AddReverb(torch.nn.Module):
     >>> reverb = AddReverb('tests/samples/annotation/RIRs.csv',
     ...                     replacements={'rir_folder': 'tests/samples/RIRs'})
     >>> reverbed = reverb(clean, torch.ones(1))
+    >>> bank = AudioBank('tests/samples/annotation/RIRs.csv',
+    ...                  replacements={'rir_folder': 'tests/samples/RIRs'})
+    >>> reverb = AddReverb(rir_bank=bank)
+    >>> reverbed = reverb(clean.repeat(4, 1), torch.ones(4))
     """
 
     def __init__(
         self,
-        csv_file,
+        csv_file=None,
         sorting="random",
         reverb_prob=1.0,
         rir_scale_factor=1.0,
         replacements={},
         reverb_sample_rate=16000,
         clean_sample_rate=16000,
+        rir_bank=None,
     ):
         super().__init__()
         self.csv_file = csv_file
@@ -363,6 +406,12 @@ class AddReverb(torch.nn.Module):
         self.reverb_prob = reverb_prob
         self.replacements = replacements
         self.rir_scale_factor = rir_scale_factor
+        self.rir_bank = rir_bank
+
+        if rir_bank is not None:
+            return
+        if csv_file is None:
+            raise ValueError("AddReverb needs a csv_file or a rir_bank")
 
         # Create a data loader for the RIR waveforms
         dataset = ExtendedCSVDataset(
@@ -406,7 +455,12 @@ class AddReverb(torch.nn.Module):
         # lengths = (lengths * waveforms.shape[1])[:, None, None]
 
         # Load and prepare RIR
-        rir_waveform = self._load_rir(waveforms)
+        if self.rir_bank is not None:
+            rir_waveform, _ = self.rir_bank.sample_clips(len(waveforms))
+            rir_waveform = rir_waveform.unsqueeze(-1)
+            rir_waveform = rir_waveform.to(waveforms.device, waveforms.dtype)
+        else:
+            rir_waveform = self._load_rir(waveforms)
 
         # Resample to correct rate
         if hasattr(self, "resampler"):
@@ -446,6 +500,228 @@ class AddReverb(torch.nn.Module):
         return rir_waveform.to(waveforms.device)
 
 
+class AudioBank(torch.nn.Module):
+    """A bank of audio clips, such as noises or room impulse responses,
+    decoded once and stored in one contiguous tensor.
+
+    ``AddNoise`` and ``AddReverb`` load their signals from a csv file through
+    a DataLoader, which reads and decodes files at every batch. With a bank,
+    the clips of the csv file are decoded (and resampled) once, and stored
+    end to end, with a table of their offsets. Random clips or crops for a
+    whole batch are then gathered with one indexing operation.
+
+    The clips are stored in float32 or float16, in memory or in a
+    memory-mapped file on disk. They are not buffers of the module: they
+    always stay on the CPU (``.to()`` does not move them, and they are not
+    saved in checkpoints), so a large bank is never copied to the GPU. Only
+    the gathered crops are, by the modules using the bank.
+
+    Arguments
+    ---------
+    csv_file : str
+        The name of a csv file containing the location of the audio files.
+    csv_keys : list, None, optional
+        Default: None . One data entry for the audio should be specified.
+        If None, the csv file is expected to have only one data entry.
+    replacements : dict
+        A set of string replacements to carry out in the
+        csv file. Each time a key is found in the text, it will be replaced
+        with the corresponding value.
+    orig_sample_rate : int
+        The sample rate of the audio files.
+    sample_rate : int
+        The sample rate of the clips in the bank, to which they are resampled
+        if necessary.
+    dtype : str
+        "float32" or "float16", the type of the stored clips.
+    cache_dir : str, None
+        If given, the clips are stored in this directory and memory-mapped.
+        The directory is reused as long as the csv file and the arguments do
+        not change.
+
+    Example
+    -------
+    >>> bank = AudioBank(
+    ...     'tests/samples/annotation/RIRs.csv',
+    ...     replacements={'rir_folder': 'tests/samples/RIRs'},
+    ...     dtype="float16",
+    ... )
+    >>> len(bank)
+    4
+    >>> clips, lengths = bank.sample_clips(4)
+    >>> clips.shape[1] == lengths.max().item()
+    True
+    >>> crops, lengths = bank.sample_crops(4, 8000, tile=True)
+    >>> crops.shape, lengths.tolist()
+    (torch.Size([4, 8000]), [8000, 8000, 8000, 8000])
+    """
+
+    def __init__(
+        self,
+        csv_file,
+        csv_keys=None,
+        replacements={},
+        orig_sample_rate=16000,
+        sample_rate=16000,
+        dtype="float32",
+        cache_dir=None,
+    ):
+        super().__init__()
+        if dtype not in ["float32", "float16"]:
+            raise ValueError(f"Unsupported dtype {dtype}")
+        self.sample_rate = sample_rate
+        config = {
+            "csv_file": os.path.abspath(csv_file),
+            "csv_mtime": os.path.getmtime(csv_file),
+            "csv_keys": csv_keys,
+            "replacements": replacements,
+            "orig_sample_rate": orig_sample_rate,
+            "sample_rate": sample_rate,
+            "dtype": dtype,
+        }
+
+        if cache_dir is not None and _bank_config(cache_dir) == config:
+            clips, offsets = _load_bank(cache_dir)
+        else:
+            clips, offsets = self._decode(
+                csv_file, csv_keys, replacements, orig_sample_rate, dtype
+            )
+            if cache_dir is not None:
+                _save_bank(cache_dir, clips, offsets, config)
+                clips, offsets = _load_bank(cache_dir)
+
+        self.clips = clips
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """The lengths of the clips, in samples."""
+        return self.offsets[1:] - self.offsets[:-1]
+
+    def sample_clips(self, batch_size):
+        """Returns random clips, whole.
+
+        Arguments
+        ---------
+        batch_size : int
+            Number of clips.
+
+        Returns
+        -------
+        clips : torch.Tensor
+            The clips, zero-padded to the longest, [batch_size, time], on
+            the CPU.
+        lengths : torch.Tensor
+            Their lengths, in samples, [batch_size].
+        """
+        ids = torch.randint(len(self), (batch_size,))
+        lengths = self.lengths[ids]
+        positions = torch.arange(int(lengths.max()))
+        valid = positions < lengths.unsqueeze(1)
+        positions = torch.minimum(positions, lengths.unsqueeze(1) - 1)
+        clips = self.clips[self.offsets[ids].unsqueeze(1) + positions]
+        return clips.float() * valid, lengths
+
+    def sample_crops(self, batch_size, length, tile=False, start_index=None):
+        """Returns random crops of random clips.
+
+        Arguments
+        ---------
+        batch_size : int
+            Number of crops.
+        length : int
+            Length of the crops, in samples.
+        tile : bool
+            If True, clips shorter than length are repeated to cover the
+            crop. Otherwise, they are zero-padded.
+        start_index : int, None
+            The index in the clips where the crops start. By default, a random
+            index in [0, len(clip) - length] (or in the clip, with tile).
+
+        Returns
+        -------
+        crops : torch.Tensor
+            The crops, [batch_size, length], on the CPU.
+        lengths : torch.Tensor
+            Their lengths, before zero-padding, in samples, [batch_size].
+        """
+        ids = torch.randint(len(self), (batch_size,))
+        clip_lengths = self.lengths[ids].unsqueeze(1)
+        rand = torch.rand(batch_size, 1)
+        if start_index is not None:
+            starts = torch.full_like(clip_lengths, start_index)
+        elif tile:
+            starts = (rand * clip_lengths).long()
+        else:
+            starts = (rand * (clip_lengths - length + 1).clamp(min=1)).long()
+
+        # Positions within the clips fit in int32, whose division (for the
+        # modulo) is much faster than int64's
+        clip_lengths = clip_lengths.int()
+        positions = torch.arange(length, dtype=torch.int32)
+        positions = starts.int() + positions
+        if tile:
+            positions = positions % clip_lengths
+            crops = self.clips[self.offsets[ids].unsqueeze(1) + positions]
+            lengths = torch.full((batch_size,), length)
+            return crops.float(), lengths
+
+        valid = positions < clip_lengths
+        positions = torch.minimum(positions, clip_lengths - 1)
+        crops = self.clips[self.offsets[ids].unsqueeze(1) + positions]
+        return crops.float().masked_fill_(~valid, 0), valid.sum(dim=1)
+
+    def _decode(
+        self, csv_file, csv_keys, replacements, orig_sample_rate, dtype
+    ):
+        """Reads all the clips of the csv file, returns them end to end,
+        and their offsets."""
+        dataset = ExtendedCSVDataset(
+            csvpath=csv_file, output_keys=csv_keys, replacements=replacements,
+        )
+        resampler = None
+        if orig_sample_rate != self.sample_rate:
+            resampler = Resample(orig_sample_rate, self.sample_rate)
+        clips = []
+        for i in range(len(dataset)):
+            clip = next(iter(dataset[i].values()))
+            # Multi-channel clips: first channel
+            if clip.dim() == 2:
+                clip = clip[:, 0]
+            if resampler is not None:
+                clip = resampler(clip.unsqueeze(0)).squeeze(0)
+            clips.append(clip.to(getattr(torch, dtype)))
+        lengths = torch.tensor([0] + [len(clip) for clip in clips])
+        return torch.cat(clips), torch.cumsum(lengths, dim=0)
+
+
+def _bank_config(cache_dir):
+    config_path = os.path.join(cache_dir, "config.json")
+    if not os.path.isfile(config_path):
+        return None
+    with open(config_path) as fi:
+        return json.load(fi)
+
+
+def _save_bank(cache_dir, clips, offsets, config):
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, "clips.npy"), clips.numpy())
+    np.save(os.path.join(cache_dir, "offsets.npy"), offsets.numpy())
+    # Written last: the directory is only reused once complete
+    with open(os.path.join(cache_dir, "config.json"), "w") as fo:
+        json.dump(config, fo)
+
+
+def _load_bank(cache_dir):
+    # Copy-on-write mapping: writable for torch, never written back
+    clips = np.load(os.path.join(cache_dir, "clips.npy"), mmap_mode="c")
+    offsets = np.load(os.path.join(cache_dir, "offsets.npy"))
+    return torch.from_numpy(clips), torch.from_numpy(offsets)
+
+
 class SpeedPerturb(torch.nn.Module):
     """Slightly speed up or slow down an audio signal.
 
@@ -917,7 +1193,8 @@ class DropFreq(torch.nn.Module):
     """This class drops a random frequency from the signal.
 
     The purpose of this class is to teach models to learn to rely on all parts
-    of the signal, not just a few frequency bands.
+    of the signal, not just a few frequency bands. The number of frequencies
+    and the frequencies to drop are picked for each signal of the batch.
 
     Arguments
     ---------
@@ -983,48 +1260,60 @@ class DropFreq(torch.nn.Module):
         # Add channels dimension
         if len(waveforms.shape) == 2:
             dropped_waveform = dropped_waveform.unsqueeze(-1)
+        batch_size, time, channels = dropped_waveform.shape
 
-        # Pick number of frequencies to drop
+        # Pick number of frequencies to drop, for each signal
         drop_count = torch.randint(
-            low=self.drop_count_low, high=self.drop_count_high + 1, size=(1,)
+            low=self.drop_count_low,
+            high=self.drop_count_high + 1,
+            size=(batch_size,),
         )
+        max_count = int(drop_count.max())
 
-        # Pick a frequency to drop
+        # Pick the frequencies to drop
         drop_range = self.drop_freq_high - self.drop_freq_low
         drop_frequency = (
-            torch.rand(drop_count) * drop_range + self.drop_freq_low
+            torch.rand(batch_size, max_count) * drop_range + self.drop_freq_low
         )
 
         # Filter parameters
         filter_length = 101
         pad = filter_length // 2
 
-        # Start with delta function
-        drop_filter = torch.zeros(1, filter_length, 1, device=waveforms.device)
-        drop_filter[0, pad, 0] = 1
+        # Start with delta functions, one filter per signal
+        delta = torch.zeros(batch_size, filter_length, 1)
+        delta[:, pad] = 1
+        drop_filter = delta
 
-        # Subtract each frequency
-        for frequency in drop_frequency:
+        # Subtract each frequency (signals with fewer frequencies to drop
+        # are convolved with the delta function instead)
+        for i in range(max_count):
             notch_kernel = notch_filter(
-                frequency, filter_length, self.drop_width
-            ).to(waveforms.device)
-            drop_filter = convolve1d(drop_filter, notch_kernel, pad)
-
-        # Manage multiple channels
-        if len(waveforms.shape) == 3:
-            dropped_waveform = dropped_waveform.reshape(
-                dropped_waveform.shape[0] * dropped_waveform.shape[2],
-                dropped_waveform.shape[1],
-                1,
-            )
-
-        # Apply filter
-        dropped_waveform = convolve1d(dropped_waveform, drop_filter, pad)
-
-        if len(waveforms.shape) == 3:
-            dropped_waveform = dropped_waveform.reshape(
-                waveforms.shape[0], waveforms.shape[1], waveforms.shape[2]
+                drop_frequency[:, i], filter_length, self.drop_width
             )
+            dropped = (i < drop_count).view(-1, 1, 1)
+            notch_kernel = torch.where(dropped, notch_kernel, delta)
+            drop_filter = convolve1d(
+                drop_filter.transpose(0, 2),
+                notch_kernel,
+                pad,
+                groups=batch_size,
+            ).transpose(0, 2)
+
+        # Apply the filter of each signal to all its channels, by groups
+        drop_filter = drop_filter.repeat_interleave(channels, dim=0)
+        dropped_waveform = dropped_waveform.transpose(0, 1).reshape(
+            1, time, batch_size * channels
+        )
+        dropped_waveform = convolve1d(
+            dropped_waveform,
+            drop_filter.to(waveforms.device),
+            pad,
+            groups=batch_size * channels,
+        )
+        dropped_waveform = dropped_waveform.reshape(
+            time, batch_size, channels
+        ).transpose(0, 1)
 
         # Remove channels dimension if added
         return dropped_waveform.squeeze(-1)
@@ -1136,60 +1425,68 @@ class DropChunk(torch.nn.Module):
         if torch.rand(1) > self.drop_prob:
             return dropped_waveform
 
-        # Store original amplitude for computing white noise amplitude
-        clean_amplitude = compute_amplitude(waveforms, lengths.unsqueeze(1))
-
         # Pick a number of times to drop
+        device = waveforms.device
         drop_times = torch.randint(
             low=self.drop_count_low,
             high=self.drop_count_high + 1,
             size=(batch_size,),
+            device=device,
         )
+        max_times = int(drop_times.max())
+        if max_times == 0:
+            return dropped_waveform
 
-        # Iterate batch to set mask
-        for i in range(batch_size):
-            if drop_times[i] == 0:
-                continue
-
-            # Pick lengths
-            length = torch.randint(
-                low=self.drop_length_low,
-                high=self.drop_length_high + 1,
-                size=(drop_times[i],),
-            )
-
-            # Compute range of starting locations
-            start_min = self.drop_start
-            if start_min < 0:
-                start_min += lengths[i]
-            start_max = self.drop_end
-            if start_max is None:
-                start_max = lengths[i]
-            if start_max < 0:
-                start_max += lengths[i]
-            start_max = max(0, start_max - length.max())
-
-            # Pick starting locations
-            start = torch.randint(
-                low=start_min, high=start_max + 1, size=(drop_times[i],)
-            )
-
-            end = start + length
+        # Pick lengths, zero for the drops beyond the number of times
+        length = torch.randint(
+            low=self.drop_length_low,
+            high=self.drop_length_high + 1,
+            size=(batch_size, max_times),
+            device=device,
+        )
+        active = torch.arange(max_times, device=device) < drop_times[:, None]
+        length = length * active
+
+        # Compute range of starting locations
+        start_min = torch.full_like(lengths, self.drop_start)
+        if self.drop_start < 0:
+            start_min += lengths
+        start_max = lengths.clone()
+        if self.drop_end is not None:
+            start_max.fill_(self.drop_end)
+            if self.drop_end < 0:
+                start_max += lengths
+        start_max = (start_max - length.max(dim=1).values).clamp(min=0)
+
+        # Pick starting locations
+        start_range = (start_max - start_min + 1).clamp(min=1)
+        start = torch.rand(batch_size, max_times, device=device)
+        start = start_min[:, None] + (start * start_range[:, None]).long()
+
+        # Indices of the dropped samples, for all the drops at once
+        time = waveforms.size(1)
+        offsets = torch.arange(int(length.max()), device=device)
+        positions = start.unsqueeze(-1) + offsets
+        valid = (offsets < length.unsqueeze(-1)) & (positions < time)
+        batch_index = torch.arange(batch_size, device=device)
+        batch_index = batch_index.view(-1, 1, 1).expand_as(positions)
+        batch_index, positions = batch_index[valid], positions[valid]
+
+        # Update waveform
+        if not self.noise_factor:
+            dropped_waveform[batch_index, positions] = 0.0
+            return dropped_waveform
 
-            # Update waveform
-            if not self.noise_factor:
-                for j in range(drop_times[i]):
-                    dropped_waveform[i, start[j] : end[j]] = 0.0
-            else:
-                # Uniform distribution of -2 to +2 * avg amplitude should
-                # preserve the average for normalization
-                noise_max = 2 * clean_amplitude[i] * self.noise_factor
-                for j in range(drop_times[i]):
-                    # zero-center the noise distribution
-                    noise_vec = torch.rand(length[j], device=waveforms.device)
-                    noise_vec = 2 * noise_max * noise_vec - noise_max
-                    dropped_waveform[i, start[j] : end[j]] = noise_vec
+        # Original amplitude for computing white noise amplitude
+        clean_amplitude = compute_amplitude(waveforms, lengths.unsqueeze(1))
 
+        # Uniform distribution of -2 to +2 * avg amplitude should
+        # preserve the average for normalization
+        noise_max = 2 * clean_amplitude[batch_index, 0] * self.noise_factor
+        noise = torch.rand_like(noise_max)
+        dropped_waveform[batch_index, positions] = (
+            2 * noise_max * noise - noise_max
+        )
         return dropped_waveform
 
 
@@ -1422,12 +1719,16 @@ class DoClip(torch.nn.Module):
         if torch.rand(1) > self.clip_prob:
             return waveforms.clone()
 
-        # Randomly select clip value
+        # Randomly select clip value, for each signal
         clipping_range = self.clip_high - self.clip_low
-        clip_value = torch.rand(1)[0] * clipping_range + self.clip_low
+        clip_value = torch.rand(len(waveforms), device=waveforms.device)
+        clip_value = clip_value * clipping_range + self.clip_low
+        clip_value = clip_value.view(-1, *[1] * (len(waveforms.shape) - 1))
 
         # Apply clipping
-        clipped_waveform = waveforms.clamp(-clip_value, clip_value)
+        clipped_waveform = torch.minimum(
+            torch.maximum(waveforms, -clip_value), clip_value
+        )
 
         return clipped_waveform
 
@@ -1,5 +1,8 @@
 """Calculates Diarization Error Rate (DER) which is the sum of Missed Speaker (MS),
-False Alarm (FA), and Speaker Error Rate (SER) using md-eval-22.pl from NIST RT Evaluation.
+False Alarm (FA), and Speaker Error Rate (SER) as md-eval-22.pl from NIST RT Evaluation.
+
+The scores are computed natively with numpy, following the rules of md-eval
+(the Perl script can still be used with ``use_md_eval=True``).
 
 Authors
  * Neville Ryant 2018
@@ -13,6 +16,9 @@ import os
 import re
 import subprocess
 import numpy as np
+from collections import defaultdict
+from scipy.optimize import linear_sum_assignment
+from speechbrain.utils.parallel import parallel_map
 
 FILE_IDS = re.compile(r"(?<=Speaker Diarization for).+(?=\*\*\*)")
 SCORED_SPEAKER_TIME = re.compile(r"(?<=SCORED SPEAKER TIME =)[\d.]+")
@@ -41,6 +47,8 @@ def DER(
     ignore_overlap=False,
     collar=0.25,
     individual_file_scores=False,
+    use_md_eval=False,
+    num_workers=0,
 ):
     """Computes Missed Speaker percentage (MS), False Alarm (FA),
     Speaker Error Rate (SER), and Diarization Error Rate (DER).
@@ -57,6 +65,11 @@ def DER(
         Forgiveness collar.
     ignore_overlap : bool
         If True, ignores overlapping speech during evaluation.
+    use_md_eval : bool
+        If True, runs the md-eval Perl script instead of the native scorer.
+    num_workers : int
+        Number of processes scoring the recordings. 0 scores them in this
+        process.
 
     Returns
     -------
@@ -71,17 +84,264 @@ def DER(
 
     Example
     -------
-    >>> import pytest
-    >>> pytest.skip('Skipping because of Perl dependency')
-    >>> ref_rttm = "../../tests/samples/rttm/ref_rttm/ES2014c.rttm"
-    >>> sys_rttm = "../../tests/samples/rttm/sys_rttm/ES2014c.rttm"
-    >>> ignore_overlap = True
-    >>> collar = 0.25
-    >>> individual_file_scores = True
-    >>> Scores = DER(ref_rttm, sys_rttm, ignore_overlap, collar, individual_file_scores)
-    >>> print (Scores)
-    (array([0., 0.]), array([0., 0.]), array([7.16923618, 7.16923618]), array([7.16923618, 7.16923618]))
+    >>> tmpdir = getfixture("tmpdir")
+    >>> ref_rttm = str(tmpdir / "ref.rttm")
+    >>> with open(ref_rttm, "w") as f:
+    ...     _ = f.write("SPEAKER rec 1 0.00 5.00 <NA> <NA> spk1 <NA>\\n")
+    ...     _ = f.write("SPEAKER rec 1 4.00 6.00 <NA> <NA> spk2 <NA>\\n")
+    >>> sys_rttm = str(tmpdir / "sys.rttm")
+    >>> with open(sys_rttm, "w") as f:
+    ...     _ = f.write("SPEAKER rec 1 0.00 4.50 <NA> <NA> A <NA>\\n")
+    ...     _ = f.write("SPEAKER rec 1 4.50 3.50 <NA> <NA> B <NA>\\n")
+    ...     _ = f.write("SPEAKER rec 1 8.00 2.00 <NA> <NA> A <NA>\\n")
+    >>> MS, FA, SER, DER_ = DER(ref_rttm, sys_rttm, collar=0.0)
+    >>> print(round(MS, 2), round(FA, 2), round(SER, 2), round(DER_, 2))
+    9.09 0.0 18.18 27.27
+    """
+
+    if use_md_eval:
+        times = _md_eval_speaker_times(
+            ref_rttm, sys_rttm, ignore_overlap, collar
+        )
+        if times is None:
+            return None
+    else:
+        times = speaker_times(
+            ref_rttm, sys_rttm, ignore_overlap, collar, num_workers
+        )
+    (
+        scored_speaker_times,
+        miss_speaker_times,
+        fa_speaker_times,
+        error_speaker_times,
+    ) = times.T
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tot_error_times = (
+            miss_speaker_times + fa_speaker_times + error_speaker_times
+        )
+        miss_speaker_frac = miss_speaker_times / scored_speaker_times
+        fa_speaker_frac = fa_speaker_times / scored_speaker_times
+        sers_frac = error_speaker_times / scored_speaker_times
+        ders_frac = tot_error_times / scored_speaker_times
+
+    # Values in percentage of scored_speaker_time
+    miss_speaker = rectify(miss_speaker_frac)
+    fa_speaker = rectify(fa_speaker_frac)
+    sers = rectify(sers_frac)
+    ders = rectify(ders_frac)
+
+    if individual_file_scores:
+        return miss_speaker, fa_speaker, sers, ders
+    else:
+        return miss_speaker[-1], fa_speaker[-1], sers[-1], ders[-1]
+
+
+def speaker_times(
+    ref_rttm, sys_rttm, ignore_overlap=False, collar=0.25, num_workers=0
+):
+    """Computes the scored, missed, false alarm and speaker error times of
+    each recording, as md-eval does.
+
+    Arguments
+    ---------
+    ref_rttm : str
+        The path of reference/groundtruth RTTM file.
+    sys_rttm : str
+        The path of the system generated RTTM file.
+    ignore_overlap : bool
+        If True, ignores overlapping speech during evaluation.
+    collar : float
+        Forgiveness collar.
+    num_workers : int
+        Number of processes scoring the recordings. 0 scores them in this
+        process.
+
+    Returns
+    -------
+    times : np.ndarray
+        Array of (number of files + 1) x 4. Each row has the scored speaker,
+        missed speaker, false alarm speaker and speaker error times of a file
+        (files in sorted order), the last row is the total.
+    """
+    # Imported here: the diarization module needs scikit-learn
+    from speechbrain.processing.diarization import read_rttm
+
+    ref_segments = rttm_speaker_segments(read_rttm(ref_rttm))
+    sys_segments = rttm_speaker_segments(read_rttm(sys_rttm))
+    no_segments = (np.zeros(0), np.zeros(0), np.zeros(0, dtype=int))
+    # Recordings are the (file, channel) of the reference
+    recordings = sorted(ref_segments)
+    jobs = [
+        (
+            ref_segments[recording],
+            sys_segments.get(recording, no_segments),
+            collar,
+            ignore_overlap,
+        )
+        for recording in recordings
+    ]
+    if num_workers > 0:
+        results = parallel_map(
+            _score_job, jobs, process_count=num_workers, progress_bar=False
+        )
+    else:
+        results = map(_score_job, jobs)
+
+    file_times = defaultdict(lambda: np.zeros(4))
+    for (file_id, _), times in zip(recordings, results):
+        file_times[file_id] += times
+    times = [file_times[file_id] for file_id in sorted(file_times)]
+    times.append(np.sum(times, axis=0))
+    return np.stack(times)
+
+
+def rttm_speaker_segments(rttm):
+    """Gathers the SPEAKER segments of RTTM lines by recording.
+
+    Arguments
+    ---------
+    rttm : list
+        Lines of an RTTM file, as given by read_rttm.
+
+    Returns
+    -------
+    segments : dict
+        Maps (file, channel) to the start times, end times and speaker
+        indices (numpy arrays) of its segments.
+
+    Example
+    -------
+    >>> segments = rttm_speaker_segments(
+    ...     ["SPEAKER rec 1 0.50 1.00 <NA> <NA> spk1 <NA>"]
+    ... )
+    >>> segments[("rec", "1")]
+    (array([0.5]), array([1.5]), array([0]))
+    """
+    segments = defaultdict(list)
+    for line in rttm:
+        fields = line.split()
+        if len(fields) < 8 or fields[0].upper() != "SPEAKER":
+            continue
+        start = float(fields[3].replace("*", ""))
+        duration = fields[4].replace("*", "")
+        duration = 0.0 if duration.lower() == "<na>" else float(duration)
+        recording = (fields[1], fields[2].lower())
+        segments[recording].append((start, start + duration, fields[7]))
+
+    arrays = {}
+    for recording, segs in segments.items():
+        starts, ends, speakers = zip(*segs)
+        speaker_ids = {}
+        speakers = [
+            speaker_ids.setdefault(s, len(speaker_ids)) for s in speakers
+        ]
+        arrays[recording] = (
+            np.array(starts),
+            np.array(ends),
+            np.array(speakers, dtype=int),
+        )
+    return arrays
+
+
+def score_speaker_segments(
+    ref_segments, sys_segments, collar=0.25, ignore_overlap=False
+):
+    """Computes the speaker error times of one recording, as md-eval does.
+
+    The speaker activities are rasterized on the grid of all the segment
+    (and collar) boundaries, so that every cell of the grid has constant
+    reference and system speakers. The evaluation region spans the
+    reference segments. The reference speakers are mapped to the system
+    speakers which maximize their overlap in the evaluation region
+    (Hungarian algorithm). The errors are then counted outside the
+    forgiveness collars (and, with ignore_overlap, where only one reference
+    speaker talks).
+
+    Arguments
+    ---------
+    ref_segments : tuple
+        Start times, end times and speaker indices of the reference segments.
+    sys_segments : tuple
+        Start times, end times and speaker indices of the system segments.
+    collar : float
+        Forgiveness collar, around each reference segment boundary.
+    ignore_overlap : bool
+        If True, ignores overlapping speech during evaluation.
+
+    Returns
+    -------
+    times : np.ndarray
+        The scored speaker, missed speaker, false alarm speaker and speaker
+        error times.
+
+    Example
+    -------
+    >>> ref = (np.array([0.0, 4.0]), np.array([5.0, 10.0]), np.array([0, 1]))
+    >>> hyp = (np.array([0.0, 4.5]), np.array([4.5, 10.0]), np.array([0, 1]))
+    >>> score_speaker_segments(ref, hyp, collar=0.0)
+    array([11.,  1.,  0.,  0.])
     """
+    ref_start, ref_end, ref_spk = ref_segments
+    sys_start, sys_end, sys_spk = sys_segments
+    boundaries = [ref_start, ref_end, sys_start, sys_end]
+    if collar > 0:
+        collar_start = np.concatenate([ref_start, ref_end]) - collar
+        collar_end = np.concatenate([ref_start, ref_end]) + collar
+        boundaries += [collar_start, collar_end]
+    grid = np.unique(np.concatenate(boundaries))
+    durations = np.diff(grid)
+
+    num_ref = ref_spk.max() + 1
+    num_sys = sys_spk.max() + 1 if len(sys_spk) else 0
+    ref_active = _coverage(grid, ref_start, ref_end, ref_spk, num_ref) > 0
+    sys_active = _coverage(grid, sys_start, sys_end, sys_spk, num_sys) > 0
+
+    # Map the speakers on the evaluation region (where the reference speaks)
+    evaluated = (grid[:-1] >= ref_start.min()) & (grid[1:] <= ref_end.max())
+    weights = durations * (evaluated & ref_active.any(axis=0))
+    overlap = (ref_active * weights) @ sys_active.T.astype(float)
+    rows, cols = linear_sum_assignment(overlap, maximize=True)
+    mapped = overlap[rows, cols] > 0
+    num_mapped = (ref_active[rows[mapped]] & sys_active[cols[mapped]]).sum(0)
+
+    # Score outside of the collars (and overlaps)
+    scored = evaluated
+    if collar > 0:
+        scored = scored & (_coverage(grid, collar_start, collar_end) == 0)
+    if ignore_overlap:
+        scored = scored & (_coverage(grid, ref_start, ref_end) <= 1)
+    num_ref = ref_active.sum(axis=0)
+    num_sys = sys_active.sum(axis=0)
+    durations = durations * scored
+    return np.array(
+        [
+            durations @ num_ref,
+            durations @ np.maximum(num_ref - num_sys, 0),
+            durations @ np.maximum(num_sys - num_ref, 0),
+            durations @ (np.minimum(num_ref, num_sys) - num_mapped),
+        ]
+    )
+
+
+def _coverage(grid, starts, ends, groups=None, num_groups=1):
+    """Number of segments covering each cell of the grid, for each group of
+    segments if groups are given."""
+    counts = np.zeros((num_groups, len(grid)))
+    rows = 0 if groups is None else groups
+    np.add.at(counts, (rows, np.searchsorted(grid, starts)), 1)
+    np.add.at(counts, (rows, np.searchsorted(grid, ends)), -1)
+    counts = np.cumsum(counts, axis=1)[:, :-1]
+    return counts[0] if groups is None else counts
+
+
+def _score_job(job):
+    return score_speaker_segments(*job)
+
+
+def _md_eval_speaker_times(ref_rttm, sys_rttm, ignore_overlap, collar):
+    """Runs md-eval, and returns the times of each file and the total (as
+    speaker_times), or None if md-eval fails."""
 
     curr = os.path.abspath(os.path.dirname(__file__))
     mdEval = os.path.join(curr, "../../tools/der_eval/md-eval.pl")
@@ -102,51 +362,33 @@ def DER(
     try:
         stdout = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
 
-    except subprocess.CalledProcessError as ex:
-        stdout = ex.output
-
-    else:
-        stdout = stdout.decode("utf-8")
+    except subprocess.CalledProcessError:
+        return None
 
-        # Get all recording IDs
-        file_ids = [m.strip() for m in FILE_IDS.findall(stdout)]
-        file_ids = [
-            file_id[2:] if file_id.startswith("f=") else file_id
-            for file_id in file_ids
-        ]
+    stdout = stdout.decode("utf-8")
 
-        scored_speaker_times = np.array(
-            [float(m) for m in SCORED_SPEAKER_TIME.findall(stdout)]
-        )
+    scored_speaker_times = np.array(
+        [float(m) for m in SCORED_SPEAKER_TIME.findall(stdout)]
+    )
 
-        miss_speaker_times = np.array(
-            [float(m) for m in MISS_SPEAKER_TIME.findall(stdout)]
-        )
+    miss_speaker_times = np.array(
+        [float(m) for m in MISS_SPEAKER_TIME.findall(stdout)]
+    )
 
-        fa_speaker_times = np.array(
-            [float(m) for m in FA_SPEAKER_TIME.findall(stdout)]
-        )
+    fa_speaker_times = np.array(
+        [float(m) for m in FA_SPEAKER_TIME.findall(stdout)]
+    )
 
-        error_speaker_times = np.array(
-            [float(m) for m in ERROR_SPEAKER_TIME.findall(stdout)]
-        )
+    error_speaker_times = np.array(
+        [float(m) for m in ERROR_SPEAKER_TIME.findall(stdout)]
+    )
 
-        with np.errstate(invalid="ignore", divide="ignore"):
-            tot_error_times = (
-                miss_speaker_times + fa_speaker_times + error_speaker_times
-            )
-            miss_speaker_frac = miss_speaker_times / scored_speaker_times
-            fa_speaker_frac = fa_speaker_times / scored_speaker_times
-            sers_frac = error_speaker_times / scored_speaker_times
-            ders_frac = tot_error_times / scored_speaker_times
-
-        # Values in percentage of scored_speaker_time
-        miss_speaker = rectify(miss_speaker_frac)
-        fa_speaker = rectify(fa_speaker_frac)
-        sers = rectify(sers_frac)
-        ders = rectify(ders_frac)
-
-        if individual_file_scores:
-            return miss_speaker, fa_speaker, sers, ders
-        else:
-            return miss_speaker[-1], fa_speaker[-1], sers[-1], ders[-1]
+    return np.stack(
+        [
+            scored_speaker_times,
+            miss_speaker_times,
+            fa_speaker_times,
+            error_speaker_times,
+        ],
+        axis=1,
+    )
@@ -58,8 +58,11 @@ import inspect
 import shutil
 import logging
 import warnings
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from packaging import version
 import speechbrain.utils._workarounds as __wa
+from speechbrain.utils.tensor_file import is_tensor_file, load_tensor_file_into
 from speechbrain.utils.distributed import (
     main_process_only,
     if_main_process,
@@ -68,6 +71,9 @@ from speechbrain.utils.distributed import (
 
 logger = logging.getLogger(__name__)
 
+# Set in the thread writing asynchronous checkpoints
+_background_job = threading.local()
+
 CKPT_PREFIX = "CKPT"
 METAFNAME = f"{CKPT_PREFIX}.yaml"  # Important that this is not .ckpt
 PARAMFILE_EXT = ".ckpt"  # ...because these files will be
@@ -88,7 +94,9 @@ def torch_recovery(obj, path, end_of_epoch, device=None):
     end_of_epoch : bool
         Whether the recovery comes from an end of epoch checkpoint.
     device : str
-        Torch device, where to map the loaded parameters.
+        Torch device, where to map the loaded parameters. Tensor files (see
+        speechbrain.utils.tensor_file) are copied straight into the
+        parameters of modules, wherever they are.
 
     Returns
     -------
@@ -96,6 +104,9 @@ def torch_recovery(obj, path, end_of_epoch, device=None):
         Given object is modified in place.
     """
     del end_of_epoch  # Unused
+    if isinstance(obj, torch.nn.Module) and is_tensor_file(path):
+        load_tensor_file_into(obj, path, strict=True)
+        return
     try:
         obj.load_state_dict(torch.load(path, map_location=device), strict=True)
     except TypeError:
@@ -127,6 +138,38 @@ def torch_save(obj, path):
     torch.save(state_dict, path)
 
 
+def cpu_snapshot(state):
+    """Copies the tensors of a (nested) state dict to the CPU.
+
+    The copy no longer changes when training goes on, so that it can be
+    written to disk in the background.
+
+    Arguments
+    ---------
+    state : dict, list, tuple, torch.Tensor
+        The state, e.g. the state_dict of a module or an optimizer.
+
+    Returns
+    -------
+    The same structure, with copies of the tensors on the CPU.
+
+    Example
+    -------
+    >>> param = torch.ones(2)
+    >>> snapshot = cpu_snapshot({"param": param, "step": [1]})
+    >>> param += 1
+    >>> snapshot
+    {'param': tensor([1., 1.]), 'step': [1]}
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    elif isinstance(state, collections.abc.Mapping):
+        return type(state)((k, cpu_snapshot(v)) for k, v in state.items())
+    elif isinstance(state, (list, tuple)) and not hasattr(state, "_fields"):
+        return type(state)(cpu_snapshot(v) for v in state)
+    return state
+
+
 def torch_parameter_transfer(obj, path, device):
     """Non-strict Torch Module state_dict load.
 
@@ -140,16 +183,23 @@ def torch_parameter_transfer(obj, path, device):
     obj : torch.nn.Module
         Instance for which to load the parameters.
     path : str
-        Path where to load from.
+        Path where to load from. Tensor files (see
+        speechbrain.utils.tensor_file) are memory-mapped, and copied straight
+        into the parameters.
+    device : str
+        Torch device, where to map the loaded parameters.
 
     Returns
     -------
     None
         The object is modified in place.
     """
-    incompatible_keys = obj.load_state_dict(
-        torch.load(path, map_location=device), strict=False
-    )
+    if is_tensor_file(path):
+        incompatible_keys = load_tensor_file_into(obj, path, strict=False)
+    else:
+        incompatible_keys = obj.load_state_dict(
+            torch.load(path, map_location=device), strict=False
+        )
     for missing_key in incompatible_keys.missing_keys:
         logger.warning(
             f"During parameter transfer to {obj} loading from "
@@ -437,6 +487,15 @@ class Checkpointer:
         for every registered recoverable. In that case, only the found
         savefiles are loaded. When False, loading such a save will raise
         RuntimeError. (default: False)
+    async_save : bool, optional
+        If True, checkpoints are written to disk in a background thread, so
+        that saving does not stall training. The state dicts of the objects
+        saved with torch_save (modules, optimizers, schedulers) are copied
+        to the CPU, and written in the background; other objects are saved
+        right away. The checkpoint directory appears, complete, once
+        written. Finding and loading checkpoints waits for the pending
+        saves. The time spent blocked by saves and the latency of the saves
+        are in ``save_stats``. (default: False)
 
     Example
     -------
@@ -470,6 +529,7 @@ class Checkpointer:
         custom_load_hooks=None,
         custom_save_hooks=None,
         allow_partial_load=False,
+        async_save=False,
     ):
         self.checkpoints_dir = pathlib.Path(checkpoints_dir)
         os.makedirs(self.checkpoints_dir, exist_ok=True)
@@ -483,6 +543,16 @@ class Checkpointer:
         if custom_save_hooks is not None:
             self.custom_save_hooks.update(custom_save_hooks)
         self.allow_partial_load = allow_partial_load
+        self.async_save = async_save
+        self.save_stats = {
+            "num_saves": 0,
+            "last_blocked_time": 0.0,
+            "total_blocked_time": 0.0,
+            "last_save_latency": 0.0,
+            "total_save_latency": 0.0,
+        }
+        self._executor = None
+        self._pending = []
 
     def add_recoverable(
         self, name, obj, custom_load_hook=None, custom_save_hook=None,
@@ -571,8 +641,14 @@ class Checkpointer:
         -------
         Checkpoint
             namedtuple [see above], the saved checkpoint, unless this is run
-            on a non-main process, in which case it returns None.
+            on a non-main process, in which case it returns None. With
+            async_save, the checkpoint may still be being written.
         """
+        if self.async_save:
+            return self._save_checkpoint_async(
+                meta, end_of_epoch, name, verbosity
+            )
+        start = time.time()
         ckpt_dir = None
         if if_main_process():
             if name is None:
@@ -595,33 +671,160 @@ class Checkpointer:
             objfname = f"{name}" + PARAMFILE_EXT
             savepath = ckpt_dir / objfname
             saved_paramfiles[name] = savepath
-
-            # First see if object has custom save hook:
-            if name in self.custom_save_hooks:
-                self.custom_save_hooks[name](obj, savepath)
-                continue
-
-            # Otherwise find the default saver for that type:
-            default_hook = get_default_hook(obj, DEFAULT_SAVE_HOOKS)
-            if default_hook is not None:
-                default_hook(obj, savepath)
-                continue
-
-            # If we got here, no custom hook or registered default hook
-            MSG = f"Don't know how to save {type(obj)}. Register default hook \
-                    or add custom hook for this object."
-            raise RuntimeError(MSG)
+            self._get_save_hook(name, obj)(obj, savepath)
 
         if if_main_process():
             ckpt_type = "end-of-epoch" if end_of_epoch else "intra-epoch"
             logger.log(
                 verbosity, f"Saved an {ckpt_type} checkpoint in {ckpt_dir}"
             )
+            elapsed = time.time() - start
+            self._update_save_stats(elapsed, elapsed)
             return Checkpoint(ckpt_dir, saved_meta, saved_paramfiles)
 
         # Explicity return None if this is not the main process
         return None
 
+    def _get_save_hook(self, name, obj):
+        # First see if object has custom save hook:
+        if name in self.custom_save_hooks:
+            return self.custom_save_hooks[name]
+
+        # Otherwise find the default saver for that type:
+        default_hook = get_default_hook(obj, DEFAULT_SAVE_HOOKS)
+        if default_hook is not None:
+            return default_hook
+
+        # If we got here, no custom hook or registered default hook
+        MSG = f"Don't know how to save {type(obj)}. Register default hook \
+                or add custom hook for this object."
+        raise RuntimeError(MSG)
+
+    def _save_checkpoint_async(self, meta, end_of_epoch, name, verbosity):
+        # Only one save is pending at a time, which bounds the memory used by
+        # the snapshots
+        blocked_time = self._wait_for_pending()
+        start = time.time()
+        ckpt_dir = tmp_dir = None
+        if if_main_process():
+            if name is None:
+                ckpt_dir = self._new_checkpoint_dirpath()
+            else:
+                ckpt_dir = self._custom_checkpoint_dirpath(name)
+            # Not a checkpoint directory until it is renamed
+            tmp_dir = self._tmp_checkpoint_dirpath(ckpt_dir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            saved_meta = self._save_checkpoint_metafile(
+                tmp_dir / METAFNAME, meta, end_of_epoch
+            )
+
+        # Communicate the directories to all procs
+        communication_list = [ckpt_dir, tmp_dir]
+        if torch.distributed.is_initialized():
+            torch.distributed.broadcast_object_list(communication_list, src=0)
+        ckpt_dir, tmp_dir = communication_list
+
+        saved_paramfiles = {}
+        snapshots = []
+        for name, obj in self.recoverables.items():
+            objfname = f"{name}" + PARAMFILE_EXT
+            saved_paramfiles[name] = ckpt_dir / objfname
+            hook = self._get_save_hook(name, obj)
+            if hook is torch_save:
+                if if_main_process():
+                    state_dict = obj.state_dict()
+                    if not state_dict:
+                        logger.warning(
+                            f"Saving an empty state_dict for {obj} in "
+                            f"{ckpt_dir / objfname}."
+                        )
+                    snapshots.append(
+                        (cpu_snapshot(state_dict), tmp_dir / objfname)
+                    )
+            else:
+                hook(obj, tmp_dir / objfname)
+        # Savers running on all processes must be done before the rename
+        ddp_barrier()
+
+        if not if_main_process():
+            return None
+        ckpt_type = "end-of-epoch" if end_of_epoch else "intra-epoch"
+        self._submit(
+            self._write_checkpoint,
+            snapshots,
+            tmp_dir,
+            ckpt_dir,
+            f"Saved an {ckpt_type} checkpoint in {ckpt_dir}",
+            verbosity,
+            start,
+        )
+        blocked_time += time.time() - start
+        self.save_stats["last_blocked_time"] = blocked_time
+        self.save_stats["total_blocked_time"] += blocked_time
+        return Checkpoint(ckpt_dir, saved_meta, saved_paramfiles)
+
+    def _write_checkpoint(
+        self, snapshots, tmp_dir, ckpt_dir, message, verbosity, start
+    ):
+        # Runs in the background thread
+        try:
+            for state_dict, path in snapshots:
+                torch.save(state_dict, path)
+            if ckpt_dir.exists():
+                # Saving again under the same custom name
+                shutil.rmtree(ckpt_dir)
+            os.replace(tmp_dir, ckpt_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        latency = time.time() - start
+        self.save_stats["num_saves"] += 1
+        self.save_stats["last_save_latency"] = latency
+        self.save_stats["total_save_latency"] += latency
+        logger.log(verbosity, f"{message} ({latency:.2f}s in the background)")
+
+    def _update_save_stats(self, blocked_time, latency):
+        self.save_stats["num_saves"] += 1
+        self.save_stats["last_blocked_time"] = blocked_time
+        self.save_stats["total_blocked_time"] += blocked_time
+        self.save_stats["last_save_latency"] = latency
+        self.save_stats["total_save_latency"] += latency
+
+    def _submit(self, fn, *args):
+        # Jobs run one after the other, in the order of submission
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="checkpointer"
+            )
+
+        def job():
+            _background_job.active = True
+            fn(*args)
+
+        self._pending.append(self._executor.submit(job))
+
+    def wait_for_saves(self):
+        """Blocks until the pending asynchronous saves (and deletions) are
+        done. Errors raised in the background are raised here.
+
+        Called before finding or loading checkpoints. The time spent waiting
+        counts in ``save_stats["total_blocked_time"]``.
+        """
+        blocked_time = self._wait_for_pending()
+        self.save_stats["total_blocked_time"] += blocked_time
+
+    def _wait_for_pending(self):
+        # The background jobs list checkpoints too: they must not wait for
+        # themselves
+        if getattr(_background_job, "active", False) or not self._pending:
+            return 0.0
+        start = time.time()
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+        return time.time() - start
+
     def save_and_keep_only(
         self,
         meta={},
@@ -686,7 +889,7 @@ class Checkpointer:
 
         if keep_recent:
             importance_keys.append(ckpt_recency)
-        self.delete_checkpoints(
+        delete_kwargs = dict(
             num_to_keep=num_to_keep,
             max_keys=max_keys,
             min_keys=min_keys,
@@ -694,6 +897,12 @@ class Checkpointer:
             ckpt_predicate=ckpt_predicate,
             verbosity=verbosity,
         )
+        if self.async_save:
+            # Deleted once the new checkpoint is written, in the background
+            if if_main_process():
+                self._submit(self._delete_unprotected, delete_kwargs)
+        else:
+            self.delete_checkpoints(**delete_kwargs)
 
     def find_checkpoint(
         self,
@@ -905,6 +1114,7 @@ class Checkpointer:
         checkpoint : Checkpoint
             Checkpoint to load.
         """
+        self.wait_for_saves()
         self._call_load_hooks(checkpoint, device)
 
     def list_checkpoints(self):
@@ -915,6 +1125,7 @@ class Checkpointer:
         list
             List of Checkpoint namedtuple (see above).
         """
+        self.wait_for_saves()
         return self._construct_checkpoint_objects(self._list_checkpoint_dirs())
 
     def delete_checkpoints(
@@ -977,6 +1188,34 @@ class Checkpointer:
         if num_to_keep < 0:
             raise ValueError("Number of checkpoints to keep must be positive.")
 
+        # Sync before deleting to avoid another process saving at the same time.
+        # This has led to errors as documented here:
+        # https://github.com/speechbrain/speechbrain/issues/2250
+        ddp_barrier()
+
+        self._delete_unprotected(
+            dict(
+                num_to_keep=num_to_keep,
+                min_keys=min_keys,
+                max_keys=max_keys,
+                importance_keys=importance_keys,
+                ckpt_predicate=ckpt_predicate,
+                verbosity=verbosity,
+            )
+        )
+
+        # Sync after deleting to avoid another process saving at the same time.
+        # This has led to errors as documented here:
+        # https://github.com/speechbrain/speechbrain/issues/2250
+        ddp_barrier()
+
+    def _delete_unprotected(self, kwargs):
+        num_to_keep = kwargs["num_to_keep"]
+        min_keys, max_keys = kwargs["min_keys"], kwargs["max_keys"]
+        importance_keys = kwargs["importance_keys"]
+        ckpt_predicate = kwargs["ckpt_predicate"]
+        verbosity = kwargs["verbosity"]
+
         # Build a list of potential deletions and protected checkpoints
         potential_deletions = set()
         protected_checkpoints = set()
@@ -994,21 +1233,11 @@ class Checkpointer:
                 )
             )
 
-        # Sync before deleting to avoid another process saving at the same time.
-        # This has led to errors as documented here:
-        # https://github.com/speechbrain/speechbrain/issues/2250
-        ddp_barrier()
-
         # Delete unprotected checkpoints
         for ckpt in potential_deletions:
             if ckpt not in protected_checkpoints:
                 Checkpointer._delete_checkpoint(ckpt, verbosity=verbosity)
 
-        # Sync after deleting to avoid another process saving at the same time.
-        # This has led to errors as documented here:
-        # https://github.com/speechbrain/speechbrain/issues/2250
-        ddp_barrier()
-
     @staticmethod
     @main_process_only
     def _delete_checkpoint(checkpoint, verbosity=logging.INFO):
@@ -1098,11 +1327,22 @@ class Checkpointer:
         t = time.time()
         stamp = time.strftime("%Y-%m-%d+%H-%M-%S", time.localtime(t))
         suffix_num = 0
-        while (
-            self.checkpoints_dir / f"{CKPT_PREFIX}+{stamp}+{suffix_num:02d}"
-        ).exists():
+        while True:
+            path = (
+                self.checkpoints_dir / f"{CKPT_PREFIX}+{stamp}+{suffix_num:02d}"
+            )
+            # A checkpoint of that name may also be written in the background
+            if not path.exists():
+                if not self._tmp_checkpoint_dirpath(path).exists():
+                    return path
             suffix_num += 1
-        return self.checkpoints_dir / f"{CKPT_PREFIX}+{stamp}+{suffix_num:02d}"
+
+    @staticmethod
+    def _tmp_checkpoint_dirpath(ckpt_dir):
+        # This internal method returns the temporary directory in which an
+        # asynchronous save is written (not a checkpoint directory, since it
+        # does not start with CKPT_PREFIX)
+        return ckpt_dir.parent / f".{ckpt_dir.name}.tmp"
 
     def _custom_checkpoint_dirpath(self, name):
         # This internal method creates a checkpoint name based on a given
@@ -6,6 +6,8 @@ Authors
 """
 
 import collections
+import itertools
+import numpy as np
 
 EDIT_SYMBOLS = {
     "eq": "=",  # when tokens are equal
@@ -113,9 +115,7 @@ def _batch_stats(refs, hyps):
             "The reference and hypothesis batches are not of the same size"
         )
     stats = collections.Counter()
-    for ref_tokens, hyp_tokens in zip(refs, hyps):
-        table = op_table(ref_tokens, hyp_tokens)
-        edits = count_ops(table)
+    for ref_tokens, edits in zip(refs, batch_count_ops(refs, hyps)):
         stats += edits
         stats["num_ref_tokens"] += len(ref_tokens)
     return stats
@@ -252,25 +252,26 @@ def alignment(table):
     while not (i == 0 and j == 0):
         if i == 0:
             j -= 1
-            alignment.insert(0, (EDIT_SYMBOLS["ins"], None, j))
+            alignment.append((EDIT_SYMBOLS["ins"], None, j))
         elif j == 0:
             i -= 1
-            alignment.insert(0, (EDIT_SYMBOLS["del"], i, None))
+            alignment.append((EDIT_SYMBOLS["del"], i, None))
         else:
             if table[i][j] == EDIT_SYMBOLS["ins"]:
                 j -= 1
-                alignment.insert(0, (EDIT_SYMBOLS["ins"], None, j))
+                alignment.append((EDIT_SYMBOLS["ins"], None, j))
             elif table[i][j] == EDIT_SYMBOLS["del"]:
                 i -= 1
-                alignment.insert(0, (EDIT_SYMBOLS["del"], i, None))
+                alignment.append((EDIT_SYMBOLS["del"], i, None))
             elif table[i][j] == EDIT_SYMBOLS["sub"]:
                 i -= 1
                 j -= 1
-                alignment.insert(0, (EDIT_SYMBOLS["sub"], i, j))
+                alignment.append((EDIT_SYMBOLS["sub"], i, j))
             else:
                 i -= 1
                 j -= 1
-                alignment.insert(0, (EDIT_SYMBOLS["eq"], i, j))
+                alignment.append((EDIT_SYMBOLS["eq"], i, j))
+    alignment.reverse()
     return alignment
 
 
@@ -334,6 +335,397 @@ def count_ops(table):
     return edits
 
 
+# Integer codes of the edit operations in the tables of the batched solver.
+_OP_CODES = {"eq": 0, "ins": 1, "del": 2, "sub": 3}
+# Object dtype, so that tables hold the EDIT_SYMBOLS strings themselves.
+_CODE_TO_SYMBOL = np.array(
+    [EDIT_SYMBOLS[op] for op in sorted(_OP_CODES, key=_OP_CODES.get)],
+    dtype=object,
+)
+
+
+def batch_op_tables(refs, hyps, max_batch_size=256, max_table_cells=2 ** 24):
+    """Tables of edit operations for many sequence pairs at once.
+
+    Produces exactly the same tables as calling ``op_table(a, b)`` on each
+    pair (including the Kaldi tie-breaking), but solves the dynamic
+    programming problem row-wise with numpy over a batch of pairs. Within
+    a row, the left-to-right insertion dependency is resolved with a
+    cumulative minimum, so each row costs a handful of array operations.
+
+    The tables have the same format as the ``op_table`` output, so they
+    can be passed directly to ``alignment`` and ``count_ops``.
+
+    Arguments
+    ---------
+    refs : iterable
+        Batch of reference sequences. The tokens must be hashable.
+    hyps : iterable
+        Batch of hypothesis sequences. The tokens must be hashable.
+    max_batch_size : int
+        Maximum number of pairs solved together.
+    max_table_cells : int
+        Maximum number of table cells (over the whole padded batch)
+        allocated at once. Very long pairs are solved one by one.
+
+    Returns
+    -------
+    list
+        One table (list of lists) of size ``[|ref|+1, |hyp|+1]`` per pair.
+
+    Example
+    -------
+    >>> tables = batch_op_tables([[1,2,3]], [[1,2,4]])
+    >>> for row in tables[0]:
+    ...     print(row)
+    ['=', 'I', 'I', 'I']
+    ['D', '=', 'I', 'I']
+    ['D', 'D', '=', 'I']
+    ['D', 'D', 'D', 'S']
+    >>> print(alignment(tables[0]))
+    [('=', 0, 0), ('=', 1, 1), ('S', 2, 2)]
+    """
+    refs, hyps = _encode_batch(refs, hyps)
+    tables = [None] * len(refs)
+    for chunk in _length_sorted_chunks(
+        refs, hyps, max_batch_size, max_table_cells
+    ):
+        codes = _solve_edit_distance(
+            [refs[k] for k in chunk], [hyps[k] for k in chunk], True
+        )[1]
+        symbols = _CODE_TO_SYMBOL[codes]
+        for row, k in enumerate(chunk):
+            table = symbols[row, : len(refs[k]) + 1, : len(hyps[k]) + 1]
+            tables[k] = table.tolist()
+    return tables
+
+
+def batch_alignments(refs, hyps, max_batch_size=256, max_table_cells=2 ** 24):
+    """Edit distance alignments for many sequence pairs at once.
+
+    Gives the same alignments as ``alignment(op_table(a, b))`` for each
+    pair. The tables are solved as in ``batch_op_tables``, but they are
+    walked back directly in their compact form, for all pairs in lockstep,
+    without building the tables of edit symbols.
+
+    Arguments
+    ---------
+    refs : iterable
+        Batch of reference sequences. The tokens must be hashable.
+    hyps : iterable
+        Batch of hypothesis sequences. The tokens must be hashable.
+    max_batch_size : int
+        Maximum number of pairs solved together.
+    max_table_cells : int
+        Maximum number of table cells (over the whole padded batch)
+        allocated at once.
+
+    Returns
+    -------
+    list
+        One alignment per pair, see ``alignment``.
+
+    Example
+    -------
+    >>> batch_alignments([[1,2,3], [4,5,6]], [[1,2,4], [5,6]])
+    [[('=', 0, 0), ('=', 1, 1), ('S', 2, 2)], [('D', 0, None), ('=', 1, 0), ('=', 2, 1)]]
+    """
+    return _batch_alignments_and_ops(
+        refs, hyps, max_batch_size, max_table_cells
+    )[0]
+
+
+def _batch_alignments_and_ops(refs, hyps, max_batch_size, max_table_cells):
+    """Alignments and counts of the edit operations of many pairs."""
+    refs, hyps = _encode_batch(refs, hyps)
+    alignments = [None] * len(refs)
+    counts = [None] * len(refs)
+    for chunk in _length_sorted_chunks(
+        refs, hyps, max_batch_size, max_table_cells
+    ):
+        chunk_refs = [refs[k] for k in chunk]
+        chunk_hyps = [hyps[k] for k in chunk]
+        codes = _solve_edit_distance(chunk_refs, chunk_hyps, True)[1]
+        ops, ref_idx, hyp_idx, lengths = _backtrace(
+            codes,
+            [len(seq) for seq in chunk_refs],
+            [len(seq) for seq in chunk_hyps],
+        )
+        num_ops = np.stack(
+            [
+                (ops == _OP_CODES[op]).sum(axis=1)
+                for op in ("ins", "del", "sub")
+            ],
+            axis=1,
+        ).tolist()
+        for row, k in enumerate(chunk):
+            # The path was collected backwards
+            length = lengths[row]
+            path = zip(
+                _CODE_TO_SYMBOL[ops[row, :length][::-1]].tolist(),
+                ref_idx[row, :length][::-1].tolist(),
+                hyp_idx[row, :length][::-1].tolist(),
+            )
+            alignments[k] = [
+                (
+                    op,
+                    None if op == EDIT_SYMBOLS["ins"] else i,
+                    None if op == EDIT_SYMBOLS["del"] else j,
+                )
+                for op, i, j in path
+            ]
+            edits = collections.Counter()
+            for key, value in zip(
+                ("insertions", "deletions", "substitutions"), num_ops[row]
+            ):
+                if value:
+                    edits[key] = value
+            counts[k] = edits
+    return alignments, counts
+
+
+def batch_count_ops(refs, hyps, max_batch_size=256):
+    """Counts of the edit operations for many sequence pairs at once.
+
+    Gives the same counts as ``count_ops(op_table(a, b))`` for each pair,
+    but never builds the tables: the insertion and deletion counts along
+    the (Kaldi tie-broken) shortest edit path are carried through the
+    dynamic programming rows, and the substitutions are the remainder of
+    the edit distance. Memory is linear in the hypothesis length.
+
+    Arguments
+    ---------
+    refs : iterable
+        Batch of reference sequences. The tokens must be hashable.
+    hyps : iterable
+        Batch of hypothesis sequences. The tokens must be hashable.
+    max_batch_size : int
+        Maximum number of pairs solved together.
+
+    Returns
+    -------
+    list
+        One collections.Counter per pair, see ``count_ops``.
+
+    Example
+    -------
+    >>> refs = [[1,2,3], [4,5,6]]
+    >>> hyps = [[1,2,4], [5,6]]
+    >>> print(batch_count_ops(refs, hyps))
+    [Counter({'substitutions': 1}), Counter({'deletions': 1})]
+    """
+    refs, hyps = _encode_batch(refs, hyps)
+    counts = [None] * len(refs)
+    for chunk in _length_sorted_chunks(refs, hyps, max_batch_size, None):
+        ops = _solve_edit_distance(
+            [refs[k] for k in chunk], [hyps[k] for k in chunk], False
+        )[0]
+        for row, k in enumerate(chunk):
+            num_edits, dels = ops[row].tolist()
+            ins = len(hyps[k]) - len(refs[k]) + dels
+            edits = collections.Counter()
+            for key, value in (
+                ("insertions", ins),
+                ("deletions", dels),
+                ("substitutions", num_edits - ins - dels),
+            ):
+                if value:
+                    edits[key] = value
+            counts[k] = edits
+    return counts
+
+
+def _encode_batch(refs, hyps):
+    """Maps the tokens of all pairs to shared integer ids."""
+    refs, hyps = list(refs), list(hyps)
+    if len(refs) != len(hyps):
+        raise ValueError(
+            "The reference and hypothesis batches are not of the same size"
+        )
+    # Tensors and arrays hash by identity, their lists by value
+    refs = [seq.tolist() if hasattr(seq, "tolist") else seq for seq in refs]
+    hyps = [seq.tolist() if hasattr(seq, "tolist") else seq for seq in hyps]
+    tokens = dict.fromkeys(itertools.chain(*refs, *hyps))
+    vocab = dict(zip(tokens, range(len(tokens))))
+    encode = vocab.__getitem__
+    return (
+        [list(map(encode, seq)) for seq in refs],
+        [list(map(encode, seq)) for seq in hyps],
+    )
+
+
+def _length_sorted_chunks(refs, hyps, max_batch_size, max_table_cells):
+    """Groups pair indices of similar lengths, to keep padding small."""
+    order = sorted(range(len(refs)), key=lambda k: (len(refs[k]), len(hyps[k])))
+    chunk = []
+    max_ref = max_hyp = 0
+    for k in order:
+        new_ref = max(max_ref, len(refs[k]))
+        new_hyp = max(max_hyp, len(hyps[k]))
+        cells = (len(chunk) + 1) * (new_ref + 1) * (new_hyp + 1)
+        if chunk and (
+            len(chunk) == max_batch_size
+            or (max_table_cells is not None and cells > max_table_cells)
+        ):
+            yield chunk
+            chunk = []
+            new_ref, new_hyp = len(refs[k]), len(hyps[k])
+        chunk.append(k)
+        max_ref, max_hyp = new_ref, new_hyp
+    if chunk:
+        yield chunk
+
+
+def _solve_edit_distance(refs, hyps, return_tables):
+    """Batched row-wise Levenshtein DP with Kaldi tie-breaking.
+
+    Arguments
+    ---------
+    refs : list
+        Integer encoded reference sequences.
+    hyps : list
+        Integer encoded hypothesis sequences.
+    return_tables : bool
+        Whether to also build the (padded) tables of operation codes.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape ``[batch, 2]`` with the edit distance and the number
+        of deletions of each pair (only filled if not return_tables).
+    numpy.ndarray
+        Operation codes of shape ``[batch, max_ref+1, max_hyp+1]``,
+        or None if not return_tables.
+    """
+    batch = len(refs)
+    ref_lens = np.array([len(seq) for seq in refs], dtype=np.int64)
+    hyp_lens = np.array([len(seq) for seq in hyps], dtype=np.int64)
+    max_ref, max_hyp = int(ref_lens.max()), int(hyp_lens.max())
+    # Padding never matches, and only cells up to the true lengths are read.
+    ref_codes = _pad_codes(refs, ref_lens, max_ref, -1)
+    hyp_codes = _pad_codes(hyps, hyp_lens, max_hyp, -2)
+
+    columns = np.arange(max_hyp + 1, dtype=np.int32)
+    offsets = np.arange(batch, dtype=np.int32)[:, None] * (max_hyp + 1)
+    # First row: only insertions.
+    prev = np.broadcast_to(columns, (batch, max_hyp + 1)).copy()
+    prev_del = np.zeros_like(prev)
+    tables = None
+    if return_tables:
+        tables = np.empty((batch, max_ref + 1, max_hyp + 1), dtype=np.uint8)
+        tables[:, 0, :] = _OP_CODES["ins"]
+        tables[:, 0, 0] = _OP_CODES["eq"]
+    # Empty references: only insertions.
+    result = np.stack([hyp_lens, np.zeros_like(hyp_lens)], axis=1)
+
+    best = np.empty_like(prev)
+    curr_ops = np.empty((batch, max_hyp + 1), dtype=np.uint8)
+    curr_ops[:, 0] = _OP_CODES["del"]
+    for i in range(1, max_ref + 1):
+        mismatch = ref_codes[:, i - 1, None] != hyp_codes
+        sub_cost = prev[:, :-1] + mismatch
+        del_cost = prev[:, 1:] + 1
+        # Best cost without insertions, then resolve the insertion chain:
+        # curr[j] = min_k (best[k] + j - k), a cumulative minimum.
+        best[:, 0] = i
+        np.minimum(sub_cost, del_cost, out=best[:, 1:])
+        best -= columns
+        curr = np.minimum.accumulate(best, axis=1)
+        curr += columns
+        ins_cost = curr[:, :-1] + 1
+        # Kaldi compute-wer order, as in op_table:
+        # insertion > deletion > substitution in ties
+        take_sub = (sub_cost < ins_cost) & (sub_cost < del_cost)
+        take_del = ~take_sub & (del_cost < ins_cost)
+        if return_tables:
+            curr_ops[:, 1:] = np.where(
+                take_sub,
+                np.where(mismatch, _OP_CODES["sub"], _OP_CODES["eq"]),
+                np.where(take_del, _OP_CODES["del"], _OP_CODES["ins"]),
+            )
+            tables[:, i, :] = curr_ops
+        else:
+            # Along the path i - deletions == j - insertions, so only the
+            # deletions need to be followed. Insertion runs keep the count
+            # of the last non-insertion cell on their left.
+            source = np.where(take_sub | take_del, columns[1:], 0)
+            source = np.maximum.accumulate(source, axis=1)
+            base_del = np.empty_like(prev)
+            base_del[:, 0] = i
+            base_del[:, 1:] = np.where(
+                take_del, prev_del[:, 1:] + 1, prev_del[:, :-1]
+            )
+            prev_del[:, 0] = i
+            prev_del[:, 1:] = base_del.ravel()[source + offsets]
+
+            ends = np.nonzero(ref_lens == i)[0]
+            if len(ends):
+                last = hyp_lens[ends]
+                result[ends, 0] = curr[ends, last]
+                result[ends, 1] = prev_del[ends, last]
+        prev = curr
+    return result, tables
+
+
+def _backtrace(tables, ref_lens, hyp_lens):
+    """Walks back padded tables of operation codes, all pairs in lockstep.
+
+    Arguments
+    ---------
+    tables : numpy.ndarray
+        Operation codes from ``_solve_edit_distance``.
+    ref_lens : list
+        Reference lengths, the walk of each pair starts at
+        ``(ref_lens[k], hyp_lens[k])``.
+    hyp_lens : list
+        Hypothesis lengths.
+
+    Returns
+    -------
+    numpy.ndarray
+        Operation codes along each path, from the end to the start.
+    numpy.ndarray
+        The reference index of each operation.
+    numpy.ndarray
+        The hypothesis index of each operation.
+    numpy.ndarray
+        The number of operations on each path.
+    """
+    batch = tables.shape[0]
+    rows = np.arange(batch)
+    i = np.array(ref_lens, dtype=np.int64)
+    j = np.array(hyp_lens, dtype=np.int64)
+    max_steps = int((i + j).max()) if batch else 0
+    ops = np.full((batch, max_steps), 255, dtype=np.uint8)
+    ref_idx = np.empty((batch, max_steps), dtype=np.int64)
+    hyp_idx = np.empty((batch, max_steps), dtype=np.int64)
+    lengths = np.zeros(batch, dtype=np.int64)
+    for step in range(max_steps):
+        active = (i > 0) | (j > 0)
+        if not active.any():
+            break
+        # The first row and column of the tables already hold the
+        # insertions and deletions at the edges.
+        op = np.where(active, tables[rows, i, j], 255)
+        ops[:, step] = op
+        ref_idx[:, step] = i - 1
+        hyp_idx[:, step] = j - 1
+        lengths += active
+        i -= active & (op != _OP_CODES["ins"])
+        j -= active & (op != _OP_CODES["del"])
+    return ops, ref_idx, hyp_idx, lengths
+
+
+def _pad_codes(seqs, lens, max_len, pad_value):
+    """Stacks integer sequences into a padded [batch, max_len] array."""
+    codes = np.full((len(seqs), max_len), pad_value, dtype=np.int64)
+    flat = np.fromiter(
+        itertools.chain.from_iterable(seqs), dtype=np.int64, count=lens.sum()
+    )
+    codes[np.arange(max_len) < lens[:, None]] = flat
+    return codes
+
+
 def _batch_to_dict_format(ids, seqs):
     # Used by wer_details_for_batch
     return dict(zip(ids, seqs))
@@ -441,6 +833,8 @@ def wer_details_by_utterance(
         If scoring mode is 'strict' and a hypothesis is not found.
     """
     details_by_utterance = []
+    # Pairs to score, solved together after the loop
+    scored_details, scored_refs, scored_hyps = [], [], []
     for key, ref_tokens in ref_dict.items():
         # Initialize utterance_details
         utterance_details = {
@@ -476,9 +870,21 @@ def wer_details_by_utterance(
             )
         else:
             raise ValueError("Invalid scoring mode: " + scoring_mode)
-        # Compute edits for this utterance
-        table = op_table(ref_tokens, hyp_tokens)
-        ops = count_ops(table)
+        details_by_utterance.append(utterance_details)
+        scored_details.append(utterance_details)
+        scored_refs.append(ref_tokens)
+        scored_hyps.append(hyp_tokens)
+    # Compute edits for all scored utterances at once; the tables of edit
+    # operations are only solved if the alignments are needed.
+    if compute_alignments:
+        alignments, all_ops = _batch_alignments_and_ops(
+            scored_refs, scored_hyps, 256, 2 ** 24
+        )
+    else:
+        all_ops = batch_count_ops(scored_refs, scored_hyps)
+    for k, utterance_details in enumerate(scored_details):
+        ref_tokens, hyp_tokens = scored_refs[k], scored_hyps[k]
+        ops = all_ops[k]
         # Take into account "" outputs as empty
         if ref_tokens[0] == "" and hyp_tokens[0] == "":
             num_ref_tokens = 0
@@ -497,12 +903,11 @@ def wer_details_by_utterance(
                 "insertions": ops["insertions"],
                 "deletions": ops["deletions"],
                 "substitutions": ops["substitutions"],
-                "alignment": alignment(table) if compute_alignments else None,
+                "alignment": alignments[k] if compute_alignments else None,
                 "ref_tokens": ref_tokens if compute_alignments else None,
                 "hyp_tokens": hyp_tokens if compute_alignments else None,
             }
         )
-        details_by_utterance.append(utterance_details)
     return details_by_utterance
 
 
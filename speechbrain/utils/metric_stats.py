@@ -442,26 +442,12 @@ class BinaryMetricStats(MetricStats):
                 if len(positive_scores) > max_samples:
                     positive_scores, _ = torch.sort(positive_scores)
                     positive_scores = positive_scores[
-                        [
-                            i
-                            for i in range(
-                                0,
-                                len(positive_scores),
-                                int(len(positive_scores) / max_samples),
-                            )
-                        ]
+                        :: int(len(positive_scores) / max_samples)
                     ]
                 if len(negative_scores) > max_samples:
                     negative_scores, _ = torch.sort(negative_scores)
                     negative_scores = negative_scores[
-                        [
-                            i
-                            for i in range(
-                                0,
-                                len(negative_scores),
-                                int(len(negative_scores) / max_samples),
-                            )
-                        ]
+                        :: int(len(negative_scores) / max_samples)
                     ]
 
             eer, threshold = EER(positive_scores, negative_scores)
@@ -500,6 +486,10 @@ class BinaryMetricStats(MetricStats):
 def EER(positive_scores, negative_scores):
     """Computes the EER (and its threshold).
 
+    The scores are sorted once, and the error rates at every distinct score
+    are computed with cumulative sums, so the cost is O(N log N) in the
+    number of trials.
+
     Arguments
     ---------
     positive_scores : torch.tensor
@@ -515,39 +505,19 @@ def EER(positive_scores, negative_scores):
     >>> val_eer
     0.0
     """
+    thresholds, FRR, FAR = _error_rates(positive_scores, negative_scores)
 
-    # Computing candidate thresholds
-    thresholds, _ = torch.sort(torch.cat([positive_scores, negative_scores]))
-    thresholds = torch.unique(thresholds)
-
-    # Adding intermediate thresholds
+    # Adding intermediate thresholds, with the rates of the highest score
+    # below them (they may round to one of their neighbours)
     interm_thresholds = (thresholds[0:-1] + thresholds[1:]) / 2
-    thresholds, _ = torch.sort(torch.cat([thresholds, interm_thresholds]))
-
-    # Variable to store the min FRR, min FAR and their corresponding index
-    min_index = 0
-    final_FRR = 0
-    final_FAR = 0
-
-    for i, cur_thresh in enumerate(thresholds):
-        pos_scores_threshold = positive_scores <= cur_thresh
-        FRR = (pos_scores_threshold.sum(0)).float() / positive_scores.shape[0]
-        del pos_scores_threshold
-
-        neg_scores_threshold = negative_scores > cur_thresh
-        FAR = (neg_scores_threshold.sum(0)).float() / negative_scores.shape[0]
-        del neg_scores_threshold
-
-        # Finding the threshold for EER
-        if (FAR - FRR).abs().item() < abs(final_FAR - final_FRR) or i == 0:
-            min_index = i
-            final_FRR = FRR.item()
-            final_FAR = FAR.item()
-
-    # It is possible that eer != fpr != fnr. We return (FAR  + FRR) / 2 as EER.
-    EER = (final_FAR + final_FRR) / 2
+    below = torch.searchsorted(thresholds, interm_thresholds, right=True) - 1
+    order = torch.arange(len(thresholds) + len(interm_thresholds))
+    order = torch.cat([order[0::2], order[1::2]]).argsort()
+    thresholds = torch.cat([thresholds, interm_thresholds])[order]
+    FRR = torch.cat([FRR, FRR[below]])[order]
+    FAR = torch.cat([FAR, FAR[below]])[order]
 
-    return float(EER), float(thresholds[min_index])
+    return _eer_from_rates(thresholds, FRR, FAR)
 
 
 def minDCF(
@@ -584,39 +554,160 @@ def minDCF(
     >>> val_minDCF
     0.0
     """
+    thresholds, p_miss, p_fa = _error_rates(positive_scores, negative_scores)
+    return _min_dcf_from_rates(thresholds, p_miss, p_fa, c_miss, c_fa, p_target)
 
-    # Computing candidate thresholds
-    thresholds, _ = torch.sort(torch.cat([positive_scores, negative_scores]))
-    thresholds = torch.unique(thresholds)
 
-    # Adding intermediate thresholds
-    interm_thresholds = (thresholds[0:-1] + thresholds[1:]) / 2
-    thresholds, _ = torch.sort(torch.cat([thresholds, interm_thresholds]))
-
-    # Computing False Rejection Rate (miss detection)
-    positive_scores = torch.cat(
-        len(thresholds) * [positive_scores.unsqueeze(0)]
-    )
-    pos_scores_threshold = positive_scores.transpose(0, 1) <= thresholds
-    p_miss = (pos_scores_threshold.sum(0)).float() / positive_scores.shape[1]
-    del positive_scores
-    del pos_scores_threshold
-
-    # Computing False Acceptance Rate (false alarm)
-    negative_scores = torch.cat(
-        len(thresholds) * [negative_scores.unsqueeze(0)]
-    )
-    neg_scores_threshold = negative_scores.transpose(0, 1) > thresholds
-    p_fa = (neg_scores_threshold.sum(0)).float() / negative_scores.shape[1]
-    del negative_scores
-    del neg_scores_threshold
+def _error_rates(positive_scores, negative_scores):
+    """Computes the miss and false alarm rates at every candidate threshold.
+
+    A trial is rejected when its score is lower than or equal to the
+    threshold. The candidate thresholds are the distinct scores: a threshold
+    in between two consecutive scores gives the same rates as the lower one.
+
+    Arguments
+    ---------
+    positive_scores : torch.tensor
+        The scores from entries of the same class.
+    negative_scores : torch.tensor
+        The scores from entries of different classes.
+
+    Returns
+    -------
+    thresholds : torch.tensor
+        The distinct scores, sorted.
+    p_miss : torch.tensor
+        The fraction of positive scores <= each threshold (FRR).
+    p_fa : torch.tensor
+        The fraction of negative scores > each threshold (FAR).
+    """
+    num_positives = positive_scores.shape[0]
+    num_negatives = negative_scores.shape[0]
+    scores, order = torch.sort(torch.cat([positive_scores, negative_scores]))
+    is_positive = (order < num_positives).long()
+    thresholds, counts = torch.unique_consecutive(scores, return_counts=True)
+    # Last position of each distinct score in the sorted scores
+    ends = torch.cumsum(counts, dim=0) - 1
+    positives_below = torch.cumsum(is_positive, dim=0)[ends]
+    negatives_above = num_negatives - (ends + 1 - positives_below)
+    p_miss = positives_below.float() / num_positives
+    p_fa = negatives_above.float() / num_negatives
+    return thresholds, p_miss, p_fa
+
+
+def _eer_from_rates(thresholds, FRR, FAR):
+    """Finds the threshold where FAR and FRR are closest, returns their mean
+    and the threshold.
+
+    Going through the thresholds in order, the closest one so far is
+    replaced when a threshold is strictly closer (its difference, in the
+    precision of the rates, is compared with the closest difference in
+    double precision). A smaller difference always wins, so the result is
+    the first threshold with the smallest difference, or one of the later
+    thresholds tied with it.
+    """
+    differences = (FAR - FRR).abs()
+    ties = (differences == differences.min()).nonzero(as_tuple=True)[0]
+    ties = ties.tolist()
+    min_index = ties[0]
+    for i in ties[1:]:
+        closest = abs(FAR[min_index].item() - FRR[min_index].item())
+        if differences[i].item() < closest:
+            min_index = i
+
+    # It is possible that eer != fpr != fnr. We return (FAR  + FRR) / 2 as EER.
+    EER = (FAR[min_index].item() + FRR[min_index].item()) / 2
+    return float(EER), float(thresholds[min_index])
+
 
+def _min_dcf_from_rates(thresholds, p_miss, p_fa, c_miss, c_fa, p_target):
+    """Finds the minimum of the detection cost function and its threshold."""
     c_det = c_miss * p_miss * p_target + c_fa * p_fa * (1 - p_target)
     c_min, min_index = torch.min(c_det, dim=0)
-
     return float(c_min), float(thresholds[min_index])
 
 
+class ScoreHistogram:
+    """Streaming EER and minDCF, from histograms of the scores.
+
+    For verification lists with too many trials to keep all the scores in
+    memory, the positive and negative scores are counted in ``num_bins``
+    bins of equal width over ``[min_score, max_score]`` (scores outside the
+    range fall in the first or last bin). Memory is O(num_bins) whatever
+    the number of trials, and the candidate thresholds are the bin edges,
+    so the results are within one bin of the exact ``EER`` and ``minDCF``.
+
+    Arguments
+    ---------
+    min_score : float
+        Lower bound of the score range, e.g. -1 for cosine scores.
+    max_score : float
+        Upper bound of the score range.
+    num_bins : int
+        Number of bins. The threshold resolution is
+        ``(max_score - min_score) / num_bins``.
+
+    Example
+    -------
+    >>> histogram = ScoreHistogram(min_score=0.0, max_score=1.0, num_bins=100)
+    >>> histogram.append(torch.tensor([0.6, 0.7]), torch.tensor([0.4, 0.3]))
+    >>> histogram.append(torch.tensor([0.8, 0.5]), torch.tensor([0.2, 0.1]))
+    >>> val_eer, threshold = histogram.EER()
+    >>> val_eer
+    0.0
+    >>> val_minDCF, threshold = histogram.minDCF()
+    >>> val_minDCF
+    0.0
+    """
+
+    def __init__(self, min_score=-1.0, max_score=1.0, num_bins=100000):
+        self.min_score = min_score
+        self.max_score = max_score
+        self.num_bins = num_bins
+        self.clear()
+
+    def clear(self):
+        """Resets the counts."""
+        self.positive_counts = torch.zeros(self.num_bins, dtype=torch.long)
+        self.negative_counts = torch.zeros(self.num_bins, dtype=torch.long)
+
+    def append(self, positive_scores, negative_scores):
+        """Counts a chunk of positive and negative scores."""
+        self.positive_counts += self._count(positive_scores)
+        self.negative_counts += self._count(negative_scores)
+
+    def _count(self, scores):
+        scores = scores.detach().flatten().double().cpu()
+        width = (self.max_score - self.min_score) / self.num_bins
+        bins = ((scores - self.min_score) / width).floor().long()
+        bins = bins.clamp(0, self.num_bins - 1)
+        return torch.bincount(bins, minlength=self.num_bins)
+
+    def _error_rates(self):
+        """Rates at the upper edge of every bin."""
+        thresholds = torch.linspace(
+            self.min_score,
+            self.max_score,
+            self.num_bins + 1,
+            dtype=torch.float64,
+        )[1:]
+        positives_below = torch.cumsum(self.positive_counts, dim=0)
+        negatives_below = torch.cumsum(self.negative_counts, dim=0)
+        num_positives = positives_below[-1].item()
+        num_negatives = negatives_below[-1].item()
+        p_miss = positives_below.double() / num_positives
+        p_fa = (num_negatives - negatives_below).double() / num_negatives
+        return thresholds, p_miss, p_fa
+
+    def EER(self):
+        """Computes the EER (and its threshold), see ``EER``."""
+        return _eer_from_rates(*self._error_rates())
+
+    def minDCF(self, c_miss=1.0, c_fa=1.0, p_target=0.01):
+        """Computes the minDCF (and its threshold), see ``minDCF``."""
+        return _min_dcf_from_rates(*self._error_rates(), c_miss, c_fa, p_target)
+
+
 class ClassificationStats(MetricStats):
     """Computes statistics pertaining to multi-label
     classification tasks, as well as tasks that can be loosely interpreted as such for the purpose of
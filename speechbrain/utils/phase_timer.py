@@ -0,0 +1,149 @@
+"""Lightweight timing of the phases of training steps.
+
+Unlike ``speechbrain.utils.profiling``, this is cheap enough to be always
+on: recording a phase is a ``time.perf_counter()`` call and an append to a
+bounded deque, and the percentiles are only computed for the summary.
+
+Times are measured on the host: on GPUs, they include the device time only
+where the host waits for the device (e.g. when reading the loss).
+
+Example
+-------
+>>> timer = PhaseTimer()
+>>> for batch in timer.timed(range(3)):
+...     with timer.time("compute"):
+...         pass
+...     timer.add_batch(4, audio_seconds=2.0)
+>>> summary = timer.summary()
+>>> summary["steps"], summary["samples"], summary["audio_seconds"]
+(3, 12, 6.0)
+>>> sorted(k for k in summary if k.startswith("compute"))
+['compute_time_p50', 'compute_time_p95']
+"""
+
+import collections
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class PhaseTimer:
+    """Records the duration of named phases, and the amount of data processed.
+
+    Keeps the last ``window`` durations of each phase, and reports their
+    median and 95th percentile, along with the throughput since the last
+    ``reset()``.
+
+    Arguments
+    ---------
+    window : int
+        Number of durations kept for each phase.
+    percentiles : list of int
+        The percentiles reported.
+    """
+
+    def __init__(self, window=1000, percentiles=[50, 95]):
+        self.window = window
+        self.percentiles = percentiles
+        self.reset()
+
+    def reset(self):
+        """Forgets everything, and restarts the clock of the throughput."""
+        self.durations = collections.defaultdict(
+            lambda: collections.deque(maxlen=self.window)
+        )
+        self.steps = 0
+        self.samples = 0
+        self.audio_seconds = 0.0
+        self.start_time = time.perf_counter()
+
+    def record(self, phase, seconds):
+        """Records one duration of a phase.
+
+        Arguments
+        ---------
+        phase : str
+            Name of the phase, e.g. "data".
+        seconds : float
+            The duration.
+        """
+        self.durations[phase].append(seconds)
+
+    @contextmanager
+    def time(self, phase):
+        """Context manager recording the duration of its block.
+
+        Arguments
+        ---------
+        phase : str
+            Name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def timed(self, batches):
+        """Iterates over batches, recording the time waiting for each one
+        (phase "data") and the time of each step, from the end of the
+        previous one (phase "step").
+
+        Arguments
+        ---------
+        batches : iterable
+            E.g. a DataLoader.
+        """
+        start = time.perf_counter()
+        for batch in batches:
+            self.record("data", time.perf_counter() - start)
+            yield batch
+            end = time.perf_counter()
+            self.record("step", end - start)
+            self.steps += 1
+            start = end
+
+    def add_batch(self, num_samples, audio_seconds=None):
+        """Counts the data of a batch in the throughput.
+
+        Arguments
+        ---------
+        num_samples : int
+            Number of examples in the batch.
+        audio_seconds : float, torch.Tensor, optional
+            Duration of the audio in the batch. A tensor is accumulated as
+            is (possibly on a device) and only read by ``summary()``.
+        """
+        self.samples += num_samples
+        if audio_seconds is not None:
+            self.audio_seconds += audio_seconds
+
+    def summary(self):
+        """Returns the statistics of the phases and the throughput.
+
+        Returns
+        -------
+        dict
+            With "<phase>_time_p<percentile>" for every phase and percentile
+            (in seconds), "steps", "samples", "samples_per_second",
+            "stage_time", and "audio_seconds" and "audio_seconds_per_second"
+            if the duration of the audio was given.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        stats = {}
+        for phase, durations in self.durations.items():
+            values = np.percentile(durations, self.percentiles)
+            for percentile, value in zip(self.percentiles, values):
+                stats[f"{phase}_time_p{percentile}"] = float(value)
+        stats["steps"] = self.steps
+        stats["stage_time"] = elapsed
+        stats["samples"] = self.samples
+        stats["samples_per_second"] = self.samples / max(elapsed, 1e-9)
+        audio_seconds = float(self.audio_seconds)
+        if audio_seconds > 0:
+            stats["audio_seconds"] = audio_seconds
+            stats["audio_seconds_per_second"] = audio_seconds / max(
+                elapsed, 1e-9
+            )
+        return stats
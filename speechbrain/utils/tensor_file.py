@@ -0,0 +1,322 @@
+"""Memory-mapped tensor files for parameter loading.
+
+A tensor file stores a flat dict of tensors in the safetensors layout: an
+8-byte little-endian header size, a JSON header giving the dtype, shape and
+byte offsets of each tensor, and then the raw tensor data, one contiguous
+buffer. Loading such a file does not deserialize anything: the file is
+memory-mapped, and the tensors are views on the mapping, so the parameters
+are read straight from the page cache when copied into a module, and pages
+are only read when needed.
+
+Tensor files keep the ``.ckpt`` extension of the other parameter files, the
+default load and transfer hooks of ``speechbrain.utils.checkpoints`` detect
+the format. Existing checkpoints of modules can be converted with
+``convert_to_tensor_file``.
+
+Example
+-------
+>>> tmpdir = getfixture("tmpdir")
+>>> module = torch.nn.Linear(3, 2)
+>>> path = tmpdir / "model.ckpt"
+>>> save_tensor_file(module.state_dict(), path)
+>>> is_tensor_file(path)
+True
+>>> other = torch.nn.Linear(3, 2)
+>>> load_tensor_file_into(other, path)
+<All keys matched successfully>
+>>> torch.equal(other.weight, module.weight)
+True
+"""
+
+import collections
+import json
+import logging
+import mmap
+import os
+import pathlib
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+HEADER_SIZE_BYTES = 8
+METADATA_KEY = "__metadata__"
+
+# The dtype names of the safetensors format
+DTYPES = {
+    "BOOL": torch.bool,
+    "U8": torch.uint8,
+    "I8": torch.int8,
+    "I16": torch.int16,
+    "I32": torch.int32,
+    "I64": torch.int64,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "F32": torch.float32,
+    "F64": torch.float64,
+}
+DTYPE_NAMES = {dtype: name for name, dtype in DTYPES.items()}
+
+
+def save_tensor_file(tensors, path, metadata=None):
+    """Saves a flat dict of tensors as a tensor file.
+
+    The tensors are copied to the CPU. The largest elements come first, so
+    that every tensor is aligned in the file.
+
+    Arguments
+    ---------
+    tensors : dict
+        Mapping from name to torch.Tensor, e.g. the state_dict of a module.
+    path : str, pathlib.Path
+        Path where to save to.
+    metadata : dict, optional
+        Mapping from str to str, saved in the header.
+    """
+    tensors = {
+        name: tensor.detach().cpu().contiguous()
+        for name, tensor in tensors.items()
+    }
+    for name, tensor in tensors.items():
+        if tensor.dtype not in DTYPE_NAMES:
+            raise ValueError(
+                f"Cannot save {name} of dtype {tensor.dtype} in a tensor file"
+            )
+    names = sorted(tensors, key=lambda n: (-tensors[n].element_size(), n))
+    header = collections.OrderedDict()
+    if metadata is not None:
+        header[METADATA_KEY] = {str(k): str(v) for k, v in metadata.items()}
+    offset = 0
+    for name in names:
+        tensor = tensors[name]
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {
+            "dtype": DTYPE_NAMES[tensor.dtype],
+            "shape": list(tensor.shape),
+            "data_offsets": [offset, offset + nbytes],
+        }
+        offset += nbytes
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Pad with spaces, so that the data starts on an 8-byte boundary
+    header += b" " * (-len(header) % 8)
+    with open(path, "wb") as fo:
+        fo.write(len(header).to_bytes(HEADER_SIZE_BYTES, "little"))
+        fo.write(header)
+        for name in names:
+            tensor = tensors[name].reshape(-1)
+            if tensor.numel() > 0:
+                fo.write(tensor.view(torch.uint8).numpy().data)
+
+
+def is_tensor_file(path):
+    """Checks whether the file at path is a tensor file (rather than e.g.
+    a file written by torch.save).
+
+    Arguments
+    ---------
+    path : str, pathlib.Path
+        Path of the file.
+
+    Returns
+    -------
+    bool
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as fi:
+            header_size = int.from_bytes(fi.read(HEADER_SIZE_BYTES), "little")
+            if not 2 <= header_size <= size - HEADER_SIZE_BYTES:
+                return False
+            return fi.read(1) == b"{"
+    except OSError:
+        return False
+
+
+class TensorFile:
+    """A memory-mapped tensor file.
+
+    The tensors are views on the mapping: they are read from the file when
+    used, and the pages of the file can be released once the tensors have
+    been copied, see ``release``. The mapping is copy-on-write, modifying
+    the tensors does not modify the file.
+
+    Arguments
+    ---------
+    path : str, pathlib.Path
+        Path of the tensor file.
+
+    Example
+    -------
+    >>> tmpdir = getfixture("tmpdir")
+    >>> save_tensor_file({"a": torch.arange(3)}, tmpdir / "a.ckpt", {"k": 1})
+    >>> tensor_file = TensorFile(tmpdir / "a.ckpt")
+    >>> tensor_file["a"]
+    tensor([0, 1, 2])
+    >>> tensor_file.metadata
+    {'k': '1'}
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        if not is_tensor_file(path):
+            raise ValueError(f"{path} is not a tensor file")
+        with open(path, "rb") as fi:
+            header_size = int.from_bytes(fi.read(HEADER_SIZE_BYTES), "little")
+            header = json.loads(fi.read(header_size).decode("utf-8"))
+            self._mmap = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.metadata = header.pop(METADATA_KEY, {})
+        self._data_start = HEADER_SIZE_BYTES + header_size
+        self._entries = header
+
+    def keys(self):
+        """The names of the tensors, in the order of the file."""
+        return self._entries.keys()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        entry = self._entries[name]
+        dtype = DTYPES[entry["dtype"]]
+        begin, end = entry["data_offsets"]
+        if end == begin:
+            return torch.empty(entry["shape"], dtype=dtype)
+        data = np.frombuffer(
+            self._mmap,
+            dtype=np.uint8,
+            count=end - begin,
+            offset=self._data_start + begin,
+        )
+        return torch.from_numpy(data).view(dtype).view(entry["shape"])
+
+    def tensors(self):
+        """Returns a dict of all the tensors (views on the file)."""
+        return collections.OrderedDict(
+            (name, self[name]) for name in self.keys()
+        )
+
+    def release(self, names):
+        """Releases the pages holding the given tensors from memory.
+
+        The tensors stay valid, they are read from the file again if used.
+
+        Arguments
+        ---------
+        names : iterable
+            Names of the tensors.
+        """
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        for name in names:
+            begin, end = self._entries[name]["data_offsets"]
+            begin += self._data_start
+            end += self._data_start
+            begin -= begin % mmap.PAGESIZE
+            if end > begin:
+                self._mmap.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+
+def load_tensor_file(path, device=None):
+    """Loads a tensor file as a dict of tensors.
+
+    Arguments
+    ---------
+    path : str, pathlib.Path
+        Path of the tensor file.
+    device : str, optional
+        Device where to move the tensors. By default, the tensors are views
+        on the memory-mapped file.
+
+    Returns
+    -------
+    collections.OrderedDict
+        Mapping from name to torch.Tensor.
+    """
+    tensor_file = TensorFile(path)
+    if device is None:
+        return tensor_file.tensors()
+    return collections.OrderedDict(
+        (name, tensor_file[name].to(device)) for name in tensor_file.keys()
+    )
+
+
+def load_tensor_file_into(module, path, strict=True):
+    """Loads a tensor file into the parameters and buffers of a module.
+
+    The tensors are copied one module at a time, straight from the
+    memory-mapped file into the existing parameters (on whatever device they
+    are), and the pages of the file are released as soon as copied, so that
+    the whole file is never in memory next to the module.
+
+    Arguments
+    ---------
+    module : torch.nn.Module
+        Module for which to load the parameters.
+    path : str, pathlib.Path
+        Path of the tensor file.
+    strict : bool
+        As for torch.nn.Module.load_state_dict.
+
+    Returns
+    -------
+    The missing and unexpected keys, as torch.nn.Module.load_state_dict.
+    """
+    tensor_file = TensorFile(path)
+    by_prefix = collections.defaultdict(list)
+    for name in tensor_file.keys():
+        by_prefix[name[: name.rfind(".") + 1]].append(name)
+
+    # load_state_dict visits the submodules one after the other: when a
+    # submodule starts loading, the previous one is done
+    loaded_prefixes = []
+
+    def release_loaded(state_dict, prefix, *args):
+        if loaded_prefixes:
+            tensor_file.release(by_prefix.pop(loaded_prefixes[-1], []))
+        loaded_prefixes.append(prefix)
+
+    handles = [
+        submodule._register_load_state_dict_pre_hook(release_loaded)
+        for submodule in module.modules()
+    ]
+    try:
+        return module.load_state_dict(tensor_file.tensors(), strict=strict)
+    finally:
+        for handle in handles:
+            handle.remove()
+        tensor_file.release(tensor_file.keys())
+
+
+def convert_to_tensor_file(source, destination=None):
+    """Converts a parameter file written by torch.save to a tensor file.
+
+    Only files holding a flat dict of tensors (e.g. the state_dict of a
+    module) can be converted.
+
+    Arguments
+    ---------
+    source : str, pathlib.Path
+        Path of the file written by torch.save.
+    destination : str, pathlib.Path, optional
+        Path of the tensor file. By default, the source is replaced.
+
+    Example
+    -------
+    >>> tmpdir = getfixture("tmpdir")
+    >>> torch.save({"a": torch.ones(2)}, tmpdir / "a.ckpt")
+    >>> convert_to_tensor_file(tmpdir / "a.ckpt")
+    >>> load_tensor_file(tmpdir / "a.ckpt")
+    OrderedDict([('a', tensor([1., 1.]))])
+    """
+    source = pathlib.Path(source)
+    destination = source if destination is None else pathlib.Path(destination)
+    tensors = torch.load(source, map_location="cpu")
+    if not isinstance(tensors, collections.abc.Mapping) or not all(
+        isinstance(tensor, torch.Tensor) for tensor in tensors.values()
+    ):
+        raise ValueError(f"{source} does not hold a flat dict of tensors")
+    tmp_path = destination.with_name(destination.name + ".tmp")
+    save_tensor_file(tensors, tmp_path, metadata={"format": "pt"})
+    os.replace(tmp_path, destination)
+    logger.info(f"Converted {source} to a tensor file in {destination}")
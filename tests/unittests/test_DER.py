@@ -0,0 +1,41 @@
+import shutil
+
+import numpy as np
+import pytest
+
+REF_RTTM = "tests/samples/rttm/ref_rttm/ES2014c.rttm"
+SYS_RTTM = "tests/samples/rttm/sys_rttm/ES2014c.rttm"
+
+
+def test_DER_matches_md_eval(tmpdir):
+    pytest.importorskip("sklearn")
+    if shutil.which("perl") is None:
+        pytest.skip("md-eval needs Perl")
+    from speechbrain.utils.DER import DER
+
+    # Two recordings: the sample, and a short one with overlaps and a
+    # speaker confusion
+    ref_rttm = str(tmpdir / "ref.rttm")
+    sys_rttm = str(tmpdir / "sys.rttm")
+    with open(ref_rttm, "w") as fo, open(REF_RTTM) as fi:
+        fo.write(fi.read())
+        fo.write("SPEAKER rec 1 0.00 5.00 <NA> <NA> spk1 <NA>\n")
+        fo.write("SPEAKER rec 1 4.00 6.00 <NA> <NA> spk2 <NA>\n")
+        fo.write("SPEAKER rec 1 9.00 3.00 <NA> <NA> spk3 <NA>\n")
+    with open(sys_rttm, "w") as fo, open(SYS_RTTM) as fi:
+        fo.write(fi.read())
+        fo.write("SPEAKER rec 1 0.00 4.50 <NA> <NA> A <NA>\n")
+        fo.write("SPEAKER rec 1 4.50 3.50 <NA> <NA> B <NA>\n")
+        fo.write("SPEAKER rec 1 8.00 2.00 <NA> <NA> A <NA>\n")
+        fo.write("SPEAKER rec 1 10.30 3.00 <NA> <NA> C <NA>\n")
+
+    for ignore_overlap in [False, True]:
+        for collar in [0.0, 0.25]:
+            expected = DER(
+                ref_rttm, sys_rttm, ignore_overlap, collar, True, True
+            )
+            scores = DER(ref_rttm, sys_rttm, ignore_overlap, collar, True)
+            assert np.allclose(scores, expected, atol=1e-4)
+    # Parallel scoring gives the same results
+    parallel_scores = DER(ref_rttm, sys_rttm, True, 0.25, True, num_workers=2)
+    assert np.allclose(parallel_scores, scores)
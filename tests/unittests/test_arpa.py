@@ -125,3 +125,45 @@ def test_weird_arpa_formats():
     assert ngrams[2][("b",)]["a"] == -0.6931
     assert backoffs[1][("b",)] == 0.0
     assert list(backoffs[1].keys()) == [("b",)]
+
+
+def test_read_arpa_arrays():
+    from speechbrain.lm.arpa import read_arpa_arrays
+    import io
+
+    with io.StringIO() as f:
+        print("\\data\\", file=f)
+        print("ngram 1=2", file=f)
+        print("ngram 2=3", file=f)
+        print("", file=f)
+        print("\\1-grams:", file=f)
+        print("-0.6931 a", file=f)
+        print("-0.6931 b -0.5", file=f)
+        print("", file=f)
+        print("\\2-grams:", file=f)
+        print("-0.1 a a", file=f)
+        print("-0.2 a b", file=f)
+        print("-0.3 b a", file=f)
+        print("\\end\\", file=f)  # No empty line before end
+        f.seek(0)
+        vocab, arrays = read_arpa_arrays(f)
+    assert vocab == ["a", "b"]
+    words, logprobs, backoffs = arrays[1]
+    assert words.tolist() == [[0], [1]]
+    assert backoffs.tolist() == [0.0, -0.5]
+    words, logprobs, backoffs = arrays[2]
+    assert words.tolist() == [[0, 0], [0, 1], [1, 0]]
+    assert abs(logprobs[2] + 0.3) < 1e-6
+
+    # Fewer N-grams than declared
+    with io.StringIO() as f:
+        print("\\data\\", file=f)
+        print("ngram 1=3", file=f)
+        print("", file=f)
+        print("\\1-grams:", file=f)
+        print("-0.6931 a", file=f)
+        print("", file=f)
+        print("\\end\\", file=f)
+        f.seek(0)
+        with pytest.raises(ValueError):
+            read_arpa_arrays(f)
@@ -25,3 +25,50 @@ def test_rel_pos_MHA(device):
                         (1, 2 * kl - 1, emb_dim), device=device
                     )
                     relpos(q, k, k, pos_embs=pos_embs)
+
+
+def test_MHA_forward_step(device):
+
+    from speechbrain.nnet.attention import MultiheadAttention
+    from speechbrain.lobes.models.transformer.Transformer import (
+        get_lookahead_mask,
+    )
+
+    torch.manual_seed(0)
+    mha = MultiheadAttention(nhead=4, d_model=16).to(device).eval()
+    x = torch.rand((2, 7, 16), device=device)
+    enc = torch.rand((2, 9, 16), device=device)
+
+    # self-attention, one position at a time
+    mask = get_lookahead_mask(x)
+    full, _ = mha(x, x, x, attn_mask=mask)
+    cache = None
+    for t in range(x.shape[1]):
+        step = x[:, t : t + 1]
+        out, _, cache = mha.forward_step(step, step, step, cache=cache)
+        assert torch.allclose(out, full[:, t : t + 1], atol=1e-5)
+
+    # self-attention, several positions at a time, masked causally
+    out, _, cache = mha.forward_step(x[:, :3], x[:, :3], x[:, :3], causal=True)
+    assert torch.allclose(out, full[:, :3], atol=1e-5)
+    out, _, cache = mha.forward_step(
+        x[:, 3:], x[:, 3:], x[:, 3:], cache=cache, causal=True
+    )
+    assert torch.allclose(out, full[:, 3:], atol=1e-5)
+
+    # cross-attention with cached projections of the encoder states
+    key_padding_mask = torch.tensor([[False] * 9, [False] * 6 + [True] * 3])
+    key_padding_mask = key_padding_mask.to(device)
+    full, full_attn = mha(x, enc, enc, key_padding_mask=key_padding_mask)
+    cache = None
+    for t in range(x.shape[1]):
+        out, attn, cache = mha.forward_step(
+            x[:, t : t + 1],
+            enc,
+            enc,
+            cache=cache,
+            static_kv=True,
+            key_padding_mask=key_padding_mask,
+        )
+        assert torch.allclose(out, full[:, t : t + 1], atol=1e-5)
+        assert torch.allclose(attn, full_attn[:, t : t + 1], atol=1e-5)
@@ -0,0 +1,68 @@
+import os
+import pickle
+
+import torch
+import torchaudio
+
+
+def test_audio_cache(tmpdir):
+    from speechbrain.dataio.audio_cache import AudioCache
+    from speechbrain.dataio.dataio import read_audio, read_audio_info
+
+    torch.manual_seed(0)
+    paths = []
+    for name, channels, kwargs in [
+        ("s16.wav", 1, {"encoding": "PCM_S", "bits_per_sample": 16}),
+        ("s32.wav", 2, {"encoding": "PCM_S", "bits_per_sample": 32}),
+        ("u8.wav", 1, {"encoding": "PCM_U", "bits_per_sample": 8}),
+        ("f32.wav", 3, {"encoding": "PCM_F", "bits_per_sample": 32}),
+        ("s24.wav", 1, {"encoding": "PCM_S", "bits_per_sample": 24}),
+        ("audio.flac", 2, {}),
+    ]:
+        path = str(tmpdir / name)
+        torchaudio.save(
+            path, torch.rand(channels, 16000) - 0.5, 16000, **kwargs
+        )
+        paths.append(path)
+
+    cache = AudioCache(str(tmpdir / "index.json"), max_decoded_bytes=150000)
+    assert cache.build(paths, num_workers=0) == len(paths)
+    headers = [cache.info(path) for path in paths]
+    # PCM WAV files are memory-mapped, 24 bits and FLAC are decoded
+    assert [header.data_offset is not None for header in headers] == [
+        True,
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    for path, header in zip(paths, headers):
+        info = read_audio_info(path)
+        assert header.sample_rate == info.sample_rate
+        assert header.num_frames == info.num_frames
+        assert header.num_channels == info.num_channels
+
+    audio_list = []
+    for path in paths:
+        audio_list.append(path)
+        audio_list.append({"file": path, "start": 1000, "stop": 5000})
+        audio_list.append({"file": path, "start": 15000, "stop": 17000})
+        audio_list.append({"file": path, "start": 3000})
+    for _ in range(2):
+        for audio in audio_list:
+            assert torch.equal(cache(audio), read_audio(audio))
+    # The decoded audio of both files does not fit, the last one is kept
+    assert list(cache._decoded) == [paths[5]]
+    assert cache._decoded_bytes <= 150000
+
+    # Sent to a worker, and reopened from the index
+    cache = pickle.loads(pickle.dumps(cache))
+    assert torch.equal(cache(audio_list[1]), read_audio(audio_list[1]))
+    cache = AudioCache(str(tmpdir / "index.json"))
+    assert cache.build(paths, num_workers=0) == 0
+    torchaudio.save(paths[0], torch.rand(1, 8000) - 0.5, 8000)
+    os.utime(paths[0], ns=(0, 0))
+    assert cache.info(paths[0]).num_frames == 8000
+    assert torch.equal(cache(audio_list[1]), read_audio(audio_list[1]))
+    assert cache.build(paths, num_workers=0) == 0
@@ -4,7 +4,7 @@ from speechbrain.dataio.dataio import write_audio
 
 
 def test_add_noise(tmpdir, device):
-    from speechbrain.processing.speech_augmentation import AddNoise
+    from speechbrain.processing.speech_augmentation import AddNoise, AudioBank
 
     # Test concatenation of batches
     wav_a = torch.sin(torch.arange(8000.0, device=device)).unsqueeze(0)
@@ -49,9 +49,30 @@ def test_add_noise(tmpdir, device):
     expected = (test_waveform + test_noise) / 2
     assert add_noise(test_waveform, wav_lens).allclose(expected, atol=1e-4)
 
+    # Noise drawn from a bank
+    bank = AudioBank(csv)
+    add_noise = AddNoise(noise_bank=bank, start_index=0).to(device)
+    assert add_noise(test_waveform, wav_lens).allclose(expected, atol=1e-4)
+    all_noise = AddNoise(noise_bank=bank, snr_low=-1000, snr_high=-1000)
+    noisy = all_noise(test_waveform.repeat(3, 1), wav_lens.repeat(3))
+    assert noisy.shape == (3, 16000)
+    assert noisy.abs().max() > 0.5
+
+    # The same noise on all the channels
+    stereo = test_waveform.unsqueeze(-1).repeat(3, 1, 2)
+    noisy = all_noise.to(device)(stereo, wav_lens.repeat(3))
+    assert noisy.shape == (3, 16000, 2)
+    assert noisy[..., 0].allclose(noisy[..., 1])
+    assert noisy.abs().max() > 0.5
+
+    # The bank stays on the CPU, as it is
+    assert bank.clips.device == torch.device("cpu")
+    all_noise.to(torch.float64)
+    assert bank.clips.dtype == torch.float32
+
 
 def test_add_reverb(tmpdir, device):
-    from speechbrain.processing.speech_augmentation import AddReverb
+    from speechbrain.processing.speech_augmentation import AddReverb, AudioBank
 
     test_waveform = torch.sin(torch.arange(16000.0, device=device)).unsqueeze(0)
     impulse_response = torch.zeros(1, 8000, device=device)
@@ -96,6 +117,64 @@ def test_add_reverb(tmpdir, device):
     reverbed = add_reverb(test_waveform, wav_lens)[:, 0:1000]
     assert reverbed.allclose(ir3_result[:, 0:1000], atol=2e-1)
 
+    # One impulse response per signal, from a bank of the two impulses
+    with open(csv, "w") as w:
+        w.write("ID, duration, wav, wav_format, wav_opts\n")
+        w.write(f"1, 0.5, {ir1}, wav,\n")
+        w.write(f"2, 0.5, {ir2}, wav,\n")
+    add_reverb = AddReverb(rir_bank=AudioBank(csv)).to(device)
+    reverbed = add_reverb(test_waveform.repeat(4, 1), wav_lens.repeat(4))
+    assert reverbed.shape == (4, 16000)
+    expected = test_waveform.repeat(4, 1)
+    assert reverbed[:, 0:1000].allclose(expected[:, 0:1000], atol=1e-1)
+
+
+def test_audio_bank(tmpdir):
+    from speechbrain.processing.speech_augmentation import AudioBank
+
+    # Clips of 100, 200 and 300 samples, each with a distinct value
+    csv = os.path.join(tmpdir, "clips.csv")
+    with open(csv, "w") as w:
+        w.write("ID, duration, wav, wav_format, wav_opts\n")
+        for i in range(3):
+            path = os.path.join(tmpdir, f"clip{i}.wav")
+            write_audio(
+                path, torch.full((100 * (i + 1),), 0.25 * (i + 1)), 16000
+            )
+            w.write(f"{i}, 0.1, {path}, wav,\n")
+
+    bank = AudioBank(csv)
+    assert len(bank) == 3
+    assert bank.lengths.tolist() == [100, 200, 300]
+
+    # Zero-padded crops are as long as their clip
+    crops, lengths = bank.sample_crops(32, 250)
+    assert crops.shape == (32, 250)
+    for crop, length in zip(crops, lengths):
+        value = {100: 0.25, 200: 0.5, 250: 0.75}[int(length)]
+        assert length in [100, 200, 250]
+        assert crop[:length].allclose(torch.tensor(value))
+        assert (crop[length:] == 0).all()
+
+    # Tiled crops cover the whole length
+    crops, lengths = bank.sample_crops(32, 250, tile=True)
+    assert (lengths == 250).all()
+    assert (crops > 0).all()
+
+    # Whole clips
+    clips, lengths = bank.sample_clips(32)
+    assert clips.shape[1] == lengths.max()
+    assert (clips.sum(dim=1) == 0.25 * lengths * lengths / 100).all()
+
+    # Stored in float16 and memory-mapped, reused from the folder
+    cache_dir = os.path.join(tmpdir, "bank")
+    bank = AudioBank(csv, dtype="float16", cache_dir=cache_dir)
+    assert bank.clips.dtype == torch.float16
+    assert os.path.isfile(os.path.join(cache_dir, "clips.npy"))
+    reloaded = AudioBank(csv, dtype="float16", cache_dir=cache_dir)
+    assert torch.equal(reloaded.clips, bank.clips)
+    assert torch.equal(reloaded.offsets, bank.offsets)
+
 
 def test_speed_perturb(device):
     from speechbrain.processing.speech_augmentation import SpeedPerturb
@@ -478,3 +557,64 @@ def test_augment_pipeline():
     )
 
     assert torch.equal(output_signal, signal)
+
+
+def test_augment_per_example():
+    import pytest
+    from speechbrain.processing.speech_augmentation import (
+        DoClip,
+        RandAmp,
+        SpeedPerturb,
+    )
+    from speechbrain.processing.augmentation import Augmenter
+
+    # One augmentation per example, either of the two
+    augment = Augmenter(
+        per_example_augment=True,
+        min_augmentations=1,
+        max_augmentations=1,
+        shuffle_augmentations=True,
+        amp=RandAmp(amp_low=2, amp_high=2),
+        clip=DoClip(clip_low=0.5, clip_high=0.5),
+    )
+    signal = torch.rand([64, 1000])
+    lengths = torch.ones(64)
+    output_signal, output_lengths = augment(signal, lengths)
+    amplified = (output_signal == 2 * signal).all(dim=1)
+    clipped = (output_signal == signal.clamp(max=0.5)).all(dim=1)
+    assert torch.equal(output_lengths, lengths)
+    assert (amplified ^ clipped).all()
+    assert amplified.any() and clipped.any()
+
+    # Both augmentations, in the order of the arguments
+    augment = Augmenter(
+        per_example_augment=True,
+        concat_original=True,
+        min_augmentations=2,
+        max_augmentations=2,
+        shuffle_augmentations=True,
+        amp=RandAmp(amp_low=2, amp_high=2),
+        clip=DoClip(clip_low=0.5, clip_high=0.5),
+    )
+    output_signal, output_lengths = augment(signal, lengths)
+    assert torch.equal(output_signal[:64], signal)
+    assert torch.equal(output_signal[64:], (2 * signal).clamp(max=0.5))
+
+    # Augmentations which change the length of the examples
+    augment = Augmenter(
+        per_example_augment=True,
+        min_augmentations=1,
+        max_augmentations=1,
+        shuffle_augmentations=True,
+        speed=SpeedPerturb(16000, speeds=[50]),
+        amp=RandAmp(amp_low=1, amp_high=1),
+    )
+    output_signal, output_lengths = augment(signal, lengths)
+    assert output_signal.shape == (64, 1000)
+    slowed = output_lengths < 1
+    assert slowed.any() and not slowed.all()
+    assert (output_signal[slowed, 500:] == 0).all()
+    assert torch.equal(output_signal[~slowed], signal[~slowed])
+
+    with pytest.raises(ValueError):
+        Augmenter(per_example_augment=True, parallel_augment=True)
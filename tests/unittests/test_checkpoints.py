@@ -383,6 +383,77 @@ def test_torch_defaults(tmpdir, device):
     assert torch.allclose(module(inp), prev_output)
 
 
+def test_async_checkpoint(tmpdir):
+    from speechbrain.utils.checkpoints import Checkpointer
+    from speechbrain.utils.epoch_loop import EpochCounter
+
+    module = torch.nn.Linear(3, 3)
+    optimizer = torch.optim.SGD(module.parameters(), 0.1)
+    counter = EpochCounter(10)
+    recoverables = {"module": module, "optimizer": optimizer, "e": counter}
+    checkpointer = Checkpointer(tmpdir, recoverables, async_save=True)
+    saved_weight = module.weight.detach().clone()
+    ckpt = checkpointer.save_checkpoint(meta={"step": 1})
+    # The snapshot is not affected by later updates
+    with torch.no_grad():
+        module.weight.add_(1.0)
+    checkpointer.wait_for_saves()
+    assert (ckpt.path / "module.ckpt").exists()
+    assert checkpointer.list_checkpoints() == [ckpt]
+    assert checkpointer.save_stats["num_saves"] == 1
+    assert checkpointer.save_stats["last_save_latency"] > 0
+    checkpointer.load_checkpoint(ckpt)
+    assert torch.equal(module.weight, saved_weight)
+    with torch.no_grad():
+        module.weight.add_(1.0)
+
+    # Older checkpoints are deleted in the background
+    for step in range(2, 5):
+        checkpointer.save_and_keep_only(meta={"step": step}, num_to_keep=1)
+    ckpts = checkpointer.list_checkpoints()
+    assert len(ckpts) == 1 and ckpts[0].meta["step"] == 4
+    assert sorted(p.basename for p in tmpdir.listdir()) == [ckpts[0].path.name]
+
+    with torch.no_grad():
+        module.weight.zero_()
+    checkpointer.recover_if_possible()
+    assert torch.equal(module.weight, saved_weight + 1.0)
+
+
+def test_tensor_file_checkpoint(tmpdir):
+    from speechbrain.utils.checkpoints import Checkpointer
+    from speechbrain.utils.checkpoints import torch_parameter_transfer
+    from speechbrain.utils.tensor_file import convert_to_tensor_file
+    from speechbrain.utils.tensor_file import is_tensor_file
+
+    def make_model():
+        return torch.nn.Sequential(
+            torch.nn.Linear(4, 8),
+            torch.nn.BatchNorm1d(8),
+            torch.nn.Linear(8, 2).to(torch.bfloat16),
+        )
+
+    model = make_model()
+    model[:2](torch.randn(5, 4))  # Updates the batchnorm statistics
+    checkpointer = Checkpointer(tmpdir, {"model": model})
+    ckpt = checkpointer.save_checkpoint()
+    paramfile = ckpt.paramfiles["model"]
+    assert not is_tensor_file(paramfile)
+    convert_to_tensor_file(paramfile)
+    assert is_tensor_file(paramfile)
+
+    new_model = make_model()
+    checkpointer = Checkpointer(tmpdir, {"model": new_model})
+    checkpointer.recover_if_possible()
+    for key, value in model.state_dict().items():
+        assert torch.equal(new_model.state_dict()[key], value)
+
+    # Non-strict transfer, into a different model
+    other = torch.nn.Sequential(torch.nn.Linear(4, 8), torch.nn.ReLU())
+    torch_parameter_transfer(other, paramfile, device="cpu")
+    assert torch.equal(other[0].weight, model[0].weight)
+
+
 def parallel_checkpoint(rank, world_size, tmpdir):
     import os
     from speechbrain.utils.checkpoints import Checkpointer
@@ -38,3 +38,231 @@ def test_brain(device):
     end_output = brain.compute_forward(inputs, Stage.VALID)
     end_loss = brain.compute_objectives(end_output, targets, Stage.VALID)
     assert end_loss < start_loss
+
+
+def test_brain_sync_free(device):
+    import torch
+    from speechbrain.core import Brain, Stage
+    from torch.optim import SGD
+
+    class SimpleBrain(Brain):
+        def compute_forward(self, batch, stage):
+            return self.modules.model(batch[0])
+
+        def compute_objectives(self, predictions, batch, stage):
+            return torch.nn.functional.l1_loss(predictions, batch[1])
+
+        def on_stage_end(self, stage, stage_loss, epoch=None):
+            if stage == Stage.TRAIN:
+                self.train_losses.append(stage_loss)
+
+    inputs = torch.rand(8, 10, 10, device=device)
+    targets = torch.rand(8, 10, 10, device=device)
+    train_set = list(zip(inputs, targets))
+
+    brains = []
+    for host_sync_interval in [1, 3]:
+        torch.manual_seed(0)
+        model = torch.nn.Linear(10, 10, device=device)
+        brain = SimpleBrain(
+            {"model": model},
+            lambda x: SGD(x, 0.1),
+            run_opts={
+                "device": device,
+                "host_sync_interval": host_sync_interval,
+            },
+        )
+        brain.train_losses = []
+        brain.fit(range(2), train_set=train_set, progressbar=False)
+        brains.append(brain)
+
+    # Same training, with fewer reads of the loss
+    assert torch.allclose(
+        brains[0].modules.model.weight, brains[1].modules.model.weight
+    )
+    assert torch.allclose(
+        torch.tensor(brains[0].train_losses),
+        torch.tensor(brains[1].train_losses),
+    )
+    assert brains[0].host_syncs == 16
+    assert brains[1].host_syncs == 3
+
+    # A non-finite loss is only noticed when read, but its step is undone
+    # on the device: no momentum nor weight decay moves the weights, and the
+    # average loss leaves it out, as when the step is skipped
+    train_set[1] = (inputs[1] * float("nan"), targets[1])
+    brains = []
+    for host_sync_interval in [1, 3]:
+        torch.manual_seed(0)
+        model = torch.nn.Linear(10, 10, device=device)
+        brain = SimpleBrain(
+            {"model": model},
+            lambda x: SGD(x, 0.1, momentum=0.9, weight_decay=0.1),
+            run_opts={
+                "device": device,
+                "host_sync_interval": host_sync_interval,
+            },
+        )
+        brain.train_losses = []
+        brain.fit(range(2), train_set=train_set, progressbar=False)
+        assert brain.nonfinite_count == 1
+        brains.append(brain)
+    assert torch.isfinite(brains[1].modules.model.weight).all()
+    assert torch.allclose(
+        brains[0].modules.model.weight, brains[1].modules.model.weight
+    )
+    assert torch.allclose(
+        torch.tensor(brains[0].train_losses),
+        torch.tensor(brains[1].train_losses),
+    )
+
+
+def test_brain_grad_clipping(device):
+    import torch
+    from speechbrain.core import Brain
+    from torch.optim import SGD
+
+    class SimpleBrain(Brain):
+        def compute_forward(self, batch, stage):
+            return self.modules.model(batch[0])
+
+        def compute_objectives(self, predictions, batch, stage):
+            return torch.nn.functional.mse_loss(predictions, batch[1])
+
+    # Large targets: the gradient norms are far above max_grad_norm
+    inputs = torch.rand(6, 10, 10, device=device)
+    targets = 100 * torch.rand(6, 10, 10, device=device)
+    train_set = list(zip(inputs, targets))
+
+    weights = []
+    for host_sync_interval in [1, 3]:
+        torch.manual_seed(0)
+        model = torch.nn.Linear(10, 10, device=device)
+        brain = SimpleBrain(
+            {"model": model},
+            lambda x: SGD(x, 0.1),
+            run_opts={
+                "device": device,
+                "host_sync_interval": host_sync_interval,
+                "max_grad_norm": 1.0,
+            },
+        )
+        brain.fit(range(2), train_set=train_set, progressbar=False)
+        weights.append(
+            torch.cat([p.detach().flatten() for p in model.parameters()])
+        )
+    assert torch.allclose(weights[0], weights[1], atol=1e-5)
+
+    # Same as clipping the gradients of each batch by hand
+    torch.manual_seed(0)
+    model = torch.nn.Linear(10, 10, device=device)
+    initial = torch.cat([p.detach().flatten() for p in model.parameters()])
+    optimizer = SGD(model.parameters(), 0.1)
+    for epoch in range(2):
+        for x, y in train_set:
+            optimizer.zero_grad()
+            torch.nn.functional.mse_loss(model(x), y).backward()
+            norm = torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+            assert norm > 1.0
+            optimizer.step()
+    expected = torch.cat([p.detach().flatten() for p in model.parameters()])
+    assert torch.allclose(weights[0], expected, atol=1e-5)
+    # Each of the 12 steps moves the weights by 0.1 at most
+    assert (weights[0] - initial).norm() <= 1.2 + 1e-5
+
+
+def test_brain_async_checkpoint(tmpdir):
+    import time
+    import torch
+    from speechbrain.core import Brain, Stage
+    from speechbrain.utils.checkpoints import Checkpointer
+
+    def slow_save(obj, path):
+        time.sleep(0.2)
+        torch.save(obj.state_dict(), path)
+
+    model = torch.nn.Linear(in_features=10, out_features=10)
+    checkpointer = Checkpointer(
+        tmpdir,
+        recoverables={"model": model},
+        custom_save_hooks={"model": slow_save},
+        async_save=True,
+    )
+
+    class SimpleBrain(Brain):
+        def compute_forward(self, batch, stage):
+            return self.modules.model(batch[0])
+
+        def compute_objectives(self, predictions, batch, stage):
+            return torch.nn.functional.l1_loss(predictions, batch[1])
+
+        def on_stage_end(self, stage, stage_loss, epoch=None):
+            if stage != Stage.TRAIN:
+                self.checkpointer.save_checkpoint(meta={"stage": str(stage)})
+
+    brain = SimpleBrain(
+        {"model": model},
+        lambda x: torch.optim.SGD(x, 0.1),
+        checkpointer=checkpointer,
+    )
+    data = ([torch.rand(10, 10), torch.rand(10, 10)],)
+
+    # The checkpoints are written when fit and evaluate return
+    brain.fit(range(2), train_set=data, valid_set=data, progressbar=False)
+    assert not checkpointer._pending
+    assert len(list(tmpdir.visit("*/model.ckpt"))) == 2
+    brain.evaluate(data, progressbar=False)
+    assert not checkpointer._pending
+    assert len(list(tmpdir.visit("*/model.ckpt"))) == 3
+
+
+def test_brain_timing(tmpdir):
+    import torch
+    from speechbrain.core import Brain, Stage
+    from speechbrain.dataio.batch import PaddedBatch
+    from speechbrain.utils.train_logger import FileTrainLogger
+    from torch.utils.data import DataLoader
+
+    class SimpleBrain(Brain):
+        def compute_forward(self, batch, stage):
+            wavs, wav_lens = batch.sig
+            return self.modules.model(wavs)
+
+        def compute_objectives(self, predictions, batch, stage):
+            return predictions.abs().mean()
+
+        def on_stage_end(self, stage, stage_loss, epoch=None):
+            self.timings[stage] = self.stage_timing
+
+    examples = [{"sig": torch.rand(10)}, {"sig": torch.rand(5)}] * 3
+    train_set = DataLoader(examples, batch_size=2, collate_fn=PaddedBatch)
+    brain = SimpleBrain(
+        {"model": torch.nn.Linear(10, 1)},
+        lambda x: torch.optim.SGD(x, 0.1),
+        hparams={
+            "sample_rate": 10,
+            "train_logger": FileTrainLogger(tmpdir / "train_log.txt"),
+        },
+        run_opts={"log_timing": True},
+    )
+    brain.timings = {}
+    brain.fit(range(1), train_set, valid_set=train_set, progressbar=False)
+
+    for stage in [Stage.TRAIN, Stage.VALID]:
+        timing = brain.timings[stage]
+        assert timing["steps"] == 3 and timing["samples"] == 6
+        # 1.5 seconds of audio per batch
+        assert abs(timing["audio_seconds"] - 4.5) < 1e-6
+        for phase in ["data", "compute", "step"]:
+            assert 0 <= timing[f"{phase}_time_p50"] <= timing["stage_time"]
+        assert timing["samples_per_second"] > 0
+
+    # The optimizer is timed apart, within the compute phase
+    timing = brain.timings[Stage.TRAIN]
+    assert 0 <= timing["optimizer_time_p50"] <= timing["compute_time_p95"]
+    assert "optimizer_time_p50" not in brain.timings[Stage.VALID]
+
+    with open(tmpdir / "train_log.txt") as fin:
+        lines = fin.read().splitlines()
+    assert lines[0].startswith("timing: train - train data_time_p50: ")
+    assert lines[1].startswith("timing: valid - valid data_time_p50: ")
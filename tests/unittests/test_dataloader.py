@@ -85,3 +85,42 @@ def test_looped_loader(tmpdir):
     next(new_data_iterator)
     with pytest.raises(StopIteration):
         next(new_data_iterator)
+
+
+def test_device_prefetcher(tmpdir, device):
+    from speechbrain.dataio.dataloader import DevicePrefetcher
+    from speechbrain.dataio.dataloader import SaveableDataLoader
+
+    save_file = tmpdir + "/dataloader.ckpt"
+    dataset = torch.arange(10.0).unsqueeze(1)
+    prefetcher = DevicePrefetcher(
+        SaveableDataLoader(dataset, collate_fn=None), device, num_batches=3
+    )
+    assert len(prefetcher) == 10
+    data_iterator = iter(prefetcher)
+    first_item = next(data_iterator)
+    assert first_item.device == torch.device(device)
+    assert first_item.item() == 0.0
+    # The loader is ahead, but the position saved is the one used:
+    prefetcher._speechbrain_save(save_file)
+    second_item = next(data_iterator)
+    assert second_item.item() == 1.0
+    data_iterator.close()
+
+    new_prefetcher = DevicePrefetcher(
+        SaveableDataLoader(dataset, collate_fn=None), device
+    )
+    new_prefetcher._speechbrain_load(save_file, end_of_epoch=False)
+    assert [x.item() for x in new_prefetcher] == list(range(1, 10))
+    # A new epoch starts from the beginning
+    assert [x.item() for x in new_prefetcher] == list(range(10))
+
+    # Errors in loading are raised in the main thread
+    def failing_collate(batch):
+        raise ValueError("Bad batch")
+
+    prefetcher = DevicePrefetcher(
+        SaveableDataLoader(dataset, collate_fn=failing_collate), device
+    )
+    with pytest.raises(ValueError):
+        next(iter(prefetcher))
@@ -0,0 +1,232 @@
+import pytest
+import torch
+
+
+@pytest.mark.parametrize("rnn_type", ["GRU", "LSTM"])
+def test_transducer_batched_beam_search(rnn_type):
+    import speechbrain as sb
+    from speechbrain.decoders.transducer import TransducerBeamSearcher
+    from speechbrain.nnet.transducer.transducer_joint import Transducer_joint
+
+    torch.manual_seed(0)
+    vocab_size = 6
+    emb = sb.nnet.embedding.Embedding(
+        num_embeddings=vocab_size,
+        embedding_dim=vocab_size - 1,
+        consider_as_one_hot=True,
+        blank_id=0,
+    )
+    dec = getattr(sb.nnet.RNN, rnn_type)(
+        hidden_size=10, input_shape=(1, 40, vocab_size - 1)
+    )
+    lin = sb.nnet.linear.Linear(input_shape=(1, 40, 10), n_neurons=vocab_size)
+    # Frequent blanks, for alignments reaching the same prefixes
+    with torch.no_grad():
+        lin.w.bias[0] += 1.0
+    joint_network = sb.nnet.linear.Linear(
+        input_shape=(1, 1, 40, vocab_size), n_neurons=vocab_size
+    )
+    searcher = TransducerBeamSearcher(
+        decode_network_lst=[emb, dec],
+        tjoint=Transducer_joint(joint_network, joint="sum"),
+        classifier_network=[lin],
+        blank_id=0,
+        beam_size=4,
+        nbest=3,
+        batched_beam_search=True,
+    ).eval()
+
+    # Same hypotheses and scores in a batch as for each utterance alone
+    enc = torch.randn(5, 30, 10)
+    with torch.no_grad():
+        hyps, _, nbest_hyps, nbest_scores = searcher(enc)
+        assert any(len(hyp) > 0 for hyp in hyps)
+        for i in range(len(enc)):
+            utt_hyps, _, utt_nbest, utt_scores = searcher(enc[i : i + 1])
+            assert utt_hyps[0] == hyps[i]
+            assert utt_nbest[0] == nbest_hyps[i]
+            assert torch.allclose(
+                torch.tensor(utt_scores[0]), torch.tensor(nbest_scores[i])
+            )
+            # Merged prefixes: the nbest hypotheses are all different
+            assert len(set(map(tuple, nbest_hyps[i]))) == len(nbest_hyps[i])
+
+
+def test_transducer_merge_duplicate_prefixes():
+    from speechbrain.decoders.transducer import TransducerBeamSearcher
+
+    searcher = TransducerBeamSearcher(None, None, None, blank_id=0)
+    scores = torch.log(torch.tensor([[0.2, 0.1, 0.3]]))
+    lengths = torch.tensor([[2, 2, 2]])
+    tokens = torch.tensor([[[1, 2, 0], [1, 2, 0], [2, 1, 0]]])
+
+    # Hyps 0 and 1 have the same prefix
+    hashes = torch.tensor([[7, 7, 5]])
+    merged = searcher._merge_duplicate_prefixes(scores, hashes, lengths, tokens)
+    expected = torch.log(torch.tensor([[0.3, 0.0, 0.3]]))
+    assert torch.allclose(merged, expected)
+
+    # A hash collision does not merge different prefixes
+    hashes = torch.tensor([[7, 7, 7]])
+    merged = searcher._merge_duplicate_prefixes(scores, hashes, lengths, tokens)
+    assert torch.allclose(merged, expected)
+
+
+def test_transformer_searchers_kv_cache():
+    import speechbrain as sb
+    from speechbrain.decoders.seq2seq import (
+        S2STransformerBeamSearch,
+        S2STransformerGreedySearch,
+    )
+    from speechbrain.lobes.models.transformer.TransformerASR import (
+        TransformerASR,
+    )
+
+    torch.manual_seed(0)
+    model = TransformerASR(
+        tgt_vocab=10,
+        input_size=32,
+        d_model=32,
+        nhead=4,
+        num_encoder_layers=1,
+        num_decoder_layers=2,
+        d_ffn=64,
+    ).eval()
+    fc = sb.nnet.linear.Linear(input_size=32, n_neurons=10)
+    # Sharper distributions, and long hypotheses (unlikely eos)
+    with torch.no_grad():
+        for param in list(model.decoder.parameters()) + [fc.w.weight]:
+            if param.dim() > 1:
+                param.mul_(3.0)
+        fc.w.bias[2] -= 3.0
+    enc = model.encode(torch.randn(3, 15, 32)).detach()
+    wav_len = torch.tensor([1.0, 0.8, 0.6])
+
+    for searcher_class, kwargs in [
+        (S2STransformerGreedySearch, {}),
+        (S2STransformerBeamSearch, {"beam_size": 3, "topk": 2}),
+    ]:
+        outputs = []
+        for use_kv_cache in [False, True]:
+            searcher = searcher_class(
+                modules=[model, fc, None],
+                bos_index=1,
+                eos_index=2,
+                min_decode_ratio=0.0,
+                max_decode_ratio=1.0,
+                use_kv_cache=use_kv_cache,
+                **kwargs,
+            )
+            with torch.no_grad():
+                outputs.append(searcher(enc, wav_len))
+        (hyps, scores), (cached_hyps, cached_scores) = outputs
+        assert cached_hyps == hyps
+        assert torch.allclose(
+            torch.as_tensor(cached_scores), torch.as_tensor(scores), atol=1e-4
+        )
+
+
+def test_ctc_prefix_beam_search_exhaustive():
+    import itertools
+    from speechbrain.decoders.ctc import CTCPrefixBeamSearcher
+
+    torch.manual_seed(0)
+    log_probs = torch.randn(2, 5, 3).log_softmax(dim=-1)
+    wav_lens = torch.tensor([1.0, 0.8])
+    searcher = CTCPrefixBeamSearcher(
+        blank_index=0,
+        beam_size=100,
+        beam_prune_logp=-1e9,
+        token_prune_min_logp=-1e9,
+        blank_skip_threshold=1.0,
+    )
+    beams = searcher.decode_beams(log_probs, wav_lens)
+
+    for utt_log_probs, length, utt_beams in zip(log_probs, [5, 4], beams):
+        # Probability of each output, summed over all the alignments
+        expected = {}
+        for alignment in itertools.product(range(3), repeat=length):
+            logp = sum(utt_log_probs[t, a] for t, a in enumerate(alignment))
+            output = tuple(
+                token for token, _ in itertools.groupby(alignment) if token != 0
+            )
+            expected[output] = torch.logaddexp(
+                expected.get(output, torch.tensor(-float("inf"))), logp
+            )
+        assert len(utt_beams) == len(expected)
+        for tokens, score in utt_beams:
+            assert abs(score - expected[tuple(tokens)].item()) < 1e-4
+        best = max(expected, key=lambda output: expected[output])
+        assert tuple(utt_beams[0][0]) == best
+
+
+def test_ctc_prefix_beam_search_lm_hotwords(tmpdir):
+    from speechbrain.decoders.ctc import CTCPrefixBeamSearcher
+    from speechbrain.lm.ngram import CompiledNgramLM
+
+    vocab = ["<blank>", " ", "a", "b"]
+    # Acoustically, "a a" is best, "a b" and "b a" are close
+    probs = torch.tensor(
+        [
+            [
+                [0.1, 0.0, 0.5, 0.4],
+                [0.9, 0.0, 0.05, 0.05],
+                [0.05, 0.9, 0.0, 0.05],
+                [0.1, 0.0, 0.5, 0.4],
+                [0.9, 0.0, 0.05, 0.05],
+            ]
+        ]
+    )
+    log_probs = (probs + 1e-4).log()
+    wav_lens = torch.tensor([1.0])
+
+    def best_words(**kwargs):
+        searcher = CTCPrefixBeamSearcher(
+            blank_index=0, vocab_list=vocab, **kwargs
+        )
+        beams = searcher.decode_beams(log_probs, wav_lens)[0]
+        words = "".join(vocab[token] for token in beams[0][0])
+        return words, beams
+
+    assert best_words()[0] == "a a"
+
+    # The LM prefers "a b"
+    arpa = "\\data\\\nngram 1=5\nngram 2=3\n\n\\1-grams:\n"
+    arpa += "-1.0 <s> -0.3\n-1.0 </s>\n-0.5 a -0.2\n-0.5 b -0.2\n"
+    arpa += "-2.0 <unk>\n\n\\2-grams:\n"
+    arpa += "-0.1 <s> a\n-0.05 a b\n-3.0 a a\n\n\\end\\\n"
+    arpa_file = str(tmpdir / "lm.arpa")
+    with open(arpa_file, "w") as fout:
+        fout.write(arpa)
+    compiled_file = str(tmpdir / "lm.bin")
+    with open(arpa_file) as fin:
+        CompiledNgramLM.from_arpa(fin).save(compiled_file)
+
+    words, beams = best_words(lm=arpa_file, lm_weight=1.0)
+    assert words == "a b"
+    # Same scores through the integer states of the compiled LM
+    compiled_words, compiled_beams = best_words(lm=compiled_file, lm_weight=1.0)
+    assert compiled_words == words
+    assert [tokens for tokens, _ in compiled_beams] == [
+        tokens for tokens, _ in beams
+    ]
+    for (_, score), (_, compiled_score) in zip(beams, compiled_beams):
+        assert abs(score - compiled_score) < 1e-4
+
+    # Hotwords win over the acoustics (and the LM)
+    assert best_words(hotwords=["b"], hotword_weight=2.0)[0] == "b b"
+    words, _ = best_words(
+        lm=arpa_file, lm_weight=1.0, hotwords=["b"], hotword_weight=5.0
+    )
+    assert words == "b b"
+
+    # The LM cache only holds the queries of the last call
+    searcher = CTCPrefixBeamSearcher(
+        blank_index=0, vocab_list=vocab, lm=arpa_file, lm_weight=1.0
+    )
+    searcher.decode_beams(log_probs, wav_lens)
+    num_queries = len(searcher._lm_cache)
+    assert num_queries > 0
+    searcher.decode_beams(log_probs.flip(-1), wav_lens)
+    searcher.decode_beams(log_probs, wav_lens)
+    assert len(searcher._lm_cache) == num_queries
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+
+def test_sparse_spectral_clustering():
+    pytest.importorskip("sklearn")
+    from speechbrain.processing.diarization import (
+        Spec_Clust_sparse,
+        Spec_Clust_unorm,
+    )
+
+    rng = np.random.RandomState(0)
+    centers = rng.randn(4, 32)
+    speakers = rng.randint(4, size=600)
+    emb = centers[speakers] + 0.5 * rng.randn(600, 32)
+
+    def same_partition(labels):
+        pairs = set(zip(speakers.tolist(), labels.tolist()))
+        return len(pairs) == 4 and len(set(labels.tolist())) == 4
+
+    dense = Spec_Clust_unorm(min_num_spkrs=2, max_num_spkrs=10)
+    dense.do_spec_clust(emb.copy(), None, 0.05)
+    assert same_partition(dense.labels_)
+
+    # Same pruned affinity and Eigen values as the dense implementation
+    clust = Spec_Clust_sparse(max_num_spkrs=10, chunk_size=128)
+    sim_mat = dense.p_pruning(dense.get_sim_mat(emb), 0.05)
+    sparse_sim_mat = clust.get_sim_mat(emb, 0.05)
+    assert np.allclose(sparse_sim_mat.toarray(), sim_mat)
+    laplacian = dense.get_laplacian(0.5 * (sim_mat + sim_mat.T))
+    lambdas = np.linalg.eigvalsh(laplacian)[:10]
+    for eigen_solver in ["lanczos", "lobpcg"]:
+        clust = Spec_Clust_sparse(max_num_spkrs=10, eigen_solver=eigen_solver)
+        sparse_laplacian = clust.get_laplacian(
+            0.5 * (sparse_sim_mat + sparse_sim_mat.T)
+        )
+        assert np.allclose(sparse_laplacian.toarray(), laplacian)
+        sparse_lambdas, _ = clust.get_smallest_eigs(sparse_laplacian, 10)
+        assert np.allclose(sparse_lambdas, lambdas, atol=1e-5)
+        clust.do_spec_clust(emb, None, 0.05)
+        assert same_partition(clust.labels_)
+
+    # Disconnected graph: repeated zero Eigen value
+    clust = Spec_Clust_sparse(max_num_spkrs=10, max_neighbors=5)
+    clust.do_spec_clust(centers[speakers] + 0.01 * rng.randn(600, 32), None, 1)
+    assert same_partition(clust.labels_)
+
+    # Clustering of kmeans centroids
+    clust = Spec_Clust_sparse(num_centroids=100)
+    clust.do_spec_clust(emb, 4, 0.1)
+    assert same_partition(clust.labels_)
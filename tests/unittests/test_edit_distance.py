@@ -60,3 +60,39 @@ def test_count_ops():
     assert count_ops(table)["insertions"] == 0
     assert count_ops(table)["deletions"] == 0
     assert count_ops(table)["substitutions"] == 1
+
+
+def test_batch_edit_distance():
+    import random
+    from speechbrain.utils.edit_distance import (
+        op_table,
+        count_ops,
+        alignment,
+        batch_op_tables,
+        batch_count_ops,
+        batch_alignments,
+    )
+
+    random.seed(1)
+    # A small vocabulary makes many ties, which exercises the tie-breaking
+    refs = [
+        [random.choice("abcd") for _ in range(random.randint(0, 12))]
+        for _ in range(50)
+    ]
+    hyps = [
+        [random.choice("abcd") for _ in range(random.randint(0, 12))]
+        for _ in range(50)
+    ]
+    tables = batch_op_tables(refs, hyps, max_batch_size=7)
+    counts = batch_count_ops(refs, hyps, max_batch_size=7)
+    alignments = batch_alignments(refs, hyps, max_batch_size=7)
+    for ref, hyp, table, ops, ali in zip(
+        refs, hyps, tables, counts, alignments
+    ):
+        expected = op_table(ref, hyp)
+        assert table == expected
+        assert ops == count_ops(expected)
+        assert ali == alignment(expected)
+    # Very long pairs are split over several solver calls
+    tables = batch_op_tables(refs, hyps, max_table_cells=200)
+    assert all(t == op_table(r, h) for r, h, t in zip(refs, hyps, tables))
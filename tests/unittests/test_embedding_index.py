@@ -0,0 +1,64 @@
+import pytest
+
+
+def test_embedding_index(tmpdir):
+    import torch
+    from speechbrain.pretrained.embedding_index import EmbeddingIndex
+
+    torch.manual_seed(0)
+    embeddings = torch.randn(3000, 32)
+    keys = [f"spk{i}" for i in range(len(embeddings))]
+    queries = embeddings[:50] + 0.3 * torch.randn(50, 32)
+
+    def brute_force(keys, embeddings, queries, k):
+        embeddings = torch.nn.functional.normalize(embeddings, dim=-1)
+        queries = torch.nn.functional.normalize(queries, dim=-1)
+        scores, top = (queries @ embeddings.T).topk(k, dim=1)
+        return scores, [[keys[i] for i in row] for row in top.tolist()]
+
+    index = EmbeddingIndex(dim=32, path=tmpdir / "index", chunk_size=700)
+    index.add(keys[:2000], embeddings[:2000])
+    index.add(keys[2000:], embeddings[2000:].unsqueeze(1))
+    scores, found = index.search(queries, k=5)
+    expected_scores, expected = brute_force(keys, embeddings, queries, 5)
+    assert found == expected
+    assert torch.allclose(scores, expected_scores, atol=1e-5)
+
+    # Removing and adding back
+    removed = keys[10:40]
+    index.remove(removed)
+    assert len(index) == len(keys) - len(removed) and keys[10] not in index
+    kept = [i for i in range(len(keys)) if i < 10 or i >= 40]
+    _, found = index.search(queries, k=5)
+    assert (
+        found
+        == brute_force([keys[i] for i in kept], embeddings[kept], queries, 5)[1]
+    )
+    index.add(removed, embeddings[10:40])
+    index.save()
+
+    # Creating an index over an existing one is refused
+    with pytest.raises(FileExistsError):
+        EmbeddingIndex(dim=32, path=tmpdir / "index")
+
+    # Reopened from the memory-mapped file, approximate search
+    index = EmbeddingIndex.open(tmpdir / "index")
+    assert len(index) == len(keys)
+    _, found = index.search(queries, k=5)
+    assert found == expected
+    index.train_ivfpq(num_lists=32, num_subvectors=8, num_iters=10)
+    _, found = index.search(queries, k=1, nprobe=4)
+    recall = sum(f[0] == e[0] for f, e in zip(found, expected)) / len(found)
+    assert recall >= 0.9
+    index.remove(keys[:5])
+    index.add(keys[:5], embeddings[:5])
+    index.save()
+    index = EmbeddingIndex.open(tmpdir / "index")
+    _, exhaustive = index.search(queries, k=1, nprobe=32, refine=100)
+    assert exhaustive == [e[:1] for e in expected]
+
+    # float16 storage
+    index = EmbeddingIndex(dim=32, dtype="float16")
+    index.add(keys, embeddings)
+    scores, found = index.search(queries, k=1)
+    assert torch.allclose(scores, expected_scores[:, :1], atol=1e-2)
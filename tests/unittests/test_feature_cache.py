@@ -0,0 +1,75 @@
+import os
+
+import torch
+
+
+def test_feature_cache(tmpdir):
+    from speechbrain.dataio.dataio import read_audio, write_audio
+    from speechbrain.dataio.feature_cache import FeatureCache
+    from speechbrain.lobes.features import Fbank, MFCC
+
+    audio_list = []
+    for i in range(6):
+        path = str(tmpdir / f"utt{i}.wav")
+        write_audio(path, torch.rand(4000 + 1000 * i) - 0.5, 16000)
+        audio_list.append(path)
+    audio_list.append({"file": audio_list[5], "start": 1000, "stop": 5000})
+
+    fbank = Fbank(n_mels=24)
+    cache = FeatureCache(fbank, str(tmpdir / "cache"))
+    assert cache.build(audio_list, num_workers=2, chunk_size=2) == 7
+    assert len(cache) == 7
+    for audio in audio_list:
+        expected = fbank(read_audio(audio).unsqueeze(0)).squeeze(0)
+        assert torch.allclose(cache(audio), expected, atol=1e-5)
+
+    # Persistent: a new cache with the same configuration is already built
+    cache = FeatureCache(Fbank(n_mels=24), str(tmpdir / "cache"))
+    assert cache.build(audio_list, num_workers=0) == 0
+    # A changed audio file is recomputed
+    write_audio(audio_list[0], torch.rand(8000) - 0.5, 16000)
+    os.utime(audio_list[0], ns=(0, 0))
+    assert cache.build(audio_list, num_workers=0) == 1
+    expected = fbank(read_audio(audio_list[0]).unsqueeze(0)).squeeze(0)
+    assert torch.allclose(cache(audio_list[0]), expected, atol=1e-5)
+    assert torch.allclose(
+        cache(audio_list[1]),
+        fbank(read_audio(audio_list[1]).unsqueeze(0)).squeeze(0),
+        atol=1e-5,
+    )
+
+    # Another configuration gets its own store
+    for other in [Fbank(n_mels=40), Fbank(n_mels=24, deltas=True), MFCC()]:
+        other_cache = FeatureCache(other, str(tmpdir / "cache"))
+        assert other_cache.cache_dir != cache.cache_dir
+        assert len(other_cache) == 0
+
+    # Misses are computed on the fly
+    missing = str(tmpdir / "missing.wav")
+    write_audio(missing, torch.rand(3000) - 0.5, 16000)
+    assert missing not in cache
+    assert cache(missing).shape == (19, 24)
+
+
+def test_feature_cache_dataloader(tmpdir):
+    from speechbrain.dataio.dataio import write_audio
+    from speechbrain.dataio.dataloader import make_dataloader
+    from speechbrain.dataio.dataset import DynamicItemDataset
+    from speechbrain.dataio.feature_cache import FeatureCache
+    from speechbrain.lobes.features import Fbank
+
+    data = {}
+    for i in range(4):
+        path = str(tmpdir / f"utt{i}.wav")
+        write_audio(path, torch.rand(4000) - 0.5, 16000)
+        data[f"utt{i}"] = {"wav": path}
+    cache = FeatureCache(Fbank(), str(tmpdir / "cache"), dtype="float16")
+    cache.build([example["wav"] for example in data.values()], num_workers=0)
+    dataset = DynamicItemDataset(data)
+    dataset.add_dynamic_item(cache, takes="wav", provides="feats")
+    dataset.set_output_keys(["id", "feats"])
+    loader = make_dataloader(dataset, batch_size=2, num_workers=2)
+    batches = list(loader)
+    assert len(batches) == 2
+    assert batches[0].feats.data.shape == (2, 26, 40)
+    assert batches[0].feats.data.dtype == torch.float32
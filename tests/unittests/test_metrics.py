@@ -119,6 +119,27 @@ def test_minDCF(device):
     assert threshold > 0.3 and threshold < 0.4
 
 
+def test_score_histogram():
+    from speechbrain.utils.metric_stats import EER, minDCF, ScoreHistogram
+
+    torch.manual_seed(0)
+    positive_scores = (0.5 + 0.2 * torch.randn(2000)).clamp(-1, 1)
+    negative_scores = (0.2 * torch.randn(20000)).clamp(-1, 1)
+    histogram = ScoreHistogram(num_bins=20000)
+    for positive_chunk, negative_chunk in zip(
+        positive_scores.tensor_split(4), negative_scores.tensor_split(4)
+    ):
+        histogram.append(positive_chunk, negative_chunk)
+
+    eer, threshold = EER(positive_scores, negative_scores)
+    hist_eer, hist_threshold = histogram.EER()
+    assert abs(eer - hist_eer) < 1e-3
+    assert abs(threshold - hist_threshold) < 1e-3
+    min_dcf, threshold = minDCF(positive_scores, negative_scores)
+    hist_min_dcf, hist_threshold = histogram.minDCF()
+    assert abs(min_dcf - hist_min_dcf) < 1e-3
+
+
 def test_classification_stats():
     import pytest
     from speechbrain.utils.metric_stats import ClassificationStats
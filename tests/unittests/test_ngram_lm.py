@@ -24,3 +24,89 @@ def test_backofff_ngram_lm():
     assert lm.logprob("c", ()) == float("-inf")
     # OOV in context:
     assert lm.logprob("a", ("c",)) == HALF
+
+
+def _random_arpa(seed=0, vocab_size=20, order=3):
+    """Writes a random (but well formed) ARPA model to a string."""
+    import random
+
+    rng = random.Random(seed)
+    vocab = ["<s>", "</s>", "<unk>"] + ["w%d" % i for i in range(vocab_size)]
+    sections = [[(w,) for w in vocab]]
+    for n in range(2, order + 1):
+        grams = set()
+        for context in sections[-1]:
+            for _ in range(rng.randint(0, 3)):
+                grams.add(context + (rng.choice(vocab),))
+        sections.append(sorted(grams))
+    lines = ["\\data\\"]
+    lines += ["ngram %d=%d" % (n + 1, len(s)) for n, s in enumerate(sections)]
+    for n, section in enumerate(sections):
+        lines += ["", "\\%d-grams:" % (n + 1)]
+        for gram in section:
+            line = "%.4f %s" % (-rng.random() * 3, " ".join(gram))
+            if n + 1 < order and rng.random() < 0.7:
+                line += " %.4f" % (-rng.random())
+            lines.append(line)
+    lines += ["", "\\end\\", ""]
+    return "\n".join(lines), vocab
+
+
+def test_compiled_ngram_lm(tmpdir):
+    from speechbrain.lm.arpa import read_arpa
+    from speechbrain.lm.ngram import BackoffNgramLM, CompiledNgramLM
+    import io
+    import os
+    import random
+
+    arpa, vocab = _random_arpa()
+    _, ngrams, backoffs = read_arpa(io.StringIO(arpa))
+    reference = BackoffNgramLM(ngrams, backoffs)
+    lm = CompiledNgramLM.from_arpa(io.StringIO(arpa))
+    path = os.path.join(tmpdir, "lm.bin")
+    lm.save(path)
+    assert CompiledNgramLM.is_compiled_lm(path)
+    loaded = CompiledNgramLM.load(path)
+
+    rng = random.Random(1)
+    words = vocab + ["oov"]
+    for _ in range(500):
+        context = tuple(rng.choice(words) for _ in range(rng.randint(0, 3)))
+        token = rng.choice(words)
+        expected = reference.logprob(token, context)
+        for model in [lm, loaded]:
+            result = model.logprob(token, context)
+            if expected == float("-inf"):
+                assert result == expected
+            else:
+                assert abs(result - expected) < 1e-5
+
+    # Scoring whole sentences with the batched state API
+    sentences = [[rng.choice(vocab[1:]) for _ in range(8)] for _ in range(20)]
+    states = [lm.context_state(("<s>",))] * len(sentences)
+    for t in range(8):
+        tokens = [sentence[t] for sentence in sentences]
+        logprobs, states = lm.score_batch(states, lm.words_to_ids(tokens))
+        for i, sentence in enumerate(sentences):
+            context = tuple(["<s>"] + sentence[:t])
+            expected = reference.logprob(sentence[t], context)
+            assert abs(logprobs[i] - expected) < 1e-5
+
+
+def test_compiled_ngram_lm_quantized():
+    from speechbrain.lm.ngram import CompiledNgramLM
+    import io
+
+    arpa, vocab = _random_arpa(order=2)
+    lm = CompiledNgramLM.from_arpa(io.StringIO(arpa))
+    quantized = CompiledNgramLM.from_arpa(io.StringIO(arpa), quantize_bits=8)
+    assert quantized.tables["probs_2"].dtype.itemsize == 1
+    for token in vocab:
+        for context in [(), ("w1",), ("<s>",)]:
+            assert (
+                abs(
+                    lm.logprob(token, context)
+                    - quantized.logprob(token, context)
+                )
+                < 0.1
+            )
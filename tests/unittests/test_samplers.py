@@ -46,3 +46,52 @@ def test_ConcatDatasetBatchSampler(device):
     non_cat_data = [x[:minlen] for x in non_cat_data]
     non_cat_data = np.array(non_cat_data)
     np.testing.assert_array_equal(non_cat_data.T, concat_data)
+
+
+def test_DynamicBatchSampler():
+    from speechbrain.dataio.sampler import DynamicBatchSampler
+    import numpy as np
+
+    rng = np.random.RandomState(0)
+    lengths = rng.randint(10, 100, size=500)
+    dataset = list(range(len(lengths)))
+
+    def check(sampler, padded_budget=False):
+        batches = list(sampler)
+        assert len(batches) == len(sampler)
+        # Every example exactly once
+        assert sorted(sum(batches, [])) == dataset
+        padded, total = 0, 0
+        for batch in batches:
+            assert len(batch) <= 8
+            padded += len(batch) * lengths[batch].max()
+            total += lengths[batch].sum()
+            if padded_budget:
+                assert len(batch) * lengths[batch].max() <= 300
+        assert np.isclose(sampler.padding_ratio, 1 - total / padded)
+
+    bucketed = DynamicBatchSampler(
+        dataset, 300, num_buckets=5, lengths_list=lengths, max_batch_ex=8
+    )
+    check(bucketed)
+    first_epoch = list(bucketed)
+    bucketed.set_epoch(1)
+    check(bucketed)
+    assert list(bucketed) != first_epoch
+
+    packed = DynamicBatchSampler(
+        dataset, 300, lengths_list=lengths, max_batch_ex=8, packing=True
+    )
+    check(packed, padded_budget=True)
+    assert packed.padding_ratio < bucketed.padding_ratio
+
+    ordered = DynamicBatchSampler(
+        dataset,
+        300,
+        num_buckets=5,
+        lengths_list=lengths,
+        max_batch_ex=8,
+        batch_ordering="descending",
+    )
+    max_lengths = [lengths[batch].max() for batch in ordered]
+    assert max_lengths == sorted(max_lengths, reverse=True)
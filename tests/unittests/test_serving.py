@@ -0,0 +1,72 @@
+import pytest
+
+
+def test_batching_server():
+    import asyncio
+    import torch
+    from speechbrain.pretrained.serving import BatchingServer
+
+    batch_sizes = []
+
+    def batch_fn(wavs, wav_lens):
+        batch_sizes.append(wavs.shape[0])
+        lengths = torch.round(wav_lens * wavs.shape[1]).long()
+        sums = [wav[:length].sum() for wav, length in zip(wavs, lengths)]
+        return {"sum": torch.stack(sums), "len": lengths.tolist()}, None
+
+    wavs = [torch.rand(length) for length in range(10, 410, 10)]
+
+    async def submit_all(server):
+        return await asyncio.gather(*[server.submit(wav) for wav in wavs])
+
+    with BatchingServer(
+        batch_fn, max_batch_size=8, max_wait_ms=50, max_length_ratio=3.0
+    ) as server:
+        results = asyncio.run(submit_all(server))
+    for wav, (output, extra) in zip(wavs, results):
+        assert extra is None
+        assert output["len"] == len(wav)
+        assert torch.allclose(output["sum"], wav.sum())
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < len(wavs)
+
+    # Errors are raised in the submitting coroutine
+    def failing_fn(wavs, wav_lens):
+        raise ValueError("bad input")
+
+    with BatchingServer(failing_fn) as server:
+        with pytest.raises(ValueError):
+            asyncio.run(server.submit(torch.rand(10)))
+
+
+def test_batching_server_errors():
+    import asyncio
+    import torch
+    from speechbrain.pretrained.serving import BatchingServer, _STOP
+
+    def batch_fn(wavs, wav_lens):
+        return wavs.sum(dim=1)
+
+    async def bad_then_good(server):
+        with pytest.raises(ValueError):
+            await server.submit(torch.tensor(1.0))
+        return await asyncio.wait_for(server.submit(torch.ones(10)), 5)
+
+    # A bad input fails alone, and the worker keeps serving
+    with BatchingServer(batch_fn) as server:
+        assert asyncio.run(bad_then_good(server)).item() == 10.0
+        assert server._worker.is_alive()
+    with pytest.raises(RuntimeError):
+        asyncio.run(server.submit(torch.ones(10)))
+
+    # Requests left in the queue after the stop are failed, not forgotten
+    async def left_behind(server):
+        future = asyncio.get_running_loop().create_future()
+        server._queue.put(_STOP)
+        server._queue.put((torch.ones(10), asyncio.get_running_loop(), future))
+        server._worker.join()
+        return await asyncio.wait_for(future, 5)
+
+    server = BatchingServer(batch_fn).start()
+    with pytest.raises(RuntimeError, match="closed"):
+        asyncio.run(left_behind(server))
@@ -0,0 +1,73 @@
+import torch
+
+
+def _make_shards(tmpdir, num_utts=12, max_count=3):
+    from speechbrain.dataio.dataio import write_audio
+    from speechbrain.dataio.shards import write_shards
+
+    data = {}
+    signals = {}
+    for i in range(num_utts):
+        path = str(tmpdir / f"utt.{i}.wav")
+        signal = torch.rand(800 + 100 * i) - 0.5
+        write_audio(path, signal, 16000)
+        data[f"utt.{i}"] = {"wav": path, "length": i}
+        signals[f"utt.{i}"] = signal
+    # A segment, stored cut from its file
+    data["segment"] = {
+        "wav": {"file": data["utt.5"]["wav"], "start": 100, "stop": 500},
+        "length": -1,
+    }
+    signals["segment"] = signals["utt.5"][100:500]
+    shards = write_shards(
+        data, str(tmpdir / "shards" / "train-%03d.tar"), max_count=max_count
+    )
+    return shards, signals
+
+
+def test_sharded_dataset(tmpdir):
+    from speechbrain.dataio.dataio import read_audio
+    from speechbrain.dataio.shards import ShardedDynamicItemDataset
+
+    shards, signals = _make_shards(tmpdir)
+    assert len(shards) == 5
+    dataset = ShardedDynamicItemDataset(shards)
+    dataset.add_dynamic_item(read_audio, takes="wav", provides="sig")
+    dataset.set_output_keys(["id", "sig", "length"])
+    examples = list(dataset)
+    # Without shuffling, the examples come in the order of writing
+    assert [example["id"] for example in examples] == list(signals.keys())
+    for example in examples:
+        assert torch.allclose(example["sig"], signals[example["id"]], atol=1e-4)
+    assert examples[0]["length"] == 0
+
+    # Shuffling: all examples, in an order which depends on the epoch
+    dataset = ShardedDynamicItemDataset(shards, shuffle=True, shuffle_buffer=4)
+    dataset.set_output_keys(["id"])
+    orders = []
+    for epoch in range(2):
+        dataset.set_epoch(epoch)
+        orders.append([example["id"] for example in dataset])
+        assert orders[-1] != list(signals.keys())
+        assert sorted(orders[-1]) == sorted(signals.keys())
+        assert orders[-1] == [example["id"] for example in dataset]
+    assert orders[0] != orders[1]
+
+
+def test_sharded_dataset_workers(tmpdir):
+    from speechbrain.dataio.batch import PaddedBatch
+    from speechbrain.dataio.dataio import read_audio
+    from speechbrain.dataio.dataloader import make_dataloader
+    from speechbrain.dataio.shards import ShardedDynamicItemDataset
+
+    shards, signals = _make_shards(tmpdir)
+    dataset = ShardedDynamicItemDataset(shards, shuffle=True)
+    dataset.add_dynamic_item(read_audio, takes="wav", provides="sig")
+    dataset.set_output_keys(["id", "sig"])
+    loader = make_dataloader(dataset, batch_size=2, num_workers=2)
+    ids = []
+    for batch in loader:
+        assert isinstance(batch, PaddedBatch)
+        ids.extend(batch.id)
+    # Every example exactly once, the shards being split between workers
+    assert sorted(ids) == sorted(signals.keys())
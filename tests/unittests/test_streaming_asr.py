@@ -0,0 +1,94 @@
+def test_encoder_asr_streaming(tmpdir):
+    import functools
+    import pytest
+    import torch
+    from speechbrain.dataio.dataio import write_audio
+    from speechbrain.dataio.encoder import CTCTextEncoder
+    from speechbrain.decoders.ctc import (
+        CTCPrefixBeamSearcher,
+        ctc_greedy_decode,
+    )
+    from speechbrain.pretrained.interfaces import EncoderASR
+
+    hop, num_tokens = 160, 5
+
+    class FrameEncoder(torch.nn.Module):
+        """Token posteriors of each frame of hop samples, from its mean
+        level alone."""
+
+        def forward(self, wavs, wav_lens):
+            frames = wavs[:, : wavs.shape[1] // hop * hop]
+            levels = frames.reshape(len(wavs), -1, hop).mean(dim=-1)
+            tokens = torch.round(levels * 10).long().clamp(0, num_tokens - 1)
+            one_hot = torch.nn.functional.one_hot(tokens, num_tokens)
+            return (4.0 * one_hot).log_softmax(dim=-1)
+
+    tokenizer = CTCTextEncoder()
+    tokenizer.insert_blank(index=0)
+    tokenizer.update_from_iterable("abcd")
+    tokenizer.expect_len(num_tokens)
+    asr = EncoderASR(
+        modules={"encoder": FrameEncoder()},
+        hparams={
+            "tokenizer": tokenizer,
+            "decoding_function": functools.partial(
+                ctc_greedy_decode, blank_id=0
+            ),
+        },
+    )
+
+    # Tokens of various lengths (in frames), some spanning the chunk
+    # boundaries (every 25 frames), and a repeated token split by a blank
+    # at a boundary
+    segments = [(0, 3), (1, 30), (2, 4), (0, 12), (3, 9), (0, 1), (3, 7)]
+    segments += [(4, 50), (1, 6), (0, 24), (1, 40), (0, 10)]
+    levels = torch.cat(
+        [torch.full((length * hop,), token / 10) for token, length in segments]
+    )
+    path = str(tmpdir / "tokens.wav")
+    write_audio(path, levels, 16000)
+    num_frames = len(levels) // hop
+
+    # Chunks of 25 frames, with 10 frames of left and 5 of right context
+    chunks = list(asr.load_audio_chunks(path, 0.25, 0.1, 0.05, savedir=tmpdir))
+    assert len(chunks) == -(-num_frames // 25)
+    trimmed = []
+    for i, (chunk, left, right) in enumerate(chunks):
+        assert left == (0 if i == 0 else 1600)
+        assert right == (800 if i < len(chunks) - 1 else 0)
+        frames = asr.encode_batch(chunk.unsqueeze(0), torch.ones(1))
+        frames = asr.trim_context(frames, chunk.shape[0], left, right)
+        assert frames.shape[1] == min(25, num_frames - 25 * i)
+        trimmed.append(frames)
+    full = asr.encode_batch(
+        asr.load_audio(path, savedir=tmpdir).unsqueeze(0), torch.ones(1)
+    )
+    assert torch.equal(torch.cat(trimmed, dim=1), full)
+
+    expected = asr.transcribe_file(path, savedir=tmpdir)
+    assert expected == "abccdaa"
+    texts = list(
+        asr.transcribe_file_streaming(path, 0.25, 0.1, 0.05, savedir=tmpdir)
+    )
+    assert len(texts) == len(chunks)
+    assert "".join(texts) == expected
+
+    # The beams of the prefix search are carried over the chunks
+    asr.decoding_function = CTCPrefixBeamSearcher(
+        blank_index=0, vocab_list=asr._get_vocab_list(), hotwords=["ab"]
+    )
+    assert asr.transcribe_file(path, savedir=tmpdir) == expected
+    texts = list(
+        asr.transcribe_file_streaming(path, 0.25, 0.1, 0.05, savedir=tmpdir)
+    )
+    assert len(texts) == len(chunks) + 1
+    assert "".join(texts) == expected
+    # Tokens shared by all the beams are output before the end
+    assert "".join(texts[:-1])
+
+    # Other decoding functions have no state to carry
+    asr.decoding_function = lambda log_probs, wav_lens: [[]]
+    with pytest.raises(ValueError):
+        list(
+            asr.transcribe_file_streaming(path, 0.25, 0.1, 0.05, savedir=tmpdir)
+        )
@@ -0,0 +1,70 @@
+def test_streaming_vad():
+    import torch
+    from speechbrain.pretrained.interfaces import VAD, StreamingVAD
+
+    hop, win = 160, 400
+
+    class EnergyVAD(VAD):
+        """Speech probability from the local amplitude, one frame per hop
+        centered on it, as the features of the pre-trained VAD."""
+
+        def __init__(self):
+            torch.nn.Module.__init__(self)
+            self.time_resolution = 0.01
+            self.sample_rate = 16000
+            self.device = "cpu"
+
+        def get_speech_prob_chunk(self, wavs, wav_lens=None):
+            padded = torch.nn.functional.pad(wavs, (win // 2, win // 2))
+            frames = padded.unfold(1, win, hop)
+            return frames.abs().mean(dim=-1, keepdim=True).clamp(max=1.0)
+
+    # Segments of silence, speech, and levels between the thresholds
+    torch.manual_seed(0)
+    levels = [0.0, 0.9, 0.0, 0.35, 0.9, 0.35, 0.0, 0.9, 0.0, 0.9, 0.0]
+    durations = [0.3, 1.0, 0.1, 0.3, 0.5, 0.2, 0.6, 0.15, 0.2, 0.8, 0.37]
+    wav = torch.cat(
+        [
+            level * 2 * torch.ones(int(duration * 16000))
+            for level, duration in zip(levels, durations)
+        ]
+    )
+    wav = wav * torch.sign(torch.randn(wav.shape))
+
+    vad = EnergyVAD()
+    num_frames = len(wav) // hop
+    expected_probs = vad.get_speech_prob_chunk(wav.unsqueeze(0))
+    expected_probs = expected_probs[:, :num_frames]
+    boundaries = vad.get_boundaries(vad.apply_threshold(expected_probs))
+    boundaries = vad.merge_close_segments(boundaries, close_th=0.255)
+    expected = vad.remove_short_segments(boundaries, len_th=0.205)
+    assert len(expected) == 2
+
+    stream = StreamingVAD(
+        vad, chunk_size=0.3, context=0.2, close_th=0.255, len_th=0.205
+    )
+    for _ in range(2):
+        probs, segments, begin = [], [], 0
+        while begin < len(wav):
+            end = begin + int(torch.randint(1, 4000, (1,)))
+            new_probs, new_segments = stream.process(wav[begin:end])
+            # Segments are given as soon as they are final
+            for segment in new_segments:
+                assert (
+                    end / 16000
+                    <= segment[1] + stream.close_th + stream.latency + 0.01
+                )
+            probs.append(new_probs)
+            segments.append(new_segments)
+            begin = end
+        new_probs, new_segments = stream.flush()
+        probs = torch.cat(probs + [new_probs])
+        segments = torch.cat(segments + [new_segments])
+        assert torch.allclose(probs, expected_probs[0, :, 0])
+        assert torch.allclose(segments, expected)
+
+    # Integer PCM
+    probs, _ = stream.process((wav * 8192).short())
+    expected_probs = vad.get_speech_prob_chunk(wav.unsqueeze(0) / 4)
+    assert torch.allclose(probs, expected_probs[0, : len(probs), 0], atol=1e-4)
+    assert stream.latency == 0.8
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmarks the throughput of noise and reverberation augmentation.
+
+Writes synthetic noises and room impulse responses to a temporary folder,
+and corrupts batches of random waveforms with ``AddNoise`` and
+``AddReverb``, reading the corruptions from their csv files (through a
+DataLoader, at every batch) or drawing them from an ``AudioBank`` (decoded
+once, in float32 or float16). Reports the time per batch and the number of
+seconds of audio augmented per second.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_augmentation.py --batch-size 16 --duration 4
+"""
+import os
+import tempfile
+import time
+
+import torch
+
+from speechbrain.dataio.dataio import write_audio
+from speechbrain.processing.speech_augmentation import (
+    AddNoise,
+    AddReverb,
+    AudioBank,
+)
+
+
+def write_csv(folder, name, signals, sample_rate):
+    """Writes the signals to wav files, and a csv file listing them."""
+    csv_file = os.path.join(folder, f"{name}.csv")
+    with open(csv_file, "w") as fo:
+        fo.write("ID, duration, wav, wav_format, wav_opts\n")
+        for i, signal in enumerate(signals):
+            path = os.path.join(folder, f"{name}{i}.wav")
+            write_audio(path, signal, sample_rate)
+            duration = len(signal) / sample_rate
+            fo.write(f"{name}{i}, {duration}, {path}, wav,\n")
+    return csv_file
+
+
+def make_rir(length, sample_rate, generator):
+    """Exponentially decaying noise after a direct path."""
+    rir = torch.randn(length, generator=generator)
+    rir *= torch.exp(-torch.arange(length) / (0.05 * sample_rate))
+    rir[: int(torch.randint(100, (1,), generator=generator))] = 0
+    return 0.5 * rir / rir.abs().max()
+
+
+def timed(augment, waveforms, lengths, num_batches, device):
+    """Augments num_batches batches, returns the time per batch."""
+    augment(waveforms, lengths)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        augment(waveforms, lengths)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / num_batches
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=4.0)
+    parser.add_argument("--num-noises", type=int, default=100)
+    parser.add_argument("--num-rirs", type=int, default=100)
+    parser.add_argument("--num-batches", type=int, default=20)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    sample_rate = args.sample_rate
+    generator = torch.Generator().manual_seed(0)
+    noises = [
+        0.1 * torch.randn(int(sample_rate * (2 + 8 * i / args.num_noises)))
+        for i in range(args.num_noises)
+    ]
+    rirs = [
+        make_rir(int(sample_rate * 0.5), sample_rate, generator)
+        for _ in range(args.num_rirs)
+    ]
+    num_samples = int(args.duration * sample_rate)
+    waveforms = torch.randn(
+        args.batch_size, num_samples, generator=generator
+    ).to(args.device)
+    lengths = torch.ones(args.batch_size, device=args.device)
+    audio_seconds = args.batch_size * args.duration
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        noise_csv = write_csv(tmpdir, "noise", noises, sample_rate)
+        rir_csv = write_csv(tmpdir, "rir", rirs, sample_rate)
+
+        systems = {
+            "noise csv": AddNoise(noise_csv, pad_noise=True),
+            "reverb csv": AddReverb(rir_csv),
+        }
+        for dtype in ["float32", "float16"]:
+            start = time.perf_counter()
+            noise_bank = AudioBank(noise_csv, dtype=dtype)
+            rir_bank = AudioBank(rir_csv, dtype=dtype)
+            print(
+                f"{dtype} banks loaded in "
+                f"{time.perf_counter() - start:.2f} s, "
+                f"{noise_bank.clips.nbytes / 2 ** 20:.1f} MB of noises"
+            )
+            systems[f"noise bank {dtype}"] = AddNoise(
+                noise_bank=noise_bank, pad_noise=True
+            )
+            systems[f"reverb bank {dtype}"] = AddReverb(rir_bank=rir_bank)
+
+        for name, augment in systems.items():
+            augment = augment.to(args.device)
+            latency = timed(
+                augment, waveforms, lengths, args.num_batches, args.device
+            )
+            print(
+                f"{name:20s}: {latency * 1000:8.1f} ms per batch, "
+                f"{audio_seconds / latency:8.0f} s of audio per s"
+            )
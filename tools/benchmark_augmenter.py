@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmarks the cost per batch of waveform augmentation.
+
+Augments batches of random waveforms with each augmentation alone, then
+with an ``Augmenter`` combining them:
+
+* "batch": one set of augmentations sampled for the whole batch,
+* "loop": the Augmenter called on each example, the way to get different
+  augmentations per example without ``per_example_augment``,
+* "per example": ``per_example_augment=True``, each augmentation running
+  once on the sub-batch of the examples which selected it.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_augmenter.py --batch-size 32 --duration 4
+"""
+import time
+
+import torch
+
+from speechbrain.processing.augmentation import Augmenter
+from speechbrain.processing.speech_augmentation import (
+    DoClip,
+    DropChunk,
+    DropFreq,
+    RandAmp,
+    SpeedPerturb,
+)
+
+
+def timed(augment, waveforms, lengths, num_batches, device):
+    """Augments num_batches batches, returns the time per batch."""
+    augment(waveforms, lengths)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        augment(waveforms, lengths)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / num_batches
+
+
+def without_lengths(augmentation):
+    """Calls an augmentation which does not take the lengths."""
+
+    def augment(waveforms, lengths):
+        return augmentation(waveforms)
+
+    return augment
+
+
+def loop_over_examples(augmenter):
+    """Calls the augmenter on each example of the batch."""
+
+    def augment(waveforms, lengths):
+        return [
+            augmenter(waveforms[i : i + 1], lengths[i : i + 1])
+            for i in range(len(waveforms))
+        ]
+
+    return augment
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=4.0)
+    parser.add_argument("--num-batches", type=int, default=10)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    augmentations = {
+        "speed": SpeedPerturb(args.sample_rate, speeds=[90, 100, 110]),
+        "drop_freq": DropFreq(drop_count_low=1, drop_count_high=3),
+        "drop_chunk": DropChunk(drop_count_low=1, drop_count_high=5),
+        "clip": DoClip(),
+        "amp": RandAmp(),
+    }
+    for augment in augmentations.values():
+        augment.to(args.device)
+
+    num_samples = int(args.duration * args.sample_rate)
+    waveforms = torch.rand(args.batch_size, num_samples, device=args.device)
+    lengths = torch.ones(args.batch_size, device=args.device)
+
+    for name, augment in augmentations.items():
+        latency = timed(
+            without_lengths(augment) if name != "drop_chunk" else augment,
+            waveforms,
+            lengths,
+            args.num_batches,
+            args.device,
+        )
+        print(f"{name:12s}: {latency * 1000:8.1f} ms per batch")
+
+    kwargs = dict(
+        min_augmentations=1,
+        max_augmentations=3,
+        shuffle_augmentations=True,
+        **augmentations,
+    )
+    systems = {
+        "batch": Augmenter(**kwargs),
+        "loop": loop_over_examples(Augmenter(**kwargs)),
+        "per example": Augmenter(per_example_augment=True, **kwargs),
+    }
+    for name, augment in systems.items():
+        latency = timed(
+            augment, waveforms, lengths, args.num_batches, args.device
+        )
+        print(f"Augmenter {name:12s}: {latency * 1000:8.1f} ms per batch")
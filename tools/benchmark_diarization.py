@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmarks the spectral clustering of diarization embeddings.
+
+Clusters synthetic embeddings (noisy copies of a few speaker embeddings,
+grouped in turns, as the windows of a meeting) with the dense
+``Spec_Clust_unorm`` and the sparse ``Spec_Clust_sparse``, with and without
+kmeans centroids, from 10^3 to 10^5 windows. Reports the time, the
+estimated number of speakers and the adjusted Rand index of the labels
+(1.0 when the speakers are perfectly recovered). The dense clustering is
+skipped above ``--max-dense`` windows: its memory is quadratic in the
+number of windows, and its time cubic.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_diarization.py --sizes 1000 10000 100000
+"""
+import time
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from speechbrain.processing.diarization import (
+    Spec_Clust_sparse,
+    Spec_Clust_unorm,
+)
+
+
+def make_embeddings(num_windows, num_spkrs, dim, noise, seed):
+    """Windows of speaker turns of random lengths, with noisy embeddings."""
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(num_spkrs, dim)
+    speakers = []
+    while len(speakers) < num_windows:
+        speakers.extend([rng.randint(num_spkrs)] * rng.randint(1, 50))
+    speakers = np.array(speakers[:num_windows])
+    emb = centers[speakers] + noise * rng.randn(num_windows, dim)
+    return emb, speakers
+
+
+def run(clust, emb, speakers, p_val):
+    """Clusters, returns the time, number of speakers and Rand index."""
+    start = time.perf_counter()
+    clust.do_spec_clust(emb, None, p_val)
+    elapsed = time.perf_counter() - start
+    num_spkrs = len(set(clust.labels_.tolist()))
+    return elapsed, num_spkrs, adjusted_rand_score(speakers, clust.labels_)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--num-spkrs", type=int, default=6)
+    parser.add_argument("--dim", type=int, default=192)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--p-val", type=float, default=0.02)
+    parser.add_argument("--max-neighbors", type=int, default=100)
+    parser.add_argument("--num-centroids", type=int, default=1000)
+    parser.add_argument("--max-dense", type=int, default=10000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        emb, speakers = make_embeddings(
+            size, args.num_spkrs, args.dim, args.noise, seed=0
+        )
+        systems = {
+            "sparse": Spec_Clust_sparse(max_neighbors=args.max_neighbors),
+            "sparse lobpcg": Spec_Clust_sparse(
+                max_neighbors=args.max_neighbors, eigen_solver="lobpcg"
+            ),
+            "sparse centroids": Spec_Clust_sparse(
+                max_neighbors=args.max_neighbors,
+                num_centroids=args.num_centroids,
+            ),
+        }
+        if size <= args.max_dense:
+            systems["dense"] = Spec_Clust_unorm()
+        for name, clust in systems.items():
+            elapsed, num_spkrs, ari = run(clust, emb, speakers, args.p_val)
+            print(
+                f"{size:7d} windows, {name:16s}: {elapsed:8.2f} s, "
+                f"{num_spkrs} speakers, ARI {ari:.3f}"
+            )
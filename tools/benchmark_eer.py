@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Benchmarks EER and minDCF on random verification trials.
+
+Compares the sort-based ``EER`` and ``minDCF`` of
+``speechbrain.utils.metric_stats`` with the former implementations (one
+pass over the scores per candidate threshold, reproduced below), and
+checks that both give the same results. The previous implementations are
+O(N^2) (and minDCF also needs O(N^2) memory), so they only run on the
+smaller sizes. The streaming ``ScoreHistogram`` is compared with the exact
+results on all sizes.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_eer.py --sizes 1000 4000 1000000 10000000
+"""
+import time
+
+import torch
+
+from speechbrain.utils.metric_stats import EER, ScoreHistogram, minDCF
+
+
+def reference_EER(positive_scores, negative_scores):
+    """The previous implementation of EER."""
+    thresholds, _ = torch.sort(torch.cat([positive_scores, negative_scores]))
+    thresholds = torch.unique(thresholds)
+    interm_thresholds = (thresholds[0:-1] + thresholds[1:]) / 2
+    thresholds, _ = torch.sort(torch.cat([thresholds, interm_thresholds]))
+    min_index = 0
+    final_FRR = 0
+    final_FAR = 0
+    for i, cur_thresh in enumerate(thresholds):
+        pos_scores_threshold = positive_scores <= cur_thresh
+        FRR = (pos_scores_threshold.sum(0)).float() / positive_scores.shape[0]
+        neg_scores_threshold = negative_scores > cur_thresh
+        FAR = (neg_scores_threshold.sum(0)).float() / negative_scores.shape[0]
+        if (FAR - FRR).abs().item() < abs(final_FAR - final_FRR) or i == 0:
+            min_index = i
+            final_FRR = FRR.item()
+            final_FAR = FAR.item()
+    EER = (final_FAR + final_FRR) / 2
+    return float(EER), float(thresholds[min_index])
+
+
+def reference_minDCF(
+    positive_scores, negative_scores, c_miss=1.0, c_fa=1.0, p_target=0.01
+):
+    """The previous implementation of minDCF."""
+    thresholds, _ = torch.sort(torch.cat([positive_scores, negative_scores]))
+    thresholds = torch.unique(thresholds)
+    interm_thresholds = (thresholds[0:-1] + thresholds[1:]) / 2
+    thresholds, _ = torch.sort(torch.cat([thresholds, interm_thresholds]))
+    positive_scores = torch.cat(
+        len(thresholds) * [positive_scores.unsqueeze(0)]
+    )
+    pos_scores_threshold = positive_scores.transpose(0, 1) <= thresholds
+    p_miss = (pos_scores_threshold.sum(0)).float() / positive_scores.shape[1]
+    negative_scores = torch.cat(
+        len(thresholds) * [negative_scores.unsqueeze(0)]
+    )
+    neg_scores_threshold = negative_scores.transpose(0, 1) > thresholds
+    p_fa = (neg_scores_threshold.sum(0)).float() / negative_scores.shape[1]
+    c_det = c_miss * p_miss * p_target + c_fa * p_fa * (1 - p_target)
+    c_min, min_index = torch.min(c_det, dim=0)
+    return float(c_min), float(thresholds[min_index])
+
+
+def random_trials(num_trials, target_ratio, decimals, generator):
+    """Cosine-like scores: targets around 0.6, non-targets around 0.1.
+
+    Rounding the scores to some decimals creates ties, as with quantized
+    or low precision scores."""
+    num_positives = max(1, int(num_trials * target_ratio))
+    num_negatives = num_trials - num_positives
+    positives = 0.6 + 0.15 * torch.randn(num_positives, generator=generator)
+    negatives = 0.1 + 0.15 * torch.randn(num_negatives, generator=generator)
+    if decimals is not None:
+        positives = positives.round(decimals=decimals)
+        negatives = negatives.round(decimals=decimals)
+    return positives.clamp(-1, 1), negatives.clamp(-1, 1)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 4000, 1000000]
+    )
+    parser.add_argument("--target-ratio", type=float, default=0.1)
+    parser.add_argument(
+        "--max-reference-size",
+        type=int,
+        default=5000,
+        help="Largest size on which the former implementations are run.",
+    )
+    parser.add_argument("--num-bins", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(args.seed)
+    for size in args.sizes:
+        for decimals in [None, 3]:
+            positives, negatives = random_trials(
+                size, args.target_ratio, decimals, generator
+            )
+            ties = "no ties" if decimals is None else "ties"
+            print(f"{size} trials ({ties}):")
+            eer, eer_time = timed(EER, positives, negatives)
+            dcf, dcf_time = timed(minDCF, positives, negatives)
+            print(
+                f"  sorted     EER {eer[0]:.6f} @ {eer[1]:.6f} "
+                f"({eer_time:.3f}s), minDCF {dcf[0]:.6f} @ {dcf[1]:.6f} "
+                f"({dcf_time:.3f}s)"
+            )
+            if size <= args.max_reference_size:
+                ref_eer, ref_eer_time = timed(
+                    reference_EER, positives, negatives
+                )
+                ref_dcf, ref_dcf_time = timed(
+                    reference_minDCF, positives, negatives
+                )
+                print(
+                    f"  reference  EER {ref_eer[0]:.6f} @ {ref_eer[1]:.6f} "
+                    f"({ref_eer_time:.3f}s), minDCF {ref_dcf[0]:.6f} @ "
+                    f"{ref_dcf[1]:.6f} ({ref_dcf_time:.3f}s)"
+                )
+                print(
+                    f"  identical: EER {eer == ref_eer}, "
+                    f"minDCF {dcf == ref_dcf}"
+                )
+            histogram = ScoreHistogram(num_bins=args.num_bins)
+            start = time.perf_counter()
+            # Streamed in chunks, as they would come from scoring
+            num_chunks = max(1, size // 1000000)
+            for positive_chunk, negative_chunk in zip(
+                positives.tensor_split(num_chunks),
+                negatives.tensor_split(num_chunks),
+            ):
+                histogram.append(positive_chunk, negative_chunk)
+            hist_eer = histogram.EER()
+            hist_dcf = histogram.minDCF()
+            hist_time = time.perf_counter() - start
+            print(
+                f"  histogram  EER {hist_eer[0]:.6f} @ {hist_eer[1]:.6f}, "
+                f"minDCF {hist_dcf[0]:.6f} @ {hist_dcf[1]:.6f} "
+                f"({hist_time:.3f}s)"
+            )
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmarks the search of an EmbeddingIndex.
+
+Fills an index with random clustered embeddings (as speaker embeddings,
+the enrolled ones are grouped around a few directions) and searches it with
+noisy copies of some of them. Reports the latency per batch of queries of
+the brute force search, by chunks, and of the IVF-PQ search for several
+``nprobe``, with the recall at k of the approximate results (the fraction
+of the k results of the brute force search which are found).
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_embedding_index.py --size 200000 --dim 192
+"""
+import tempfile
+import time
+
+import torch
+
+from speechbrain.pretrained.embedding_index import EmbeddingIndex
+
+
+def make_embeddings(size, dim, num_groups, seed):
+    """Random embeddings around num_groups directions."""
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn(num_groups, dim, generator=generator)
+    groups = torch.randint(num_groups, (size,), generator=generator)
+    return centers[groups] + torch.randn(size, dim, generator=generator)
+
+
+def timed_search(index, queries, k, batch_size, **kwargs):
+    """Searches by batches, returns the keys and the time per batch."""
+    found = []
+    start = time.perf_counter()
+    for begin in range(0, len(queries), batch_size):
+        _, keys = index.search(queries[begin : begin + batch_size], k, **kwargs)
+        found.extend(keys)
+    num_batches = -(-len(queries) // batch_size)
+    return found, (time.perf_counter() - start) / num_batches
+
+
+def recall(found, expected):
+    """Fraction of the expected keys found."""
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, expected))
+    return hits / sum(len(e) for e in expected)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=192)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--num-lists", type=int, default=512)
+    parser.add_argument("--num-subvectors", type=int, default=48)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    embeddings = make_embeddings(args.size, args.dim, 1000, seed=0)
+    keys = list(range(args.size))
+    queries = embeddings[: args.queries] + 0.5 * torch.randn(
+        args.queries, args.dim, generator=torch.Generator().manual_seed(1)
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index = EmbeddingIndex(
+            args.dim, path=tmpdir, dtype=args.dtype, device=args.device
+        )
+        start = time.perf_counter()
+        index.add(keys, embeddings)
+        index.save()
+        print(f"add {args.size}: {time.perf_counter() - start:.2f} s")
+
+        # Reopened, so that the matrix is memory-mapped
+        index = EmbeddingIndex.open(tmpdir, device=args.device)
+        expected, latency = timed_search(
+            index, queries, args.k, args.batch_size
+        )
+        print(
+            f"brute force: {latency * 1000:8.1f} ms per batch of "
+            f"{args.batch_size}"
+        )
+
+        start = time.perf_counter()
+        index.train_ivfpq(args.num_lists, args.num_subvectors)
+        print(f"IVF-PQ training: {time.perf_counter() - start:.2f} s")
+        for nprobe in [1, 4, 16, 64]:
+            found, latency = timed_search(
+                index, queries, args.k, args.batch_size, nprobe=nprobe
+            )
+            print(
+                f"IVF-PQ nprobe={nprobe:3d}: {latency * 1000:8.1f} ms per "
+                f"batch, recall@{args.k} {recall(found, expected):.3f}"
+            )
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Benchmarks loading parameters from torch.save files and tensor files.
+
+Saves the parameters of a stack of linear layers in both formats, and then
+loads them with ``torch_parameter_transfer`` (the default transfer hook of
+the Pretrainer) in a fresh process for each format. Reports the loading
+time and the peak memory used on top of the module (the peak resident set
+size, after the module is built; Linux only). A torch.save file is deserialized whole
+before being copied into the module, a tensor file is copied from the
+memory-mapped file, one submodule at a time.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_param_loading.py --layers 24 --size 2048
+"""
+import multiprocessing
+import pathlib
+import tempfile
+import time
+
+import torch
+
+from speechbrain.utils.checkpoints import torch_parameter_transfer
+from speechbrain.utils.tensor_file import convert_to_tensor_file
+
+
+def make_model(layers, size):
+    """A stack of linear layers, with layers * size ** 2 parameters."""
+    return torch.nn.Sequential(
+        *[torch.nn.Linear(size, size) for _ in range(layers)]
+    )
+
+
+def peak_rss():
+    """The peak resident set size of this process in MB (Linux only)."""
+    with open("/proc/self/status") as fi:
+        for line in fi:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+
+def load(path, layers, size, queue):
+    """Loads path into a new model, reports the time and peak memory."""
+    model = make_model(layers, size)
+    peak_before = peak_rss()
+    start = time.perf_counter()
+    torch_parameter_transfer(model, path, device="cpu")
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss() - peak_before))
+
+
+def run_fresh(path, layers, size):
+    """Runs load in a new process, so that the peak memory is its own."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=load, args=(path, layers, size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--layers", type=int, default=24)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        torch_path = pathlib.Path(tmpdir) / "torch.ckpt"
+        tensor_path = pathlib.Path(tmpdir) / "tensors.ckpt"
+        model = make_model(args.layers, args.size)
+        torch.save(model.state_dict(), torch_path)
+        torch.save(model.state_dict(), tensor_path)
+        convert_to_tensor_file(tensor_path)
+        del model
+        print(f"model of {torch_path.stat().st_size / 2 ** 20:.0f} MB")
+
+        for name, path in [("torch.save", torch_path), ("tensor", tensor_path)]:
+            results = [
+                run_fresh(path, args.layers, args.size)
+                for _ in range(args.repeats)
+            ]
+            elapsed = min(r[0] for r in results)
+            peak = min(r[1] for r in results)
+            print(
+                f"  {name:10} {elapsed * 1000:8.1f} ms, "
+                f"peak memory on top of the module {peak:7.1f} MB"
+            )
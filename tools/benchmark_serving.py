@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Load test of the dynamic batching server for pretrained models.
+
+Concurrent clients send requests (random-length waveforms) back to back,
+first to a naive server which runs one request at a time, then to a
+``BatchingServer``. The script reports the throughput and the p50 / p99
+latencies of both.
+
+By default a small randomly initialized CRDNN-like model is served, so that
+the benchmark runs offline. A real model can be served instead, e.g.::
+
+    python tools/benchmark_serving.py \\
+        --source speechbrain/asr-crdnn-rnnlm-librispeech \\
+        --interface EncoderDecoderASR --method transcribe_batch
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_serving.py --clients 32 --requests 512
+"""
+import asyncio
+import concurrent.futures
+import random
+import time
+
+import torch
+
+import speechbrain.pretrained as pretrained
+from speechbrain.pretrained.serving import BatchingServer
+
+
+class _ToyModel(torch.nn.Module):
+    """Features, CNN, RNN and a classifier, roughly the cost profile of a
+    small ASR encoder."""
+
+    def __init__(self, n_mels=40, hidden=256, n_out=100):
+        super().__init__()
+        from speechbrain.lobes.features import Fbank
+
+        self.fbank = Fbank(n_mels=n_mels)
+        self.cnn = torch.nn.Conv1d(n_mels, hidden, 3, stride=2, padding=1)
+        self.rnn = torch.nn.LSTM(hidden, hidden, batch_first=True)
+        self.out = torch.nn.Linear(hidden, n_out)
+
+    def forward(self, wavs, wav_lens):
+        feats = self.fbank(wavs)
+        x = torch.relu(self.cnn(feats.transpose(1, 2))).transpose(1, 2)
+        x, _ = self.rnn(x)
+        return self.out(x).log_softmax(dim=-1).argmax(dim=-1)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def _load_test(submit, wavs, num_clients):
+    """Closed loop: every client sends its next request when it gets the
+    answer to the previous one."""
+    pending = list(wavs)
+    latencies = []
+
+    async def client():
+        while pending:
+            wav = pending.pop()
+            start = time.perf_counter()
+            await submit(wav)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(num_clients)])
+    return latencies, time.perf_counter() - start
+
+
+def _report(name, latencies, elapsed):
+    print(
+        "%-8s throughput: %7.1f req/s  p50: %7.1f ms  p99: %7.1f ms"
+        % (
+            name,
+            len(latencies) / elapsed,
+            1000 * _percentile(latencies, 50),
+            1000 * _percentile(latencies, 99),
+        )
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Load test the dynamic batching server."
+    )
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--min-duration", type=float, default=1.0)
+    parser.add_argument("--max-duration", type=float, default=6.0)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--source", help="Pretrained model to serve.")
+    parser.add_argument("--interface", default="EncoderDecoderASR")
+    parser.add_argument("--method", default="transcribe_batch")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    rng = random.Random(args.seed)
+    if args.source:
+        model = getattr(pretrained, args.interface).from_hparams(
+            source=args.source, run_opts={"device": args.device}
+        )
+        batch_fn = getattr(model, args.method)
+    else:
+        batch_fn = _ToyModel().to(args.device).eval()
+    wavs = [
+        torch.randn(
+            int(16000 * rng.uniform(args.min_duration, args.max_duration))
+        )
+        for _ in range(args.requests)
+    ]
+
+    # Naive: one request at a time on the model
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def run_one(wav):
+        with torch.no_grad():
+            return batch_fn(wav.unsqueeze(0), torch.tensor([1.0]))
+
+    async def naive_submit(wav):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, run_one, wav)
+
+    _report("naive", *asyncio.run(_load_test(naive_submit, wavs, args.clients)))
+
+    with BatchingServer(
+        batch_fn,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    ) as server:
+        _report(
+            "batched",
+            *asyncio.run(_load_test(server.submit, wavs, args.clients)),
+        )
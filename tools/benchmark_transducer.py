@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmarks the Numba transducer loss against torchaudio's rnnt_loss.
+
+Times the forward and backward passes of
+``speechbrain.nnet.loss.transducer_loss.TransducerLoss`` (with and without
+the fused log-softmax) and of ``torchaudio.functional.rnnt_loss`` on random
+logits, and checks that they give the same losses and gradients. The
+SpeechBrain loss of an utterance is divided by its number of frames (but
+not its gradient), so it is multiplied back before the comparison.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_transducer.py --batch 8 --time 200 --labels 50 \\
+        --vocab 256 --device cpu
+"""
+import time
+
+import torch
+from torchaudio.functional import rnnt_loss
+
+from speechbrain.nnet.loss.transducer_loss import TransducerLoss
+
+
+def random_batch(batch, max_time, max_labels, vocab, device, generator):
+    """Random logits and targets, with random lengths."""
+    logits = torch.randn(
+        batch, max_time, max_labels + 1, vocab, generator=generator
+    )
+    labels = torch.randint(1, vocab, (batch, max_labels), generator=generator)
+    logit_lens = torch.randint(
+        max_time // 2, max_time + 1, (batch,), generator=generator
+    )
+    label_lens = torch.randint(
+        max_labels // 2, max_labels + 1, (batch,), generator=generator
+    )
+    logit_lens[0], label_lens[0] = max_time, max_labels
+    return (
+        logits.to(device).requires_grad_(),
+        labels.int().to(device),
+        logit_lens.int().to(device),
+        label_lens.int().to(device),
+    )
+
+
+def run(loss_fn, logits, repeats):
+    """Returns the losses, the gradients and the mean time of one pass."""
+    times = []
+    for _ in range(repeats):
+        logits.grad = None
+        if logits.is_cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        loss = loss_fn(logits)
+        loss.sum().backward()
+        if logits.is_cuda:
+            torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+    # The first pass compiles the Numba kernels
+    times = times[1:] if len(times) > 1 else times
+    return loss.detach(), logits.grad.clone(), sum(times) / len(times)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--time", type=int, default=200)
+    parser.add_argument("--labels", type=int, default=50)
+    parser.add_argument("--vocab", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(args.seed)
+    logits, labels, logit_lens, label_lens = random_batch(
+        args.batch, args.time, args.labels, args.vocab, args.device, generator
+    )
+    print(
+        f"logits {tuple(logits.shape)} on {args.device} "
+        f"({logits.numel() * 4 / 2 ** 20:.0f} MB)"
+    )
+
+    ref_loss, ref_grads, ref_time = run(
+        lambda x: rnnt_loss(
+            x, labels, logit_lens, label_lens, blank=0, reduction="none"
+        ),
+        logits,
+        args.repeats,
+    )
+    print(f"  torchaudio           {ref_time * 1000:9.1f} ms")
+    for fused in [False, True]:
+        loss_fn = TransducerLoss(
+            blank=0, reduction="none", fused_log_softmax=fused
+        )
+        loss, grads, sb_time = run(
+            lambda x: loss_fn(x, labels, logit_lens, label_lens),
+            logits,
+            args.repeats,
+        )
+        loss = loss * logit_lens
+        name = "speechbrain (fused)" if fused else "speechbrain"
+        print(
+            f"  {name:20} {sb_time * 1000:9.1f} ms, "
+            f"max loss diff {(loss - ref_loss).abs().max():.2e}, "
+            f"max grad diff {(grads - ref_grads).abs().max():.2e}"
+        )
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmarks the WER computation on random transcripts.
+
+Compares the batched numpy edit distance solver
+(``speechbrain.utils.edit_distance.batch_count_ops`` and
+``batch_alignments``) with the plain Python dynamic programming
+(``op_table`` followed by ``count_ops`` / ``alignment``), and checks that
+both give the same results.
+
+Usage
+-----
+
+::
+
+    python tools/benchmark_wer.py --num-utts 2000 --max-len 40
+    python tools/benchmark_wer.py --num-utts 10 --max-len 2000  # long-form
+"""
+import random
+import time
+
+import speechbrain.utils.edit_distance as edit_distance
+
+
+def _random_pairs(num_utts, max_len, vocab_size, error_rate, seed):
+    # Hypotheses are noisy copies of the references, as in real ASR output
+    rng = random.Random(seed)
+    refs, hyps = [], []
+    for _ in range(num_utts):
+        ref = [
+            "w%d" % rng.randrange(vocab_size)
+            for _ in range(rng.randint(1, max_len))
+        ]
+        hyp = []
+        for token in ref:
+            r = rng.random()
+            if r < error_rate / 3:
+                continue  # deletion
+            elif r < 2 * error_rate / 3:
+                hyp.append("w%d" % rng.randrange(vocab_size))
+            elif r < error_rate:
+                hyp.extend([token, "w%d" % rng.randrange(vocab_size)])
+            else:
+                hyp.append(token)
+        refs.append(ref)
+        hyps.append(hyp)
+    return refs, hyps
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    output = function(*args)
+    return output, time.perf_counter() - start
+
+
+def _python_counts(refs, hyps):
+    return [
+        edit_distance.count_ops(edit_distance.op_table(ref, hyp))
+        for ref, hyp in zip(refs, hyps)
+    ]
+
+
+def _python_alignments(refs, hyps):
+    return [
+        edit_distance.alignment(edit_distance.op_table(ref, hyp))
+        for ref, hyp in zip(refs, hyps)
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the edit distance used for WER computation."
+    )
+    parser.add_argument("--num-utts", type=int, default=2000)
+    parser.add_argument("--max-len", type=int, default=40)
+    parser.add_argument("--vocab-size", type=int, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    refs, hyps = _random_pairs(
+        args.num_utts, args.max_len, args.vocab_size, args.error_rate, args.seed
+    )
+    num_tokens = sum(len(ref) for ref in refs)
+    print("%d utterances, %d reference tokens" % (len(refs), num_tokens))
+    for name, python_fn, batch_fn in [
+        ("counts", _python_counts, edit_distance.batch_count_ops),
+        ("alignments", _python_alignments, edit_distance.batch_alignments),
+    ]:
+        expected, python_time = _timed(python_fn, refs, hyps)
+        output, batch_time = _timed(batch_fn, refs, hyps)
+        assert output == expected, "Batched results differ from op_table"
+        print(
+            "%-10s python: %.3fs  batched: %.3fs  speedup: %.1fx"
+            % (name, python_time, batch_time, python_time / batch_time)
+        )
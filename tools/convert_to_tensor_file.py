@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Converts parameter files written by torch.save to memory-mapped tensor
+files (see ``speechbrain.utils.tensor_file``), in place.
+
+The files keep their names, so that the Pretrainer and the Checkpointer
+find them as before. Directories are searched for ``.ckpt`` files; the files
+which do not hold a flat dict of tensors (optimizers, schedulers, counters)
+are left as they are.
+
+Usage
+-----
+
+::
+
+    python tools/convert_to_tensor_file.py pretrained_models/asr-wav2vec2 \\
+        results/CKPT+2023-01-01+00-00-00+00/model.ckpt
+"""
+import pathlib
+
+from speechbrain.utils.tensor_file import (
+    convert_to_tensor_file,
+    is_tensor_file,
+)
+
+
+def find_paramfiles(paths):
+    """Yields the .ckpt files given, or found in the directories given."""
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            yield from sorted(path.rglob("*.ckpt"))
+        else:
+            yield path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("paths", nargs="+", help="Files or directories")
+    args = parser.parse_args()
+
+    for path in find_paramfiles(args.paths):
+        if is_tensor_file(path):
+            print(f"{path}: already a tensor file")
+            continue
+        try:
+            convert_to_tensor_file(path.resolve())
+            print(f"{path}: converted")
+        except ValueError as e:
+            print(f"{path}: skipped ({e})")